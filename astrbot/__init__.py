@@ -1,3 +1,9 @@
-from .core.log import LogManager
+def __getattr__(name: str):
+    # 延迟导入 astrbot.core：文档解析子进程只导入 astrbot.kb_processing，不应初始化核心
+    if name == "logger":
+        from .core.log import LogManager
 
-logger = LogManager.GetLogger(log_name="astrbot")
+        logger = LogManager.GetLogger(log_name="astrbot")
+        globals()["logger"] = logger
+        return logger
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
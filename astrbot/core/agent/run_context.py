@@ -17,6 +17,8 @@ class ContextWrapper(Generic[TContext]):
     messages: list[Message] = Field(default_factory=list)
     """This field stores the llm message context for the agent run, agent runners will maintain this field automatically."""
     tool_call_timeout: int = 60  # Default tool call timeout in seconds
+    max_concurrent_tool_calls: int = 4
+    """The maximum number of tool calls executed concurrently in one step. 1 means sequential execution."""
 
 
 NoContext = ContextWrapper[None]
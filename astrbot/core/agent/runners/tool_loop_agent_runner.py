@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import traceback
 import typing as T
@@ -26,6 +27,7 @@ from ..hooks import BaseAgentRunHooks
 from ..message import AssistantMessageSegment, Message, ToolCallMessageSegment
 from ..response import AgentResponseData
 from ..run_context import ContextWrapper, TContext
+from ..tool import FunctionTool, ToolSet
 from ..tool_executor import BaseFunctionToolExecutor
 from .base import AgentResponse, AgentState, BaseAgentRunner
 
@@ -62,10 +64,10 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         if request.prompt is not None:
             m = await request.assemble_context()
             messages.append(Message.model_validate(m))
-        if request.system_prompt:
+        if system_prompt := request.merged_system_prompt():
             messages.insert(
                 0,
-                Message(role="system", content=request.system_prompt),
+                Message(role="system", content=system_prompt),
             )
         self.run_context.messages = messages
 
@@ -75,14 +77,27 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
             logger.debug(f"Agent state transition: {self._state} -> {new_state}")
             self._state = new_state
 
+    def _request_kwargs(self) -> dict[str, T.Any]:
+        kwargs = self.req.__dict__
+        if (
+            self.req.dynamic_system_prompt
+            and not self.provider.supports_dynamic_system_prompt
+        ):
+            kwargs = {
+                **kwargs,
+                "system_prompt": self.req.merged_system_prompt(),
+                "dynamic_system_prompt": "",
+            }
+        return kwargs
+
     async def _iter_llm_responses(self) -> T.AsyncGenerator[LLMResponse, None]:
         """Yields chunks *and* a final LLMResponse."""
         if self.streaming:
-            stream = self.provider.text_chat_stream(**self.req.__dict__)
+            stream = self.provider.text_chat_stream(**self._request_kwargs())
             async for resp in stream:  # type: ignore
                 yield resp
         else:
-            yield await self.provider.text_chat(**self.req.__dict__)
+            yield await self.provider.text_chat(**self._request_kwargs())
 
     @override
     async def step(self):
@@ -230,91 +245,258 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
         req: ProviderRequest,
         llm_response: LLMResponse,
     ) -> T.AsyncGenerator[MessageChain | list[ToolCallMessageSegment], None]:
-        """处理函数工具调用。"""
-        tool_call_result_blocks: list[ToolCallMessageSegment] = []
+        """处理函数工具调用。
+
+        同一轮中相互独立的工具调用会并发执行，每个调用完成时即产出其结果；
+        最终返回的结果块按 tool_call_id 的原始顺序排列。
+        """
         logger.info(f"Agent 使用工具: {llm_response.tools_call_name}")
+        if not req.func_tool:
+            return
 
-        # 执行函数调用
-        for func_tool_name, func_tool_args, func_tool_id in zip(
-            llm_response.tools_call_name,
-            llm_response.tools_call_args,
-            llm_response.tools_call_ids,
-        ):
+        calls = list(
+            zip(
+                llm_response.tools_call_name,
+                llm_response.tools_call_args,
+                llm_response.tools_call_ids,
+            ),
+        )
+        results: list[list[ToolCallMessageSegment]] = [[] for _ in calls]
+        for batch in self._plan_tool_call_batches(req.func_tool, calls):
+            if len(batch) == 1:
+                idx = batch[0]
+                async for chain in self._execute_tool_call(
+                    req.func_tool.get_func(calls[idx][0]),
+                    *calls[idx],
+                    results[idx],
+                ):
+                    yield chain
+            else:
+                async for chain in self._execute_tool_calls_concurrently(
+                    req.func_tool,
+                    calls,
+                    batch,
+                    results,
+                ):
+                    yield chain
+
+        # 处理函数调用响应
+        tool_call_result_blocks = [block for blocks in results for block in blocks]
+        if tool_call_result_blocks:
+            yield tool_call_result_blocks
+
+    def _plan_tool_call_batches(
+        self,
+        func_tool: ToolSet,
+        calls: list[tuple[str, dict, str]],
+    ) -> list[list[int]]:
+        """将工具调用划分为若干批次，批次之间按顺序执行，批次内并发执行。
+
+        执行器判定不能并发的工具（如标记为 sequential 的工具）单独成为一个批次，
+        即等待之前的调用全部完成后再独占执行。
+        """
+        if self.run_context.max_concurrent_tool_calls <= 1:
+            return [[idx] for idx in range(len(calls))]
+        batches: list[list[int]] = []
+        current: list[int] = []
+        for idx, (func_tool_name, _, _) in enumerate(calls):
+            tool = func_tool.get_func(func_tool_name)
+            if tool and not self.tool_executor.is_concurrency_safe(tool):
+                if current:
+                    batches.append(current)
+                    current = []
+                batches.append([idx])
+            else:
+                current.append(idx)
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _execute_tool_calls_concurrently(
+        self,
+        func_tool: ToolSet,
+        calls: list[tuple[str, dict, str]],
+        batch: list[int],
+        results: list[list[ToolCallMessageSegment]],
+    ) -> T.AsyncGenerator[MessageChain, None]:
+        """并发执行一批工具调用，按完成顺序产出各调用的消息。
+
+        并发数受 run_context.max_concurrent_tool_calls 以及各工具的 max_concurrency 限制。
+        """
+        global_sem = asyncio.Semaphore(self.run_context.max_concurrent_tool_calls)
+        tool_sems: dict[str, asyncio.Semaphore] = {}
+        queue: asyncio.Queue[MessageChain | None] = asyncio.Queue()
+
+        async def _run(idx: int) -> None:
+            func_tool_name, func_tool_args, func_tool_id = calls[idx]
+            tool = func_tool.get_func(func_tool_name)
+            tool_sem = None
+            if tool and tool.max_concurrency > 0:
+                tool_sem = tool_sems.setdefault(
+                    func_tool_name,
+                    asyncio.Semaphore(tool.max_concurrency),
+                )
             try:
-                if not req.func_tool:
-                    return
-                func_tool = req.func_tool.get_func(func_tool_name)
-                logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
-
-                if not func_tool:
-                    logger.warning(f"未找到指定的工具: {func_tool_name}，将跳过。")
-                    tool_call_result_blocks.append(
-                        ToolCallMessageSegment(
-                            role="tool",
-                            tool_call_id=func_tool_id,
-                            content=f"error: 未找到工具 {func_tool_name}",
-                        ),
-                    )
+                async with global_sem:
+                    if tool_sem:
+                        await tool_sem.acquire()
+                    try:
+                        async for chain in self._execute_tool_call(
+                            tool,
+                            func_tool_name,
+                            func_tool_args,
+                            func_tool_id,
+                            results[idx],
+                        ):
+                            await queue.put(chain)
+                    finally:
+                        if tool_sem:
+                            tool_sem.release()
+            finally:
+                await queue.put(None)
+
+        tasks = [
+            asyncio.create_task(_run(idx), name=f"tool_call_{calls[idx][2]}")
+            for idx in batch
+        ]
+        try:
+            pending = len(tasks)
+            while pending:
+                chain = await queue.get()
+                if chain is None:
+                    pending -= 1
                     continue
+                yield chain
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _execute_tool_call(
+        self,
+        func_tool: FunctionTool | None,
+        func_tool_name: str,
+        func_tool_args: dict,
+        func_tool_id: str,
+        tool_call_result_blocks: list[ToolCallMessageSegment],
+    ) -> T.AsyncGenerator[MessageChain, None]:
+        """执行单个工具调用，结果块追加到 tool_call_result_blocks 中。"""
+        try:
+            logger.info(f"使用工具：{func_tool_name}，参数：{func_tool_args}")
+
+            if not func_tool:
+                logger.warning(f"未找到指定的工具: {func_tool_name}，将跳过。")
+                tool_call_result_blocks.append(
+                    ToolCallMessageSegment(
+                        role="tool",
+                        tool_call_id=func_tool_id,
+                        content=f"error: 未找到工具 {func_tool_name}",
+                    ),
+                )
+                return
 
-                valid_params = {}  # 参数过滤：只传递函数实际需要的参数
+            valid_params = {}  # 参数过滤：只传递函数实际需要的参数
 
-                # 获取实际的 handler 函数
-                if func_tool.handler:
-                    logger.debug(
-                        f"工具 {func_tool_name} 期望的参数: {func_tool.parameters}",
-                    )
-                    if func_tool.parameters and func_tool.parameters.get("properties"):
-                        expected_params = set(func_tool.parameters["properties"].keys())
-
-                        valid_params = {
-                            k: v
-                            for k, v in func_tool_args.items()
-                            if k in expected_params
-                        }
-
-                    # 记录被忽略的参数
-                    ignored_params = set(func_tool_args.keys()) - set(
-                        valid_params.keys(),
-                    )
-                    if ignored_params:
-                        logger.warning(
-                            f"工具 {func_tool_name} 忽略非期望参数: {ignored_params}",
-                        )
-                else:
-                    # 如果没有 handler（如 MCP 工具），使用所有参数
-                    valid_params = func_tool_args
+            # 获取实际的 handler 函数
+            if func_tool.handler:
+                logger.debug(
+                    f"工具 {func_tool_name} 期望的参数: {func_tool.parameters}",
+                )
+                if func_tool.parameters and func_tool.parameters.get("properties"):
+                    expected_params = set(func_tool.parameters["properties"].keys())
 
-                try:
-                    await self.agent_hooks.on_tool_start(
-                        self.run_context,
-                        func_tool,
-                        valid_params,
+                    valid_params = {
+                        k: v for k, v in func_tool_args.items() if k in expected_params
+                    }
+
+                # 记录被忽略的参数
+                ignored_params = set(func_tool_args.keys()) - set(
+                    valid_params.keys(),
+                )
+                if ignored_params:
+                    logger.warning(
+                        f"工具 {func_tool_name} 忽略非期望参数: {ignored_params}",
                     )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
+            else:
+                # 如果没有 handler（如 MCP 工具），使用所有参数
+                valid_params = func_tool_args
 
-                executor = self.tool_executor.execute(
-                    tool=func_tool,
-                    run_context=self.run_context,
-                    **valid_params,  # 只传递有效的参数
+            try:
+                await self.agent_hooks.on_tool_start(
+                    self.run_context,
+                    func_tool,
+                    valid_params,
                 )
+            except Exception as e:
+                logger.error(f"Error in on_tool_start hook: {e}", exc_info=True)
+
+            executor = self.tool_executor.execute(
+                tool=func_tool,
+                run_context=self.run_context,
+                **valid_params,  # 只传递有效的参数
+            )
 
-                _final_resp: CallToolResult | None = None
-                async for resp in executor:  # type: ignore
-                    if isinstance(resp, CallToolResult):
-                        res = resp
-                        _final_resp = resp
-                        if isinstance(res.content[0], TextContent):
+            # 单次调用的总超时，未设置时仅由执行器自身的超时约束
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + func_tool.timeout if func_tool.timeout else None
+
+            _final_resp: CallToolResult | None = None
+            while True:
+                try:
+                    if deadline is None:
+                        resp = await anext(executor)  # type: ignore
+                    else:
+                        resp = await asyncio.wait_for(
+                            anext(executor),  # type: ignore
+                            timeout=deadline - loop.time(),
+                        )
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    await executor.aclose()  # type: ignore
+                    raise Exception(
+                        f"tool {func_tool_name} execution timeout after {func_tool.timeout} seconds.",
+                    )
+                if isinstance(resp, CallToolResult):
+                    res = resp
+                    _final_resp = resp
+                    if isinstance(res.content[0], TextContent):
+                        tool_call_result_blocks.append(
+                            ToolCallMessageSegment(
+                                role="tool",
+                                tool_call_id=func_tool_id,
+                                content=res.content[0].text,
+                            ),
+                        )
+                        yield MessageChain().message(res.content[0].text)
+                    elif isinstance(res.content[0], ImageContent):
+                        tool_call_result_blocks.append(
+                            ToolCallMessageSegment(
+                                role="tool",
+                                tool_call_id=func_tool_id,
+                                content="返回了图片(已直接发送给用户)",
+                            ),
+                        )
+                        yield MessageChain(type="tool_direct_result").base64_image(
+                            res.content[0].data,
+                        )
+                    elif isinstance(res.content[0], EmbeddedResource):
+                        resource = res.content[0].resource
+                        if isinstance(resource, TextResourceContents):
                             tool_call_result_blocks.append(
                                 ToolCallMessageSegment(
                                     role="tool",
                                     tool_call_id=func_tool_id,
-                                    content=res.content[0].text,
+                                    content=resource.text,
                                 ),
                             )
-                            yield MessageChain().message(res.content[0].text)
-                        elif isinstance(res.content[0], ImageContent):
+                            yield MessageChain().message(resource.text)
+                        elif (
+                            isinstance(resource, BlobResourceContents)
+                            and resource.mimeType
+                            and resource.mimeType.startswith("image/")
+                        ):
                             tool_call_result_blocks.append(
                                 ToolCallMessageSegment(
                                     role="tool",
@@ -322,81 +504,51 @@ class ToolLoopAgentRunner(BaseAgentRunner[TContext]):
                                     content="返回了图片(已直接发送给用户)",
                                 ),
                             )
-                            yield MessageChain(type="tool_direct_result").base64_image(
-                                res.content[0].data,
+                            yield MessageChain(
+                                type="tool_direct_result",
+                            ).base64_image(resource.blob)
+                        else:
+                            tool_call_result_blocks.append(
+                                ToolCallMessageSegment(
+                                    role="tool",
+                                    tool_call_id=func_tool_id,
+                                    content="返回的数据类型不受支持",
+                                ),
                             )
-                        elif isinstance(res.content[0], EmbeddedResource):
-                            resource = res.content[0].resource
-                            if isinstance(resource, TextResourceContents):
-                                tool_call_result_blocks.append(
-                                    ToolCallMessageSegment(
-                                        role="tool",
-                                        tool_call_id=func_tool_id,
-                                        content=resource.text,
-                                    ),
-                                )
-                                yield MessageChain().message(resource.text)
-                            elif (
-                                isinstance(resource, BlobResourceContents)
-                                and resource.mimeType
-                                and resource.mimeType.startswith("image/")
-                            ):
-                                tool_call_result_blocks.append(
-                                    ToolCallMessageSegment(
-                                        role="tool",
-                                        tool_call_id=func_tool_id,
-                                        content="返回了图片(已直接发送给用户)",
-                                    ),
-                                )
-                                yield MessageChain(
-                                    type="tool_direct_result",
-                                ).base64_image(resource.blob)
-                            else:
-                                tool_call_result_blocks.append(
-                                    ToolCallMessageSegment(
-                                        role="tool",
-                                        tool_call_id=func_tool_id,
-                                        content="返回的数据类型不受支持",
-                                    ),
-                                )
-                                yield MessageChain().message("返回的数据类型不受支持。")
-
-                    elif resp is None:
-                        # Tool 直接请求发送消息给用户
-                        # 这里我们将直接结束 Agent Loop。
-                        # 发送消息逻辑在 ToolExecutor 中处理了。
-                        logger.warning(
-                            f"{func_tool_name} 没有没有返回值或者将结果直接发送给用户，此工具调用不会被记录到历史中。"
-                        )
-                        self._transition_state(AgentState.DONE)
-                    else:
-                        # 不应该出现其他类型
-                        logger.warning(
-                            f"Tool 返回了不支持的类型: {type(resp)}，将忽略。",
-                        )
-
-                try:
-                    await self.agent_hooks.on_tool_end(
-                        self.run_context,
-                        func_tool,
-                        func_tool_args,
-                        _final_resp,
+                            yield MessageChain().message("返回的数据类型不受支持。")
+
+                elif resp is None:
+                    # Tool 直接请求发送消息给用户
+                    # 这里我们将直接结束 Agent Loop。
+                    # 发送消息逻辑在 ToolExecutor 中处理了。
+                    logger.warning(
+                        f"{func_tool_name} 没有没有返回值或者将结果直接发送给用户，此工具调用不会被记录到历史中。"
+                    )
+                    self._transition_state(AgentState.DONE)
+                else:
+                    # 不应该出现其他类型
+                    logger.warning(
+                        f"Tool 返回了不支持的类型: {type(resp)}，将忽略。",
                     )
-                except Exception as e:
-                    logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
-            except Exception as e:
-                logger.warning(traceback.format_exc())
-                tool_call_result_blocks.append(
-                    ToolCallMessageSegment(
-                        role="tool",
-                        tool_call_id=func_tool_id,
-                        content=f"error: {e!s}",
-                    ),
-                )
 
-        # 处理函数调用响应
-        if tool_call_result_blocks:
-            yield tool_call_result_blocks
+            try:
+                await self.agent_hooks.on_tool_end(
+                    self.run_context,
+                    func_tool,
+                    func_tool_args,
+                    _final_resp,
+                )
+            except Exception as e:
+                logger.error(f"Error in on_tool_end hook: {e}", exc_info=True)
+        except Exception as e:
+            logger.warning(traceback.format_exc())
+            tool_call_result_blocks.append(
+                ToolCallMessageSegment(
+                    role="tool",
+                    tool_call_id=func_tool_id,
+                    content=f"error: {e!s}",
+                ),
+            )
 
     def done(self) -> bool:
         """检查 Agent 是否已完成工作"""
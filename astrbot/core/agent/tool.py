@@ -52,6 +52,19 @@ class FunctionTool(ToolSchema, Generic[TContext]):
     Whether the tool is active. This field is a special field for AstrBot.
     You can ignore it when integrating with other frameworks.
     """
+    sequential: bool | None = None
+    """
+    Whether the tool must not run concurrently with other tool calls of the same step.
+    Tools that rely on shared state (e.g. setting results on the event to send messages
+    directly to the user) should set this to True. None lets the tool executor decide.
+    """
+    max_concurrency: int = 0
+    """The maximum number of concurrent calls of this tool within one step. 0 means no limit."""
+    timeout: float | None = None
+    """
+    The total timeout in seconds for a single call of this tool.
+    If not set, only the executor's own timeout (tool_call_timeout) applies.
+    """
 
     def __repr__(self):
         return f"FuncTool(name={self.name}, parameters={self.parameters}, description={self.description})"
@@ -71,7 +84,53 @@ class ToolSet:
     """
 
     def __init__(self, tools: list[FunctionTool] | None = None):
-        self.tools: list[FunctionTool] = tools or []
+        self.tools = tools or []
+
+    @property
+    def tools(self) -> list[FunctionTool]:
+        return self._tools
+
+    @tools.setter
+    def tools(self, tools: list[FunctionTool]):
+        self._tools = tools
+        self._reindex()
+        self._cache: dict = {}
+        """schema cache, shared with copies until either side is modified"""
+
+    def _reindex(self):
+        self._index: dict[str, int] = {}
+        for i, tool in enumerate(self._tools):
+            self._index.setdefault(tool.name, i)
+        self._indexed_len = len(self._tools)
+
+    def _lookup(self, name: str) -> int | None:
+        if self._indexed_len != len(self._tools):
+            # the list was modified in place
+            self._reindex()
+            self._cache = {}
+        i = self._index.get(name)
+        if i is not None and self._tools[i].name != name:
+            self._reindex()
+            self._cache = {}
+            i = self._index.get(name)
+        return i
+
+    def _memoize(self, key, factory: Callable[[], Any]) -> Any:
+        if self._indexed_len != len(self._tools):
+            self._reindex()
+            self._cache = {}
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    def copy(self) -> "ToolSet":
+        """Create a shallow copy. The copy shares the schema cache until modified."""
+        new = ToolSet.__new__(ToolSet)
+        new._tools = self._tools.copy()
+        new._index = self._index.copy()
+        new._indexed_len = self._indexed_len
+        new._cache = self._cache
+        return new
 
     def empty(self) -> bool:
         """Check if the tool set is empty."""
@@ -80,22 +139,38 @@ class ToolSet:
     def add_tool(self, tool: FunctionTool):
         """Add a tool to the set."""
         # 检查是否已存在同名工具
-        for i, existing_tool in enumerate(self.tools):
-            if existing_tool.name == tool.name:
-                self.tools[i] = tool
+        i = self._lookup(tool.name)
+        if i is not None:
+            if self._tools[i] is tool:
                 return
-        self.tools.append(tool)
+            self._tools[i] = tool
+        else:
+            self._index[tool.name] = len(self._tools)
+            self._tools.append(tool)
+            self._indexed_len = len(self._tools)
+        self._cache = {}
 
     def remove_tool(self, name: str):
         """Remove a tool by its name."""
-        self.tools = [tool for tool in self.tools if tool.name != name]
+        if self._lookup(name) is None:
+            return
+        self.tools = [tool for tool in self._tools if tool.name != name]
 
     def get_tool(self, name: str) -> FunctionTool | None:
         """Get a tool by its name."""
-        for tool in self.tools:
-            if tool.name == name:
-                return tool
-        return None
+        i = self._lookup(name)
+        return self._tools[i] if i is not None else None
+
+    def filter(self, key, predicate: Callable[[FunctionTool], bool]) -> "ToolSet":
+        """Get a subset of the tools that satisfy the predicate.
+
+        The subset is cached under `key`, so `key` must identify the predicate.
+        """
+        subset: ToolSet = self._memoize(
+            ("filter", key),
+            lambda: ToolSet([tool for tool in self._tools if predicate(tool)]),
+        )
+        return subset.copy()
 
     @deprecated(reason="Use add_tool() instead", version="4.0.0")
     def add_func(
@@ -140,6 +215,14 @@ class ToolSet:
 
     def openai_schema(self, omit_empty_parameter_field: bool = False) -> list[dict]:
         """Convert tools to OpenAI API function calling schema format."""
+        return list(
+            self._memoize(
+                ("openai", omit_empty_parameter_field),
+                lambda: self._openai_schema(omit_empty_parameter_field),
+            ),
+        )
+
+    def _openai_schema(self, omit_empty_parameter_field: bool) -> list[dict]:
         result = []
         for tool in self.tools:
             func_def = {
@@ -160,6 +243,9 @@ class ToolSet:
 
     def anthropic_schema(self) -> list[dict]:
         """Convert tools to Anthropic API format."""
+        return list(self._memoize("anthropic", self._anthropic_schema))
+
+    def _anthropic_schema(self) -> list[dict]:
         result = []
         for tool in self.tools:
             input_schema = {"type": "object"}
@@ -176,7 +262,9 @@ class ToolSet:
 
     def google_schema(self) -> dict:
         """Convert tools to Google GenAI API format."""
+        return dict(self._memoize("google", self._google_schema))
 
+    def _google_schema(self) -> dict:
         def convert_schema(schema: dict) -> dict:
             """Convert schema to Gemini API format."""
             supported_types = {
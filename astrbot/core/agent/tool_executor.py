@@ -15,3 +15,8 @@ class BaseFunctionToolExecutor(Generic[TContext]):
         run_context: ContextWrapper[TContext],
         **tool_args,
     ) -> AsyncGenerator[Any | mcp.types.CallToolResult, None]: ...
+
+    @classmethod
+    def is_concurrency_safe(cls, tool: FunctionTool) -> bool:
+        """Whether the tool can run concurrently with other tool calls of the same step."""
+        return not tool.sequential
@@ -13,7 +13,6 @@ from astrbot.core.agent.tool import FunctionTool, ToolSet
 from astrbot.core.agent.tool_executor import BaseFunctionToolExecutor
 from astrbot.core.astr_agent_context import AstrAgentContext
 from astrbot.core.message.message_event_result import (
-    CommandResult,
     MessageChain,
     MessageEventResult,
 )
@@ -48,6 +47,17 @@ class FunctionToolExecutor(BaseFunctionToolExecutor[AstrAgentContext]):
                 yield r
             return
 
+    @classmethod
+    def is_concurrency_safe(cls, tool: FunctionTool) -> bool:
+        # Handoff 子 Agent 共用同一个事件，总是逐个执行
+        if isinstance(tool, HandoffTool):
+            return False
+        # 本地工具可能直接调用 event.set_result 发送消息，需在注册时显式传入
+        # sequential=False 才会并发；未声明时只有 MCP 工具并发
+        if tool.sequential is None:
+            return isinstance(tool, MCPTool)
+        return super().is_concurrency_safe(tool)
+
     @classmethod
     async def _execute_handoff(
         cls,
@@ -135,7 +145,13 @@ class FunctionToolExecutor(BaseFunctionToolExecutor[AstrAgentContext]):
                     anext(wrapper),
                     timeout=run_context.tool_call_timeout,
                 )
-                if resp is not None:
+                if isinstance(resp, MessageEventResult):
+                    # NOTE: Tool 在这里直接请求发送消息给用户
+                    # 直接使用本次调用产出的结果，并发的调用之间不会相互读取
+                    event.set_result(resp)
+                    await cls._send_direct_result(event, resp)
+                    yield None
+                elif resp is not None:
                     if isinstance(resp, mcp.types.CallToolResult):
                         yield resp
                     else:
@@ -145,23 +161,14 @@ class FunctionToolExecutor(BaseFunctionToolExecutor[AstrAgentContext]):
                         )
                         yield mcp.types.CallToolResult(content=[text_content])
                 else:
-                    # NOTE: Tool 在这里直接请求发送消息给用户
+                    # 处理函数自行调用了 event.set_result。并发执行的工具之间会共享
+                    # 该结果，因此只对逐个执行的工具读取
                     # TODO: 是否需要判断 event.get_result() 是否为空?
                     # 如果为空,则说明没有发送消息给用户,并且返回值为空,将返回一个特殊的 TextContent,其内容如"工具没有返回内容"
-                    if res := run_context.context.event.get_result():
-                        if res.chain:
-                            try:
-                                await event.send(
-                                    MessageChain(
-                                        chain=res.chain,
-                                        type="tool_direct_result",
-                                    )
-                                )
-                            except Exception as e:
-                                logger.error(
-                                    f"Tool 直接发送消息失败: {e}",
-                                    exc_info=True,
-                                )
+                    if not cls.is_concurrency_safe(tool) and (
+                        res := event.get_result()
+                    ):
+                        await cls._send_direct_result(event, res)
                     yield None
             except asyncio.TimeoutError:
                 raise Exception(
@@ -170,6 +177,23 @@ class FunctionToolExecutor(BaseFunctionToolExecutor[AstrAgentContext]):
             except StopAsyncIteration:
                 break
 
+    @staticmethod
+    async def _send_direct_result(event, res: MessageEventResult) -> None:
+        if not res.chain:
+            return
+        try:
+            await event.send(
+                MessageChain(
+                    chain=res.chain,
+                    type="tool_direct_result",
+                )
+            )
+        except Exception as e:
+            logger.error(
+                f"Tool 直接发送消息失败: {e}",
+                exc_info=True,
+            )
+
     @classmethod
     async def _execute_mcp(
         cls,
@@ -221,15 +245,9 @@ async def call_local_llm_tool(
             async for ret in ready_to_call:
                 # 这里逐步执行异步生成器, 对于每个 yield 返回的 ret, 执行下面的代码
                 # 返回值只能是 MessageEventResult 或者 None（无返回值）
+                # MessageEventResult 原样交给调用方，由调用方发送本次调用的结果
                 _has_yielded = True
-                if isinstance(ret, (MessageEventResult, CommandResult)):
-                    # 如果返回值是 MessageEventResult, 设置结果并继续
-                    event.set_result(ret)
-                    yield
-                else:
-                    # 如果返回值是 None, 则不设置结果并继续
-                    # 继续执行后续阶段
-                    yield ret
+                yield ret
             if not _has_yielded:
                 # 如果这个异步生成器没有执行到 yield 分支
                 yield
@@ -239,8 +257,4 @@ async def call_local_llm_tool(
     elif inspect.iscoroutine(ready_to_call):
         # 如果只是一个协程, 直接执行
         ret = await ready_to_call
-        if isinstance(ret, (MessageEventResult, CommandResult)):
-            event.set_result(ret)
-            yield
-        else:
-            yield ret
+        yield ret
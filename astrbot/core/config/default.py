@@ -66,11 +66,17 @@ DEFAULT_CONFIG = {
         "prompt_prefix": "{{prompt}}",
         "max_context_length": -1,
         "dequeue_context_length": 1,
+        "max_context_tokens": 0,
+        "history_image_turns": -1,
+        "history_image_policy": "drop",
+        "prompt_cache": True,
+        "dynamic_prompt_position": "system",
         "streaming_response": False,
         "show_tool_use_status": False,
         "unsupported_streaming_strategy": "realtime_segmenting",
         "max_agent_step": 30,
         "tool_call_timeout": 60,
+        "max_concurrent_tool_calls": 4,
     },
     "provider_stt_settings": {
         "enable": False,
@@ -81,6 +87,8 @@ DEFAULT_CONFIG = {
         "provider_id": "",
         "dual_output": False,
         "use_file_service": False,
+        "max_concurrency": 3,
+        "cache_size_mb": 64,
     },
     "provider_ltm_settings": {
         "group_icl_enable": False,
@@ -95,7 +103,11 @@ DEFAULT_CONFIG = {
     },
     "content_safety": {
         "also_use_in_response": False,
-        "internal_keywords": {"enable": True, "extra_keywords": []},
+        "internal_keywords": {
+            "enable": True,
+            "extra_keywords": [],
+            "normalize": True,
+        },
         "baidu_aip": {"enable": False, "app_id": "", "api_key": "", "secret_key": ""},
     },
     "admins_id": ["astrbot"],
@@ -137,6 +149,12 @@ DEFAULT_CONFIG = {
     "kb_names": [],  # 默认知识库名称列表
     "kb_fusion_top_k": 20,  # 知识库检索融合阶段返回结果数量
     "kb_final_top_k": 5,  # 知识库检索最终返回结果数量
+    "event_bus_settings": {
+        "max_concurrency": 64,  # 全局同时处理的事件数量上限, <= 0 表示不限制
+        "max_concurrency_per_session": 1,  # 单个私聊会话或群成员同时处理的事件数量上限
+        "max_pending": 2000,  # 等待处理的事件数量上限
+        "overflow_strategy": "shed",  # shed, discard
+    },
 }
 
 
@@ -718,6 +736,10 @@ CONFIG_METADATA_2 = {
                                 "items": {"type": "string"},
                                 "hint": "额外的屏蔽关键词列表，支持正则表达式。",
                             },
+                            "normalize": {
+                                "type": "bool",
+                                "hint": "启用后，匹配前会去除零宽字符、将全角字符转为半角并忽略大小写。",
+                            },
                         },
                     },
                 },
@@ -2004,6 +2026,21 @@ CONFIG_METADATA_2 = {
                     "dequeue_context_length": {
                         "type": "int",
                     },
+                    "max_context_tokens": {
+                        "type": "int",
+                    },
+                    "history_image_turns": {
+                        "type": "int",
+                    },
+                    "history_image_policy": {
+                        "type": "string",
+                    },
+                    "prompt_cache": {
+                        "type": "bool",
+                    },
+                    "dynamic_prompt_position": {
+                        "type": "string",
+                    },
                     "streaming_response": {
                         "type": "bool",
                     },
@@ -2021,6 +2058,10 @@ CONFIG_METADATA_2 = {
                         "description": "工具调用超时时间（秒）",
                         "type": "int",
                     },
+                    "max_concurrent_tool_calls": {
+                        "description": "工具并发调用数",
+                        "type": "int",
+                    },
                 },
             },
             "provider_stt_settings": {
@@ -2049,6 +2090,12 @@ CONFIG_METADATA_2 = {
                     "use_file_service": {
                         "type": "bool",
                     },
+                    "max_concurrency": {
+                        "type": "int",
+                    },
+                    "cache_size_mb": {
+                        "type": "int",
+                    },
                 },
             },
             "provider_ltm_settings": {
@@ -2146,6 +2193,18 @@ CONFIG_METADATA_2 = {
             "kb_names": {"type": "list", "items": {"type": "string"}},
             "kb_fusion_top_k": {"type": "int", "default": 20},
             "kb_final_top_k": {"type": "int", "default": 5},
+            "event_bus_settings": {
+                "type": "object",
+                "items": {
+                    "max_concurrency": {"type": "int"},
+                    "max_concurrency_per_session": {"type": "int"},
+                    "max_pending": {"type": "int"},
+                    "overflow_strategy": {
+                        "type": "string",
+                        "options": ["shed", "discard"],
+                    },
+                },
+            },
         },
     },
 }
@@ -2312,6 +2371,11 @@ CONFIG_METADATA_3 = {
                         "description": "工具调用超时时间（秒）",
                         "type": "int",
                     },
+                    "provider_settings.max_concurrent_tool_calls": {
+                        "description": "工具并发调用数",
+                        "type": "int",
+                        "hint": "同一轮中相互独立的工具调用最多同时执行的数量。MCP 工具默认并发执行，插件工具需在注册时声明 sequential=False 才会并发。设置为 1 则按顺序逐个执行。",
+                    },
                     "provider_settings.streaming_response": {
                         "description": "流式回复",
                         "type": "bool",
@@ -2336,6 +2400,35 @@ CONFIG_METADATA_3 = {
                         "type": "int",
                         "hint": "超出最多携带对话轮数时, 一次丢弃的聊天轮数。",
                     },
+                    "provider_settings.max_context_tokens": {
+                        "description": "上下文 Token 预算",
+                        "type": "int",
+                        "hint": "请求前按估算的 Token 数从最新的对话开始保留上下文，系统提示词、知识库内容、工具定义与本轮输入优先预留。建议设置为略低于模型上下文窗口的值。0 为不限制。",
+                    },
+                    "provider_settings.history_image_turns": {
+                        "description": "携带历史图片的对话轮数",
+                        "type": "int",
+                        "hint": "只在最近的若干轮对话中携带历史图片，更早的图片按下方策略处理。-1 为不限制。",
+                    },
+                    "provider_settings.history_image_policy": {
+                        "description": "更早历史图片的处理方式",
+                        "type": "string",
+                        "options": ["drop", "caption"],
+                        "labels": ["替换为占位文本", "替换为图片描述"],
+                        "hint": "替换为图片描述需要设置默认图片转述模型，描述生成后会被缓存。",
+                    },
+                    "provider_settings.prompt_cache": {
+                        "description": "提示词缓存",
+                        "type": "bool",
+                        "hint": "为 Anthropic 请求的工具定义、系统提示词与最后一条消息设置缓存断点。OpenAI、Gemini 等提供商会自动缓存相同的前缀，无需设置。",
+                    },
+                    "provider_settings.dynamic_prompt_position": {
+                        "description": "每轮变化的提示词位置",
+                        "type": "string",
+                        "options": ["system", "user"],
+                        "labels": ["系统提示词末尾", "最新用户消息开头"],
+                        "hint": "当前时间、知识库检索结果、引用消息等每轮变化的内容的位置。放在最新用户消息开头时，历史对话也能命中提示词缓存，首字延迟与费用更低。",
+                    },
                     "provider_settings.wake_prefix": {
                         "description": "LLM 聊天额外唤醒前缀 ",
                         "type": "string",
@@ -2350,6 +2443,16 @@ CONFIG_METADATA_3 = {
                         "description": "开启 TTS 时同时输出语音和文字内容",
                         "type": "bool",
                     },
+                    "provider_tts_settings.max_concurrency": {
+                        "description": "TTS 最大并发合成数",
+                        "type": "int",
+                        "hint": "分段回复时，多个消息段会同时合成语音，此项限制同时进行的合成请求数。",
+                    },
+                    "provider_tts_settings.cache_size_mb": {
+                        "description": "TTS 音频缓存大小(MB)",
+                        "type": "int",
+                        "hint": "相同提供商配置与文本的合成结果会被缓存到 data/tts_cache，超出大小时淘汰最久未使用的音频。设为 0 关闭缓存。缓存为全局共享，只读取默认配置。",
+                    },
                 },
             },
         },
@@ -2495,6 +2598,14 @@ CONFIG_METADATA_3 = {
                         "items": {"type": "string"},
                         "hint": "额外的屏蔽关键词列表，支持正则表达式。",
                     },
+                    "content_safety.internal_keywords.normalize": {
+                        "description": "关键词匹配前规范化文本",
+                        "type": "bool",
+                        "hint": "去除零宽字符、全角转半角并忽略大小写，防止通过变形绕过关键词检查。",
+                        "condition": {
+                            "content_safety.internal_keywords.enable": True,
+                        },
+                    },
                 },
             },
             "t2i": {
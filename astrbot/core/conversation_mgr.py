@@ -172,6 +172,7 @@ class ConversationManager:
         unified_msg_origin: str,
         conversation_id: str,
         create_if_not_exists: bool = False,
+        history_limit: int | None = None,
     ) -> Conversation | None:
         """获取会话的对话.
 
@@ -179,20 +180,65 @@ class ConversationManager:
             unified_msg_origin (str): 统一的消息来源字符串。格式为 platform_name:message_type:session_id
             conversation_id (str): 对话 ID, 是 uuid 格式的字符串
             create_if_not_exists (bool): 如果对话不存在,是否创建一个新的对话
+            history_limit (int): 若指定，history 中只包含最近的 history_limit 条消息
         Returns:
             conversation (Conversation): 对话对象
 
         """
-        conv = await self.db.get_conversation_by_id(cid=conversation_id)
+        load_content = history_limit is None
+        conv = await self.db.get_conversation_by_id(
+            cid=conversation_id,
+            load_content=load_content,
+        )
         if not conv and create_if_not_exists:
             # 如果对话不存在且需要创建，则新建一个对话
             conversation_id = await self.new_conversation(unified_msg_origin)
-            conv = await self.db.get_conversation_by_id(cid=conversation_id)
+            conv = await self.db.get_conversation_by_id(
+                cid=conversation_id,
+                load_content=load_content,
+            )
         conv_res = None
         if conv:
+            if not load_content:
+                conv.content = await self.db.get_conversation_messages(
+                    cid=conv.conversation_id,
+                    limit=history_limit,
+                )
             conv_res = self._convert_conv_from_v2_to_v1(conv)
         return conv_res
 
+    async def get_conversation_messages(
+        self,
+        conversation_id: str,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """获取对话的历史消息列表，而不读取整个对话对象.
+
+        Args:
+            conversation_id (str): 对话 ID, 是 uuid 格式的字符串
+            limit (int): 若指定，只返回最近的 limit 条消息
+        Returns:
+            messages (list[dict]): OpenAI 格式的消息列表
+
+        """
+        return await self.db.get_conversation_messages(
+            cid=conversation_id,
+            limit=limit,
+        )
+
+    async def append_messages(self, cid: str, messages: list[dict]) -> None:
+        """在对话历史末尾追加消息，不会读取或重写已有的历史.
+
+        Args:
+            cid (str): 对话 ID
+            messages (list[dict]): OpenAI 格式的消息列表
+
+        Raises:
+            ValueError: 对话不存在时抛出
+
+        """
+        await self.db.append_conversation_messages(cid=cid, messages=messages)
+
     async def get_conversations(
         self,
         unified_msg_origin: str | None = None,
@@ -336,10 +382,6 @@ class ConversationManager:
         Raises:
             Exception: If the conversation with the given ID is not found
         """
-        conv = await self.db.get_conversation_by_id(cid=cid)
-        if not conv:
-            raise Exception(f"Conversation with id {cid} not found")
-        history = conv.content or []
         if isinstance(user_message, UserMessageSegment):
             user_msg_dict = user_message.model_dump()
         else:
@@ -348,12 +390,10 @@ class ConversationManager:
             assistant_msg_dict = assistant_message.model_dump()
         else:
             assistant_msg_dict = assistant_message
-        history.append(user_msg_dict)
-        history.append(assistant_msg_dict)
-        await self.db.update_conversation(
-            cid=cid,
-            content=history,
-        )
+        try:
+            await self.append_messages(cid, [user_msg_dict, assistant_msg_dict])
+        except ValueError as e:
+            raise Exception(f"Conversation with id {cid} not found") from e
 
     async def get_human_readable_context(
         self,
@@ -22,17 +22,24 @@ from astrbot.core.config.default import VERSION
 from astrbot.core.conversation_mgr import ConversationManager
 from astrbot.core.db import BaseDatabase
 from astrbot.core.db.migration.migra_45_to_46 import migrate_45_to_46
+from astrbot.core.db.migration.migra_conversation_messages import (
+    migrate_conversation_messages,
+)
+from astrbot.core.db.migration.migra_inline_images import migrate_inline_images
 from astrbot.core.knowledge_base.kb_mgr import KnowledgeBaseManager
 from astrbot.core.persona_mgr import PersonaManager
 from astrbot.core.pipeline.scheduler import PipelineContext, PipelineScheduler
 from astrbot.core.platform.manager import PlatformManager
 from astrbot.core.platform_message_history_mgr import PlatformMessageHistoryManager
 from astrbot.core.provider.manager import ProviderManager
+from astrbot.core.provider.tts_cache import tts_audio_cache
 from astrbot.core.star import PluginManager
 from astrbot.core.star.context import Context
 from astrbot.core.star.star_handler import EventType, star_handlers_registry, star_map
 from astrbot.core.umop_config_router import UmopConfigRouter
 from astrbot.core.updator import AstrBotUpdator
+from astrbot.core.utils.io import media_cache, temp_janitor
+from astrbot.core.utils.metrics import Metric
 
 from . import astrbot_config, html_renderer
 from .event_bus import EventBus
@@ -84,7 +91,16 @@ class AstrBotCoreLifecycle:
 
         await self.db.initialize()
 
+        # 预热偏好设置缓存
+        await sp.initialize()
+
         await html_renderer.initialize()
+        temp_janitor.ensure_started()
+        # TTS 音频缓存为全局共享，大小上限以默认配置为准
+        tts_settings = self.astrbot_config.get("provider_tts_settings", {})
+        tts_audio_cache.max_bytes = (
+            int(tts_settings.get("cache_size_mb", 64)) * 1024 * 1024
+        )
 
         # 初始化 UMOP 配置路由器
         self.umop_config_router = UmopConfigRouter(sp=sp)
@@ -103,6 +119,9 @@ class AstrBotCoreLifecycle:
             logger.error(f"Migration from version 4.5 to 4.6 failed: {e!s}")
             logger.error(traceback.format_exc())
 
+        # 将对话历史迁移到追加写入的消息表，并将其中的内联图片提取为附件。读取时兼容旧格式，因此在后台进行
+        asyncio.create_task(self._migrate_conversation_messages())
+
         # 初始化事件队列
         self.event_queue = Queue()
 
@@ -179,6 +198,19 @@ class AstrBotCoreLifecycle:
         # 初始化关闭控制面板的事件
         self.dashboard_shutdown_event = asyncio.Event()
 
+    async def _migrate_conversation_messages(self) -> None:
+        try:
+            await migrate_conversation_messages(self.db)
+        except Exception as e:
+            logger.error(f"Migration of conversation messages failed: {e!s}")
+            logger.error(traceback.format_exc())
+            return
+        try:
+            await migrate_inline_images(self.db)
+        except Exception as e:
+            logger.error(f"Migration of inline images failed: {e!s}")
+            logger.error(traceback.format_exc())
+
     def _load(self) -> None:
         """加载事件总线和任务并初始化."""
         # 创建一个异步任务来执行事件总线的 dispatch() 方法
@@ -261,6 +293,9 @@ class AstrBotCoreLifecycle:
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
         await self.kb_manager.terminate()
+        await Metric.shutdown()
+        await media_cache.close()
+        await temp_janitor.stop()
         self.dashboard_shutdown_event.set()
 
         # 再次遍历curr_tasks等待每个任务真正结束
@@ -277,6 +312,9 @@ class AstrBotCoreLifecycle:
         await self.provider_manager.terminate()
         await self.platform_manager.terminate()
         await self.kb_manager.terminate()
+        await Metric.shutdown()
+        await media_cache.close()
+        await temp_janitor.stop()
         self.dashboard_shutdown_event.set()
         threading.Thread(
             target=self.astrbot_updator._reboot,
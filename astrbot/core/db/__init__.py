@@ -80,6 +80,17 @@ class BaseDatabase(abc.ABC):
         """Insert a new platform statistic record."""
         ...
 
+    @abc.abstractmethod
+    async def insert_platform_stats_batch(
+        self,
+        stats: list[tuple[datetime.datetime, str, str, int]],
+    ) -> None:
+        """Upsert many platform statistic records in one transaction.
+
+        Each item is a (timestamp, platform_id, platform_type, count) tuple.
+        """
+        ...
+
     @abc.abstractmethod
     async def count_platform_stats(self) -> int:
         """Count the number of platform statistics records."""
@@ -103,8 +114,15 @@ class BaseDatabase(abc.ABC):
         ...
 
     @abc.abstractmethod
-    async def get_conversation_by_id(self, cid: str) -> ConversationV2:
-        """Get a specific conversation by its ID."""
+    async def get_conversation_by_id(
+        self,
+        cid: str,
+        load_content: bool = True,
+    ) -> ConversationV2:
+        """Get a specific conversation by its ID.
+
+        If `load_content` is False, the history is not loaded and `content` may be None.
+        """
         ...
 
     @abc.abstractmethod
@@ -154,6 +172,27 @@ class BaseDatabase(abc.ABC):
         """Update a conversation's history."""
         ...
 
+    @abc.abstractmethod
+    async def append_conversation_messages(
+        self,
+        cid: str,
+        messages: list[dict],
+    ) -> None:
+        """Append messages to the end of a conversation's history.
+
+        Unlike `update_conversation`, the existing history is neither read nor rewritten.
+        """
+        ...
+
+    @abc.abstractmethod
+    async def get_conversation_messages(
+        self,
+        cid: str,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """Get a conversation's history in order. If `limit` is set, only the last `limit` messages are returned."""
+        ...
+
     @abc.abstractmethod
     async def delete_conversation(self, cid: str) -> None:
         """Delete a conversation by its ID."""
@@ -212,6 +251,16 @@ class BaseDatabase(abc.ABC):
         """Get an attachment by its ID."""
         ...
 
+    @abc.abstractmethod
+    async def get_attachments(self, attachment_ids: list[str]) -> list[Attachment]:
+        """Get attachments by their IDs. Missing IDs are skipped."""
+        ...
+
+    @abc.abstractmethod
+    async def get_attachment_by_path(self, path: str) -> Attachment | None:
+        """Get an attachment by its file path."""
+        ...
+
     @abc.abstractmethod
     async def insert_persona(
         self,
@@ -0,0 +1,36 @@
+"""将对话历史从 conversations.content JSON 列迁移到 conversation_messages 表。
+
+迁移是幂等的，可以在后台运行：读取时会兼容两种存储方式，追加消息时也会顺带迁移该对话。
+"""
+
+from sqlalchemy import text
+
+from astrbot.api import logger
+
+from .. import BaseDatabase
+
+BATCH_SIZE = 100
+
+
+async def migrate_conversation_messages(db: BaseDatabase):
+    migrated = 0
+    while True:
+        async with db.get_db() as session:
+            result = await session.execute(
+                text(
+                    "SELECT conversation_id FROM conversations "
+                    "WHERE content IS NOT NULL AND content != 'null' LIMIT :limit",
+                ),
+                {"limit": BATCH_SIZE},
+            )
+            cids = [row[0] for row in result.all()]
+        if not cids:
+            break
+        if migrated == 0:
+            logger.info("开始迁移对话历史到 conversation_messages 表...")
+        for cid in cids:
+            await db.append_conversation_messages(cid, [])
+        migrated += len(cids)
+
+    if migrated:
+        logger.info(f"对话历史迁移完成，共迁移 {migrated} 个对话。")
@@ -0,0 +1,56 @@
+"""将对话历史中内联的 base64 图片提取为附件引用。
+
+需在对话历史迁移到 conversation_messages 表之后运行。迁移是幂等的，可以在后台运行：
+解析时兼容内联图片与附件引用两种形式。
+"""
+
+import json
+
+from sqlalchemy import text
+
+from astrbot.api import logger
+from astrbot.core.provider.image_refs import externalize_images
+
+from .. import BaseDatabase
+
+BATCH_SIZE = 100
+
+
+async def migrate_inline_images(db: BaseDatabase):
+    last_id = 0
+    migrated = 0
+    while True:
+        async with db.get_db() as session:
+            result = await session.execute(
+                text(
+                    "SELECT id, payload FROM conversation_messages "
+                    "WHERE id > :last_id AND payload LIKE '%;base64,%' "
+                    "ORDER BY id LIMIT :limit",
+                ),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            )
+            rows = result.all()
+        if not rows:
+            break
+        if migrated == 0:
+            logger.info("开始将对话历史中的内联图片提取为附件...")
+        updates = []
+        for msg_id, payload in rows:
+            message = json.loads(payload) if isinstance(payload, str) else payload
+            new_message = (await externalize_images([message]))[0]
+            if new_message is not message:
+                updates.append({"id": msg_id, "payload": json.dumps(new_message)})
+        if updates:
+            async with db.get_db() as session, session.begin():
+                await session.execute(
+                    text(
+                        "UPDATE conversation_messages SET payload = :payload "
+                        "WHERE id = :id",
+                    ),
+                    updates,
+                )
+        migrated += len(updates)
+        last_id = rows[-1][0]
+
+    if migrated:
+        logger.info(f"内联图片提取完成，共处理 {migrated} 条消息。")
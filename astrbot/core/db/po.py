@@ -68,6 +68,38 @@ class ConversationV2(SQLModel, table=True):
     )
 
 
+class ConversationMessage(SQLModel, table=True):
+    """This class represents a single message of a conversation history.
+
+    Messages are stored append-only, ordered by `seq` within a conversation. It
+    replaces the legacy `ConversationV2.content` JSON column, which now stays
+    `None` once a conversation's history has been moved here.
+    """
+
+    __tablename__ = "conversation_messages"
+
+    id: int | None = Field(
+        default=None,
+        primary_key=True,
+        sa_column_kwargs={"autoincrement": True},
+    )
+    conversation_id: str = Field(max_length=36, nullable=False)
+    seq: int = Field(nullable=False)
+    """Position of the message in the conversation, starting from 0."""
+    role: str = Field(nullable=False)
+    payload: dict = Field(sa_type=JSON, nullable=False)
+    """OpenAI-format message dict."""
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint(
+            "conversation_id",
+            "seq",
+            name="uix_conversation_message_seq",
+        ),
+    )
+
+
 class Persona(SQLModel, table=True):
     """Persona is a set of instructions for LLMs to follow.
 
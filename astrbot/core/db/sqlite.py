@@ -1,7 +1,7 @@
 import asyncio
 import threading
 import typing as T
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import col, delete, desc, func, or_, select, text, update
@@ -9,6 +9,7 @@ from sqlmodel import col, delete, desc, func, or_, select, text, update
 from astrbot.core.db import BaseDatabase
 from astrbot.core.db.po import (
     Attachment,
+    ConversationMessage,
     ConversationV2,
     Persona,
     PlatformMessageHistory,
@@ -25,12 +26,21 @@ from astrbot.core.db.po import (
 
 NOT_GIVEN = T.TypeVar("NOT_GIVEN")
 
+_UPSERT_PLATFORM_STATS = text("""
+INSERT INTO platform_stats (timestamp, platform_id, platform_type, count)
+VALUES (:timestamp, :platform_id, :platform_type, :count)
+ON CONFLICT(timestamp, platform_id, platform_type) DO UPDATE SET
+    count = platform_stats.count + EXCLUDED.count
+""")
+
 
 class SQLiteDatabase(BaseDatabase):
     def __init__(self, db_path: str) -> None:
         self.db_path = db_path
         self.DATABASE_URL = f"sqlite+aiosqlite:///{db_path}"
         self.inited = False
+        self._conv_message_lock = asyncio.Lock()
+        """Serializes appends so that `seq` allocation does not race."""
         super().__init__()
 
     async def initialize(self) -> None:
@@ -68,12 +78,7 @@ class SQLiteDatabase(BaseDatabase):
                     )
                 current_hour = timestamp
                 await session.execute(
-                    text("""
-                    INSERT INTO platform_stats (timestamp, platform_id, platform_type, count)
-                    VALUES (:timestamp, :platform_id, :platform_type, :count)
-                    ON CONFLICT(timestamp, platform_id, platform_type) DO UPDATE SET
-                        count = platform_stats.count + EXCLUDED.count
-                    """),
+                    _UPSERT_PLATFORM_STATS,
                     {
                         "timestamp": current_hour,
                         "platform_id": platform_id,
@@ -82,6 +87,29 @@ class SQLiteDatabase(BaseDatabase):
                     },
                 )
 
+    async def insert_platform_stats_batch(
+        self,
+        stats: list[tuple[datetime, str, str, int]],
+    ) -> None:
+        """Upsert many platform statistic records in one transaction."""
+        if not stats:
+            return
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                await session.execute(
+                    _UPSERT_PLATFORM_STATS,
+                    [
+                        {
+                            "timestamp": timestamp,
+                            "platform_id": platform_id,
+                            "platform_type": platform_type,
+                            "count": count,
+                        }
+                        for timestamp, platform_id, platform_type, count in stats
+                    ],
+                )
+
     async def count_platform_stats(self) -> int:
         """Count the number of platform statistics records."""
         async with self.get_db() as session:
@@ -127,15 +155,19 @@ class SQLiteDatabase(BaseDatabase):
             # order by
             query = query.order_by(desc(ConversationV2.created_at))
             result = await session.execute(query)
+            conversations = result.scalars().all()
+            await self._hydrate_conversation_contents(session, conversations)
+            return conversations
 
-            return result.scalars().all()
-
-    async def get_conversation_by_id(self, cid):
+    async def get_conversation_by_id(self, cid, load_content=True):
         async with self.get_db() as session:
             session: AsyncSession
             query = select(ConversationV2).where(ConversationV2.conversation_id == cid)
             result = await session.execute(query)
-            return result.scalar_one_or_none()
+            conversation = result.scalar_one_or_none()
+            if conversation and load_content:
+                await self._hydrate_conversation_contents(session, [conversation])
+            return conversation
 
     async def get_all_conversations(self, page=1, page_size=20):
         async with self.get_db() as session:
@@ -147,7 +179,9 @@ class SQLiteDatabase(BaseDatabase):
                 .offset(offset)
                 .limit(page_size),
             )
-            return result.scalars().all()
+            conversations = result.scalars().all()
+            await self._hydrate_conversation_contents(session, conversations)
+            return conversations
 
     async def get_filtered_conversations(
         self,
@@ -172,6 +206,15 @@ class SQLiteDatabase(BaseDatabase):
                     or_(
                         col(ConversationV2.title).ilike(f"%{search_query}%"),
                         col(ConversationV2.content).ilike(f"%{search_query}%"),
+                        select(ConversationMessage.id)
+                        .where(
+                            col(ConversationMessage.conversation_id)
+                            == ConversationV2.conversation_id,
+                            col(ConversationMessage.payload).ilike(
+                                f"%{search_query}%",
+                            ),
+                        )
+                        .exists(),
                         col(ConversationV2.user_id).ilike(f"%{search_query}%"),
                         col(ConversationV2.conversation_id).ilike(f"%{search_query}%"),
                     ),
@@ -200,6 +243,7 @@ class SQLiteDatabase(BaseDatabase):
             )
             result = await session.execute(result_query)
             conversations = result.scalars().all()
+            await self._hydrate_conversation_contents(session, conversations)
 
             return conversations, total
 
@@ -226,14 +270,21 @@ class SQLiteDatabase(BaseDatabase):
             async with session.begin():
                 new_conversation = ConversationV2(
                     user_id=user_id,
-                    content=content or [],
+                    content=None,
                     platform_id=platform_id,
                     title=title,
                     persona_id=persona_id,
                     **kwargs,
                 )
                 session.add(new_conversation)
-                return new_conversation
+                session.add_all(
+                    self._build_message_rows(
+                        new_conversation.conversation_id,
+                        content or [],
+                    ),
+                )
+            new_conversation.content = content or []
+            return new_conversation
 
     async def update_conversation(self, cid, title=None, persona_id=None, content=None):
         async with self.get_db() as session:
@@ -248,13 +299,120 @@ class SQLiteDatabase(BaseDatabase):
                 if persona_id is not None:
                     values["persona_id"] = persona_id
                 if content is not None:
-                    values["content"] = content
+                    # 全量替换对话历史
+                    values["content"] = None
+                    values["updated_at"] = datetime.now(timezone.utc)
+                    await session.execute(
+                        delete(ConversationMessage).where(
+                            col(ConversationMessage.conversation_id) == cid,
+                        ),
+                    )
+                    session.add_all(self._build_message_rows(cid, content))
                 if not values:
                     return None
                 query = query.values(**values)
                 await session.execute(query)
         return await self.get_conversation_by_id(cid)
 
+    async def append_conversation_messages(self, cid, messages):
+        # 即使 messages 为空，也会将旧版本存储在 content 列中的历史迁移到消息表
+        async with self._conv_message_lock, self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                result = await session.execute(
+                    select(ConversationV2.content).where(
+                        col(ConversationV2.conversation_id) == cid,
+                    ),
+                )
+                row = result.first()
+                if row is None:
+                    raise ValueError(f"Conversation with id {cid} not found")
+                legacy_content = row[0]
+                if legacy_content is not None:
+                    # 旧版本存储在 content 列中的历史，先迁移到消息表
+                    session.add_all(self._build_message_rows(cid, legacy_content))
+                    next_seq = len(legacy_content)
+                else:
+                    result = await session.execute(
+                        select(func.max(ConversationMessage.seq)).where(
+                            col(ConversationMessage.conversation_id) == cid,
+                        ),
+                    )
+                    max_seq = result.scalar_one_or_none()
+                    next_seq = 0 if max_seq is None else max_seq + 1
+                session.add_all(self._build_message_rows(cid, messages, next_seq))
+                await session.execute(
+                    update(ConversationV2)
+                    .where(col(ConversationV2.conversation_id) == cid)
+                    .values(content=None, updated_at=datetime.now(timezone.utc)),
+                )
+
+    async def get_conversation_messages(self, cid, limit=None):
+        async with self.get_db() as session:
+            session: AsyncSession
+            result = await session.execute(
+                select(ConversationV2.content).where(
+                    col(ConversationV2.conversation_id) == cid,
+                ),
+            )
+            row = result.first()
+            if row is None:
+                return []
+            if row[0] is not None:
+                legacy_content = row[0]
+                return legacy_content[-limit:] if limit else legacy_content
+            query = (
+                select(ConversationMessage.payload)
+                .where(col(ConversationMessage.conversation_id) == cid)
+                .order_by(desc(ConversationMessage.seq))
+            )
+            if limit:
+                query = query.limit(limit)
+            result = await session.execute(query)
+            messages = list(result.scalars().all())
+            messages.reverse()
+            return messages
+
+    @staticmethod
+    def _build_message_rows(
+        cid: str,
+        messages: list[dict],
+        start_seq: int = 0,
+    ) -> list[ConversationMessage]:
+        return [
+            ConversationMessage(
+                conversation_id=cid,
+                seq=start_seq + i,
+                role=str(message.get("role", "")),
+                payload=message,
+            )
+            for i, message in enumerate(messages)
+        ]
+
+    @staticmethod
+    async def _hydrate_conversation_contents(
+        session: AsyncSession,
+        conversations: T.Sequence[ConversationV2],
+    ) -> None:
+        """为历史存储在消息表中的对话填充 `content`，以兼容读取完整历史的调用方。
+
+        Note: 必须在会话中的最后一次查询之后调用，避免修改后的对象被 autoflush 写回数据库。
+        """
+        cids = [c.conversation_id for c in conversations if c.content is None]
+        if not cids:
+            return
+        result = await session.execute(
+            select(ConversationMessage.conversation_id, ConversationMessage.payload)
+            .where(col(ConversationMessage.conversation_id).in_(cids))
+            .order_by(ConversationMessage.conversation_id, ConversationMessage.seq),
+        )
+        grouped: dict[str, list[dict]] = {}
+        for cid, payload in result.all():
+            grouped.setdefault(cid, []).append(payload)
+        for conversation in conversations:
+            if conversation.content is None:
+                conversation.content = grouped.get(conversation.conversation_id, [])
+
     async def delete_conversation(self, cid):
         async with self.get_db() as session:
             session: AsyncSession
@@ -264,11 +422,25 @@ class SQLiteDatabase(BaseDatabase):
                         col(ConversationV2.conversation_id) == cid,
                     ),
                 )
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id) == cid,
+                    ),
+                )
 
     async def delete_conversations_by_user_id(self, user_id: str) -> None:
         async with self.get_db() as session:
             session: AsyncSession
             async with session.begin():
+                await session.execute(
+                    delete(ConversationMessage).where(
+                        col(ConversationMessage.conversation_id).in_(
+                            select(ConversationV2.conversation_id).where(
+                                col(ConversationV2.user_id) == user_id,
+                            ),
+                        ),
+                    ),
+                )
                 await session.execute(
                     delete(ConversationV2).where(
                         col(ConversationV2.user_id) == user_id
@@ -469,6 +641,26 @@ class SQLiteDatabase(BaseDatabase):
             result = await session.execute(query)
             return result.scalar_one_or_none()
 
+    async def get_attachments(self, attachment_ids):
+        """Get attachments by their IDs. Missing IDs are skipped."""
+        if not attachment_ids:
+            return []
+        async with self.get_db() as session:
+            session: AsyncSession
+            query = select(Attachment).where(
+                col(Attachment.attachment_id).in_(attachment_ids),
+            )
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    async def get_attachment_by_path(self, path):
+        """Get an attachment by its file path."""
+        async with self.get_db() as session:
+            session: AsyncSession
+            query = select(Attachment).where(Attachment.path == path).limit(1)
+            result = await session.execute(query)
+            return result.scalar_one_or_none()
+
     async def insert_persona(
         self,
         persona_id,
@@ -10,6 +10,16 @@ from sqlmodel import Field, MetaData, SQLModel, col, func, select, text
 
 from astrbot.core import logger
 
+INDEXED_METADATA_COLUMNS = ("kb_id", "kb_doc_id", "user_id")
+"""以生成列形式建立索引的元数据键"""
+
+
+def metadata_filter_clause(key: str):
+    """元数据过滤条件。已建立索引的键直接使用生成列。"""
+    if key in INDEXED_METADATA_COLUMNS:
+        return text(f"documents.{key} = :filter_{key}")
+    return text(f"json_extract(metadata, '$.{key}') = :filter_{key}")
+
 
 class BaseDocModel(SQLModel, table=False):
     metadata = MetaData()
@@ -50,33 +60,23 @@ class DocumentStorage:
             # Create tables using SQLModel
             await conn.run_sync(BaseDocModel.metadata.create_all)
 
-            try:
-                await conn.execute(
-                    text(
-                        "ALTER TABLE documents ADD COLUMN kb_doc_id TEXT "
-                        "GENERATED ALWAYS AS (json_extract(metadata, '$.kb_doc_id')) STORED",
-                    ),
-                )
-                await conn.execute(
-                    text(
-                        "ALTER TABLE documents ADD COLUMN user_id TEXT "
-                        "GENERATED ALWAYS AS (json_extract(metadata, '$.user_id')) STORED",
-                    ),
-                )
-
-                # Create indexes
-                await conn.execute(
-                    text(
-                        "CREATE INDEX IF NOT EXISTS idx_documents_kb_doc_id ON documents(kb_doc_id)",
-                    ),
-                )
+            # 为常用的元数据键添加带索引的生成列，使过滤不必逐行解析 JSON。
+            # SQLite 不支持向已有数据的表添加 STORED 列，因此使用 VIRTUAL 列。
+            result = await conn.execute(text("PRAGMA table_xinfo(documents)"))
+            existing = {row[1] for row in result.fetchall()}
+            for column in INDEXED_METADATA_COLUMNS:
+                if column not in existing:
+                    await conn.execute(
+                        text(
+                            f"ALTER TABLE documents ADD COLUMN {column} TEXT "
+                            f"GENERATED ALWAYS AS (json_extract(metadata, '$.{column}')) VIRTUAL",
+                        ),
+                    )
                 await conn.execute(
                     text(
-                        "CREATE INDEX IF NOT EXISTS idx_documents_user_id ON documents(user_id)",
+                        f"CREATE INDEX IF NOT EXISTS idx_documents_{column} ON documents({column})",
                     ),
                 )
-            except BaseException:
-                pass
 
             await conn.commit()
 
@@ -130,7 +130,7 @@ class DocumentStorage:
 
             for key, val in metadata_filters.items():
                 query = query.where(
-                    text(f"json_extract(metadata, '$.{key}') = :filter_{key}"),
+                    metadata_filter_clause(key),
                 ).params(**{f"filter_{key}": val})
 
             if ids is not None and len(ids) > 0:
@@ -287,7 +287,7 @@ class DocumentStorage:
 
             for key, val in metadata_filters.items():
                 query = query.where(
-                    text(f"json_extract(metadata, '$.{key}') = :filter_{key}"),
+                    metadata_filter_clause(key),
                 ).params(**{f"filter_{key}": val})
 
             result = await session.execute(query)
@@ -316,7 +316,7 @@ class DocumentStorage:
             if metadata_filters:
                 for key, val in metadata_filters.items():
                     query = query.where(
-                        text(f"json_extract(metadata, '$.{key}') = :filter_{key}"),
+                        metadata_filter_clause(key),
                     ).params(**{f"filter_{key}": val})
 
             result = await session.execute(query)
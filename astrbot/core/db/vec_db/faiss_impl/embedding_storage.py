@@ -4,21 +4,403 @@ except ModuleNotFoundError:
     raise ImportError(
         "faiss 未安装。请使用 'pip install faiss-cpu' 或 'pip install faiss-gpu' 安装。",
     )
+import asyncio
+import json
+import math
 import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
+from astrbot import logger
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+"""支持的索引类型。flat 为精确检索，其余为近似最近邻（ANN）索引"""
+
+ANN_MIN_VECTORS = 10000
+"""向量数量达到该值后才训练/构建 ANN 索引，在此之前使用精确检索"""
+ANN_REBUILD_GROWTH = 4
+"""IVF 索引的向量数量增长到训练时的该倍数后重新训练"""
+HNSW_REBUILD_STALE_RATIO = 0.2
+"""HNSW 不支持删除，已删除向量占比超过该值后重建"""
+HNSW_M = 32
+
+DEFAULT_SAVE_DELAY = 5.0
+WAL_MAX_BYTES = 64 * 1024 * 1024
+
+_WAL_ADD = 1
+_WAL_REMOVE = 2
+_WAL_HEADER = struct.Struct("<BQQ")  # op, seq, count
+
 
 class EmbeddingStorage:
-    def __init__(self, dimension: int, path: str | None = None):
+    """FAISS 向量存储
+
+    - 精确索引 IndexIDMap(IndexFlatL2) 保存全部向量，是数据的唯一来源，文件格式与旧版本兼容；
+    - 配置了 ANN 索引类型且向量足够多时，在后台线程中由精确索引构建 ANN 索引用于检索。
+      切换索引类型时同样在后台重建，完成前继续使用旧索引检索；
+    - 所有对索引的读写都在一个专用线程中串行执行，不会阻塞事件循环；
+    - 增删操作先追加到预写日志（WAL），索引文件在空闲 `save_delay` 秒后合并写入，启动时重放 WAL。
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        path: str | None = None,
+        index_type: str = "flat",
+        nprobe: int = 16,
+        ef_search: int = 64,
+        save_delay: float = DEFAULT_SAVE_DELAY,
+    ):
         self.dimension = dimension
         self.path = path
+        if index_type not in INDEX_TYPES:
+            logger.warning(f"未知的索引类型 {index_type}，将使用 flat。")
+            index_type = "flat"
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.save_delay = save_delay
+
+        self.ann = None
+        """当前用于检索的 ANN 索引，为 None 时使用精确索引"""
+        self.ann_type: str | None = None
+        self._ann_built_n = 0
+        self._stale: set[int] = set()
+        """已删除但仍留在 HNSW 索引中的向量 ID"""
+        self._build_log: list | None = None
+        """构建 ANN 索引期间发生的增删操作，构建完成后重放到新索引上"""
+        self._build_task: asyncio.Task | None = None
+        self._save_task: asyncio.Task | None = None
+        self._dirty = False
+        self._closed = False
+        self._seq = 0
+        self._wal_file = None
+        self._wal_bytes = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="faiss_storage",
+        )
+
         self.index = None
         if path and os.path.exists(path):
             self.index = faiss.read_index(path)
         else:
             base_index = faiss.IndexFlatL2(dimension)
             self.index = faiss.IndexIDMap(base_index)
+        if path:
+            self._load_ann_and_replay_wal()
+
+    @property
+    def ann_path(self) -> str:
+        return f"{self.path}.ann"
+
+    @property
+    def meta_path(self) -> str:
+        return f"{self.path}.meta.json"
+
+    @property
+    def wal_path(self) -> str:
+        return f"{self.path}.wal"
+
+    # ==== 加载与持久化（均在专用线程中执行） ====
+
+    def _load_ann_and_replay_wal(self):
+        meta = {}
+        if os.path.exists(self.meta_path):
+            try:
+                with open(self.meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+            except Exception as e:
+                logger.warning(f"读取索引元数据 {self.meta_path} 失败: {e}")
+        self._seq = meta.get("last_seq", 0)
+
+        ann_meta = meta.get("ann")
+        if (
+            ann_meta
+            and ann_meta.get("type") == self.index_type
+            and os.path.exists(self.ann_path)
+        ):
+            try:
+                self.ann = faiss.read_index(self.ann_path)
+                self.ann_type = ann_meta["type"]
+                self._ann_built_n = ann_meta.get("built_n", 0)
+                self._stale = set(ann_meta.get("stale", []))
+                self._apply_search_params()
+            except Exception as e:
+                logger.warning(f"读取 ANN 索引 {self.ann_path} 失败，将重建: {e}")
+                self.ann = None
+
+        if not os.path.exists(self.wal_path):
+            return
+        replayed = 0
+        with open(self.wal_path, "rb") as f:
+            data = f.read()
+        pos = 0
+        dim = self.dimension
+        while pos + _WAL_HEADER.size <= len(data):
+            op, seq, count = _WAL_HEADER.unpack_from(data, pos)
+            body = count * 8 + (count * dim * 4 if op == _WAL_ADD else 0)
+            start = pos + _WAL_HEADER.size
+            if start + body > len(data):
+                break  # 写入中断的记录
+            ids = np.frombuffer(data, dtype=np.int64, count=count, offset=start)
+            if seq > self._seq:
+                if op == _WAL_ADD:
+                    vectors = np.frombuffer(
+                        data,
+                        dtype=np.float32,
+                        count=count * dim,
+                        offset=start + count * 8,
+                    ).reshape(count, dim)
+                    # 重放需要幂等
+                    self.index.remove_ids(ids)
+                    if self.ann is not None and self.ann_type != "hnsw":
+                        self.ann.remove_ids(ids)
+                    self._apply_add(vectors, ids, log=False)
+                else:
+                    self._apply_remove(ids, log=False)
+                self._seq = seq
+                replayed += 1
+            pos = start + body
+        if replayed:
+            logger.info(f"从 {self.wal_path} 重放了 {replayed} 条索引变更。")
+            self._dirty = True
+
+    def _wal_append(self, op: int, ids: np.ndarray, vectors: np.ndarray | None):
+        self._seq += 1
+        if not self.path:
+            return
+        if self._wal_file is None:
+            self._wal_file = open(self.wal_path, "ab")
+        record = _WAL_HEADER.pack(op, self._seq, len(ids)) + ids.tobytes()
+        if vectors is not None:
+            record += vectors.tobytes()
+        self._wal_file.write(record)
+        self._wal_file.flush()
+        self._wal_bytes += len(record)
+
+    def _save_sync(self):
+        if not self.path or not self._dirty:
+            return
+        _atomic_write_index(self.index, self.path)
+        if self.ann is not None:
+            _atomic_write_index(self.ann, self.ann_path)
+            ann_meta = {
+                "type": self.ann_type,
+                "built_n": self._ann_built_n,
+                "stale": sorted(self._stale),
+            }
+        else:
+            ann_meta = None
+            if os.path.exists(self.ann_path):
+                os.remove(self.ann_path)
+        tmp = f"{self.meta_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"last_seq": self._seq, "ann": ann_meta}, f)
+        os.replace(tmp, self.meta_path)
+
+        # 已写入索引文件的变更不再需要保留
+        if self._wal_file is not None:
+            self._wal_file.close()
+            self._wal_file = None
+        if os.path.exists(self.wal_path):
+            os.remove(self.wal_path)
+        self._wal_bytes = 0
+        self._dirty = False
+
+    # ==== 索引变更（均在专用线程中执行） ====
+
+    def _apply_add(self, vectors: np.ndarray, ids: np.ndarray, log: bool = True):
+        if log:
+            self._wal_append(_WAL_ADD, ids, vectors)
+        self.index.add_with_ids(vectors, ids)
+        if self.ann is not None:
+            self.ann.add_with_ids(vectors, ids)
+        if self._build_log is not None:
+            self._build_log.append((_WAL_ADD, ids, vectors))
+        self._dirty = True
+
+    def _apply_remove(self, ids: np.ndarray, log: bool = True):
+        if log:
+            self._wal_append(_WAL_REMOVE, ids, None)
+        self.index.remove_ids(ids)
+        if self.ann is not None:
+            self._ann_remove(self.ann, self.ann_type, ids)
+        if self._build_log is not None:
+            self._build_log.append((_WAL_REMOVE, ids, None))
+        self._dirty = True
+
+    def _ann_remove(self, ann, ann_type: str | None, ids: np.ndarray):
+        if ann_type == "hnsw":
+            self._stale.update(int(i) for i in ids)
+        else:
+            ann.remove_ids(ids)
+
+    def _search_sync(self, vector: np.ndarray, k: int) -> tuple:
+        faiss.normalize_L2(vector)
+        if self.ann is None:
+            return self.index.search(vector, k)
+        if not self._stale:
+            return self.ann.search(vector, k)
+        # HNSW 中仍残留已删除的向量，多取一些再过滤
+        fetch_k = min(k + len(self._stale), max(self.ann.ntotal, 1))
+        distances, indices = self.ann.search(vector, fetch_k)
+        out_d = np.full((len(indices), k), np.inf, dtype=np.float32)
+        out_i = np.full((len(indices), k), -1, dtype=np.int64)
+        for row in range(len(indices)):
+            keep = [
+                j
+                for j, i in enumerate(indices[row])
+                if i != -1 and i not in self._stale
+            ][:k]
+            out_d[row, : len(keep)] = distances[row, keep]
+            out_i[row, : len(keep)] = indices[row, keep]
+        return out_d, out_i
+
+    def _apply_search_params(self):
+        if self.ann is None:
+            return
+        params = faiss.ParameterSpace()
+        if self.ann_type == "hnsw":
+            params.set_index_parameter(self.ann, "efSearch", self.ef_search)
+        else:
+            params.set_index_parameter(self.ann, "nprobe", self.nprobe)
+
+    # ==== ANN 索引构建 ====
+
+    def _needs_ann_rebuild(self) -> bool:
+        n = self.index.ntotal
+        if self.index_type == "flat" or n < ANN_MIN_VECTORS:
+            return False
+        if self.ann is None or self.ann_type != self.index_type:
+            return True
+        if self.ann_type == "hnsw":
+            return len(self._stale) > n * HNSW_REBUILD_STALE_RATIO
+        return n > self._ann_built_n * ANN_REBUILD_GROWTH
+
+    def _snapshot_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        ids = faiss.vector_to_array(self.index.id_map).copy()
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+        self._build_log = []
+        return ids, vectors
+
+    def _train_ann(self, index_type: str, vectors: np.ndarray, ids: np.ndarray):
+        dim = self.dimension
+        n = len(ids)
+        if index_type == "hnsw":
+            ann = faiss.IndexIDMap2(faiss.IndexHNSWFlat(dim, HNSW_M))
+        else:
+            nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+            quantizer = faiss.IndexFlatL2(dim)
+            if index_type == "ivf_flat":
+                ann = faiss.IndexIVFFlat(quantizer, dim, nlist)
+            else:
+                ann = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), 8)
+            ann.train(vectors)
+        ann.add_with_ids(vectors, ids)
+        return ann
+
+    def _install_ann(self, ann, index_type: str, built_n: int) -> bool:
+        build_log, self._build_log = self._build_log or [], None
+        if index_type != self.index_type:
+            return False
+        self._stale = set()
+        for op, ids, vectors in build_log:
+            if op == _WAL_ADD:
+                ann.add_with_ids(vectors, ids)
+            else:
+                self._ann_remove(ann, index_type, ids)
+        self.ann = ann
+        self.ann_type = index_type
+        self._ann_built_n = built_n
+        self._apply_search_params()
+        self._dirty = True
+        return True
+
+    def _drop_ann(self):
+        if self.ann is not None:
+            self.ann = None
+            self.ann_type = None
+            self._ann_built_n = 0
+            self._stale = set()
+            self._dirty = True
+
+    async def _build_ann(self):
+        loop = asyncio.get_running_loop()
+        index_type = self.index_type
+        ids, vectors = await loop.run_in_executor(
+            self._executor,
+            self._snapshot_vectors,
+        )
+        logger.info(f"正在为 {len(ids)} 条向量构建 {index_type} 索引...")
+        try:
+            ann = await asyncio.to_thread(self._train_ann, index_type, vectors, ids)
+        except Exception as e:
+            logger.error(f"构建 {index_type} 索引失败: {e}")
+            await loop.run_in_executor(self._executor, self._reset_build_log)
+            return
+        installed = await loop.run_in_executor(
+            self._executor,
+            self._install_ann,
+            ann,
+            index_type,
+            len(ids),
+        )
+        if installed:
+            logger.info(f"{index_type} 索引构建完成。")
+            self._schedule_save()
+
+    def _reset_build_log(self):
+        self._build_log = None
+
+    def _maybe_update_ann(self):
+        """按当前配置与数据量决定是否需要（重新）构建 ANN 索引"""
+        if self._closed:
+            return
+        if self._build_task is not None and not self._build_task.done():
+            return
+        if self.index_type == "flat" and self.ann is not None:
+            self._executor.submit(self._drop_ann)
+            self._schedule_save()
+            return
+        if self._needs_ann_rebuild():
+            self._build_task = asyncio.create_task(self._build_ann())
+            self._build_task.add_done_callback(lambda _: self._maybe_update_ann())
+
+    def _after_mutation(self):
+        self._schedule_save()
+        self._maybe_update_ann()
+
+    def _schedule_save(self):
+        if not self.path:
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        if self._wal_bytes < WAL_MAX_BYTES:
+            await asyncio.sleep(self.save_delay)
+        try:
+            await self.save_index()
+        except Exception as e:
+            logger.error(f"保存索引 {self.path} 失败: {e}")
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            func,
+            *args,
+        )
+
+    # ==== 公共接口 ====
+
+    async def initialize(self):
+        """写入启动时从 WAL 重放的变更，并按配置在后台构建 ANN 索引"""
+        if self._dirty:
+            self._schedule_save()
+        self._maybe_update_ann()
 
     async def insert(self, vector: np.ndarray, id: int):
         """插入向量
@@ -35,8 +417,12 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vector.shape[0]}",
             )
-        self.index.add_with_ids(vector.reshape(1, -1), np.array([id]))
-        await self.save_index()
+        await self._run(
+            self._apply_add,
+            np.ascontiguousarray(vector.reshape(1, -1), dtype=np.float32),
+            np.array([id], dtype=np.int64),
+        )
+        self._after_mutation()
 
     async def insert_batch(self, vectors: np.ndarray, ids: list[int]):
         """批量插入向量
@@ -53,8 +439,12 @@ class EmbeddingStorage:
             raise ValueError(
                 f"向量维度不匹配, 期望: {self.dimension}, 实际: {vectors.shape[1]}",
             )
-        self.index.add_with_ids(vectors, np.array(ids))
-        await self.save_index()
+        await self._run(
+            self._apply_add,
+            np.ascontiguousarray(vectors, dtype=np.float32),
+            np.array(ids, dtype=np.int64),
+        )
+        self._after_mutation()
 
     async def search(self, vector: np.ndarray, k: int) -> tuple:
         """搜索最相似的向量
@@ -67,9 +457,7 @@ class EmbeddingStorage:
 
         """
         assert self.index is not None, "FAISS index is not initialized."
-        faiss.normalize_L2(vector)
-        distances, indices = self.index.search(vector, k)
-        return distances, indices
+        return await self._run(self._search_sync, vector, k)
 
     async def delete(self, ids: list[int]):
         """删除向量
@@ -79,15 +467,63 @@ class EmbeddingStorage:
 
         """
         assert self.index is not None, "FAISS index is not initialized."
-        id_array = np.array(ids, dtype=np.int64)
-        self.index.remove_ids(id_array)
-        await self.save_index()
+        if not len(ids):
+            return
+        await self._run(self._apply_remove, np.array(ids, dtype=np.int64))
+        self._after_mutation()
+
+    async def configure(
+        self,
+        index_type: str | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+    ):
+        """修改索引配置。索引类型的切换在后台完成，期间继续使用旧索引检索。"""
+        if index_type is not None:
+            if index_type not in INDEX_TYPES:
+                raise ValueError(f"不支持的索引类型: {index_type}")
+            self.index_type = index_type
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+        await self._run(self._apply_search_params)
+        self._maybe_update_ann()
 
     async def save_index(self):
-        """保存索引
+        """将索引写入磁盘并清空预写日志"""
+        await self._run(self._save_sync)
 
-        Args:
-            path (str): 保存索引的路径
+    async def close(self):
+        """等待后台任务结束，写入未保存的变更并释放线程"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._build_task is not None and not self._build_task.done():
+            self._build_task.cancel()
+            try:
+                await self._build_task
+            except asyncio.CancelledError:
+                pass
+            await self._run(self._reset_build_log)
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+        await self.save_index()
+        if self._wal_file is not None:
+            self._wal_file.close()
+            self._wal_file = None
+        self._executor.shutdown(wait=True)
 
-        """
-        faiss.write_index(self.index, self.path)
+
+def _atomic_write_index(index, path: str):
+    tmp = f"{path}.tmp"
+    faiss.write_index(index, tmp)
+    os.replace(tmp, path)
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """选择能整除向量维度的 PQ 子量化器数量"""
+    for m in (64, 48, 32, 24, 16, 12, 8, 4, 2):
+        if dim % m == 0 and dim // m >= 2:
+            return m
+    return 1
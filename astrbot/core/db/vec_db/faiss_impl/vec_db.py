@@ -20,6 +20,9 @@ class FaissVecDB(BaseVecDB):
         index_store_path: str,
         embedding_provider: EmbeddingProvider,
         rerank_provider: RerankProvider | None = None,
+        index_type: str = "flat",
+        nprobe: int = 16,
+        ef_search: int = 64,
     ):
         self.doc_store_path = doc_store_path
         self.index_store_path = index_store_path
@@ -28,12 +31,29 @@ class FaissVecDB(BaseVecDB):
         self.embedding_storage = EmbeddingStorage(
             embedding_provider.get_dim(),
             index_store_path,
+            index_type=index_type,
+            nprobe=nprobe,
+            ef_search=ef_search,
         )
         self.embedding_provider = embedding_provider
         self.rerank_provider = rerank_provider
 
     async def initialize(self):
         await self.document_storage.initialize()
+        await self.embedding_storage.initialize()
+
+    async def set_index_config(
+        self,
+        index_type: str | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+    ):
+        """修改向量索引类型与检索参数，切换索引类型会在后台重建索引。"""
+        await self.embedding_storage.configure(
+            index_type=index_type,
+            nprobe=nprobe,
+            ef_search=ef_search,
+        )
 
     async def insert(
         self,
@@ -64,40 +84,50 @@ class FaissVecDB(BaseVecDB):
         tasks_limit: int = 3,
         max_retries: int = 3,
         progress_callback=None,
+        batch_callback=None,
     ) -> list[int]:
         """批量插入文本和其对应向量，自动生成 ID 并保持一致性。
 
+        每批向量生成后立即写入文档存储和 FAISS，失败的批次不影响已完成的批次。
+
         Args:
             progress_callback: 进度回调函数，接收参数 (current, total)
+            batch_callback: 每批写入后的回调函数，接收参数 (start, int_ids)，
+                其中 start 为该批在 contents 中的起始位置
+
+        Returns:
+            与 contents 一一对应的整数 ID 列表
 
         """
         metadatas = metadatas or [{} for _ in contents]
         ids = ids or [str(uuid.uuid4()) for _ in contents]
 
-        start = time.time()
+        start_time = time.time()
         logger.debug(f"Generating embeddings for {len(contents)} contents...")
-        vectors = await self.embedding_provider.get_embeddings_batch(
+        int_ids: list[int] = [-1] * len(contents)
+        async for start, vectors in self.embedding_provider.iter_embeddings_batches(
             contents,
             batch_size=batch_size,
             tasks_limit=tasks_limit,
             max_retries=max_retries,
             progress_callback=progress_callback,
-        )
-        end = time.time()
+        ):
+            end = start + len(vectors)
+            batch_int_ids = await self.document_storage.insert_documents_batch(
+                ids[start:end],
+                contents[start:end],
+                metadatas[start:end],
+            )
+            await self.embedding_storage.insert_batch(
+                np.array(vectors).astype("float32"),
+                batch_int_ids,
+            )
+            int_ids[start:end] = batch_int_ids
+            if batch_callback:
+                await batch_callback(start, batch_int_ids)
         logger.debug(
-            f"Generated embeddings for {len(contents)} contents in {end - start:.2f} seconds.",
+            f"Inserted {len(contents)} contents in {time.time() - start_time:.2f} seconds.",
         )
-
-        # 使用 DocumentStorage 的批量插入方法
-        int_ids = await self.document_storage.insert_documents_batch(
-            ids,
-            contents,
-            metadatas,
-        )
-
-        # 批量插入向量到 FAISS
-        vectors_array = np.array(vectors).astype("float32")
-        await self.embedding_storage.insert_batch(vectors_array, int_ids)
         return int_ids
 
     async def retrieve(
@@ -107,6 +137,7 @@ class FaissVecDB(BaseVecDB):
         fetch_k: int = 20,
         rerank: bool = False,
         metadata_filters: dict | None = None,
+        embedding: list[float] | None = None,
     ) -> list[Result]:
         """搜索最相似的文档。
 
@@ -116,12 +147,14 @@ class FaissVecDB(BaseVecDB):
             fetch_k (int): 在根据 metadata 过滤前从 FAISS 中获取的数量
             rerank (bool): 是否使用重排序。这需要在实例化时提供 rerank_provider, 如果未提供并且 rerank 为 True, 不会抛出异常。
             metadata_filters (dict): 元数据过滤器
+            embedding (list[float]): 预先计算好的查询向量，为空时使用 embedding_provider 计算
 
         Returns:
             List[Result]: 查询结果
 
         """
-        embedding = await self.embedding_provider.get_embedding(query)
+        if embedding is None:
+            embedding = await self.embedding_provider.get_embedding(query)
         scores, indices = await self.embedding_storage.search(
             vector=np.array([embedding]).astype("float32"),
             k=fetch_k if metadata_filters else k,
@@ -178,6 +211,7 @@ class FaissVecDB(BaseVecDB):
         await self.embedding_storage.delete([int_id])
 
     async def close(self):
+        await self.embedding_storage.close()
         await self.document_storage.close()
 
     async def count_documents(self, metadata_filter: dict | None = None) -> int:
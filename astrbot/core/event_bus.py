@@ -1,25 +1,40 @@
 """事件总线, 用于处理事件的分发和处理
 事件总线是一个异步队列, 用于接收各种消息事件, 并将其发送到Scheduler调度器进行处理
-其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并创建一个新的异步任务来执行管道调度器的处理逻辑
+其中包含了一个无限循环的调度函数, 用于从事件队列中获取新的事件, 并按会话排队后交给管道调度器处理
 
 class:
     EventBus: 事件总线, 用于处理事件的分发和处理
 
 工作流程:
 1. 维护一个异步队列, 来接受各种消息事件
-2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并创建一个新的异步任务来执行管道调度器的处理逻辑
+2. 无限循环的调度函数, 从事件队列中获取新的事件, 打印日志并放入该事件所属队列的等待队列
+3. 在全局并发上限内, 轮流从各个等待队列中取出事件, 创建异步任务执行管道调度器的处理逻辑。同一队列内的事件按到达顺序开始处理
+
+私聊按会话 (unified_msg_origin) 排队; 群聊按 会话 + 发送者 排队, 同一成员的消息依次处理,
+不同成员的消息互不阻塞, 避免活跃群聊中所有消息都排在上一条之后。
 """
 
 import asyncio
+import time
 from asyncio import Queue
+from collections import deque
+from dataclasses import dataclass
 
 from astrbot.core import logger
 from astrbot.core.astrbot_config_mgr import AstrBotConfigManager
 from astrbot.core.pipeline.scheduler import PipelineScheduler
+from astrbot.core.utils.session_waiter import FILTERS, USER_SESSIONS
 
 from .platform import AstrMessageEvent
 
 
+@dataclass
+class _PendingEvent:
+    event: AstrMessageEvent
+    scheduler: PipelineScheduler
+    enqueued_at: float
+
+
 class EventBus:
     """用于处理事件的分发和处理"""
 
@@ -34,13 +49,163 @@ class EventBus:
         self.pipeline_scheduler_mapping = pipeline_scheduler_mapping
         self.astrbot_config_mgr = astrbot_config_mgr
 
+        settings = {}
+        if astrbot_config_mgr:
+            settings = astrbot_config_mgr.default_conf.get("event_bus_settings", {})
+        self.max_concurrency: int = settings.get("max_concurrency", 64)
+        """全局同时处理的事件数量上限，<= 0 表示不限制"""
+        self.max_concurrency_per_session: int = settings.get(
+            "max_concurrency_per_session",
+            1,
+        )
+        """单个队列 (私聊会话或群聊中的单个成员) 同时处理的事件数量上限，<= 0 表示不限制"""
+        self.max_pending: int = settings.get("max_pending", 2000)
+        """等待处理的事件数量上限，<= 0 表示不限制"""
+        self.overflow_strategy: str = settings.get("overflow_strategy", "shed")
+        """等待队列满时的策略。discard: 丢弃新事件; shed: 丢弃积压最多的会话中最早的事件"""
+
+        self._pending: dict[str, deque[_PendingEvent]] = {}
+        self._pending_count = 0
+        self._ready: deque[str] = deque()
+        """有事件等待且未达到并发上限的队列，按轮转顺序排列"""
+        self._ready_set: set[str] = set()
+        self._running = 0
+        self._running_per_session: dict[str, int] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+        # metrics
+        self._dispatched_total = 0
+        self._dropped_total = 0
+        self._wait_time_avg = 0.0
+        self._wait_time_max = 0.0
+
     async def dispatch(self):
         while True:
             event: AstrMessageEvent = await self.event_queue.get()
             conf_info = self.astrbot_config_mgr.get_conf_info(event.unified_msg_origin)
             self._print_event(event, conf_info["name"])
             scheduler = self.pipeline_scheduler_mapping.get(conf_info["id"])
-            asyncio.create_task(scheduler.execute(event))
+            pending = _PendingEvent(event, scheduler, time.monotonic())
+            if self._is_waiter_event(event):
+                # 会话控制 (session_waiter) 正在等待的事件需要立即处理，
+                # 否则等待中的管道会占住会话的并发名额，导致该事件永远无法被处理。
+                self._start(self._queue_key(event), pending)
+                continue
+            self._enqueue(pending)
+            self._pump()
+
+    def get_metrics(self) -> dict:
+        """获取事件分发的运行指标"""
+        return {
+            "running": self._running,
+            "pending": self._pending_count,
+            "pending_sessions": len(self._pending),
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "dispatched_total": self._dispatched_total,
+            "dropped_total": self._dropped_total,
+            "wait_time_avg_ms": round(self._wait_time_avg * 1000, 2),
+            "wait_time_max_ms": round(self._wait_time_max * 1000, 2),
+        }
+
+    @staticmethod
+    def _queue_key(event: AstrMessageEvent) -> str:
+        """私聊按会话排队，群聊按会话内的发送者排队"""
+        umo = event.unified_msg_origin
+        if event.get_group_id():
+            return f"{umo}#{event.get_sender_id()}"
+        return umo
+
+    @staticmethod
+    def _is_waiter_event(event: AstrMessageEvent) -> bool:
+        if not USER_SESSIONS:
+            return False
+        return any(f.filter(event) in USER_SESSIONS for f in FILTERS)
+
+    def _enqueue(self, pending: _PendingEvent):
+        umo = self._queue_key(pending.event)
+        if 0 < self.max_pending <= self._pending_count:
+            if self.overflow_strategy == "discard" or not self._shed():
+                self._drop(pending)
+                return
+        self._pending.setdefault(umo, deque()).append(pending)
+        self._pending_count += 1
+        self._mark_ready(umo)
+
+    def _shed(self) -> bool:
+        """丢弃积压最多的队列中最早的事件，避免单个会话的突发消息挤占其他会话。"""
+        if not self._pending:
+            return False
+        umo = max(self._pending, key=lambda k: len(self._pending[k]))
+        queue = self._pending[umo]
+        self._drop(queue.popleft())
+        self._pending_count -= 1
+        if not queue:
+            self._remove_session(umo)
+        return True
+
+    def _drop(self, pending: _PendingEvent):
+        self._dropped_total += 1
+        logger.warning(
+            f"事件队列已满 ({self.max_pending})，丢弃来自 {pending.event.unified_msg_origin} 的消息: {pending.event.get_message_outline()}",
+        )
+
+    def _remove_session(self, umo: str):
+        self._pending.pop(umo, None)
+        if umo in self._ready_set:
+            self._ready_set.discard(umo)
+            self._ready.remove(umo)
+
+    def _mark_ready(self, umo: str):
+        if umo in self._ready_set or umo not in self._pending:
+            return
+        if (
+            0
+            < self.max_concurrency_per_session
+            <= self._running_per_session.get(
+                umo,
+                0,
+            )
+        ):
+            return
+        self._ready.append(umo)
+        self._ready_set.add(umo)
+
+    def _pump(self):
+        """在并发上限内，轮流从各个队列中取出最早的事件开始处理"""
+        while self._ready and not (0 < self.max_concurrency <= self._running):
+            umo = self._ready.popleft()
+            self._ready_set.discard(umo)
+            queue = self._pending[umo]
+            pending = queue.popleft()
+            self._pending_count -= 1
+            if not queue:
+                del self._pending[umo]
+            self._start(umo, pending)
+            self._mark_ready(umo)
+
+    def _start(self, umo: str, pending: _PendingEvent):
+        wait_time = time.monotonic() - pending.enqueued_at
+        self._dispatched_total += 1
+        self._wait_time_avg += (wait_time - self._wait_time_avg) * 0.05
+        self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        self._running += 1
+        self._running_per_session[umo] = self._running_per_session.get(umo, 0) + 1
+        task = asyncio.create_task(pending.scheduler.execute(pending.event))
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._on_done(t, umo))
+
+    def _on_done(self, task: asyncio.Task, umo: str):
+        self._tasks.discard(task)
+        self._running -= 1
+        cnt = self._running_per_session.get(umo, 1) - 1
+        if cnt <= 0:
+            self._running_per_session.pop(umo, None)
+        else:
+            self._running_per_session[umo] = cnt
+        self._mark_ready(umo)
+        self._pump()
 
     def _print_event(self, event: AstrMessageEvent, conf_name: str):
         """用于记录事件信息
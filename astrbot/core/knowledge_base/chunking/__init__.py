@@ -1,7 +1,6 @@
-"""文档分块模块"""
+"""文档分块模块，已移至 astrbot.kb_processing.chunking"""
 
-from .base import BaseChunker
-from .fixed_size import FixedSizeChunker
+from astrbot.kb_processing.chunking import BaseChunker, FixedSizeChunker
 
 __all__ = [
     "BaseChunker",
@@ -161,6 +161,31 @@ class KBSQLiteDatabase:
 
                 await session.commit()
 
+    async def migrate_to_v2(self) -> None:
+        """执行知识库数据库 v2 迁移
+
+        为知识库表添加向量索引配置字段
+        """
+        columns = {
+            "index_type": "VARCHAR(20) DEFAULT 'flat'",
+            "index_nprobe": "INTEGER DEFAULT 16",
+            "index_ef_search": "INTEGER DEFAULT 64",
+        }
+        async with self.get_db() as session:
+            session: AsyncSession
+            async with session.begin():
+                result = await session.execute(
+                    text("PRAGMA table_info(knowledge_bases)"),
+                )
+                existing = {row[1] for row in result.fetchall()}
+                for name, ddl in columns.items():
+                    if name not in existing:
+                        await session.execute(
+                            text(
+                                f"ALTER TABLE knowledge_bases ADD COLUMN {name} {ddl}"
+                            ),
+                        )
+
     async def close(self) -> None:
         """关闭数据库连接"""
         await self.engine.dispose()
@@ -253,6 +278,23 @@ class KBSQLiteDatabase:
                 "knowledge_base": row[1],
             }
 
+    async def get_documents_with_metadata(self, doc_ids: list[str]) -> dict[str, dict]:
+        """批量获取文档及其所属知识库，返回 doc_id -> {"document", "knowledge_base"}"""
+        doc_ids = list(set(doc_ids))
+        if not doc_ids:
+            return {}
+        async with self.get_db() as session:
+            stmt = (
+                select(KBDocument, KnowledgeBase)
+                .join(KnowledgeBase, col(KBDocument.kb_id) == col(KnowledgeBase.kb_id))
+                .where(col(KBDocument.doc_id).in_(doc_ids))
+            )
+            result = await session.execute(stmt)
+            return {
+                row[0].doc_id: {"document": row[0], "knowledge_base": row[1]}
+                for row in result.all()
+            }
+
     async def delete_document_by_id(self, doc_id: str, vec_db: FaissVecDB):
         """删除单个文档及其相关数据"""
         # 在知识库表中删除
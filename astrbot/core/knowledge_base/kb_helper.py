@@ -1,6 +1,11 @@
+import asyncio
+import hashlib
 import json
+import os
+import time
 import uuid
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import aiofiles
 
@@ -9,16 +14,24 @@ from astrbot.core.db.vec_db.base import BaseVecDB
 from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
 from astrbot.core.provider.manager import ProviderManager
 from astrbot.core.provider.provider import EmbeddingProvider, RerankProvider
+from astrbot.kb_processing.chunking.base import BaseChunker
 
-from .chunking.base import BaseChunker
 from .kb_db_sqlite import KBSQLiteDatabase
 from .models import KBDocument, KBMedia, KnowledgeBase
-from .parsers.util import select_parser
+from .processing import parse_and_chunk
+
+if TYPE_CHECKING:
+    from .retrieval.bm25_index import BM25Index
+
+HASH_CHUNK_SIZE = 1024 * 1024
+UPLOAD_CHECKPOINT_TTL = 24 * 3600
+"""上传断点的保留时间（秒），过期后清理其已写入的文本块"""
 
 
 class KBHelper:
     vec_db: BaseVecDB
     kb: KnowledgeBase
+    sparse_index: "BM25Index | None" = None
 
     def __init__(
         self,
@@ -38,11 +51,17 @@ class KBHelper:
         self.kb_medias_dir = Path(self.kb_dir) / "medias" / self.kb.kb_id
         self.kb_files_dir = Path(self.kb_dir) / "files" / self.kb.kb_id
 
+        self.kb_checkpoints_dir = Path(self.kb_dir) / "upload_checkpoints"
+
         self.kb_medias_dir.mkdir(parents=True, exist_ok=True)
         self.kb_files_dir.mkdir(parents=True, exist_ok=True)
+        self._active_uploads: set[str] = set()
 
     async def initialize(self):
         await self._ensure_vec_db()
+        await self._ensure_sparse_index()
+        # 旧版本创建的知识库没有稀疏索引，在后台补建
+        asyncio.create_task(self._sync_sparse_index())
 
     async def get_ep(self) -> EmbeddingProvider:
         if not self.kb.embedding_provider_id:
@@ -75,16 +94,53 @@ class KBHelper:
         ep = await self.get_ep()
         rp = await self.get_rp()
 
+        vec_db: FaissVecDB | None = getattr(self, "vec_db", None)  # type: ignore
+        if vec_db is not None and vec_db.embedding_provider is ep:
+            # 向量索引的变更是延迟写入的，复用已有实例以免丢失未写入的变更
+            vec_db.rerank_provider = rp
+            return vec_db
+        if vec_db is not None:
+            await vec_db.close()
+
         vec_db = FaissVecDB(
             doc_store_path=str(self.kb_dir / "doc.db"),
             index_store_path=str(self.kb_dir / "index.faiss"),
             embedding_provider=ep,
             rerank_provider=rp,
+            index_type=self.kb.index_type or "flat",
+            nprobe=self.kb.index_nprobe or 16,
+            ef_search=self.kb.index_ef_search or 64,
         )
         await vec_db.initialize()
         self.vec_db = vec_db
         return vec_db
 
+    async def apply_index_config(self):
+        """将知识库的向量索引配置应用到向量库，切换索引类型会在后台重建索引"""
+        vec_db: FaissVecDB = await self._ensure_vec_db()
+        await vec_db.set_index_config(
+            index_type=self.kb.index_type or "flat",
+            nprobe=self.kb.index_nprobe or 16,
+            ef_search=self.kb.index_ef_search or 64,
+        )
+
+    async def _ensure_sparse_index(self) -> "BM25Index":
+        if self.sparse_index is None:
+            from .retrieval.bm25_index import BM25Index
+
+            sparse_index = BM25Index(str(self.kb_dir / "sparse_index.db"))
+            await sparse_index.initialize()
+            self.sparse_index = sparse_index
+        return self.sparse_index
+
+    async def _sync_sparse_index(self):
+        try:
+            sparse_index = await self._ensure_sparse_index()
+            vec_db: FaissVecDB = self.vec_db  # type: ignore
+            await sparse_index.ensure_synced(vec_db.document_storage)
+        except Exception as e:
+            logger.error(f"同步知识库 {self.kb.kb_name} 的稀疏索引失败: {e}")
+
     async def delete_vec_db(self):
         """删除知识库的向量数据库和所有相关文件"""
         import shutil
@@ -94,13 +150,119 @@ class KBHelper:
             shutil.rmtree(self.kb_dir)
 
     async def terminate(self):
-        if self.vec_db:
+        if getattr(self, "vec_db", None):
             await self.vec_db.close()
+            self.vec_db = None  # type: ignore
+        if self.sparse_index:
+            await self.sparse_index.close()
+            self.sparse_index = None
+
+    def _upload_key(
+        self,
+        file_name: str,
+        file_content: bytes | str | os.PathLike,
+        chunk_size: int,
+        chunk_overlap: int,
+    ) -> str:
+        """同一文件以相同分块参数上传时得到相同的断点标识"""
+        h = hashlib.sha256()
+        if isinstance(file_content, bytes):
+            h.update(file_content)
+        else:
+            with open(file_content, "rb") as f:
+                while data := f.read(HASH_CHUNK_SIZE):
+                    h.update(data)
+        h.update(
+            f"|{file_name}|{chunk_size}|{chunk_overlap}|{self.kb.embedding_provider_id}".encode(),
+        )
+        return h.hexdigest()
+
+    def _checkpoint_path(self, upload_key: str, upload_id: str) -> Path:
+        """断点文件名包含上传 ID，同一文件的并发上传各自记录断点，互不覆盖"""
+        return self.kb_checkpoints_dir / f"{upload_key}_{upload_id}.json"
+
+    async def _claim_checkpoint(self, upload_key: str, upload_id: str) -> str | None:
+        """接管同一文件上次未完成上传的断点，返回可以继续上传的文档 ID"""
+        if not self.kb_checkpoints_dir.exists():
+            return None
+        own_path = self._checkpoint_path(upload_key, upload_id)
+        for path in self.kb_checkpoints_dir.glob(f"{upload_key}_*.json"):
+            # 正在进行的上传的断点不能接管。检查与重命名之间没有 await，不会被其他上传抢占
+            if path.stem in self._active_uploads:
+                continue
+            try:
+                path.replace(own_path)
+            except FileNotFoundError:
+                continue
+            try:
+                doc_id = json.loads(own_path.read_text(encoding="utf-8"))["doc_id"]
+            except Exception as e:
+                logger.warning(f"读取上传断点 {path} 失败: {e}")
+                own_path.unlink(missing_ok=True)
+                continue
+            if await self.kb_db.get_document_by_id(doc_id):
+                # 上次上传已经完成
+                own_path.unlink(missing_ok=True)
+                continue
+            return doc_id
+        return None
+
+    def _save_checkpoint(self, upload_key: str, upload_id: str, doc_id: str):
+        self.kb_checkpoints_dir.mkdir(parents=True, exist_ok=True)
+        self._checkpoint_path(upload_key, upload_id).write_text(
+            json.dumps({"doc_id": doc_id, "created_at": time.time()}),
+            encoding="utf-8",
+        )
+
+    async def _completed_chunk_indices(self, doc_id: str, chunk_count: int) -> set[int]:
+        """已写入向量库的文本块序号。与当前分块结果不一致时清空已写入的文本块"""
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        docs = await vec_db.document_storage.get_documents(
+            metadata_filters={"kb_doc_id": doc_id},
+            limit=None,
+            offset=None,
+        )
+        indices = [json.loads(doc["metadata"])["chunk_index"] for doc in docs]
+        if len(set(indices)) == len(indices) and all(
+            0 <= idx < chunk_count for idx in indices
+        ):
+            return set(indices)
+        logger.warning(f"文档 {doc_id} 的上传断点与分块结果不一致，重新上传")
+        await self._delete_document_chunks(doc_id)
+        return set()
+
+    async def _delete_document_chunks(self, doc_id: str):
+        vec_db: FaissVecDB = self.vec_db  # type: ignore
+        await vec_db.delete_documents(metadata_filters={"kb_doc_id": doc_id})
+        sparse_index = await self._ensure_sparse_index()
+        await sparse_index.delete_by_kb_doc_id(doc_id)
+
+    async def _cleanup_stale_checkpoints(self):
+        """清理过期的上传断点及其已写入的文本块"""
+        if not self.kb_checkpoints_dir.exists():
+            return
+        now = time.time()
+        for path in self.kb_checkpoints_dir.glob("*.json"):
+            if path.stem in self._active_uploads:
+                continue
+            try:
+                if now - path.stat().st_mtime < UPLOAD_CHECKPOINT_TTL:
+                    continue
+                doc_id = json.loads(path.read_text(encoding="utf-8"))["doc_id"]
+                if not await self.kb_db.get_document_by_id(doc_id):
+                    await self._delete_document_chunks(doc_id)
+                    await self.kb_db.update_kb_stats(
+                        kb_id=self.kb.kb_id,
+                        vec_db=self.vec_db,  # type: ignore
+                    )
+                path.unlink(missing_ok=True)
+            except Exception as e:
+                logger.warning(f"清理上传断点 {path} 失败: {e}")
 
     async def upload_document(
         self,
         file_name: str,
-        file_content: bytes,
+        file_content: bytes | str | os.PathLike,
         file_type: str,
         chunk_size: int = 512,
         chunk_overlap: int = 50,
@@ -108,6 +270,7 @@ class KBHelper:
         tasks_limit: int = 3,
         max_retries: int = 3,
         progress_callback=None,
+        upload_id: str | None = None,
     ) -> KBDocument:
         """上传并处理文档（带原子性保证和失败清理）
 
@@ -116,19 +279,38 @@ class KBHelper:
         2. 解析文档内容
         3. 提取多媒体资源
         4. 分块处理
-        5. 生成向量并存储
+        5. 逐批生成向量并存储（记录断点，同一文件重新上传时跳过已完成的文本块）
         6. 保存元数据（事务）
         7. 更新统计
 
         Args:
+            file_content: 文件内容，或已保存到磁盘的文件路径 (大文件应传入路径以免整个读入内存)
             progress_callback: 进度回调函数，接收参数 (stage, current, total)
                 - stage: 当前阶段 ('parsing', 'chunking', 'embedding')
                 - current: 当前进度
                 - total: 总数
+            upload_id: 本次上传的标识 (如上传任务 ID)，用于区分同一文件的并发上传的断点。不填则随机生成
 
         """
         await self._ensure_vec_db()
-        doc_id = str(uuid.uuid4())
+        sparse_index = await self._ensure_sparse_index()
+        await self._cleanup_stale_checkpoints()
+        upload_key = await asyncio.to_thread(
+            self._upload_key,
+            file_name,
+            file_content,
+            chunk_size,
+            chunk_overlap,
+        )
+        upload_id = upload_id or uuid.uuid4().hex
+        checkpoint_path = self._checkpoint_path(upload_key, upload_id)
+        self._active_uploads.add(checkpoint_path.stem)
+        try:
+            resume_doc_id = await self._claim_checkpoint(upload_key, upload_id)
+        except BaseException:
+            self._active_uploads.discard(checkpoint_path.stem)
+            raise
+        doc_id = resume_doc_id or str(uuid.uuid4())
         media_paths: list[Path] = []
 
         # file_path = self.kb_files_dir / f"{doc_id}.{file_type}"
@@ -136,14 +318,19 @@ class KBHelper:
         #     await f.write(file_content)
 
         try:
-            # 阶段1: 解析文档
+            # 阶段1: 解析文档并分块
             if progress_callback:
                 await progress_callback("parsing", 0, 100)
 
-            parser = await select_parser(f".{file_type}")
-            parse_result = await parser.parse(file_content, file_name)
-            text_content = parse_result.text
-            media_items = parse_result.media
+            # 解析与分块在进程池中执行
+            chunks_text, media_items = await parse_and_chunk(
+                file_content,
+                file_name,
+                file_type,
+                self.chunker,
+                chunk_size,
+                chunk_overlap,
+            )
 
             if progress_callback:
                 await progress_callback("parsing", 100, 100)
@@ -165,11 +352,6 @@ class KBHelper:
             if progress_callback:
                 await progress_callback("chunking", 0, 100)
 
-            chunks_text = await self.chunker.chunk(
-                text_content,
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-            )
             contents = []
             metadatas = []
             for idx, chunk_text in enumerate(chunks_text):
@@ -185,18 +367,53 @@ class KBHelper:
             if progress_callback:
                 await progress_callback("chunking", 100, 100)
 
-            # 阶段3: 生成向量（带进度回调）
+            # 阶段3: 逐批生成向量并写入（带进度回调）
+            done_indices: set[int] = set()
+            if resume_doc_id:
+                done_indices = await self._completed_chunk_indices(
+                    doc_id,
+                    len(contents),
+                )
+                logger.info(
+                    f"从断点继续上传文档 {file_name}，"
+                    f"已完成 {len(done_indices)}/{len(contents)} 个文本块",
+                )
+            self._save_checkpoint(upload_key, upload_id, doc_id)
+            pending = [i for i in range(len(contents)) if i not in done_indices]
+            pending_contents = [contents[i] for i in pending]
+            chunk_ids = [str(uuid.uuid4()) for _ in pending]
+
             async def embedding_progress_callback(current, total):
                 if progress_callback:
-                    await progress_callback("embedding", current, total)
-
-            await self.vec_db.insert_batch(
-                contents=contents,
-                metadatas=metadatas,
+                    await progress_callback(
+                        "embedding",
+                        len(done_indices) + current,
+                        len(contents),
+                    )
+
+            async def on_batch_inserted(start: int, int_ids: list[int]):
+                end = start + len(int_ids)
+                try:
+                    await sparse_index.add_documents(
+                        ids=int_ids,
+                        chunk_ids=chunk_ids[start:end],
+                        contents=pending_contents[start:end],
+                        kb_doc_ids=[doc_id] * len(int_ids),
+                    )
+                except Exception as e:
+                    # 稀疏索引会在下次检索前根据向量库重建
+                    logger.warning(f"更新稀疏索引失败: {e}")
+                    sparse_index.invalidate()
+
+            await self.vec_db.insert_batch(  # type: ignore
+                contents=pending_contents,
+                metadatas=[metadatas[i] for i in pending],
+                ids=chunk_ids,
                 batch_size=batch_size,
                 tasks_limit=tasks_limit,
                 max_retries=max_retries,
                 progress_callback=embedding_progress_callback,
+                batch_callback=on_batch_inserted,
             )
 
             # 保存文档的元数据
@@ -205,7 +422,11 @@ class KBHelper:
                 kb_id=self.kb.kb_id,
                 doc_name=file_name,
                 file_type=file_type,
-                file_size=len(file_content),
+                file_size=(
+                    len(file_content)
+                    if isinstance(file_content, bytes)
+                    else os.path.getsize(file_content)
+                ),
                 # file_path=str(file_path),
                 file_path="",
                 chunk_count=len(chunks_text),
@@ -219,6 +440,7 @@ class KBHelper:
                     await session.commit()
 
                 await session.refresh(doc)
+            checkpoint_path.unlink(missing_ok=True)
 
             vec_db: FaissVecDB = self.vec_db  # type: ignore
             await self.kb_db.update_kb_stats(kb_id=self.kb.kb_id, vec_db=vec_db)
@@ -237,7 +459,13 @@ class KBHelper:
                 except Exception as me:
                     logger.warning(f"清理多媒体文件失败 {media_path}: {me}")
 
+            if checkpoint_path.exists():
+                logger.info(
+                    f"文档 {file_name} 已完成的文本块已保留，重新上传该文件将从断点继续",
+                )
             raise e
+        finally:
+            self._active_uploads.discard(checkpoint_path.stem)
 
     async def list_documents(
         self,
@@ -259,6 +487,8 @@ class KBHelper:
             doc_id=doc_id,
             vec_db=self.vec_db,  # type: ignore
         )
+        sparse_index = await self._ensure_sparse_index()
+        await sparse_index.delete_by_kb_doc_id(doc_id)
         await self.kb_db.update_kb_stats(
             kb_id=self.kb.kb_id,
             vec_db=self.vec_db,  # type: ignore
@@ -269,6 +499,8 @@ class KBHelper:
         """删除单个文本块及其相关数据"""
         vec_db: FaissVecDB = self.vec_db  # type: ignore
         await vec_db.delete(chunk_id)
+        sparse_index = await self._ensure_sparse_index()
+        await sparse_index.delete_by_chunk_id(chunk_id)
         await self.kb_db.update_kb_stats(
             kb_id=self.kb.kb_id,
             vec_db=self.vec_db,  # type: ignore
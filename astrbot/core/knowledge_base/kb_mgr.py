@@ -2,13 +2,16 @@ import traceback
 from pathlib import Path
 
 from astrbot.core import logger
+from astrbot.core.db.vec_db.faiss_impl.embedding_storage import INDEX_TYPES
 from astrbot.core.provider.manager import ProviderManager
 
-# from .chunking.fixed_size import FixedSizeChunker
-from .chunking.recursive import RecursiveCharacterChunker
+# from astrbot.kb_processing.chunking.fixed_size import FixedSizeChunker
+from astrbot.kb_processing.chunking.recursive import RecursiveCharacterChunker
+
 from .kb_db_sqlite import KBSQLiteDatabase
 from .kb_helper import KBHelper
 from .models import KnowledgeBase
+from .processing import shutdown_process_pool
 from .retrieval.manager import RetrievalManager, RetrievalResult
 from .retrieval.rank_fusion import RankFusion
 from .retrieval.sparse_retriever import SparseRetriever
@@ -62,6 +65,7 @@ class KnowledgeBaseManager:
         self.kb_db = KBSQLiteDatabase(DB_PATH.as_posix())
         await self.kb_db.initialize()
         await self.kb_db.migrate_to_v1()
+        await self.kb_db.migrate_to_v2()
         logger.info(f"KnowledgeBase database initialized: {DB_PATH}")
 
     async def load_kbs(self):
@@ -90,8 +94,13 @@ class KnowledgeBaseManager:
         top_k_dense: int | None = None,
         top_k_sparse: int | None = None,
         top_m_final: int | None = None,
+        index_type: str | None = None,
+        index_nprobe: int | None = None,
+        index_ef_search: int | None = None,
     ) -> KBHelper:
         """创建新的知识库实例"""
+        if index_type is not None and index_type not in INDEX_TYPES:
+            raise ValueError(f"不支持的索引类型: {index_type}")
         kb = KnowledgeBase(
             kb_name=kb_name,
             description=description,
@@ -103,6 +112,9 @@ class KnowledgeBaseManager:
             top_k_dense=top_k_dense if top_k_dense is not None else 50,
             top_k_sparse=top_k_sparse if top_k_sparse is not None else 50,
             top_m_final=top_m_final if top_m_final is not None else 5,
+            index_type=index_type or "flat",
+            index_nprobe=index_nprobe if index_nprobe is not None else 16,
+            index_ef_search=index_ef_search if index_ef_search is not None else 64,
         )
         async with self.kb_db.get_db() as session:
             session.add(kb)
@@ -164,11 +176,16 @@ class KnowledgeBaseManager:
         top_k_dense: int | None = None,
         top_k_sparse: int | None = None,
         top_m_final: int | None = None,
+        index_type: str | None = None,
+        index_nprobe: int | None = None,
+        index_ef_search: int | None = None,
     ) -> KBHelper | None:
         """更新知识库实例"""
         kb_helper = await self.get_kb(kb_id)
         if not kb_helper:
             return None
+        if index_type is not None and index_type not in INDEX_TYPES:
+            raise ValueError(f"不支持的索引类型: {index_type}")
 
         kb = kb_helper.kb
         if kb_name is not None:
@@ -190,11 +207,20 @@ class KnowledgeBaseManager:
             kb.top_k_sparse = top_k_sparse
         if top_m_final is not None:
             kb.top_m_final = top_m_final
+        if index_type is not None:
+            kb.index_type = index_type
+        if index_nprobe is not None:
+            kb.index_nprobe = index_nprobe
+        if index_ef_search is not None:
+            kb.index_ef_search = index_ef_search
         async with self.kb_db.get_db() as session:
             session.add(kb)
             await session.commit()
             await session.refresh(kb)
 
+        # 在线切换向量索引类型与检索参数
+        await kb_helper.apply_index_config()
+
         return kb_helper
 
     async def retrieve(
@@ -277,6 +303,7 @@ class KnowledgeBaseManager:
                 logger.error(f"关闭知识库 {kb_id} 失败: {e}")
 
         self.kb_insts.clear()
+        shutdown_process_pool()
 
         # 关闭元数据数据库
         if hasattr(self, "kb_db") and self.kb_db:
@@ -40,6 +40,10 @@ class KnowledgeBase(BaseKBModel, table=True):
     top_k_dense: int | None = Field(default=50, nullable=True)
     top_k_sparse: int | None = Field(default=50, nullable=True)
     top_m_final: int | None = Field(default=5, nullable=True)
+    # 向量索引配置参数
+    index_type: str | None = Field(default="flat", max_length=20, nullable=True)
+    index_nprobe: int | None = Field(default=16, nullable=True)
+    index_ef_search: int | None = Field(default=64, nullable=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -1,13 +1,21 @@
-"""文档解析器模块"""
+"""文档解析器模块，已移至 astrbot.kb_processing.parsers"""
 
-from .base import BaseParser, MediaItem, ParseResult
-from .pdf_parser import PDFParser
-from .text_parser import TextParser
+from astrbot.kb_processing.parsers import (
+    BaseParser,
+    DocumentSource,
+    MediaItem,
+    ParseResult,
+    PDFParser,
+    TextParser,
+    open_source,
+)
 
 __all__ = [
     "BaseParser",
+    "DocumentSource",
     "MediaItem",
     "PDFParser",
     "ParseResult",
     "TextParser",
+    "open_source",
 ]
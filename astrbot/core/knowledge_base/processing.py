@@ -0,0 +1,91 @@
+"""文档解析与分块
+
+解析 (pypdf、markitdown) 与递归分块都是纯 CPU 计算，在事件循环中执行会阻塞所有平台的消息处理。
+这里将二者放到一个限制了进程数的进程池中执行：解析器逐页产出文本，直接送入分块器，无需先拼接全文。
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from astrbot.core import logger
+from astrbot.kb_processing.chunking.base import BaseChunker
+from astrbot.kb_processing.parsers.base import DocumentSource, MediaItem
+from astrbot.kb_processing.parsers.util import get_parser
+from astrbot.kb_processing.worker import parse_and_chunk as _parse_and_chunk
+
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+"""解析进程数上限，同时也是并行处理的文档数上限"""
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # 在多线程的异步进程中 fork 可能继承被其他线程持有的锁而死锁，使用 spawn 启动子进程。
+        # 子进程只导入 astrbot.kb_processing 中的解析器与分块器，不会初始化 astrbot.core
+        _pool = ProcessPoolExecutor(
+            max_workers=MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def parse_and_chunk(
+    source: DocumentSource,
+    file_name: str,
+    file_type: str,
+    chunker: BaseChunker,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> tuple[list[str], list[MediaItem]]:
+    """在进程池中解析文档并分块，返回 (文本块列表, 多媒体资源列表)
+
+    source 为文件路径时由子进程自行读取文件，文件内容不经过进程间传输。
+
+    分块器未实现同步分块 (split_text) 时，只在进程池中解析，分块仍在事件循环中执行。
+    """
+    global _pool
+    ext = f".{file_type}"
+    get_parser(ext)  # 在提交任务前检查文件格式
+    offload_chunking = type(chunker).split_text is not BaseChunker.split_text
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    try:
+        chunks, media = await loop.run_in_executor(
+            pool,
+            partial(
+                _parse_and_chunk,
+                ext,
+                source,
+                file_name,
+                chunker if offload_chunking else None,
+                chunk_size,
+                chunk_overlap,
+            ),
+        )
+    except BrokenProcessPool:
+        # 子进程异常退出 (如内存不足) 后进程池不可再用，下次调用时重建
+        logger.error(f"解析文档 {file_name} 时解析进程异常退出")
+        if _pool is pool:
+            _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    if not offload_chunking:
+        chunks = await chunker.chunk(
+            chunks[0],
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+        )
+    return chunks, media
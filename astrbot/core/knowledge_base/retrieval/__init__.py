@@ -1,11 +1,15 @@
 """检索模块"""
 
+from .bm25_index import BM25Index
 from .manager import RetrievalManager, RetrievalResult
+from .query_embedding_cache import QueryEmbeddingCache
 from .rank_fusion import FusedResult, RankFusion
 from .sparse_retriever import SparseResult, SparseRetriever
 
 __all__ = [
+    "BM25Index",
     "FusedResult",
+    "QueryEmbeddingCache",
     "RankFusion",
     "RetrievalManager",
     "RetrievalResult",
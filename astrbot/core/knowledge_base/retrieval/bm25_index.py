@@ -0,0 +1,302 @@
+"""持久化 BM25 倒排索引
+
+每个知识库在其目录下维护一个 SQLite 倒排索引（与 FAISS 索引文件放在一起）:
+
+- bm25_docs: 每个文本块的长度及其所属文档
+- bm25_postings: (词项, 文本块) -> 词频
+
+索引在上传、删除文档和删除文本块时增量更新。查询时只读取查询词项的倒排表，
+文档频率由倒排表计数得到，语料规模 (文本块数、总长度) 常驻内存，只在加载时统计一次，
+之后随写入的文本块增量更新。
+"""
+
+import asyncio
+import json
+import math
+import os
+from collections import Counter
+from contextlib import asynccontextmanager
+
+import jieba
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from astrbot.core import logger
+from astrbot.core.db.vec_db.faiss_impl.document_storage import DocumentStorage
+
+with open(
+    os.path.join(os.path.dirname(__file__), "hit_stopwords.txt"),
+    encoding="utf-8",
+) as f:
+    HIT_STOPWORDS = {word.strip() for word in f.read().splitlines() if word.strip()}
+
+
+def tokenize(content: str) -> list[str]:
+    """分词并去除停用词"""
+    return [
+        word
+        for word in jieba.cut(content)
+        if word.strip() and word not in HIT_STOPWORDS
+    ]
+
+
+REBUILD_BATCH_SIZE = 1000
+
+_INIT_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS bm25_docs (
+        id INTEGER PRIMARY KEY,
+        chunk_id TEXT NOT NULL,
+        kb_doc_id TEXT,
+        length INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_bm25_docs_chunk_id ON bm25_docs(chunk_id)",
+    "CREATE INDEX IF NOT EXISTS idx_bm25_docs_kb_doc_id ON bm25_docs(kb_doc_id)",
+    """
+    CREATE TABLE IF NOT EXISTS bm25_postings (
+        term TEXT NOT NULL,
+        doc_id INTEGER NOT NULL,
+        tf INTEGER NOT NULL,
+        PRIMARY KEY (term, doc_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_bm25_postings_doc_id ON bm25_postings(doc_id)",
+]
+
+
+class BM25Index:
+    """单个知识库的持久化 BM25 索引
+
+    文本块使用其在向量库中的整数 ID（即 FAISS 中的 ID）标识。
+    """
+
+    def __init__(self, db_path: str, k1: float = 1.5, b: float = 0.75):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        self.async_session = async_sessionmaker(
+            self.engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+        )
+        self.doc_count = 0
+        self.total_length = 0
+        self._lock = asyncio.Lock()
+        """保护写入与语料统计"""
+        self._sync_lock = asyncio.Lock()
+        self._synced = False
+
+    @asynccontextmanager
+    async def get_db(self):
+        async with self.async_session() as session:
+            yield session
+
+    async def initialize(self) -> None:
+        async with self.engine.begin() as conn:
+            for stmt in _INIT_SQL:
+                await conn.execute(text(stmt))
+            await conn.execute(text("PRAGMA journal_mode=WAL"))
+        await self._load_stats()
+
+    async def _load_stats(self) -> None:
+        async with self.get_db() as session:
+            row = (
+                await session.execute(
+                    text("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM bm25_docs"),
+                )
+            ).one()
+        self.doc_count, self.total_length = int(row[0]), int(row[1])
+
+    async def add_documents(
+        self,
+        ids: list[int],
+        chunk_ids: list[str],
+        contents: list[str],
+        kb_doc_ids: list[str | None],
+    ) -> None:
+        """将文本块加入索引。分词在线程池中进行。"""
+        if not ids:
+            return
+        tokenized = await asyncio.to_thread(
+            lambda: [Counter(tokenize(content)) for content in contents],
+        )
+        docs = []
+        postings = []
+        for int_id, chunk_id, kb_doc_id, tfs in zip(
+            ids,
+            chunk_ids,
+            kb_doc_ids,
+            tokenized,
+        ):
+            length = sum(tfs.values())
+            docs.append(
+                {
+                    "id": int_id,
+                    "chunk_id": chunk_id,
+                    "kb_doc_id": kb_doc_id,
+                    "length": length,
+                },
+            )
+            postings.extend(
+                {"term": term, "doc_id": int_id, "tf": tf} for term, tf in tfs.items()
+            )
+
+        # 以单个 JSON 参数传入 ID，避免批量较大时超出 SQLite 的参数数量上限
+        params = {"ids": json.dumps(ids)}
+        in_ids = "IN (SELECT value FROM json_each(:ids))"
+        async with self._lock, self.get_db() as session, session.begin():
+            # 被覆盖的文本块先从语料统计和倒排表中移除
+            replaced = (
+                await session.execute(
+                    text(
+                        "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM bm25_docs "
+                        f"WHERE id {in_ids}",
+                    ),
+                    params,
+                )
+            ).one()
+            if replaced[0]:
+                await session.execute(
+                    text(f"DELETE FROM bm25_postings WHERE doc_id {in_ids}"),
+                    params,
+                )
+            await session.execute(
+                text(
+                    "INSERT OR REPLACE INTO bm25_docs (id, chunk_id, kb_doc_id, length) "
+                    "VALUES (:id, :chunk_id, :kb_doc_id, :length)",
+                ),
+                docs,
+            )
+            if postings:
+                await session.execute(
+                    text(
+                        "INSERT OR REPLACE INTO bm25_postings (term, doc_id, tf) "
+                        "VALUES (:term, :doc_id, :tf)",
+                    ),
+                    postings,
+                )
+        self.doc_count += len(docs) - int(replaced[0])
+        self.total_length += sum(doc["length"] for doc in docs) - int(replaced[1])
+
+    async def _delete_where(self, condition: str, params: dict) -> None:
+        async with self._lock, self.get_db() as session, session.begin():
+            deleted = (
+                await session.execute(
+                    text(
+                        "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM bm25_docs "
+                        f"WHERE {condition}",
+                    ),
+                    params,
+                )
+            ).one()
+            await session.execute(
+                text(
+                    "DELETE FROM bm25_postings WHERE doc_id IN "
+                    f"(SELECT id FROM bm25_docs WHERE {condition})",
+                ),
+                params,
+            )
+            await session.execute(
+                text(f"DELETE FROM bm25_docs WHERE {condition}"),
+                params,
+            )
+        self.doc_count -= int(deleted[0])
+        self.total_length -= int(deleted[1])
+
+    async def delete_by_kb_doc_id(self, kb_doc_id: str) -> None:
+        """删除某个文档的所有文本块"""
+        await self._delete_where("kb_doc_id = :kb_doc_id", {"kb_doc_id": kb_doc_id})
+
+    async def delete_by_chunk_id(self, chunk_id: str) -> None:
+        """删除单个文本块"""
+        await self._delete_where("chunk_id = :chunk_id", {"chunk_id": chunk_id})
+
+    async def search(self, query: str, top_k: int) -> list[tuple[int, float]]:
+        """检索查询，返回按分数降序排列的 (文本块 ID, 分数)"""
+        terms = set(tokenize(query))
+        if not terms or not self.doc_count:
+            return []
+
+        params = {f"t{i}": term for i, term in enumerate(terms)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        async with self.get_db() as session:
+            rows = (
+                await session.execute(
+                    text(
+                        "SELECT p.term, p.doc_id, p.tf, d.length "
+                        "FROM bm25_postings p JOIN bm25_docs d ON d.id = p.doc_id "
+                        f"WHERE p.term IN ({placeholders})",
+                    ),
+                    params,
+                )
+            ).all()
+        if not rows:
+            return []
+
+        df = Counter(row[0] for row in rows)
+        n = self.doc_count
+        avgdl = self.total_length / n if n else 0
+        idf = {
+            term: math.log(1 + (n - freq + 0.5) / (freq + 0.5))
+            for term, freq in df.items()
+        }
+        k1, b = self.k1, self.b
+        scores: dict[int, float] = {}
+        for term, doc_id, tf, length in rows:
+            norm = k1 * (1 - b + b * length / avgdl) if avgdl else k1
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf[term] * (
+                tf * (k1 + 1) / (tf + norm)
+            )
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_k]
+
+    def invalidate(self) -> None:
+        """标记索引可能与向量库不一致，下次检索前重新检查"""
+        self._synced = False
+
+    async def ensure_synced(self, document_storage: DocumentStorage) -> None:
+        """确保索引与向量库中的文本块一致。
+
+        旧版本创建的知识库没有稀疏索引，或上次写入中途失败时，根据向量库重建索引。
+        """
+        if self._synced:
+            return
+        async with self._sync_lock:
+            if self._synced:
+                return
+            expected = await document_storage.count_documents()
+            if expected != self.doc_count:
+                logger.info(
+                    f"稀疏索引 {self.db_path} 与向量库不一致 "
+                    f"({self.doc_count}/{expected})，正在重建...",
+                )
+                await self._rebuild(document_storage)
+            self._synced = True
+
+    async def _rebuild(self, document_storage: DocumentStorage) -> None:
+        async with self._lock, self.get_db() as session, session.begin():
+            await session.execute(text("DELETE FROM bm25_postings"))
+            await session.execute(text("DELETE FROM bm25_docs"))
+        self.doc_count, self.total_length = 0, 0
+        documents = await document_storage.get_documents(
+            metadata_filters={},
+            limit=None,
+            offset=None,
+        )
+        for i in range(0, len(documents), REBUILD_BATCH_SIZE):
+            batch = documents[i : i + REBUILD_BATCH_SIZE]
+            await self.add_documents(
+                ids=[doc["id"] for doc in batch],
+                chunk_ids=[doc["doc_id"] for doc in batch],
+                contents=[doc["text"] for doc in batch],
+                kb_doc_ids=[
+                    json.loads(doc["metadata"] or "{}").get("kb_doc_id")
+                    for doc in batch
+                ],
+            )
+
+    async def close(self) -> None:
+        await self.engine.dispose()
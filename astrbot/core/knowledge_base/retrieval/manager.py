@@ -3,6 +3,7 @@
 协调稠密检索、稀疏检索和 Rerank,提供统一的检索接口
 """
 
+import asyncio
 import time
 from dataclasses import dataclass
 
@@ -10,9 +11,12 @@ from astrbot import logger
 from astrbot.core.db.vec_db.base import Result
 from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
 from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
+from astrbot.core.knowledge_base.retrieval.query_embedding_cache import (
+    QueryEmbeddingCache,
+)
 from astrbot.core.knowledge_base.retrieval.rank_fusion import RankFusion
 from astrbot.core.knowledge_base.retrieval.sparse_retriever import SparseRetriever
-from astrbot.core.provider.provider import RerankProvider
+from astrbot.core.provider.provider import EmbeddingProvider, RerankProvider
 
 from ..kb_helper import KBHelper
 
@@ -57,6 +61,7 @@ class RetrievalManager:
         self.sparse_retriever = sparse_retriever
         self.rank_fusion = rank_fusion
         self.kb_db = kb_db
+        self.embedding_cache = QueryEmbeddingCache()
 
     async def retrieve(
         self,
@@ -98,6 +103,7 @@ class RetrievalManager:
                     "top_k_sparse": kb.top_k_sparse or 50,
                     "top_m_final": kb.top_m_final or 5,
                     "vec_db": kb_helper.vec_db,
+                    "sparse_index": kb_helper.sparse_index,
                     "rerank_provider_id": kb.rerank_provider_id,
                 }
                 new_kb_ids.append(kb_id)
@@ -142,10 +148,13 @@ class RetrievalManager:
             f"Rank fusion took {time_end - time_start:.2f}s and returned {len(fused_results)} results.",
         )
 
-        # 4. 转换为 RetrievalResult (获取元数据)
+        # 4. 转换为 RetrievalResult (一次查询获取所有结果的元数据)
+        metadata_map = await self.kb_db.get_documents_with_metadata(
+            [fr.doc_id for fr in fused_results],
+        )
         retrieval_results = []
         for fr in fused_results:
-            metadata_dict = await self.kb_db.get_document_with_metadata(fr.doc_id)
+            metadata_dict = metadata_map.get(fr.doc_id)
             if metadata_dict:
                 retrieval_results.append(
                     RetrievalResult(
@@ -194,7 +203,7 @@ class RetrievalManager:
     ):
         """稠密检索 (向量相似度)
 
-        为每个知识库使用独立的向量数据库进行检索,然后合并结果。
+        查询向量按嵌入模型计算一次 (带缓存)，各知识库使用独立的向量数据库并发检索，然后合并结果。
 
         Args:
             query: 查询文本
@@ -205,27 +214,53 @@ class RetrievalManager:
             List[Result]: 检索结果列表
 
         """
-        all_results: list[Result] = []
+        kb_ids = [kb_id for kb_id in kb_ids if kb_id in kb_options]
+
+        # 每个嵌入模型只计算一次查询向量
+        providers: dict[int, EmbeddingProvider] = {}
         for kb_id in kb_ids:
-            if kb_id not in kb_options:
-                continue
-            try:
-                vec_db: FaissVecDB = kb_options[kb_id]["vec_db"]
-                dense_k = int(kb_options[kb_id]["top_k_dense"])
-                vec_results = await vec_db.retrieve(
-                    query=query,
-                    k=dense_k,
-                    fetch_k=dense_k * 2,
-                    rerank=False,  # 稠密检索阶段不进行 rerank
-                    metadata_filters={"kb_id": kb_id},
-                )
+            provider = kb_options[kb_id]["vec_db"].embedding_provider
+            providers.setdefault(id(provider), provider)
+        provider_keys = list(providers)
+        embeddings = await asyncio.gather(
+            *(
+                self.embedding_cache.get_embedding(providers[key], query)
+                for key in provider_keys
+            ),
+            return_exceptions=True,
+        )
+        embedding_map = dict(zip(provider_keys, embeddings))
+        logger.debug(
+            f"Query embedding cache: {len(provider_keys)} providers, "
+            f"hit rate {self.embedding_cache.hit_rate:.2%}",
+        )
 
-                all_results.extend(vec_results)
-            except Exception as e:
-                from astrbot.core import logger
+        async def _retrieve(kb_id: str) -> list[Result]:
+            vec_db: FaissVecDB = kb_options[kb_id]["vec_db"]
+            embedding = embedding_map[id(vec_db.embedding_provider)]
+            if isinstance(embedding, BaseException):
+                raise embedding
+            dense_k = int(kb_options[kb_id]["top_k_dense"])
+            return await vec_db.retrieve(
+                query=query,
+                k=dense_k,
+                fetch_k=dense_k * 2,
+                rerank=False,  # 稠密检索阶段不进行 rerank
+                metadata_filters={"kb_id": kb_id},
+                embedding=embedding,
+            )
 
-                logger.warning(f"知识库 {kb_id} 稠密检索失败: {e}")
+        # 各知识库的向量检索在各自的索引线程中并发执行
+        all_results: list[Result] = []
+        kb_results = await asyncio.gather(
+            *(_retrieve(kb_id) for kb_id in kb_ids),
+            return_exceptions=True,
+        )
+        for kb_id, vec_results in zip(kb_ids, kb_results):
+            if isinstance(vec_results, BaseException):
+                logger.warning(f"知识库 {kb_id} 稠密检索失败: {vec_results}")
                 continue
+            all_results.extend(vec_results)
 
         # 按相似度排序并返回 top_k
         all_results.sort(key=lambda x: x.similarity, reverse=True)
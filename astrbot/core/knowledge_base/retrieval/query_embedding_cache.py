@@ -0,0 +1,92 @@
+"""查询向量缓存
+
+同一个问题（或仅空白、大小写不同的问题）在短时间内往往会被重复检索，
+而每次稠密检索都需要调用一次嵌入模型 API。这里按 (提供商 ID, 模型, 规范化文本)
+缓存查询向量，带有 LRU 容量上限与过期时间，并合并同一查询的并发请求。
+"""
+
+import asyncio
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+from astrbot.core.provider.provider import EmbeddingProvider
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """规范化查询文本：Unicode NFKC、合并空白、忽略大小写"""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+class QueryEmbeddingCache:
+    """查询向量的 LRU/TTL 缓存"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._cache: OrderedDict[tuple[str, str, str], tuple[float, list[float]]] = (
+            OrderedDict()
+        )
+        self._inflight: dict[tuple[str, str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    @staticmethod
+    def _key(provider: EmbeddingProvider, text: str) -> tuple[str, str, str]:
+        model = getattr(provider, "model", None) or provider.provider_config.get(
+            "embedding_model",
+            "",
+        )
+        return (provider.meta().id, str(model), normalize_query(text))
+
+    async def get_embedding(
+        self,
+        provider: EmbeddingProvider,
+        text: str,
+    ) -> list[float]:
+        key = self._key(provider, text)
+        entry = self._cache.get(key)
+        if entry is not None:
+            expires_at, embedding = entry
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return embedding
+            del self._cache[key]
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.hits += 1
+            return await asyncio.shield(fut)
+
+        self.misses += 1
+        fut = asyncio.ensure_future(provider.get_embedding(text))
+        self._inflight[key] = fut
+        try:
+            embedding = await asyncio.shield(fut)
+        finally:
+            self._inflight.pop(key, None)
+        self._cache[key] = (time.monotonic() + self.ttl, embedding)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return embedding
+
+    def clear(self) -> None:
+        self._cache.clear()
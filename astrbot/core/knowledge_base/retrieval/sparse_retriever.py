@@ -4,15 +4,13 @@
 """
 
 import json
-import os
 from dataclasses import dataclass
 
-import jieba
-from rank_bm25 import BM25Okapi
-
 from astrbot.core.db.vec_db.faiss_impl import FaissVecDB
 from astrbot.core.knowledge_base.kb_db_sqlite import KBSQLiteDatabase
 
+from .bm25_index import HIT_STOPWORDS, BM25Index
+
 
 @dataclass
 class SparseResult:
@@ -31,7 +29,7 @@ class SparseRetriever:
 
     职责:
     - 基于关键词的文档检索
-    - 使用 BM25 算法计算相关度
+    - 使用各知识库持久化的 BM25 倒排索引计算相关度
     """
 
     def __init__(self, kb_db: KBSQLiteDatabase):
@@ -42,15 +40,7 @@ class SparseRetriever:
 
         """
         self.kb_db = kb_db
-        self._index_cache = {}  # 缓存 BM25 索引
-
-        with open(
-            os.path.join(os.path.dirname(__file__), "hit_stopwords.txt"),
-            encoding="utf-8",
-        ) as f:
-            self.hit_stopwords = {
-                word.strip() for word in set(f.read().splitlines()) if word.strip()
-            }
+        self.hit_stopwords = HIT_STOPWORDS
 
     async def retrieve(
         self,
@@ -69,68 +59,47 @@ class SparseRetriever:
             List[SparseResult]: 检索结果列表
 
         """
-        # 1. 获取所有相关块
+        results = []
         top_k_sparse = 0
-        chunks = []
         for kb_id in kb_ids:
-            vec_db: FaissVecDB = kb_options.get(kb_id, {}).get("vec_db")
-            if not vec_db:
+            options = kb_options.get(kb_id, {})
+            vec_db: FaissVecDB = options.get("vec_db")
+            sparse_index: BM25Index = options.get("sparse_index")
+            if not vec_db or not sparse_index:
+                continue
+            kb_top_k = options.get("top_k_sparse", 50)
+            top_k_sparse += kb_top_k
+
+            # 1. 只读取查询词项的倒排表
+            await sparse_index.ensure_synced(vec_db.document_storage)
+            ranked = await sparse_index.search(query, kb_top_k)
+            if not ranked:
                 continue
-            result = await vec_db.document_storage.get_documents(
+
+            # 2. 读取命中文本块的内容
+            docs = await vec_db.document_storage.get_documents(
                 metadata_filters={},
+                ids=[int_id for int_id, _ in ranked],
                 limit=None,
                 offset=None,
             )
-            chunk_mds = [json.loads(doc["metadata"]) for doc in result]
-            result = [
-                {
-                    "chunk_id": doc["doc_id"],
-                    "chunk_index": chunk_md["chunk_index"],
-                    "doc_id": chunk_md["kb_doc_id"],
-                    "kb_id": kb_id,
-                    "text": doc["text"],
-                }
-                for doc, chunk_md in zip(result, chunk_mds)
-            ]
-            chunks.extend(result)
-            top_k_sparse += kb_options.get(kb_id, {}).get("top_k_sparse", 50)
-
-        if not chunks:
-            return []
-
-        # 2. 准备文档和索引
-        corpus = [chunk["text"] for chunk in chunks]
-        tokenized_corpus = [list(jieba.cut(doc)) for doc in corpus]
-        tokenized_corpus = [
-            [word for word in doc if word not in self.hit_stopwords]
-            for doc in tokenized_corpus
-        ]
-
-        # 3. 构建 BM25 索引
-        bm25 = BM25Okapi(tokenized_corpus)
-
-        # 4. 执行检索
-        tokenized_query = list(jieba.cut(query))
-        tokenized_query = [
-            word for word in tokenized_query if word not in self.hit_stopwords
-        ]
-        scores = bm25.get_scores(tokenized_query)
-
-        # 5. 排序并返回 Top-K
-        results = []
-        for idx, score in enumerate(scores):
-            chunk = chunks[idx]
-            results.append(
-                SparseResult(
-                    chunk_id=chunk["chunk_id"],
-                    chunk_index=chunk["chunk_index"],
-                    doc_id=chunk["doc_id"],
-                    kb_id=chunk["kb_id"],
-                    content=chunk["text"],
-                    score=float(score),
-                ),
-            )
-
+            docs_by_id = {doc["id"]: doc for doc in docs}
+            for int_id, score in ranked:
+                doc = docs_by_id.get(int_id)
+                if not doc:
+                    continue
+                chunk_md = json.loads(doc["metadata"])
+                results.append(
+                    SparseResult(
+                        chunk_id=doc["doc_id"],
+                        chunk_index=chunk_md["chunk_index"],
+                        doc_id=chunk_md["kb_doc_id"],
+                        kb_id=kb_id,
+                        content=doc["text"],
+                        score=float(score),
+                    ),
+                )
+
+        # 3. 排序并返回 Top-K
         results.sort(key=lambda x: x.score, reverse=True)
-        # return results[: len(results) // len(kb_ids)]
         return results[:top_k_sparse]
@@ -0,0 +1,131 @@
+"""知识库文档上传任务登记
+
+任务状态 (pending / processing / completed / failed) 与结果保存在偏好设置中，重启后仍可查询，
+重启时未完成的任务标记为失败。进度变化频繁，只保存在内存中。已结束的任务在 TTL 过期后清理。
+"""
+
+import asyncio
+import json
+import time
+
+from astrbot.core import logger, sp
+
+TASK_SCOPE = "kb_upload_task"
+TASK_TTL = 24 * 3600
+"""已结束任务的保留时间（秒）"""
+FINISHED_STATUSES = ("completed", "failed")
+FILE_PROGRESS_FIELDS = ("file_name", "stage", "current", "total")
+
+
+class UploadTaskRegistry:
+    def __init__(self, ttl: float = TASK_TTL):
+        self.ttl = ttl
+        self.tasks: dict[str, dict] = {}
+        """task_id -> {status, result, error, updated_at}"""
+        self.progress: dict[str, dict] = {}
+        """task_id -> {status, file_index, file_total, stage, current, total, files}
+
+        同一任务的多个文件并行处理，files 按文件序号分别记录各文件的进度，顶层字段为最近一次更新。
+        """
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    async def _ensure_loaded(self):
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                prefs = await sp.range_get_async(TASK_SCOPE)
+            except Exception as e:
+                logger.warning(f"读取知识库上传任务记录失败: {e}")
+                prefs = []
+            for pref in prefs:
+                task = (pref.value or {}).get("val")
+                if not isinstance(task, dict) or pref.scope_id in self.tasks:
+                    continue
+                if task.get("status") not in FINISHED_STATUSES:
+                    task = {
+                        **task,
+                        "status": "failed",
+                        "error": "任务因重启而中断，重新上传相同的文件将从断点继续",
+                        "updated_at": time.time(),
+                    }
+                    await self._persist(pref.scope_id, task)
+                self.tasks[pref.scope_id] = task
+            self._loaded = True
+
+    async def _persist(self, task_id: str, task: dict):
+        try:
+            value = json.loads(json.dumps(task, ensure_ascii=False, default=str))
+            await sp.put_async(TASK_SCOPE, task_id, "task", value)
+        except Exception as e:
+            logger.warning(f"保存知识库上传任务 {task_id} 失败: {e}")
+
+    async def evict_expired(self):
+        now = time.time()
+        expired = [
+            task_id
+            for task_id, task in self.tasks.items()
+            if task.get("status") in FINISHED_STATUSES
+            and now - task.get("updated_at", 0) > self.ttl
+        ]
+        for task_id in expired:
+            self.tasks.pop(task_id, None)
+            self.progress.pop(task_id, None)
+            try:
+                await sp.remove_async(TASK_SCOPE, task_id, "task")
+            except Exception as e:
+                logger.warning(f"删除知识库上传任务 {task_id} 失败: {e}")
+
+    async def set_status(
+        self,
+        task_id: str,
+        status: str,
+        result: dict | None = None,
+        error: str | None = None,
+    ):
+        await self._ensure_loaded()
+        task = {
+            "status": status,
+            "result": result,
+            "error": error,
+            "updated_at": time.time(),
+        }
+        self.tasks[task_id] = task
+        if status in FINISHED_STATUSES:
+            self.progress.pop(task_id, None)
+        await self._persist(task_id, task)
+        await self.evict_expired()
+
+    def init_progress(self, task_id: str, file_total: int):
+        self.progress[task_id] = {
+            "status": "processing",
+            "file_index": 0,
+            "file_total": file_total,
+            "stage": "waiting",
+            "current": 0,
+            "total": 100,
+            "files": {},
+        }
+
+    def update_progress(self, task_id: str, **fields):
+        progress = self.progress.get(task_id)
+        if progress is None:
+            return
+        progress.update(fields)
+        file_index = fields.get("file_index")
+        if file_index is not None:
+            progress["files"].setdefault(str(file_index), {}).update(
+                {k: v for k, v in fields.items() if k in FILE_PROGRESS_FIELDS},
+            )
+
+    async def get(self, task_id: str) -> tuple[dict, dict | None] | None:
+        """返回 (任务信息, 进度)，任务不存在时返回 None"""
+        await self._ensure_loaded()
+        await self.evict_expired()
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        return task, self.progress.get(task_id)
@@ -27,12 +27,44 @@ import json
 import os
 import uuid
 from enum import Enum
+from urllib.parse import urlparse
 
 from pydantic.v1 import BaseModel
 
 from astrbot.core import astrbot_config, file_token_service, logger
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
-from astrbot.core.utils.io import download_file, download_image_by_url, file_to_base64
+from astrbot.core.utils.io import (
+    download_file,
+    download_image_by_url,
+    file_to_base64,
+    media_cache,
+)
+
+_AUDIO_SIGNATURES = (
+    (b"RIFF", ".wav"),
+    (b"ID3", ".mp3"),
+    (b"\xff\xfb", ".mp3"),
+    (b"\xff\xf3", ".mp3"),
+    (b"OggS", ".ogg"),
+    (b"fLaC", ".flac"),
+    (b"#!AMR", ".amr"),
+    (b"#!SILK", ".silk"),
+    (b"\x02#!SILK", ".silk"),
+)
+
+
+def _audio_suffix(data: bytes) -> str:
+    """根据文件头推断音频的扩展名，无法识别时返回空字符串"""
+    for signature, suffix in _AUDIO_SIGNATURES:
+        if data.startswith(signature):
+            return suffix
+    return ""
+
+
+def _url_suffix(url: str) -> str:
+    """URL 路径中的扩展名，没有时返回空字符串"""
+    ext = os.path.splitext(urlparse(url).path)[1]
+    return ext if 1 < len(ext) <= 6 and ext[1:].isalnum() else ""
 
 
 class ComponentType(str, Enum):
@@ -148,15 +180,18 @@ class Record(BaseMessageComponent):
         if self.file.startswith("file:///"):
             return self.file[8:]
         if self.file.startswith("http"):
-            file_path = await download_image_by_url(self.file)
+            file_path = await media_cache.fetch(
+                self.file,
+                suffix=_url_suffix(self.file),
+            )
             return os.path.abspath(file_path)
         if self.file.startswith("base64://"):
             bs64_data = self.file.removeprefix("base64://")
-            image_bytes = base64.b64decode(bs64_data)
-            temp_dir = os.path.join(get_astrbot_data_path(), "temp")
-            file_path = os.path.join(temp_dir, f"{uuid.uuid4()}.jpg")
-            with open(file_path, "wb") as f:
-                f.write(image_bytes)
+            audio_bytes = base64.b64decode(bs64_data)
+            file_path = await media_cache.save_bytes(
+                audio_bytes,
+                suffix=_audio_suffix(audio_bytes),
+            )
             return os.path.abspath(file_path)
         if os.path.exists(self.file):
             return os.path.abspath(self.file)
@@ -175,7 +210,10 @@ class Record(BaseMessageComponent):
         if self.file.startswith("file:///"):
             bs64_data = file_to_base64(self.file[8:])
         elif self.file.startswith("http"):
-            file_path = await download_image_by_url(self.file)
+            file_path = await media_cache.fetch(
+                self.file,
+                suffix=_url_suffix(self.file),
+            )
             bs64_data = file_to_base64(file_path)
         elif self.file.startswith("base64://"):
             bs64_data = self.file
@@ -242,9 +280,7 @@ class Video(BaseMessageComponent):
         if url and url.startswith("file:///"):
             return url[8:]
         if url and url.startswith("http"):
-            download_dir = os.path.join(get_astrbot_data_path(), "temp")
-            video_file_path = os.path.join(download_dir, f"{uuid.uuid4().hex}")
-            await download_file(url, video_file_path)
+            video_file_path = await media_cache.fetch(url, suffix="")
             if os.path.exists(video_file_path):
                 return os.path.abspath(video_file_path)
             raise Exception(f"download failed: {url}")
@@ -441,11 +477,7 @@ class Image(BaseMessageComponent):
             return os.path.abspath(image_file_path)
         if url.startswith("base64://"):
             bs64_data = url.removeprefix("base64://")
-            image_bytes = base64.b64decode(bs64_data)
-            temp_dir = os.path.join(get_astrbot_data_path(), "temp")
-            image_file_path = os.path.join(temp_dir, f"{uuid.uuid4()}.jpg")
-            with open(image_file_path, "wb") as f:
-                f.write(image_bytes)
+            image_file_path = await media_cache.save_bytes(base64.b64decode(bs64_data))
             return os.path.abspath(image_file_path)
         if os.path.exists(url):
             return os.path.abspath(url)
@@ -5,3 +5,7 @@ class ContentSafetyStrategy(abc.ABC):
     @abc.abstractmethod
     def check(self, content: str) -> tuple[bool, str]:
         raise NotImplementedError
+
+    async def acheck(self, content: str) -> tuple[bool, str]:
+        """异步检查。默认直接调用 check()，需要发起网络请求的策略应重写此方法，避免阻塞事件循环。"""
+        return self.check(content)
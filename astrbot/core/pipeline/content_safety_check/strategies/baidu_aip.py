@@ -1,5 +1,7 @@
 """使用此功能应该先 pip install baidu-aip"""
 
+import asyncio
+
 from aip import AipContentCensor
 
 from . import ContentSafetyStrategy
@@ -27,3 +29,7 @@ class BaiduAipStrategy(ContentSafetyStrategy):
         parts.append("\n判断结果：" + res["conclusion"])
         info = "".join(parts)
         return False, info
+
+    async def acheck(self, content: str) -> tuple[bool, str]:
+        # baidu-aip 的客户端是同步的，放到线程中执行
+        return await asyncio.to_thread(self.check, content)
@@ -1,10 +1,41 @@
 import re
+import unicodedata
+
+from astrbot import logger
+from astrbot.core.utils.aho_corasick import AhoCorasick
 
 from . import ContentSafetyStrategy
 
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+_ZERO_WIDTH = dict.fromkeys(
+    map(
+        ord,
+        "\u00ad\u034f\u061c\u115f\u1160\u17b4\u17b5\u180e"
+        "\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\u3164\ufeff",
+    ),
+)
+# 含命名分组、反向引用或全局内联标志的正则无法安全地拼接进组合正则，单独匹配
+_STANDALONE_REGEX = re.compile(r"\\[1-9]|\(\?P[<=]|^\(\?[aiLmsux]+\)")
+
+
+def normalize_text(text: str) -> str:
+    """去除零宽字符，全角转半角（NFKC），并统一大小写"""
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize("NFKC", text.translate(_ZERO_WIDTH)).casefold()
+
 
 class KeywordsStrategy(ContentSafetyStrategy):
-    def __init__(self, extra_keywords: list) -> None:
+    """关键词检查。
+
+    不含正则元字符的关键词构建为 Aho-Corasick 自动机，其余关键词合并为一个正则，
+    均在加载配置时构建一次，检查时各只需扫描一遍文本。
+
+    开启 normalize 时，普通关键词与文本都会被规范化后再匹配；正则关键词先匹配规范化后的文本，
+    未命中时再匹配原文，以免规范化改变正则本身的含义。
+    """
+
+    def __init__(self, extra_keywords: list, normalize: bool = True) -> None:
         self.keywords = []
         if extra_keywords is None:
             extra_keywords = []
@@ -16,9 +47,83 @@ class KeywordsStrategy(ContentSafetyStrategy):
         #         self.keywords.extend(
         #             json.loads(base64.b64decode(f.read()).decode("utf-8"))["keywords"]
         #         )
+        self.normalize = normalize
+        self._build()
 
-    def check(self, content: str) -> tuple[bool, str]:
+    def _build(self):
+        flags = re.IGNORECASE if self.normalize else 0
+        literals: list[str] = []
+        self.regex_patterns: list[tuple[str, re.Pattern]] = []
+        self.standalone_patterns: list[tuple[str, re.Pattern]] = []
         for keyword in self.keywords:
-            if re.search(keyword, content):
-                return False, "内容安全检查不通过，匹配到敏感词。"
+            if not isinstance(keyword, str) or not keyword:
+                continue
+            if _REGEX_META.isdisjoint(keyword):
+                literals.append(keyword)
+                continue
+            try:
+                pattern = re.compile(keyword, flags)
+            except re.error as e:
+                logger.warning(
+                    f"敏感词 {keyword} 不是合法的正则表达式，按普通文本匹配: {e}"
+                )
+                literals.append(keyword)
+                continue
+            if _STANDALONE_REGEX.search(keyword):
+                self.standalone_patterns.append((keyword, pattern))
+            else:
+                self.regex_patterns.append((keyword, pattern))
+
+        self.literal_terms: dict[str, str] = {}
+        """规范化后的关键词 -> 原关键词"""
+        for keyword in literals:
+            term = normalize_text(keyword) if self.normalize else keyword
+            if term:
+                self.literal_terms.setdefault(term, keyword)
+        self.automaton = AhoCorasick(self.literal_terms)
+
+        self.combined_regex = None
+        if self.regex_patterns:
+            try:
+                self.combined_regex = re.compile(
+                    "|".join(f"(?:{keyword})" for keyword, _ in self.regex_patterns),
+                    flags,
+                )
+            except re.error as e:
+                logger.debug(f"敏感词正则无法合并，逐个匹配: {e}")
+                self.standalone_patterns = [
+                    *self.regex_patterns,
+                    *self.standalone_patterns,
+                ]
+                self.regex_patterns = []
+
+    def match(self, content: str) -> str | None:
+        """返回命中的关键词，未命中时返回 None"""
+        normalized = normalize_text(content) if self.normalize else content
+        term = self.automaton.search(normalized)
+        if term is not None:
+            return self.literal_terms[term]
+        keyword = self._match_regex(normalized)
+        if keyword is None and normalized != content:
+            keyword = self._match_regex(content)
+        return keyword
+
+    def _match_regex(self, content: str) -> str | None:
+        if self.combined_regex is not None:
+            m = self.combined_regex.search(content)
+            if m:
+                # 组合正则只告诉我们命中位置，再找出在该位置命中的具体关键词
+                for keyword, pattern in self.regex_patterns:
+                    if pattern.match(content, m.start()):
+                        return keyword
+                return m.group(0)
+        for keyword, pattern in self.standalone_patterns:
+            if pattern.search(content):
+                return keyword
+        return None
+
+    def check(self, content: str) -> tuple[bool, str]:
+        keyword = self.match(content)
+        if keyword is not None:
+            return False, f"内容安全检查不通过，匹配到敏感词: {keyword}"
         return True, ""
@@ -1,30 +1,90 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+
 from astrbot import logger
 
 from . import ContentSafetyStrategy
 
+VERDICT_CACHE_TTL = 600
+"""审核结果缓存时间（秒）"""
+VERDICT_CACHE_SIZE = 2048
+
+
+class StrategyStats:
+    """单个策略的调用次数、拦截次数与耗时"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.blocked = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def record(self, elapsed_ms: float, ok: bool | None):
+        """ok 为 None 表示策略执行出错"""
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_ms = elapsed_ms
+        if ok is None:
+            self.errors += 1
+        elif not ok:
+            self.blocked += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "blocked": self.blocked,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_ms": round(self.last_ms, 2),
+        }
+
 
 class StrategySelector:
+    """并发执行所有启用的策略，任一策略判定不通过即返回。
+
+    审核结果按文本哈希缓存 VERDICT_CACHE_TTL 秒，并合并同一文本的并发审核请求，
+    重复的刷屏消息或相同的模型输出不会被重复送审。
+    """
+
     def __init__(self, config: dict) -> None:
         self.enabled_strategies: list[ContentSafetyStrategy] = []
+        self._cache: OrderedDict[str, tuple[float, tuple[bool, str]]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
         if config["internal_keywords"]["enable"]:
             from .keywords import KeywordsStrategy
 
             self.enabled_strategies.append(
-                KeywordsStrategy(config["internal_keywords"]["extra_keywords"]),
+                KeywordsStrategy(
+                    config["internal_keywords"]["extra_keywords"],
+                    normalize=config["internal_keywords"].get("normalize", True),
+                ),
             )
         if config["baidu_aip"]["enable"]:
             try:
                 from .baidu_aip import BaiduAipStrategy
             except ImportError:
                 logger.warning("使用百度内容审核应该先 pip install baidu-aip")
-                return
-            self.enabled_strategies.append(
-                BaiduAipStrategy(
-                    config["baidu_aip"]["app_id"],
-                    config["baidu_aip"]["api_key"],
-                    config["baidu_aip"]["secret_key"],
-                ),
-            )
+            else:
+                self.enabled_strategies.append(
+                    BaiduAipStrategy(
+                        config["baidu_aip"]["app_id"],
+                        config["baidu_aip"]["api_key"],
+                        config["baidu_aip"]["secret_key"],
+                    ),
+                )
+        self.strategy_stats = [
+            StrategyStats(type(s).__name__) for s in self.enabled_strategies
+        ]
 
     def check(self, content: str) -> tuple[bool, str]:
         for strategy in self.enabled_strategies:
@@ -32,3 +92,72 @@ class StrategySelector:
             if not ok:
                 return False, info
         return True, ""
+
+    async def acheck(self, content: str) -> tuple[bool, str]:
+        if not self.enabled_strategies:
+            return True, ""
+        key = hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+        entry = self._cache.get(key)
+        if entry is not None:
+            expires_at, verdict = entry
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return verdict
+            del self._cache[key]
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.cache_hits += 1
+            return await asyncio.shield(fut)
+
+        self.cache_misses += 1
+        fut = asyncio.ensure_future(self._evaluate(content))
+        self._inflight[key] = fut
+        try:
+            verdict = await asyncio.shield(fut)
+        finally:
+            self._inflight.pop(key, None)
+        self._cache[key] = (time.monotonic() + VERDICT_CACHE_TTL, verdict)
+        while len(self._cache) > VERDICT_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return verdict
+
+    async def _run(self, index: int, content: str) -> tuple[bool, str]:
+        stats = self.strategy_stats[index]
+        start = time.perf_counter()
+        try:
+            ok, info = await self.enabled_strategies[index].acheck(content)
+        except Exception:
+            stats.record((time.perf_counter() - start) * 1000, None)
+            raise
+        stats.record((time.perf_counter() - start) * 1000, ok)
+        return ok, info
+
+    async def _evaluate(self, content: str) -> tuple[bool, str]:
+        if len(self.enabled_strategies) == 1:
+            return await self._run(0, content)
+        tasks = [
+            asyncio.ensure_future(self._run(i, content))
+            for i in range(len(self.enabled_strategies))
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                ok, info = await next_done
+                if not ok:
+                    return False, info
+            return True, ""
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        total = self.cache_hits + self.cache_misses
+        return {
+            "strategies": [s.to_dict() for s in self.strategy_stats],
+            "cache_size": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / total if total else 0.0,
+        }
@@ -0,0 +1,221 @@
+"""按 Token 预算组装 LLM 请求上下文。
+
+按轮数截断（max_context_length）无法反映每轮消息的实际长度，一旦超过模型的上下文窗口，
+提供商只能在收到 "maximum context length" 错误后逐条弹出记录并重试，每弹出一条就多一次完整的 API 往返。
+
+这里在请求前就按 Token 预算裁剪上下文：
+
+- 系统提示词（含知识库注入内容）、本轮用户输入、图片、工具定义以及人格预设对话优先预留；
+- 剩余预算从最新的一轮对话开始向前按整轮填充，同一轮内的工具调用与工具结果不会被拆开，
+  且保留下来的上下文总是从 user 消息开始；
+- 纯文本消息的估算 Token 数按 (角色, 长度, 字符串哈希) 缓存，历史消息在多轮请求之间不会被重复计算；
+- 估算值按 (提供商, 模型) 维度用提供商返回的实际 prompt token 用量进行校准。
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from astrbot.core import logger
+from astrbot.core.provider import Provider
+from astrbot.core.provider.entities import LLMResponse, ProviderRequest
+
+DEFAULT_CACHE_SIZE = 8192
+MESSAGE_OVERHEAD_TOKENS = 4
+"""每条消息的角色、分隔符等固定开销"""
+IMAGE_TOKENS = 765
+"""单张图片的估算 Token 数（约为 1024x1024 图片在高精度模式下的开销）"""
+
+_CJK_PATTERN = re.compile(
+    r"[\u2e80-\u2fdf\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff"
+    r"\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]",
+)
+
+
+class TokenCounter:
+    """启发式 Token 计数器，带消息级缓存与按模型的校准系数。
+
+    不依赖具体模型的分词器：CJK 字符约 1 Token/字，其余文本约 4 字符/Token。
+    偏差由提供商返回的实际用量校准。
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, int] = OrderedDict()
+        self._ratios: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def count_text(text: str) -> int:
+        if not text:
+            return 0
+        cjk = len(_CJK_PATTERN.findall(text))
+        return cjk + math.ceil((len(text) - cjk) / 4)
+
+    def _count_content(self, content: Any) -> int:
+        if content is None:
+            return 0
+        if isinstance(content, str):
+            return self.count_text(content)
+        if isinstance(content, list):
+            total = 0
+            for part in content:
+                if not isinstance(part, dict):
+                    total += self.count_text(str(part))
+                elif part.get("type") in ("image_url", "image"):
+                    total += IMAGE_TOKENS
+                elif part.get("type") == "text":
+                    total += self.count_text(part.get("text") or "")
+                else:
+                    total += self.count_text(json.dumps(part, ensure_ascii=False))
+            return total
+        return self.count_text(str(content))
+
+    def _count_message_raw(self, message: dict) -> int:
+        total = MESSAGE_OVERHEAD_TOKENS + self._count_content(message.get("content"))
+        for tool_call in message.get("tool_calls") or []:
+            if isinstance(tool_call, dict):
+                func = tool_call.get("function") or {}
+                total += self.count_text(func.get("name") or "")
+                total += self.count_text(str(func.get("arguments") or ""))
+            else:
+                total += self.count_text(str(tool_call))
+        return total
+
+    def count_message(self, message: dict) -> int:
+        """估算一条 OpenAI 格式消息的 Token 数（未校准）。
+
+        纯文本消息按 (角色, 长度, 字符串哈希) 缓存：str 的哈希值缓存在对象上，
+        远比重新序列化整条消息便宜，哈希碰撞也只会影响估算值。其余消息直接计算。
+        """
+        content = message.get("content")
+        if not isinstance(content, str) or message.get("tool_calls"):
+            return self._count_message_raw(message)
+        key = (message.get("role"), len(content), hash(content))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        count = self._count_message_raw(message)
+        with self._lock:
+            self._cache[key] = count
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return count
+
+    def ratio(self, provider_id: str, model: str) -> float:
+        return self._ratios.get((provider_id, model), 1.0)
+
+    def calibrate(
+        self,
+        provider_id: str,
+        model: str,
+        estimated: int,
+        actual: int,
+    ) -> None:
+        """使用提供商返回的实际 prompt token 数更新该模型的校准系数。"""
+        if estimated <= 0 or actual <= 0:
+            return
+        observed = min(max(actual / estimated, 0.25), 4.0)
+        key = (provider_id, model)
+        prev = self._ratios.get(key)
+        self._ratios[key] = observed if prev is None else prev * 0.7 + observed * 0.3
+
+
+token_counter = TokenCounter()
+
+
+def get_prompt_tokens_usage(llm_response: LLMResponse | None) -> int | None:
+    """从提供商的原始响应中读取实际的 prompt token 数，不可用时返回 None。"""
+    if not llm_response:
+        return None
+    if llm_response.usage is not None and llm_response.usage.input:
+        return llm_response.usage.input
+    if llm_response.raw_completion is None:
+        return None
+    raw = llm_response.raw_completion
+    usage = getattr(raw, "usage", None)
+    if usage is not None:
+        # OpenAI: prompt_tokens; Anthropic: input_tokens
+        for attr in ("prompt_tokens", "input_tokens"):
+            value = getattr(usage, attr, None)
+            if isinstance(value, int):
+                return value
+    usage_metadata = getattr(raw, "usage_metadata", None)  # Gemini
+    value = getattr(usage_metadata, "prompt_token_count", None)
+    return value if isinstance(value, int) else None
+
+
+class ContextWindowBuilder:
+    """在 Token 预算内组装请求上下文。"""
+
+    def __init__(self, max_tokens: int, counter: TokenCounter = token_counter):
+        self.max_tokens = max_tokens
+        self.counter = counter
+
+    def _reserved_tokens(self, req: ProviderRequest, pinned: list[dict]) -> int:
+        counter = self.counter
+        total = counter.count_text(req.merged_system_prompt()) + MESSAGE_OVERHEAD_TOKENS
+        total += counter.count_text(req.prompt or "") + MESSAGE_OVERHEAD_TOKENS
+        total += IMAGE_TOKENS * len(req.image_urls or [])
+        if req.func_tool and not req.func_tool.empty():
+            total += counter.count_text(
+                json.dumps(req.func_tool.openai_schema(), ensure_ascii=False),
+            )
+        total += sum(counter.count_message(m) for m in pinned)
+        return total
+
+    @staticmethod
+    def _split_turns(messages: list[dict]) -> list[list[dict]]:
+        """按 user 消息切分为若干轮，工具调用与其结果总在同一轮内。"""
+        turns: list[list[dict]] = []
+        for message in messages:
+            if message.get("role") == "user" or not turns:
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+        return turns
+
+    def build(
+        self,
+        req: ProviderRequest,
+        provider: Provider,
+    ) -> tuple[list[dict], int]:
+        """返回裁剪后的上下文以及本次请求的估算 prompt token 数（未校准）。
+
+        人格预设对话等不持久化（带有 `_no_save` 标记）的消息始终保留在最前面。
+        """
+        contexts = req.contexts or []
+        pinned = [m for m in contexts if "_no_save" in m]
+        history = [m for m in contexts if "_no_save" not in m]
+
+        provider_id = provider.meta().id
+        ratio = self.counter.ratio(provider_id, provider.get_model())
+        budget = self.max_tokens / ratio
+        used = self._reserved_tokens(req, pinned)
+
+        kept_turns: list[list[dict]] = []
+        for turn in reversed(self._split_turns(history)):
+            cost = sum(self.counter.count_message(m) for m in turn)
+            if used + cost > budget:
+                break
+            used += cost
+            kept_turns.append(turn)
+        kept_turns.reverse()
+        # 保留下来的上下文必须从 user 消息开始
+        while kept_turns and kept_turns[0][0].get("role") != "user":
+            used -= sum(self.counter.count_message(m) for m in kept_turns.pop(0))
+
+        kept = [m for turn in kept_turns for m in turn]
+        if len(kept) < len(history):
+            logger.debug(
+                f"上下文超出 Token 预算 {self.max_tokens}，"
+                f"保留最近 {len(kept)}/{len(history)} 条记录，估算 {used} tokens。",
+            )
+        return pinned + kept, used
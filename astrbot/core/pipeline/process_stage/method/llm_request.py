@@ -6,7 +6,7 @@ import json
 from collections.abc import AsyncGenerator
 
 from astrbot.core import logger
-from astrbot.core.agent.tool import ToolSet
+from astrbot.core.agent.tool import FunctionTool
 from astrbot.core.astr_agent_context import AstrAgentContext
 from astrbot.core.conversation_mgr import Conversation
 from astrbot.core.message.components import Image
@@ -21,6 +21,14 @@ from astrbot.core.provider.entities import (
     LLMResponse,
     ProviderRequest,
 )
+from astrbot.core.provider.image_refs import (
+    cache_image_caption,
+    externalize_images,
+    get_attachment_path,
+    image_captions,
+    old_image_refs,
+    strip_old_images,
+)
 from astrbot.core.star.session_llm_manager import SessionServiceManager
 from astrbot.core.star.star_handler import EventType, star_map
 from astrbot.core.utils.metrics import Metric
@@ -31,6 +39,11 @@ from ....astr_agent_hooks import MAIN_AGENT_HOOKS
 from ....astr_agent_run_util import AgentRunner, run_agent
 from ....astr_agent_tool_exec import FunctionToolExecutor
 from ...context import PipelineContext, call_event_hook
+from ..context_window import (
+    ContextWindowBuilder,
+    get_prompt_tokens_usage,
+    token_counter,
+)
 from ..stage import Stage
 from ..utils import inject_kb_context
 
@@ -47,12 +60,31 @@ class LLMRequestSubStage(Stage):
             max(1, settings["dequeue_context_length"]),
             self.max_context_length - 1,
         )
+        self.max_context_tokens: int = settings.get("max_context_tokens", 0)
+        self.history_image_turns: int = settings.get("history_image_turns", -1)
+        self.history_image_policy: str = settings.get("history_image_policy", "drop")
+        self.image_caption_provider_id: str = (
+            settings.get("default_image_caption_provider_id") or ""
+        )
+        self.image_caption_prompt: str = settings.get(
+            "image_caption_prompt",
+            "Please describe the image using Chinese.",
+        )
+        self.context_window_builder: ContextWindowBuilder | None = None
+        if self.max_context_tokens > 0:
+            self.context_window_builder = ContextWindowBuilder(
+                self.max_context_tokens,
+            )
         self.streaming_response: bool = settings["streaming_response"]
         self.unsupported_streaming_strategy: str = settings[
             "unsupported_streaming_strategy"
         ]
         self.max_step: int = settings.get("max_agent_step", 30)
         self.tool_call_timeout: int = settings.get("tool_call_timeout", 60)
+        self.max_concurrent_tool_calls: int = settings.get(
+            "max_concurrent_tool_calls",
+            4,
+        )
         if isinstance(self.max_step, bool):  # workaround: #2622
             self.max_step = 30
         self.show_tool_use: bool = settings.get("show_tool_use_status", True)
@@ -87,10 +119,19 @@ class LLMRequestSubStage(Stage):
         cid = await conv_mgr.get_curr_conversation_id(umo)
         if not cid:
             cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-        conversation = await conv_mgr.get_conversation(umo, cid)
+        history_limit = self._history_window_size()
+        conversation = await conv_mgr.get_conversation(
+            umo,
+            cid,
+            history_limit=history_limit,
+        )
         if not conversation:
             cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
-            conversation = await conv_mgr.get_conversation(umo, cid)
+            conversation = await conv_mgr.get_conversation(
+                umo,
+                cid,
+                history_limit=history_limit,
+            )
         if not conversation:
             raise RuntimeError("无法创建新的对话。")
         return conversation
@@ -110,6 +151,16 @@ class LLMRequestSubStage(Stage):
         except Exception as e:
             logger.error(f"调用知识库时遇到问题: {e}")
 
+    def _history_window_size(self) -> int | None:
+        """需要从数据库读取的最近消息条数。
+
+        _truncate_contexts 最多保留最近 max_context_length * 2 + 1 条记录，
+        因此只需读取比这多一条的窗口，截断结果即与读取完整历史时相同。
+        """
+        if self.max_context_length == -1:
+            return None
+        return (self.max_context_length + 1) * 2
+
     def _truncate_contexts(
         self,
         contexts: list[dict],
@@ -138,6 +189,42 @@ class LLMRequestSubStage(Stage):
 
         return truncated_contexts
 
+    async def _caption_old_images(self, contexts: list[dict]) -> None:
+        """为将被移出最近轮次的历史图片生成描述，结果按附件缓存。"""
+        if not self.image_caption_provider_id:
+            return
+        attachment_ids = [
+            attachment_id
+            for attachment_id in dict.fromkeys(
+                old_image_refs(contexts, self.history_image_turns),
+            )
+            if attachment_id not in image_captions
+        ]
+        if not attachment_ids:
+            return
+        provider = self.ctx.plugin_manager.context.get_provider_by_id(
+            self.image_caption_provider_id,
+        )
+        if not isinstance(provider, Provider):
+            return
+
+        async def _caption(attachment_id: str):
+            path = await get_attachment_path(attachment_id)
+            if not path:
+                return
+            try:
+                llm_resp = await provider.text_chat(
+                    prompt=self.image_caption_prompt,
+                    image_urls=[path],
+                )
+            except Exception as e:
+                logger.warning(f"生成历史图片描述失败: {e}")
+                return
+            if llm_resp.completion_text:
+                cache_image_caption(attachment_id, llm_resp.completion_text)
+
+        await asyncio.gather(*(_caption(aid) for aid in attachment_ids))
+
     def _modalities_fix(
         self,
         provider: Provider,
@@ -165,17 +252,19 @@ class LLMRequestSubStage(Stage):
     ):
         """根据事件中的插件设置，过滤请求中的工具列表"""
         if event.plugins_name is not None and req.func_tool:
-            new_tool_set = ToolSet()
-            for tool in req.func_tool.tools:
+            plugins_name = frozenset(event.plugins_name)
+
+            def _enabled(tool: FunctionTool) -> bool:
                 mp = tool.handler_module_path
                 if not mp:
-                    continue
+                    return False
                 plugin = star_map.get(mp)
                 if not plugin:
-                    continue
-                if plugin.name in event.plugins_name or plugin.reserved:
-                    new_tool_set.add_tool(tool)
-            req.func_tool = new_tool_set
+                    return False
+                return plugin.name in plugins_name or plugin.reserved
+
+            # 同一组插件的工具子集会被缓存，工具列表变化后缓存随之失效
+            req.func_tool = req.func_tool.filter(("plugins", plugins_name), _enabled)
 
     async def _handle_webchat(
         self,
@@ -186,13 +275,11 @@ class LLMRequestSubStage(Stage):
         """处理 WebChat 平台的特殊情况，包括第一次 LLM 对话时总结对话内容生成 title"""
         if not req.conversation:
             return
-        conversation = await self.conv_manager.get_conversation(
-            event.unified_msg_origin,
-            req.conversation.cid,
-        )
-        if conversation and not req.conversation.title:
-            messages = json.loads(conversation.history)
-            latest_pair = messages[-2:]
+        if not req.conversation.title:
+            latest_pair = await self.conv_manager.get_conversation_messages(
+                req.conversation.cid,
+                limit=2,
+            )
             if not latest_pair:
                 return
             content = latest_pair[0].get("content", "")
@@ -238,7 +325,13 @@ class LLMRequestSubStage(Stage):
         event: AstrMessageEvent,
         req: ProviderRequest,
         llm_response: LLMResponse | None,
+        history_window: list[dict] | None = None,
     ):
+        """保存本轮对话到历史记录。
+
+        history_window 为本轮从数据库读取的历史消息。若请求使用的上下文仍是它的后缀（即未被插件修改），
+        只需追加本轮新增的消息；否则按原有方式用请求的上下文全量覆盖对话历史。
+        """
         if (
             not req
             or not req.conversation
@@ -254,25 +347,54 @@ class LLMRequestSubStage(Stage):
         if req.contexts is None:
             req.contexts = []
 
-        # 历史上下文
-        messages = copy.deepcopy(req.contexts)
         # 这一轮对话请求的用户输入
-        messages.append(await req.assemble_context())
+        new_messages = [await req.assemble_context()]
         # 这一轮对话的 LLM 响应
         if req.tool_calls_result:
             if not isinstance(req.tool_calls_result, list):
-                messages.extend(req.tool_calls_result.to_openai_messages())
+                new_messages.extend(req.tool_calls_result.to_openai_messages())
             elif isinstance(req.tool_calls_result, list):
                 for tcr in req.tool_calls_result:
-                    messages.extend(tcr.to_openai_messages())
-        messages.append({"role": "assistant", "content": llm_response.completion_text})
-        messages = list(filter(lambda item: "_no_save" not in item, messages))
+                    new_messages.extend(tcr.to_openai_messages())
+        new_messages.append(
+            {"role": "assistant", "content": llm_response.completion_text},
+        )
+        new_messages = [item for item in new_messages if "_no_save" not in item]
+        # 图片以附件引用的形式保存
+        new_messages = await externalize_images(new_messages)
+
+        contexts = [item for item in req.contexts if "_no_save" not in item]
+        if self._is_history_suffix(history_window, contexts):
+            await self.conv_manager.append_messages(
+                req.conversation.cid,
+                new_messages,
+            )
+            return
+
+        # 历史上下文被插件修改过，全量覆盖
+        messages = copy.deepcopy(contexts)
+        messages = await externalize_images(messages)
+        messages.extend(new_messages)
         await self.conv_manager.update_conversation(
             event.unified_msg_origin,
             req.conversation.cid,
             history=messages,
         )
 
+    @staticmethod
+    def _is_history_suffix(
+        history_window: list[dict] | None,
+        contexts: list[dict],
+    ) -> bool:
+        """请求的上下文是否仍是本轮读取的历史消息的后缀。
+
+        contexts 应已去除 _no_save 的消息（如人格预设对话），它们从不写入历史，
+        保留它们会让比较永远失败，每轮都退化为全量覆盖。
+        """
+        if history_window is None or len(contexts) > len(history_window):
+            return False
+        return history_window[len(history_window) - len(contexts) :] == contexts
+
     def _fix_messages(self, messages: list[dict]) -> list[dict]:
         """验证并且修复上下文"""
         fixed_messages = []
@@ -295,6 +417,7 @@ class LLMRequestSubStage(Stage):
         _nested: bool = False,
     ) -> None | AsyncGenerator[None, None]:
         req: ProviderRequest | None = None
+        history_window: list[dict] | None = None
 
         if not self.ctx.astrbot_config["provider_settings"]["enable"]:
             logger.debug("未启用 LLM 能力，跳过处理。")
@@ -327,6 +450,7 @@ class LLMRequestSubStage(Stage):
 
                 if req.conversation:
                     req.contexts = json.loads(req.conversation.history)
+                    history_window = copy.deepcopy(req.contexts)
 
             else:
                 req = ProviderRequest()
@@ -350,6 +474,7 @@ class LLMRequestSubStage(Stage):
                 conversation = await self._get_session_conv(event)
                 req.conversation = conversation
                 req.contexts = json.loads(conversation.history)
+                history_window = copy.deepcopy(req.contexts)
 
                 event.set_extra("provider_request", req)
 
@@ -372,6 +497,18 @@ class LLMRequestSubStage(Stage):
                 req.contexts = self._truncate_contexts(req.contexts)
                 self._fix_messages(req.contexts)
 
+            # drop or caption images outside the recent turns
+            if req.contexts and self.history_image_turns >= 0:
+                if self.history_image_policy == "caption":
+                    await self._caption_old_images(req.contexts)
+                req.contexts = strip_old_images(req.contexts, self.history_image_turns)
+                if history_window is not None:
+                    # 以相同的规则处理，使 _save_to_history 仍能识别出未被修改的历史
+                    history_window = strip_old_images(
+                        history_window,
+                        self.history_image_turns,
+                    )
+
             # session_id
             if not req.session_id:
                 req.session_id = event.unified_msg_origin
@@ -382,6 +519,14 @@ class LLMRequestSubStage(Stage):
             # filter tools, only keep tools from this pipeline's selected plugins
             self._plugin_tool_fix(event, req)
 
+            # fit contexts into the token budget
+            estimated_tokens = None
+            if self.context_window_builder:
+                req.contexts, estimated_tokens = self.context_window_builder.build(
+                    req,
+                    provider,
+                )
+
             stream_to_general = (
                 self.unsupported_streaming_strategy == "turn_off"
                 and not event.platform_meta.support_streaming_message
@@ -404,6 +549,7 @@ class LLMRequestSubStage(Stage):
                 run_context=AgentContextWrapper(
                     context=astr_agent_ctx,
                     tool_call_timeout=self.tool_call_timeout,
+                    max_concurrent_tool_calls=self.max_concurrent_tool_calls,
                 ),
                 tool_executor=FunctionToolExecutor(),
                 agent_hooks=MAIN_AGENT_HOOKS,
@@ -456,7 +602,32 @@ class LLMRequestSubStage(Stage):
             # 恢复备份的 contexts
             req.contexts = backup_contexts
 
-            await self._save_to_history(event, req, agent_runner.get_final_llm_resp())
+            if estimated_tokens and not req.tool_calls_result:
+                # 没有发生工具调用时，最终响应的用量即对应本次组装的上下文
+                actual_tokens = get_prompt_tokens_usage(
+                    agent_runner.get_final_llm_resp(),
+                )
+                if actual_tokens:
+                    token_counter.calibrate(
+                        provider.meta().id,
+                        provider.get_model(),
+                        estimated_tokens,
+                        actual_tokens,
+                    )
+
+            final_resp = agent_runner.get_final_llm_resp()
+            if final_resp and final_resp.usage and final_resp.usage.input:
+                usage = final_resp.usage
+                logger.debug(
+                    f"Token 用量: 输入 {usage.input} (缓存命中 {usage.cache_read}, 缓存写入 {usage.cache_write}), 输出 {usage.output}",
+                )
+
+            await self._save_to_history(
+                event,
+                req,
+                agent_runner.get_final_llm_resp(),
+                history_window,
+            )
 
         # 异步处理 WebChat 特殊情况
         if event.get_platform_name() == "webchat":
@@ -1,5 +1,5 @@
 from astrbot.api import logger, sp
-from astrbot.core.provider.entities import ProviderRequest
+from astrbot.core.provider.entities import ProviderRequest, merge_system_prompt
 
 from ..context import PipelineContext
 
@@ -78,4 +78,8 @@ async def inject_kb_context(
     if formatted:
         results = kb_context.get("results", [])
         logger.debug(f"[知识库] 为会话 {umo} 注入了 {len(results)} 条相关知识块")
-        req.system_prompt = f"{formatted}\n\n{req.system_prompt or ''}"
+        # 检索结果每轮都不同，放在稳定的系统提示词之后，以免破坏提示词前缀缓存
+        req.dynamic_system_prompt = merge_system_prompt(
+            req.dynamic_system_prompt,
+            formatted,
+        )
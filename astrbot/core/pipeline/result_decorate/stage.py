@@ -1,13 +1,25 @@
+import asyncio
 import re
 import time
 import traceback
 from collections.abc import AsyncGenerator
 
 from astrbot.core import file_token_service, html_renderer, logger
-from astrbot.core.message.components import At, File, Image, Node, Plain, Record, Reply
+from astrbot.core.message.components import (
+    At,
+    BaseMessageComponent,
+    File,
+    Image,
+    Node,
+    Plain,
+    Record,
+    Reply,
+)
 from astrbot.core.message.message_event_result import ResultContentType
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 from astrbot.core.platform.message_type import MessageType
+from astrbot.core.provider.provider import TTSProvider
+from astrbot.core.provider.tts_cache import tts_audio_cache
 from astrbot.core.star.session_llm_manager import SessionServiceManager
 from astrbot.core.star.star import star_map
 from astrbot.core.star.star_handler import EventType, star_handlers_registry
@@ -58,6 +70,10 @@ class ResultDecorateStage(Stage):
             "segmented_reply"
         ]["content_cleanup_rule"]
 
+        # TTS
+        tts_settings = ctx.astrbot_config["provider_tts_settings"]
+        self.tts_max_concurrency = max(int(tts_settings.get("max_concurrency", 3)), 1)
+
         # exception
         self.content_safe_check_reply = ctx.astrbot_config["content_safety"][
             "also_use_in_response"
@@ -69,6 +85,51 @@ class ResultDecorateStage(Stage):
                     self.content_safe_check_stage = stage_cls()
                     await self.content_safe_check_stage.initialize(ctx)
 
+    async def _synthesize(
+        self,
+        tts_provider: TTSProvider,
+        comp: BaseMessageComponent,
+        semaphore: asyncio.Semaphore,
+    ) -> list[BaseMessageComponent]:
+        """将一个消息段转为语音，返回替换后的消息段。失败时保留原文本。"""
+        if not isinstance(comp, Plain) or len(comp.text) <= 1:
+            return [comp]
+        try:
+            logger.info(f"TTS 请求: {comp.text}")
+            async with semaphore:
+                audio_path = await tts_audio_cache.get_audio(tts_provider, comp.text)
+            logger.info(f"TTS 结果: {audio_path}")
+            if not audio_path:
+                logger.error(
+                    f"由于 TTS 音频文件未找到，消息段转语音失败: {comp.text}",
+                )
+                return [comp]
+
+            use_file_service = self.ctx.astrbot_config["provider_tts_settings"][
+                "use_file_service"
+            ]
+            callback_api_base = self.ctx.astrbot_config["callback_api_base"]
+            dual_output = self.ctx.astrbot_config["provider_tts_settings"][
+                "dual_output"
+            ]
+
+            url = None
+            if use_file_service and callback_api_base:
+                token = await file_token_service.register_file(audio_path)
+                url = f"{callback_api_base}/api/file/{token}"
+                logger.debug(f"已注册：{url}")
+
+            new_chain: list[BaseMessageComponent] = [
+                Record(file=url or audio_path, url=url or audio_path),
+            ]
+            if dual_output:
+                new_chain.append(comp)
+            return new_chain
+        except Exception:
+            logger.error(traceback.format_exc())
+            logger.error("TTS 失败，使用文本发送。")
+            return [comp]
+
     async def process(
         self,
         event: AstrMessageEvent,
@@ -194,52 +255,14 @@ class ResultDecorateStage(Stage):
                         f"会话 {event.unified_msg_origin} 未配置文本转语音模型。",
                     )
                 else:
-                    new_chain = []
-                    for comp in result.chain:
-                        if isinstance(comp, Plain) and len(comp.text) > 1:
-                            try:
-                                logger.info(f"TTS 请求: {comp.text}")
-                                audio_path = await tts_provider.get_audio(comp.text)
-                                logger.info(f"TTS 结果: {audio_path}")
-                                if not audio_path:
-                                    logger.error(
-                                        f"由于 TTS 音频文件未找到，消息段转语音失败: {comp.text}",
-                                    )
-                                    new_chain.append(comp)
-                                    continue
-
-                                use_file_service = self.ctx.astrbot_config[
-                                    "provider_tts_settings"
-                                ]["use_file_service"]
-                                callback_api_base = self.ctx.astrbot_config[
-                                    "callback_api_base"
-                                ]
-                                dual_output = self.ctx.astrbot_config[
-                                    "provider_tts_settings"
-                                ]["dual_output"]
-
-                                url = None
-                                if use_file_service and callback_api_base:
-                                    token = await file_token_service.register_file(
-                                        audio_path,
-                                    )
-                                    url = f"{callback_api_base}/api/file/{token}"
-                                    logger.debug(f"已注册：{url}")
-
-                                new_chain.append(
-                                    Record(
-                                        file=url or audio_path,
-                                        url=url or audio_path,
-                                    ),
-                                )
-                                if dual_output:
-                                    new_chain.append(comp)
-                            except Exception:
-                                logger.error(traceback.format_exc())
-                                logger.error("TTS 失败，使用文本发送。")
-                                new_chain.append(comp)
-                        else:
-                            new_chain.append(comp)
+                    semaphore = asyncio.Semaphore(self.tts_max_concurrency)
+                    segments = await asyncio.gather(
+                        *(
+                            self._synthesize(tts_provider, comp, semaphore)
+                            for comp in result.chain
+                        ),
+                    )
+                    new_chain = [comp for segment in segments for comp in segment]
                     result.chain = new_chain
 
             # 文本转图片
@@ -0,0 +1,207 @@
+"""唤醒检查阶段的 Handler 预编译分发索引。
+
+WakingCheckStage 需要对每条消息逐个执行所有 AdapterMessageEvent Handler 的过滤器。
+绝大多数 Handler 都带有 CommandFilter / CommandGroupFilter / RegexFilter，
+而一条普通的群聊消息几乎不会命中其中任何一个。
+
+这里把这三类过滤器预编译为：
+
+- 指令名（含别名、指令组前缀）的字符前缀树
+- 指令组名的字符前缀树
+- 所有 RegexFilter 合并而成的一个正则
+
+每条消息只需按消息长度走一遍前缀树和一次合并正则，即可得到可能通过过滤的候选 Handler，
+之后仍由 Handler 自身的过滤器做完整判断，因此不会改变原有的匹配语义。
+
+索引在插件加载、卸载（StarHandlerRegistry 版本变化）或 plugin_set 配置变化时重建。
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.star.filter import HandlerFilter
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.regex import RegexFilter
+from astrbot.core.star.star import star_map
+from astrbot.core.star.star_handler import (
+    EventType,
+    StarHandlerMetadata,
+    star_handlers_registry,
+)
+
+_END = object()
+_BACKREF_PATTERN = re.compile(r"\\\d|\(\?P=")
+
+
+class _PrefixTrie:
+    """字符前缀树，用于找出一段文本的所有前缀匹配项。"""
+
+    def __init__(self):
+        self._root: dict = {}
+
+    def insert(self, word: str, value: HandlerFilter) -> None:
+        node = self._root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node.setdefault(_END, []).append(value)
+
+    def match_prefixes(
+        self,
+        text: str,
+        boundary: str | None = None,
+    ) -> Iterable[HandlerFilter]:
+        """返回所有是 text 前缀的词条对应的值。
+
+        Args:
+            text: 待匹配的文本
+            boundary: 若指定，则要求前缀之后紧跟 boundary 字符或到达文本末尾
+
+        """
+        node = self._root
+        length = len(text)
+        for i in range(length + 1):
+            values = node.get(_END)
+            if values and (boundary is None or i == length or text[i] == boundary):
+                yield from values
+            if i == length:
+                break
+            node = node.get(text[i])
+            if node is None:
+                break
+
+
+class HandlerDispatchIndex:
+    """某一 plugin_set 下 AdapterMessageEvent Handler 的分发索引。"""
+
+    def __init__(self, handlers: list[StarHandlerMetadata]):
+        self.handlers = handlers
+        self._always: list[int] = []
+        """没有可索引过滤器的 Handler，每条消息都需要检查"""
+        self._gates: list[tuple[HandlerFilter, ...]] = []
+        self._filter_owners: dict[int, list[int]] = {}
+
+        self._command_trie = _PrefixTrie()
+        self._group_trie = _PrefixTrie()
+        self._combined_regex: re.Pattern | None = None
+        self._regex_groups: dict[str, RegexFilter] = {}
+        self._fallback_regexes: list[RegexFilter] = []
+
+        regex_parts: list[str] = []
+        for pos, handler in enumerate(handlers):
+            gates = tuple(
+                f
+                for f in handler.event_filters
+                if isinstance(f, CommandFilter | CommandGroupFilter | RegexFilter)
+            )
+            self._gates.append(gates)
+            if not gates:
+                self._always.append(pos)
+                continue
+            for gate in gates:
+                owners = self._filter_owners.setdefault(id(gate), [])
+                if owners:
+                    # 同一个过滤器对象只需要索引一次
+                    owners.append(pos)
+                    continue
+                owners.append(pos)
+                if isinstance(gate, CommandFilter):
+                    for name in gate.get_complete_command_names():
+                        self._command_trie.insert(name, gate)
+                elif isinstance(gate, CommandGroupFilter):
+                    for name in gate.get_complete_command_names():
+                        self._group_trie.insert(name, gate)
+                else:
+                    group_name = f"_r{len(self._regex_groups)}"
+                    part = f"(?:(?=(?P<{group_name}>{gate.regex_str}))|)"
+                    if _BACKREF_PATTERN.search(gate.regex_str) or not _compiles(
+                        part,
+                    ):
+                        self._fallback_regexes.append(gate)
+                        continue
+                    self._regex_groups[group_name] = gate
+                    regex_parts.append(part)
+
+        if regex_parts:
+            try:
+                self._combined_regex = re.compile("".join(regex_parts))
+            except re.error:
+                self._fallback_regexes.extend(self._regex_groups.values())
+                self._regex_groups.clear()
+
+    def _matched_filters(self, event: AstrMessageEvent) -> set[int]:
+        matched: set[int] = set()
+        if event.is_at_or_wake_command:
+            # 与 CommandFilter.filter 中的规范化方式保持一致
+            message_str = re.sub(r"\s+", " ", event.get_message_str().strip())
+            for f in self._command_trie.match_prefixes(message_str, boundary=" "):
+                matched.add(id(f))
+            # 与 CommandGroupFilter.filter 一致，使用去除首尾空白后的文本
+            for f in self._group_trie.match_prefixes(event.message_str.strip()):
+                matched.add(id(f))
+
+        text = event.get_message_str().strip()
+        if self._combined_regex is not None:
+            m = self._combined_regex.match(text)
+            if m:
+                for group_name, value in m.groupdict().items():
+                    if value is not None:
+                        matched.add(id(self._regex_groups[group_name]))
+        for f in self._fallback_regexes:
+            if f.regex.match(text):
+                matched.add(id(f))
+        return matched
+
+    def candidates(self, event: AstrMessageEvent) -> list[StarHandlerMetadata]:
+        """返回可能通过过滤器的 Handler，保持原有的优先级顺序。"""
+        positions = set(self._always)
+        matched = self._matched_filters(event)
+        for filter_id in matched:
+            for pos in self._filter_owners.get(filter_id, ()):
+                if pos not in positions and all(
+                    id(g) in matched for g in self._gates[pos]
+                ):
+                    positions.add(pos)
+        ret = []
+        for pos in sorted(positions):
+            handler = self.handlers[pos]
+            plugin = star_map.get(handler.handler_module_path)
+            if plugin and plugin.activated:
+                ret.append(handler)
+        return ret
+
+
+class DispatchIndexCache:
+    """按 plugin_set 缓存分发索引，并在 Handler 注册表变化时失效。"""
+
+    def __init__(self):
+        self._version = -1
+        self._indexes: dict[tuple[str, ...] | None, HandlerDispatchIndex] = {}
+
+    def get(self, plugins_name: list[str] | None) -> HandlerDispatchIndex:
+        if self._version != star_handlers_registry.version:
+            self._indexes.clear()
+            self._version = star_handlers_registry.version
+        key = tuple(plugins_name) if plugins_name is not None else None
+        index = self._indexes.get(key)
+        if index is None:
+            # 启用状态在 candidates() 中实时判断，这里不按启用状态过滤
+            handlers = star_handlers_registry.get_handlers_by_event_type(
+                EventType.AdapterMessageEvent,
+                only_activated=False,
+                plugins_name=plugins_name,
+            )
+            index = HandlerDispatchIndex([h for h in handlers if h.event_filters])
+            self._indexes[key] = index
+        return index
+
+
+def _compiles(pattern: str) -> bool:
+    try:
+        re.compile(pattern)
+    except re.error:
+        return False
+    return True
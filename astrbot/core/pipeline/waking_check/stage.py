@@ -1,6 +1,7 @@
 from collections.abc import AsyncGenerator
 
 from astrbot import logger
+from astrbot.core import sp
 from astrbot.core.message.components import At, AtAll, Reply
 from astrbot.core.message.message_event_result import MessageChain, MessageEventResult
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
@@ -8,10 +9,10 @@ from astrbot.core.star.filter.command_group import CommandGroupFilter
 from astrbot.core.star.filter.permission import PermissionTypeFilter
 from astrbot.core.star.session_plugin_manager import SessionPluginManager
 from astrbot.core.star.star import star_map
-from astrbot.core.star.star_handler import EventType, star_handlers_registry
 
 from ..context import PipelineContext
 from ..stage import Stage, register_stage
+from .dispatch_index import DispatchIndexCache
 
 
 @register_stage
@@ -50,6 +51,8 @@ class WakingCheckStage(Stage):
             "ignore_at_all",
             False,
         )
+        # Handler 分发索引，插件或 plugin_set 变化时自动重建
+        self.dispatch_index = DispatchIndexCache()
 
     async def process(
         self,
@@ -62,6 +65,8 @@ class WakingCheckStage(Stage):
             # 忽略机器人自己发送的消息
             event.stop_event()
             return
+        # 预先异步载入会话的偏好设置，后续阶段中的同步查询直接命中缓存
+        await sp.preload("umo", event.unified_msg_origin)
         # 设置 sender 身份
         event.message_str = event.message_str.strip()
         for admin_id in self.ctx.astrbot_config["admins_id"]:
@@ -127,16 +132,12 @@ class WakingCheckStage(Stage):
             event.plugins_name = enabled_plugins_name
         logger.debug(f"enabled_plugins_name: {enabled_plugins_name}")
 
-        for handler in star_handlers_registry.get_handlers_by_event_type(
-            EventType.AdapterMessageEvent,
-            plugins_name=event.plugins_name,
-        ):
+        # 索引只返回可能通过指令/正则过滤器的 Handler，完整的过滤判断仍在下面进行
+        for handler in self.dispatch_index.get(event.plugins_name).candidates(event):
             # filter 需满足 AND 逻辑关系
             passed = True
             permission_not_pass = False
             permission_filter_raise_error = False
-            if len(handler.event_filters) == 0:
-                continue
 
             for filter in handler.event_filters:
                 try:
@@ -23,6 +23,7 @@ except Exception:
     magic = None
 
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.io import media_cache
 
 from .misskey_event import MisskeyPlatformEvent
 from .misskey_utils import (
@@ -500,8 +501,12 @@ class MisskeyPlatformAdapter(Platform):
                         return None
 
                 finally:
-                    # 清理临时文件
-                    if local_path and isinstance(local_path, str):
+                    # 清理临时文件，媒体缓存中的文件是共享的，不能删除
+                    if (
+                        local_path
+                        and isinstance(local_path, str)
+                        and not media_cache.owns(local_path)
+                    ):
                         data_temp = os.path.join(get_astrbot_data_path(), "temp")
                         if local_path.startswith(data_temp) and os.path.exists(
                             local_path,
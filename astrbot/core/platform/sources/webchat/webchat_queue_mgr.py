@@ -1,35 +1,75 @@
 import asyncio
+import time
+from contextlib import contextmanager
+
+BACK_QUEUE_IDLE_TTL = 300
+"""Seconds after which an unconsumed back queue of an idle conversation is dropped"""
 
 
 class WebChatQueueMgr:
     def __init__(self) -> None:
-        self.queues = {}
-        """Conversation ID to asyncio.Queue mapping"""
-        self.back_queues = {}
+        self.inbound_queue: asyncio.Queue = asyncio.Queue()
+        """Single queue carrying the inbound messages of all conversations"""
+        self.back_queues: dict[str, asyncio.Queue] = {}
         """Conversation ID to asyncio.Queue mapping for responses"""
+        self._consumers: dict[str, int] = {}
+        """Conversation ID to the number of active back queue consumers"""
+        self._last_active: dict[str, float] = {}
+
+    @property
+    def queues(self) -> dict[str, asyncio.Queue]:
+        """Kept for compatibility: every conversation shares the inbound queue"""
+        return dict.fromkeys(self.back_queues, self.inbound_queue)
 
     def get_or_create_queue(self, conversation_id: str) -> asyncio.Queue:
-        """Get or create a queue for the given conversation ID"""
-        if conversation_id not in self.queues:
-            self.queues[conversation_id] = asyncio.Queue()
-        return self.queues[conversation_id]
+        """Get the inbound queue. Messages of all conversations go through the same queue."""
+        return self.inbound_queue
 
     def get_or_create_back_queue(self, conversation_id: str) -> asyncio.Queue:
         """Get or create a back queue for the given conversation ID"""
+        self._last_active[conversation_id] = time.monotonic()
         if conversation_id not in self.back_queues:
+            self._evict_idle()
             self.back_queues[conversation_id] = asyncio.Queue()
         return self.back_queues[conversation_id]
 
+    @contextmanager
+    def consume_back_queue(self, conversation_id: str):
+        """Mark the back queue as being consumed (e.g. by an SSE stream).
+
+        When the last consumer leaves and nothing is left in the queue, the queue is
+        removed right away; otherwise it is dropped once idle for BACK_QUEUE_IDLE_TTL.
+        """
+        queue = self.get_or_create_back_queue(conversation_id)
+        self._consumers[conversation_id] = self._consumers.get(conversation_id, 0) + 1
+        try:
+            yield queue
+        finally:
+            remaining = self._consumers.get(conversation_id, 1) - 1
+            if remaining > 0:
+                self._consumers[conversation_id] = remaining
+            else:
+                self._consumers.pop(conversation_id, None)
+                self._last_active[conversation_id] = time.monotonic()
+                if queue.empty() and self.back_queues.get(conversation_id) is queue:
+                    self.remove_queues(conversation_id)
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        for conversation_id in list(self.back_queues):
+            if conversation_id in self._consumers:
+                continue
+            if now - self._last_active.get(conversation_id, 0) > BACK_QUEUE_IDLE_TTL:
+                self.remove_queues(conversation_id)
+
     def remove_queues(self, conversation_id: str):
         """Remove queues for the given conversation ID"""
-        if conversation_id in self.queues:
-            del self.queues[conversation_id]
-        if conversation_id in self.back_queues:
-            del self.back_queues[conversation_id]
+        self.back_queues.pop(conversation_id, None)
+        self._last_active.pop(conversation_id, None)
 
     def has_queue(self, conversation_id: str) -> bool:
         """Check if a queue exists for the given conversation ID"""
-        return conversation_id in self.queues
+        return conversation_id in self.back_queues
 
 
 webchat_queue_mgr = WebChatQueueMgr()
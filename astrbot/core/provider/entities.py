@@ -82,6 +82,15 @@ class ToolCallsResult:
         ]
 
 
+def merge_system_prompt(system_prompt: str | None, dynamic: str | None) -> str:
+    """将每轮变化的系统提示词附加在稳定的系统提示词之后"""
+    if not dynamic:
+        return system_prompt or ""
+    if not system_prompt:
+        return dynamic
+    return f"{system_prompt}\n\n{dynamic}"
+
+
 @dataclass
 class ProviderRequest:
     prompt: str | None = None
@@ -99,6 +108,12 @@ class ProviderRequest:
     """
     system_prompt: str = ""
     """系统提示词"""
+    dynamic_system_prompt: str = ""
+    """每轮都会变化的系统提示词，如当前时间、知识库检索结果、引用消息等。
+
+    与 system_prompt 分开存放，提供商将其放在稳定的前缀（工具定义、system_prompt、历史对话）之后，
+    使提示词前缀缓存可以跨轮命中。
+    """
     conversation: Conversation | None = None
     """关联的对话对象"""
     tool_calls_result: list[ToolCallsResult] | ToolCallsResult | None = None
@@ -113,12 +128,17 @@ class ProviderRequest:
             f"func_tool={self.func_tool}, "
             f"contexts={self._print_friendly_context()}, "
             f"system_prompt={self.system_prompt}, "
+            f"dynamic_system_prompt={self.dynamic_system_prompt}, "
             f"conversation_id={self.conversation.cid if self.conversation else 'N/A'}, "
         )
 
     def __str__(self):
         return self.__repr__()
 
+    def merged_system_prompt(self) -> str:
+        """system_prompt 与 dynamic_system_prompt 合并后的系统提示词"""
+        return merge_system_prompt(self.system_prompt, self.dynamic_system_prompt)
+
     def append_tool_calls_result(self, tool_calls_result: ToolCallsResult):
         """添加工具调用结果到请求中"""
         if not self.tool_calls_result:
@@ -199,6 +219,22 @@ class ProviderRequest:
         return ""
 
 
+@dataclass
+class TokenUsage:
+    input: int = 0
+    """输入 token 总数，包含命中缓存与写入缓存的部分"""
+    output: int = 0
+    """输出 token 数"""
+    cache_read: int = 0
+    """命中提示词缓存的输入 token 数"""
+    cache_write: int = 0
+    """写入提示词缓存的输入 token 数"""
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        return self.cache_read / self.input if self.input else 0.0
+
+
 @dataclass
 class LLMResponse:
     role: str
@@ -225,6 +261,9 @@ class LLMResponse:
     is_chunk: bool = False
     """Indicates if the response is a chunked response."""
 
+    usage: TokenUsage | None = None
+    """Token usage reported by the provider, including prompt cache hits."""
+
     def __init__(
         self,
         role: str,
@@ -238,6 +277,7 @@ class LLMResponse:
         | AnthropicMessage
         | None = None,
         is_chunk: bool = False,
+        usage: TokenUsage | None = None,
     ):
         """初始化 LLMResponse
 
@@ -265,6 +305,7 @@ class LLMResponse:
         self.tools_call_ids = tools_call_ids
         self.raw_completion = raw_completion
         self.is_chunk = is_chunk
+        self.usage = usage
 
     @property
     def completion_text(self):
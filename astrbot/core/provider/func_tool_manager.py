@@ -99,6 +99,25 @@ class FunctionToolManager:
         self.mcp_client_dict: dict[str, MCPClient] = {}
         """MCP 服务列表"""
         self.mcp_client_event: dict[str, asyncio.Event] = {}
+        self._cache_version = 0
+        self._tool_set_cache: dict[str, tuple[tuple, ToolSet]] = {}
+
+    def invalidate_cache(self) -> None:
+        """工具被添加、删除、激活或停用后调用，使缓存的工具集与工具描述失效。
+
+        通过本类的方法修改工具时会自动调用；直接修改 func_list 或 FuncTool.active 时需要手动调用。
+        """
+        self._cache_version += 1
+        self._tool_set_cache.clear()
+
+    def _cached_tool_set(self, kind: str, factory) -> ToolSet:
+        # 同时检查列表本身，以发现直接对 func_list 的增删
+        key = (self._cache_version, id(self.func_list), len(self.func_list))
+        cached = self._tool_set_cache.get(kind)
+        if cached is None or cached[0] != key:
+            cached = (key, factory())
+            self._tool_set_cache[kind] = cached
+        return cached[1]
 
     def empty(self) -> bool:
         return len(self.func_list) == 0
@@ -140,10 +159,7 @@ class FunctionToolManager:
         @param desc: 函数描述
         @param func_obj: 处理函数
         """
-        # check if the tool has been added before
-        self.remove_func(name)
-
-        self.func_list.append(
+        self.add_tool(
             self.spec_to_func(
                 name=name,
                 func_args=func_args,
@@ -153,22 +169,40 @@ class FunctionToolManager:
         )
         logger.info(f"添加函数调用工具: {name}")
 
+    def add_tool(self, tool: FuncTool) -> None:
+        """添加一个函数调用工具，替换同名的工具。"""
+        # check if the tool has been added before
+        self.remove_func(tool.name)
+        self.func_list.append(tool)
+        self.invalidate_cache()
+
     def remove_func(self, name: str) -> None:
         """删除一个函数调用工具。"""
         for i, f in enumerate(self.func_list):
             if f.name == name:
                 self.func_list.pop(i)
+                self.invalidate_cache()
                 break
 
     def get_func(self, name) -> FuncTool | None:
-        for f in self.func_list:
-            if f.name == name:
-                return f
+        return self._full_tool_set().get_tool(name)
+
+    def _full_tool_set(self) -> ToolSet:
+        return self._cached_tool_set("full", lambda: ToolSet(self.func_list.copy()))
+
+    def _active_tool_set(self) -> ToolSet:
+        return self._cached_tool_set(
+            "active",
+            lambda: ToolSet([f for f in self.func_list if f.active]),
+        )
 
     def get_full_tool_set(self) -> ToolSet:
         """获取完整工具集"""
-        tool_set = ToolSet(self.func_list.copy())
-        return tool_set
+        return self._full_tool_set().copy()
+
+    def get_active_tool_set(self) -> ToolSet:
+        """获取所有已激活工具组成的工具集"""
+        return self._active_tool_set().copy()
 
     async def init_mcp_clients(self) -> None:
         """从项目根目录读取 mcp_server.json 文件，初始化 MCP 服务列表。文件格式如下：
@@ -265,6 +299,7 @@ class FunctionToolManager:
                 mcp_server_name=name,
             )
             self.func_list.append(func_tool)
+        self.invalidate_cache()
 
         logger.info(f"已连接 MCP 服务 {name}, Tools: {tool_names}")
 
@@ -283,6 +318,7 @@ class FunctionToolManager:
                 for f in self.func_list
                 if not (isinstance(f, MCPTool) and f.mcp_server_name == name)
             ]
+            self.invalidate_cache()
             logger.info(f"已关闭 MCP 服务 {name}")
 
     @staticmethod
@@ -373,6 +409,7 @@ class FunctionToolManager:
                     for f in self.func_list
                     if not (isinstance(f, MCPTool) and f.mcp_server_name == name)
                 ]
+                self.invalidate_cache()
         else:
             running_events = [
                 client.running_event.wait() for client in self.mcp_client_dict.values()
@@ -388,26 +425,31 @@ class FunctionToolManager:
                 self.func_list = [
                     f for f in self.func_list if not isinstance(f, MCPTool)
                 ]
+                self.invalidate_cache()
 
     def get_func_desc_openai_style(self, omit_empty_parameter_field=False) -> list:
         """获得 OpenAI API 风格的**已经激活**的工具描述"""
-        tools = [f for f in self.func_list if f.active]
-        toolset = ToolSet(tools)
-        return toolset.openai_schema(
+        return self._active_tool_set().openai_schema(
             omit_empty_parameter_field=omit_empty_parameter_field,
         )
 
     def get_func_desc_anthropic_style(self) -> list:
         """获得 Anthropic API 风格的**已经激活**的工具描述"""
-        tools = [f for f in self.func_list if f.active]
-        toolset = ToolSet(tools)
-        return toolset.anthropic_schema()
+        return self._active_tool_set().anthropic_schema()
 
     def get_func_desc_google_genai_style(self) -> dict:
         """获得 Google GenAI API 风格的**已经激活**的工具描述"""
-        tools = [f for f in self.func_list if f.active]
-        toolset = ToolSet(tools)
-        return toolset.google_schema()
+        return self._active_tool_set().google_schema()
+
+    # 与 ToolSet 相同的接口，兼容将 FunctionToolManager 直接作为 func_tool 传入提供商的插件
+    def openai_schema(self, omit_empty_parameter_field: bool = False) -> list[dict]:
+        return self._active_tool_set().openai_schema(omit_empty_parameter_field)
+
+    def anthropic_schema(self) -> list[dict]:
+        return self._active_tool_set().anthropic_schema()
+
+    def google_schema(self) -> dict:
+        return self._active_tool_set().google_schema()
 
     def deactivate_llm_tool(self, name: str) -> bool:
         """停用一个已经注册的函数调用工具。
@@ -419,6 +461,7 @@ class FunctionToolManager:
         func_tool = self.get_func(name)
         if func_tool is not None:
             func_tool.active = False
+            self.invalidate_cache()
 
             inactivated_llm_tools: list = sp.get(
                 "inactivated_llm_tools",
@@ -449,6 +492,7 @@ class FunctionToolManager:
                     )
 
             func_tool.active = True
+            self.invalidate_cache()
 
             inactivated_llm_tools: list = sp.get(
                 "inactivated_llm_tools",
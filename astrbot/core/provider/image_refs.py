@@ -0,0 +1,321 @@
+"""对话历史中的图片附件引用。
+
+对话历史不再内联 `data:image/...;base64,` 图片，而是将图片保存为附件（attachments 表），
+消息中只保留 `attachment://<attachment_id>` 形式的引用：
+
+- 保存历史时，`externalize_images` 将内联图片按内容哈希写入 data/attachments 并替换为引用；
+- 提供商在请求时通过 `resolve_image_refs` 将引用解析为 data URL，编码结果由有界缓存复用；
+- `strip_old_images` 在请求时将最近 N 轮之外的图片替换为占位文本或图片描述。
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import uuid
+from collections import OrderedDict
+
+import aiofiles
+
+from astrbot.core import db_helper, logger
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+
+ATTACHMENT_URL_PREFIX = "attachment://"
+IMAGE_PLACEHOLDER = "[图片]"
+ENCODE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CAPTION_CACHE_SIZE = 1024
+
+_store_lock = asyncio.Lock()
+
+
+def get_attachments_dir() -> str:
+    return os.path.join(get_astrbot_data_path(), "attachments")
+
+
+def to_attachment_url(attachment_id: str) -> str:
+    return f"{ATTACHMENT_URL_PREFIX}{attachment_id}"
+
+
+def parse_attachment_url(url: str) -> str | None:
+    if url.startswith(ATTACHMENT_URL_PREFIX):
+        return url[len(ATTACHMENT_URL_PREFIX) :]
+    return None
+
+
+def _image_part_url(part) -> str | None:
+    if not isinstance(part, dict) or part.get("type") != "image_url":
+        return None
+    image_url = part.get("image_url")
+    if isinstance(image_url, dict):
+        url = image_url.get("url")
+    else:
+        url = image_url
+    return url if isinstance(url, str) else None
+
+
+def _with_url(part: dict, url: str) -> dict:
+    image_url = part.get("image_url")
+    if isinstance(image_url, dict):
+        return {**part, "image_url": {**image_url, "url": url}}
+    return {**part, "image_url": {"url": url}}
+
+
+def _map_image_parts(messages: list[dict], fn) -> list[dict]:
+    """对所有图片部分应用 fn(message_index, part) -> 新的 part 或 None（不变）。
+
+    只复制发生变化的消息。
+    """
+    ret = []
+    for idx, message in enumerate(messages):
+        content = message.get("content")
+        if not isinstance(content, list):
+            ret.append(message)
+            continue
+        new_content = None
+        for i, part in enumerate(content):
+            if _image_part_url(part) is None:
+                continue
+            new_part = fn(idx, part)
+            if new_part is None:
+                continue
+            if new_content is None:
+                new_content = list(content)
+            new_content[i] = new_part
+        ret.append(
+            message if new_content is None else {**message, "content": new_content}
+        )
+    return ret
+
+
+async def store_image(data: bytes, mime_type: str = "image/jpeg") -> str:
+    """将图片保存为附件，返回附件 ID。相同内容的图片只保存一份。"""
+    digest = hashlib.sha256(data).hexdigest()
+    ext = mimetypes.guess_extension(mime_type) or ".jpg"
+    path = os.path.join(get_attachments_dir(), f"{digest}{ext}")
+    async with _store_lock:
+        attachment = await db_helper.get_attachment_by_path(path)
+        if attachment and os.path.exists(path):
+            return attachment.attachment_id
+        if not os.path.exists(path):
+            os.makedirs(get_attachments_dir(), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(data)
+            os.replace(tmp_path, path)
+        if attachment:
+            return attachment.attachment_id
+        attachment = await db_helper.insert_attachment(
+            path=path,
+            type="image",
+            mime_type=mime_type,
+        )
+        return attachment.attachment_id
+
+
+def _decode_data_url(url: str) -> tuple[bytes, str] | None:
+    if not url.startswith("data:"):
+        return None
+    header, sep, data = url.partition(",")
+    if not sep or ";base64" not in header:
+        return None
+    mime_type = header[5:].split(";", 1)[0] or "image/jpeg"
+    try:
+        return base64.b64decode(data), mime_type
+    except (binascii.Error, ValueError):
+        return None
+
+
+async def externalize_images(messages: list[dict]) -> list[dict]:
+    """将消息中内联的 base64 图片保存为附件并替换为附件引用。"""
+    refs: dict[tuple[int, int], str] = {}
+    for idx, message in enumerate(messages):
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for i, part in enumerate(content):
+            url = _image_part_url(part)
+            if not url or not url.startswith("data:"):
+                continue
+            decoded = _decode_data_url(url)
+            if decoded is None:
+                continue
+            attachment_id = await store_image(*decoded)
+            refs[(idx, id(part))] = to_attachment_url(attachment_id)
+    if not refs:
+        return messages
+    return _map_image_parts(
+        messages,
+        lambda idx, part: (
+            _with_url(part, refs[(idx, id(part))]) if (idx, id(part)) in refs else None
+        ),
+    )
+
+
+def _encode_file(path: str, mime_type: str) -> str:
+    with open(path, "rb") as f:
+        data = base64.b64encode(f.read()).decode()
+    return f"data:{mime_type};base64,{data}"
+
+
+class ImageEncodeCache:
+    """附件 ID -> data URL 的 LRU 缓存，按编码后的总长度限制大小。"""
+
+    def __init__(self, max_bytes: int = ENCODE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._size = 0
+
+    def get(self, attachment_id: str) -> str | None:
+        data_url = self._cache.get(attachment_id)
+        if data_url is not None:
+            self._cache.move_to_end(attachment_id)
+        return data_url
+
+    def put(self, attachment_id: str, data_url: str) -> None:
+        if len(data_url) > self.max_bytes:
+            return
+        old = self._cache.pop(attachment_id, None)
+        if old is not None:
+            self._size -= len(old)
+        self._cache[attachment_id] = data_url
+        self._size += len(data_url)
+        while self._size > self.max_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._size -= len(evicted)
+
+    async def get_many(self, attachment_ids: set[str]) -> dict[str, str]:
+        ret = {}
+        missing = []
+        for attachment_id in attachment_ids:
+            data_url = self.get(attachment_id)
+            if data_url is None:
+                missing.append(attachment_id)
+            else:
+                ret[attachment_id] = data_url
+        if not missing:
+            return ret
+        attachments = await db_helper.get_attachments(missing)
+        for attachment in attachments:
+            try:
+                data_url = await asyncio.to_thread(
+                    _encode_file,
+                    attachment.path,
+                    attachment.mime_type,
+                )
+            except OSError as e:
+                logger.warning(f"读取附件 {attachment.attachment_id} 失败: {e}")
+                continue
+            self.put(attachment.attachment_id, data_url)
+            ret[attachment.attachment_id] = data_url
+        return ret
+
+
+image_encode_cache = ImageEncodeCache()
+
+
+def has_image_refs(messages: list[dict]) -> bool:
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            url = _image_part_url(part)
+            if url and url.startswith(ATTACHMENT_URL_PREFIX):
+                return True
+    return False
+
+
+async def resolve_image_refs(messages: list[dict]) -> list[dict]:
+    """将消息中的附件引用解析为 data URL。找不到的附件替换为占位文本。"""
+    if not has_image_refs(messages):
+        return messages
+    ids = set()
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            for part in content:
+                url = _image_part_url(part)
+                if url and (attachment_id := parse_attachment_url(url)):
+                    ids.add(attachment_id)
+    data_urls = await image_encode_cache.get_many(ids)
+
+    def _resolve(_, part):
+        attachment_id = parse_attachment_url(_image_part_url(part) or "")
+        if attachment_id is None:
+            return None
+        data_url = data_urls.get(attachment_id)
+        if data_url is None:
+            return {"type": "text", "text": IMAGE_PLACEHOLDER}
+        return _with_url(part, data_url)
+
+    return _map_image_parts(messages, _resolve)
+
+
+async def get_attachment_path(attachment_id: str) -> str | None:
+    attachment = await db_helper.get_attachment_by_id(attachment_id)
+    if attachment and os.path.exists(attachment.path):
+        return attachment.path
+    return None
+
+
+image_captions: OrderedDict[str, str] = OrderedDict()
+"""附件 ID -> 图片描述"""
+
+
+def cache_image_caption(attachment_id: str, caption: str) -> None:
+    image_captions[attachment_id] = caption
+    image_captions.move_to_end(attachment_id)
+    while len(image_captions) > CAPTION_CACHE_SIZE:
+        image_captions.popitem(last=False)
+
+
+def old_image_refs(messages: list[dict], keep_turns: int) -> list[str]:
+    """返回最近 keep_turns 轮之外的图片附件 ID。"""
+    boundary = _turn_boundary(messages, keep_turns)
+    ret = []
+    for message in messages[:boundary]:
+        content = message.get("content")
+        if isinstance(content, list):
+            for part in content:
+                url = _image_part_url(part)
+                if url and (attachment_id := parse_attachment_url(url)):
+                    ret.append(attachment_id)
+    return ret
+
+
+def _turn_boundary(messages: list[dict], keep_turns: int) -> int:
+    """从后往前第 keep_turns 条 user 消息的下标，之前的消息不在保留范围内。"""
+    seen = 0
+    for idx in range(len(messages) - 1, -1, -1):
+        if messages[idx].get("role") == "user":
+            seen += 1
+            if seen == keep_turns:
+                return idx
+    return 0
+
+
+def strip_old_images(messages: list[dict], keep_turns: int) -> list[dict]:
+    """将最近 keep_turns 轮之外的图片替换为文本。已有图片描述的替换为描述，否则替换为占位文本。
+
+    替换只依赖消息相对末尾的位置，因此对同一段历史的任意后缀应用结果一致。
+    """
+    if keep_turns < 0:
+        return messages
+    boundary = (
+        len(messages) if keep_turns == 0 else _turn_boundary(messages, keep_turns)
+    )
+    if boundary == 0:
+        return messages
+
+    def _strip(idx, part):
+        if idx >= boundary:
+            return None
+        attachment_id = parse_attachment_url(_image_part_url(part) or "")
+        caption = image_captions.get(attachment_id) if attachment_id else None
+        if caption:
+            return {"type": "text", "text": f"[图片: {caption}]"}
+        return {"type": "text", "text": IMAGE_PLACEHOLDER}
+
+    return _map_image_parts(messages, _strip)
@@ -0,0 +1,238 @@
+"""提供商 API Key 池
+
+每个 Key 拥有独立的客户端（及连接池），并发请求不再通过修改共享客户端的 api_key 切换 Key。
+Key 池记录每个 Key 的进行中请求数、近期失败率与冷却时间，按以下顺序选择 Key：
+
+1. 不在冷却中的 Key 优先；
+2. 进行中请求数最少；
+3. 近期失败率最低；
+4. 最久未被使用。
+
+遇到限流 (429) 或服务端错误 (5xx) 时按指数退避冷却该 Key，响应中带有 Retry-After 时以其为准。
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterable
+from contextlib import asynccontextmanager
+from typing import Generic, TypeVar
+
+from astrbot.core import logger
+
+ClientT = TypeVar("ClientT")
+
+HEALTH_WINDOW_SECONDS = 300
+"""统计近期失败率的时间窗口（秒）"""
+HEALTH_WINDOW_SIZE = 64
+COOLDOWN_BASE_SECONDS = 1.0
+COOLDOWN_MAX_SECONDS = 60.0
+INVALID_KEY_COOLDOWN_SECONDS = 300.0
+"""Key 无效 (401/403) 时的冷却时间（秒）"""
+SERVER_ERROR_COOLDOWN_THRESHOLD = 3
+"""连续服务端错误达到该次数后开始冷却"""
+COOLDOWN_MAX_WAIT_SECONDS = 10.0
+"""所有候选 Key 都在冷却时，请求等待冷却结束的最长时间（秒）"""
+
+
+def _error_status(e: BaseException) -> int | None:
+    """从 openai / anthropic / google-genai 的异常中取出 HTTP 状态码"""
+    for attr in ("status_code", "code", "status"):
+        status = getattr(e, attr, None)
+        if isinstance(status, int):
+            return status
+    if "429" in str(e):
+        return 429
+    return None
+
+
+def _retry_after(e: BaseException) -> float | None:
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_invalid_key_error(e: BaseException) -> bool:
+    return _error_status(e) in (401, 403) or "API key not valid" in str(e)
+
+
+def is_rate_limit_error(e: BaseException) -> bool:
+    return _error_status(e) == 429
+
+
+def is_key_error(e: BaseException) -> bool:
+    """是否为更换 Key 后可能恢复的错误：限流、Key 无效、服务端错误"""
+    status = _error_status(e)
+    return (
+        status == 429
+        or (status is not None and status >= 500)
+        or is_invalid_key_error(e)
+    )
+
+
+class KeyState:
+    def __init__(self, key: str):
+        self.key = key
+        self.in_flight = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.server_errors = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+        self.last_error: str | None = None
+        self.recent: deque[tuple[float, bool]] = deque(maxlen=HEALTH_WINDOW_SIZE)
+        """(时间, 是否失败)"""
+
+    def failure_rate(self, now: float) -> float:
+        while self.recent and now - self.recent[0][0] > HEALTH_WINDOW_SECONDS:
+            self.recent.popleft()
+        if not self.recent:
+            return 0.0
+        return sum(failed for _, failed in self.recent) / len(self.recent)
+
+    def stats(self, now: float) -> dict:
+        masked = f"{self.key[:8]}..." if len(self.key) > 8 else "*" * len(self.key)
+        return {
+            "key": masked,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "server_errors": self.server_errors,
+            "recent_failure_rate": round(self.failure_rate(now), 3),
+            "cooldown_remaining": round(max(0.0, self.cooldown_until - now), 1),
+            "last_error": self.last_error,
+        }
+
+
+class KeyPool(Generic[ClientT]):
+    """API Key 池。client_factory 为每个 Key 创建独立的客户端，客户端在首次使用时创建。"""
+
+    def __init__(
+        self,
+        keys: Iterable[str],
+        client_factory: Callable[[str], ClientT],
+        name: str = "",
+    ):
+        self.name = name
+        self.client_factory = client_factory
+        self.states: dict[str, KeyState] = {}
+        self.clients: dict[str, ClientT] = {}
+        for key in keys:
+            self.states.setdefault(key, KeyState(key))
+        if not self.states:
+            self.states[""] = KeyState("")
+
+    @property
+    def keys(self) -> list[str]:
+        return list(self.states)
+
+    def get_client(self, key: str) -> ClientT:
+        if key not in self.states:
+            self.states[key] = KeyState(key)
+        client = self.clients.get(key)
+        if client is None:
+            client = self.clients[key] = self.client_factory(key)
+        return client
+
+    def pick(self, candidates: Iterable[str] | None = None) -> str:
+        """在候选 Key 中选择当前最合适的 Key。候选为空时在所有 Key 中选择。"""
+        states = [self.states[k] for k in candidates or () if k in self.states]
+        if not states:
+            states = list(self.states.values())
+        now = time.monotonic()
+        return min(
+            states,
+            key=lambda s: (
+                s.cooldown_until > now,
+                s.cooldown_until if s.cooldown_until > now else 0.0,
+                s.in_flight,
+                s.failure_rate(now),
+                s.last_used,
+            ),
+        ).key
+
+    @asynccontextmanager
+    async def lease(self, key: str) -> AsyncIterator[ClientT]:
+        """使用指定 Key 的客户端发起请求，并根据请求结果更新该 Key 的状态。
+
+        Key 仍在冷却中时，最多等待 COOLDOWN_MAX_WAIT_SECONDS 秒。
+        """
+        client = self.get_client(key)
+        state = self.states[key]
+        wait = state.cooldown_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(min(wait, COOLDOWN_MAX_WAIT_SECONDS))
+        state.in_flight += 1
+        state.requests += 1
+        state.last_used = time.monotonic()
+        try:
+            yield client
+        except Exception as e:
+            self.report_error(key, e)
+            raise
+        else:
+            self.report_success(key)
+        finally:
+            state.in_flight -= 1
+
+    def report_success(self, key: str):
+        state = self.states.get(key)
+        if state is None:
+            return
+        state.consecutive_failures = 0
+        state.recent.append((time.monotonic(), False))
+
+    def report_error(self, key: str, e: BaseException):
+        """记录请求错误。与 Key 无关的错误（如上下文过长）不影响 Key 的健康状态。"""
+        state = self.states.get(key)
+        if state is None or not is_key_error(e):
+            return
+        now = time.monotonic()
+        state.recent.append((now, True))
+        state.consecutive_failures += 1
+        state.last_error = str(e)[:200]
+        cooldown = 0.0
+        if is_invalid_key_error(e):
+            cooldown = INVALID_KEY_COOLDOWN_SECONDS
+        elif is_rate_limit_error(e):
+            state.rate_limited += 1
+            cooldown = _retry_after(e) or min(
+                COOLDOWN_BASE_SECONDS * 2 ** (state.consecutive_failures - 1),
+                COOLDOWN_MAX_SECONDS,
+            )
+        else:
+            state.server_errors += 1
+            if state.consecutive_failures >= SERVER_ERROR_COOLDOWN_THRESHOLD:
+                cooldown = min(
+                    COOLDOWN_BASE_SECONDS
+                    * 2
+                    ** (state.consecutive_failures - SERVER_ERROR_COOLDOWN_THRESHOLD),
+                    COOLDOWN_MAX_SECONDS,
+                )
+        if cooldown:
+            state.cooldown_until = max(state.cooldown_until, now + cooldown)
+            logger.debug(
+                f"{self.name} Key {state.key[:12]} 冷却 {cooldown:.1f} 秒: {state.last_error}",
+            )
+
+    def stats(self) -> list[dict]:
+        now = time.monotonic()
+        return [state.stats(now) for state in self.states.values()]
+
+    async def close(self):
+        for client in self.clients.values():
+            close = getattr(client, "close", None) or getattr(client, "aclose", None)
+            if close is None:
+                continue
+            try:
+                await close()
+            except Exception as e:
+                logger.debug(f"关闭 {self.name} 客户端失败: {e}")
+        self.clients.clear()
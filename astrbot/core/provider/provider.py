@@ -1,7 +1,9 @@
 import abc
 import asyncio
+from collections import deque
 from collections.abc import AsyncGenerator
 
+from astrbot.core import logger
 from astrbot.core.agent.message import Message
 from astrbot.core.agent.tool import ToolSet
 from astrbot.core.provider.entities import (
@@ -9,9 +11,16 @@ from astrbot.core.provider.entities import (
     ProviderMeta,
     RerankResult,
     ToolCallsResult,
+    merge_system_prompt,
 )
+from astrbot.core.provider.image_refs import resolve_image_refs
 from astrbot.core.provider.register import provider_cls_map
 
+EMBEDDING_RATE_LIMIT_RETRIES = 8
+"""单个批次因限流重试的最大次数"""
+EMBEDDING_SLOW_BATCH_SECONDS = 30
+"""单批耗时超过该值时缩小批大小"""
+
 
 class AbstractProvider(abc.ABC):
     """Provider Abstract Class"""
@@ -47,6 +56,9 @@ class AbstractProvider(abc.ABC):
 class Provider(AbstractProvider):
     """Chat Provider"""
 
+    supports_dynamic_system_prompt: bool = False
+    """是否自行处理 dynamic_system_prompt 参数。不处理时由调用方将其合并进 system_prompt"""
+
     def __init__(
         self,
         provider_config: dict,
@@ -68,6 +80,10 @@ class Provider(AbstractProvider):
     def set_key(self, key: str):
         raise NotImplementedError
 
+    def get_key_stats(self) -> list[dict]:
+        """获得各个 Key 的使用统计（进行中请求数、近期失败率、冷却时间等）"""
+        return []
+
     @abc.abstractmethod
     async def get_models(self) -> list[str]:
         """获得支持的模型列表"""
@@ -165,6 +181,44 @@ class Provider(AbstractProvider):
 
         return dicts
 
+    def _place_dynamic_system_prompt(
+        self,
+        system_prompt: str | None,
+        dynamic_system_prompt: str | None,
+        context_query: list[dict],
+    ) -> str | None:
+        """按 dynamic_prompt_position 设置放置每轮变化的系统提示词，返回最终的系统提示词。
+
+        - system（默认）：附加在系统提示词末尾，工具定义与稳定的系统提示词可以命中前缀缓存；
+        - user：放在最新一条用户消息的开头，历史对话也可以命中前缀缓存。
+        """
+        if not dynamic_system_prompt:
+            return system_prompt
+        position = self.provider_settings.get("dynamic_prompt_position", "system")
+        if position == "user":
+            block = f"<context>\n{dynamic_system_prompt}\n</context>"
+            for idx in range(len(context_query) - 1, -1, -1):
+                message = context_query[idx]
+                if message.get("role") != "user":
+                    continue
+                content = message.get("content")
+                if isinstance(content, str):
+                    content = f"{block}\n\n{content}"
+                elif isinstance(content, list):
+                    content = [{"type": "text", "text": block}, *content]
+                else:
+                    break
+                context_query[idx] = {**message, "content": content}
+                return system_prompt
+        return merge_system_prompt(system_prompt, dynamic_system_prompt)
+
+    async def _prepare_contexts(
+        self,
+        messages: list[dict] | list[Message] | None,
+    ) -> list[dict]:
+        """转换为字典列表，并将对话历史中的图片附件引用解析为 data URL。"""
+        return await resolve_image_refs(self._ensure_message_to_dicts(messages))
+
 
 class STTProvider(AbstractProvider):
     def __init__(self, provider_config: dict, provider_settings: dict) -> None:
@@ -211,6 +265,138 @@ class EmbeddingProvider(AbstractProvider):
         """获取向量的维度"""
         ...
 
+    async def iter_embeddings_batches(
+        self,
+        texts: list[str],
+        batch_size: int = 16,
+        tasks_limit: int = 3,
+        max_retries: int = 3,
+        progress_callback=None,
+    ) -> AsyncGenerator[tuple[int, list[list[float]]], None]:
+        """分批获取文本的向量，每完成一批即产出 (批次在 texts 中的起始位置, 向量列表)
+
+        批次按完成顺序产出，调用方需按起始位置将向量与文本对齐。批大小与并发数根据提供商的反馈自适应调整:
+        遇到限流 (429) 时减半并暂停发送，单批耗时过长时缩小批大小，连续成功后逐步恢复到设定值。
+        单个批次重试耗尽不会中断其余批次，全部批次结束后再抛出异常。
+
+        Args:
+            texts: 文本列表
+            batch_size: 每批处理的文本数量上限
+            tasks_limit: 并发任务数量上限
+            max_retries: 失败时的最大重试次数 (限流不计入)
+            progress_callback: 进度回调函数，接收参数 (current, total)
+
+        """
+        loop = asyncio.get_running_loop()
+        total = len(texts)
+        max_batch_size = max(1, batch_size)
+        max_tasks = max(1, tasks_limit)
+        cur_batch_size, cur_tasks = max_batch_size, max_tasks
+        next_pos = 0
+        # (start, end, 失败次数, 限流次数, 最早开始时间)
+        retry_queue: deque[tuple[int, int, int, int, float]] = deque()
+        running: dict[asyncio.Task, tuple[int, int, int, int, float]] = {}
+        pause_until = 0.0
+        successes = 0
+        completed = 0
+        errors: list[str] = []
+
+        async def process_batch(start: int, end: int, not_before: float):
+            delay = max(not_before, pause_until) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            began = loop.time()
+            batch_embeddings = await self.get_embeddings(texts[start:end])
+            if len(batch_embeddings) != end - start:
+                raise ValueError(
+                    f"返回的向量数量 {len(batch_embeddings)} 与文本数量 {end - start} 不一致",
+                )
+            return batch_embeddings, loop.time() - began
+
+        try:
+            while next_pos < total or retry_queue or running:
+                while len(running) < cur_tasks and (retry_queue or next_pos < total):
+                    if retry_queue:
+                        item = retry_queue.popleft()
+                    else:
+                        end = min(total, next_pos + cur_batch_size)
+                        item = (next_pos, end, 0, 0, 0.0)
+                        next_pos = end
+                    task = asyncio.create_task(
+                        process_batch(item[0], item[1], item[4]),
+                    )
+                    running[task] = item
+
+                done, _ = await asyncio.wait(
+                    running,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    start, end, attempts, limited, _ = running.pop(task)
+                    try:
+                        batch_embeddings, elapsed = task.result()
+                    except Exception as e:
+                        successes = 0
+                        if (
+                            _is_rate_limited(e)
+                            and limited < EMBEDDING_RATE_LIMIT_RETRIES
+                        ):
+                            cur_tasks = max(1, cur_tasks // 2)
+                            cur_batch_size = max(1, cur_batch_size // 2)
+                            pause_until = max(pause_until, loop.time() + 2**limited)
+                            logger.warning(
+                                f"Embedding 请求被限流，批大小调整为 {cur_batch_size}，并发数调整为 {cur_tasks}",
+                            )
+                            for s in range(start, end, cur_batch_size):
+                                retry_queue.append(
+                                    (
+                                        s,
+                                        min(end, s + cur_batch_size),
+                                        attempts,
+                                        limited + 1,
+                                        0.0,
+                                    ),
+                                )
+                        elif attempts + 1 < max_retries:
+                            # 使用指数退避重试
+                            retry_queue.append(
+                                (
+                                    start,
+                                    end,
+                                    attempts + 1,
+                                    limited,
+                                    loop.time() + 2**attempts,
+                                ),
+                            )
+                        else:
+                            errors.append(
+                                f"批次 [{start}, {end}) 处理失败，已重试 {max_retries} 次: {e!s}",
+                            )
+                        continue
+
+                    if elapsed > EMBEDDING_SLOW_BATCH_SECONDS:
+                        successes = 0
+                        cur_batch_size = max(1, cur_batch_size // 2)
+                    else:
+                        successes += 1
+                        if successes >= cur_tasks:
+                            successes = 0
+                            cur_tasks = min(max_tasks, cur_tasks + 1)
+                            cur_batch_size = min(max_batch_size, cur_batch_size * 2)
+
+                    completed += end - start
+                    if progress_callback:
+                        await progress_callback(completed, total)
+                    yield start, batch_embeddings
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        if errors:
+            raise Exception(f"有 {len(errors)} 个批次处理失败: {'; '.join(errors)}")
+
     async def get_embeddings_batch(
         self,
         texts: list[str],
@@ -229,54 +415,27 @@ class EmbeddingProvider(AbstractProvider):
             progress_callback: 进度回调函数，接收参数 (current, total)
 
         Returns:
-            向量列表
+            与 texts 一一对应的向量列表
 
         """
-        semaphore = asyncio.Semaphore(tasks_limit)
-        all_embeddings: list[list[float]] = []
-        failed_batches: list[tuple[int, list[str]]] = []
-        completed_count = 0
-        total_count = len(texts)
-
-        async def process_batch(batch_idx: int, batch_texts: list[str]):
-            nonlocal completed_count
-            async with semaphore:
-                for attempt in range(max_retries):
-                    try:
-                        batch_embeddings = await self.get_embeddings(batch_texts)
-                        all_embeddings.extend(batch_embeddings)
-                        completed_count += len(batch_texts)
-                        if progress_callback:
-                            await progress_callback(completed_count, total_count)
-                        return
-                    except Exception as e:
-                        if attempt == max_retries - 1:
-                            # 最后一次重试失败，记录失败的批次
-                            failed_batches.append((batch_idx, batch_texts))
-                            raise Exception(
-                                f"批次 {batch_idx} 处理失败，已重试 {max_retries} 次: {e!s}",
-                            )
-                        # 等待一段时间后重试，使用指数退避
-                        await asyncio.sleep(2**attempt)
-
-        tasks = []
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i : i + batch_size]
-            batch_idx = i // batch_size
-            tasks.append(process_batch(batch_idx, batch_texts))
-
-        # 收集所有任务的结果，包括失败的任务
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        all_embeddings: list = [None] * len(texts)
+        async for start, batch_embeddings in self.iter_embeddings_batches(
+            texts,
+            batch_size=batch_size,
+            tasks_limit=tasks_limit,
+            max_retries=max_retries,
+            progress_callback=progress_callback,
+        ):
+            all_embeddings[start : start + len(batch_embeddings)] = batch_embeddings
+        return all_embeddings
 
-        # 检查是否有失败的任务
-        errors = [r for r in results if isinstance(r, Exception)]
-        if errors:
-            error_msg = (
-                f"有 {len(errors)} 个批次处理失败: {'; '.join(str(e) for e in errors)}"
-            )
-            raise Exception(error_msg)
 
-        return all_embeddings
+def _is_rate_limited(e: Exception) -> bool:
+    status = getattr(e, "status_code", None) or getattr(e, "status", None)
+    if status == 429:
+        return True
+    msg = str(e).lower()
+    return "429" in msg or "rate limit" in msg or "too many requests" in msg
 
 
 class RerankProvider(AbstractProvider):
@@ -9,18 +9,27 @@ from anthropic.types import Message
 
 from astrbot import logger
 from astrbot.api.provider import Provider
-from astrbot.core.provider.entities import LLMResponse
+from astrbot.core.provider.entities import (
+    LLMResponse,
+    TokenUsage,
+    merge_system_prompt,
+)
 from astrbot.core.provider.func_tool_manager import ToolSet
+from astrbot.core.provider.key_pool import KeyPool, is_key_error
 from astrbot.core.utils.io import download_image_by_url
 
 from ..register import register_provider_adapter
 
+CACHE_CONTROL = {"type": "ephemeral"}
+
 
 @register_provider_adapter(
     "anthropic_chat_completion",
     "Anthropic Claude API 提供商适配器",
 )
 class ProviderAnthropic(Provider):
+    supports_dynamic_system_prompt = True
+
     def __init__(
         self,
         provider_config,
@@ -39,13 +48,92 @@ class ProviderAnthropic(Provider):
         if isinstance(self.timeout, str):
             self.timeout = int(self.timeout)
 
-        self.client = AsyncAnthropic(
-            api_key=self.chosen_api_key,
+        self.key_pool: KeyPool[AsyncAnthropic] = KeyPool(
+            self.api_keys,
+            self._create_client,
+            name=provider_config.get("id", "anthropic"),
+        )
+        self.client = self.key_pool.get_client(self.chosen_api_key)
+
+        self.set_model(provider_config["model_config"]["model"])
+
+    def _create_client(self, api_key: str) -> AsyncAnthropic:
+        return AsyncAnthropic(
+            api_key=api_key,
             timeout=self.timeout,
             base_url=self.base_url,
         )
 
-        self.set_model(provider_config["model_config"]["model"])
+    @property
+    def prompt_cache_enabled(self) -> bool:
+        return bool(self.provider_settings.get("prompt_cache", True))
+
+    def _cache_tools(self, tool_list: list[dict]) -> list[dict]:
+        """在最后一个工具定义上设置缓存断点，缓存全部工具定义"""
+        if not self.prompt_cache_enabled or not tool_list:
+            return tool_list
+        tool_list = list(tool_list)
+        tool_list[-1] = {**tool_list[-1], "cache_control": CACHE_CONTROL}
+        return tool_list
+
+    def _apply_prompt_cache(
+        self,
+        payloads: dict,
+        system_prompt: str,
+        dynamic_system_prompt: str | None,
+    ):
+        """设置系统提示词，并在稳定的系统提示词与最后一条消息上设置缓存断点。
+
+        每轮变化的系统提示词作为单独的块放在缓存断点之后。
+        最后一条消息上的断点使下一轮请求可以命中本轮的全部前缀（Anthropic 会向前查找之前写入的缓存）。
+        """
+        if not self.prompt_cache_enabled:
+            if system_prompt := merge_system_prompt(
+                system_prompt,
+                dynamic_system_prompt,
+            ):
+                payloads["system"] = system_prompt
+            return
+
+        system_blocks = []
+        if system_prompt:
+            system_blocks.append(
+                {"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL},
+            )
+        if dynamic_system_prompt:
+            system_blocks.append({"type": "text", "text": dynamic_system_prompt})
+        if system_blocks:
+            payloads["system"] = system_blocks
+
+        messages = payloads.get("messages")
+        if not messages:
+            return
+        last = messages[-1]
+        content = last.get("content")
+        if isinstance(content, str) and content:
+            content = [
+                {"type": "text", "text": content, "cache_control": CACHE_CONTROL}
+            ]
+        elif isinstance(content, list) and content and isinstance(content[-1], dict):
+            content = [*content[:-1], {**content[-1], "cache_control": CACHE_CONTROL}]
+        else:
+            return
+        payloads["messages"] = [*messages[:-1], {**last, "content": content}]
+
+    @staticmethod
+    def _parse_usage(message: Message) -> TokenUsage | None:
+        usage = message.usage
+        if usage is None:
+            return None
+        cache_read = usage.cache_read_input_tokens or 0
+        cache_write = usage.cache_creation_input_tokens or 0
+        return TokenUsage(
+            # input_tokens 不包含缓存部分
+            input=(usage.input_tokens or 0) + cache_read + cache_write,
+            output=usage.output_tokens or 0,
+            cache_read=cache_read,
+            cache_write=cache_write,
+        )
 
     def _prepare_payload(self, messages: list[dict]):
         """准备 Anthropic API 的请求 payload
@@ -107,12 +195,18 @@ class ProviderAnthropic(Provider):
 
         return system_prompt, new_messages
 
-    async def _query(self, payloads: dict, tools: ToolSet | None) -> LLMResponse:
+    async def _query(
+        self,
+        payloads: dict,
+        tools: ToolSet | None,
+        client: AsyncAnthropic | None = None,
+    ) -> LLMResponse:
         if tools:
-            if tool_list := tools.get_func_desc_anthropic_style():
-                payloads["tools"] = tool_list
+            if tool_list := tools.anthropic_schema():
+                payloads["tools"] = self._cache_tools(tool_list)
 
-        completion = await self.client.messages.create(**payloads, stream=False)
+        client = client or self.client
+        completion = await client.messages.create(**payloads, stream=False)
 
         assert isinstance(completion, Message)
         logger.debug(f"completion: {completion}")
@@ -121,6 +215,8 @@ class ProviderAnthropic(Provider):
             raise Exception("API 返回的 completion 为空。")
 
         llm_response = LLMResponse(role="assistant")
+        llm_response.raw_completion = completion
+        llm_response.usage = self._parse_usage(completion)
 
         for content_block in completion.content:
             if content_block.type == "text":
@@ -141,10 +237,11 @@ class ProviderAnthropic(Provider):
         self,
         payloads: dict,
         tools: ToolSet | None,
+        client: AsyncAnthropic | None = None,
     ) -> AsyncGenerator[LLMResponse, None]:
         if tools:
-            if tool_list := tools.get_func_desc_anthropic_style():
-                payloads["tools"] = tool_list
+            if tool_list := tools.anthropic_schema():
+                payloads["tools"] = self._cache_tools(tool_list)
 
         # 用于累积工具调用信息
         tool_use_buffer = {}
@@ -152,7 +249,8 @@ class ProviderAnthropic(Provider):
         final_text = ""
         final_tool_calls = []
 
-        async with self.client.messages.stream(**payloads) as stream:
+        client = client or self.client
+        async with client.messages.stream(**payloads) as stream:
             assert isinstance(stream, anthropic.AsyncMessageStream)
             async for event in stream:
                 if event.type == "content_block_start":
@@ -223,11 +321,15 @@ class ProviderAnthropic(Provider):
                         # 清理缓冲区
                         del tool_use_buffer[event.index]
 
+            final_message = await stream.get_final_message()
+
         # 返回最终的完整结果
         final_response = LLMResponse(
             role="assistant",
             completion_text=final_text,
             is_chunk=False,
+            raw_completion=final_message,
+            usage=self._parse_usage(final_message),
         )
 
         if final_tool_calls:
@@ -256,10 +358,19 @@ class ProviderAnthropic(Provider):
         new_record = None
         if prompt is not None:
             new_record = await self.assemble_context(prompt, image_urls)
-        context_query = self._ensure_message_to_dicts(contexts)
+        context_query = await self._prepare_contexts(contexts)
         if new_record:
             context_query.append(new_record)
 
+        dynamic_system_prompt = kwargs.get("dynamic_system_prompt")
+        if self.provider_settings.get("dynamic_prompt_position", "system") == "user":
+            system_prompt = self._place_dynamic_system_prompt(
+                system_prompt,
+                dynamic_system_prompt,
+                context_query,
+            )
+            dynamic_system_prompt = None
+
         if system_prompt:
             context_query.insert(0, {"role": "system", "content": system_prompt})
 
@@ -283,17 +394,25 @@ class ProviderAnthropic(Provider):
         payloads = {"messages": new_messages, **model_config}
 
         # Anthropic has a different way of handling system prompts
-        if system_prompt:
-            payloads["system"] = system_prompt
-
-        llm_response = None
-        try:
-            llm_response = await self._query(payloads, func_tool)
-        except Exception as e:
-            logger.error(f"发生了错误。Provider 配置如下: {model_config}")
-            raise e
-
-        return llm_response
+        self._apply_prompt_cache(payloads, system_prompt, dynamic_system_prompt)
+
+        keys = self.api_keys.copy()
+        while True:
+            key = self.key_pool.pick(keys)
+            self.chosen_api_key = key
+            try:
+                async with self.key_pool.lease(key) as client:
+                    return await self._query(payloads, func_tool, client)
+            except Exception as e:
+                if key in keys:
+                    keys.remove(key)
+                if keys and is_key_error(e):
+                    logger.warning(
+                        f"检测到 Key 异常({e})，正在尝试更换 API Key 重试... 当前 Key: {key[:12]}...",
+                    )
+                    continue
+                logger.error(f"发生了错误。Provider 配置如下: {model_config}")
+                raise e
 
     async def text_chat_stream(
         self,
@@ -312,9 +431,19 @@ class ProviderAnthropic(Provider):
         new_record = None
         if prompt is not None:
             new_record = await self.assemble_context(prompt, image_urls)
-        context_query = self._ensure_message_to_dicts(contexts)
+        context_query = await self._prepare_contexts(contexts)
         if new_record:
             context_query.append(new_record)
+
+        dynamic_system_prompt = kwargs.get("dynamic_system_prompt")
+        if self.provider_settings.get("dynamic_prompt_position", "system") == "user":
+            system_prompt = self._place_dynamic_system_prompt(
+                system_prompt,
+                dynamic_system_prompt,
+                context_query,
+            )
+            dynamic_system_prompt = None
+
         if system_prompt:
             context_query.insert(0, {"role": "system", "content": system_prompt})
 
@@ -338,11 +467,33 @@ class ProviderAnthropic(Provider):
         payloads = {"messages": new_messages, **model_config}
 
         # Anthropic has a different way of handling system prompts
-        if system_prompt:
-            payloads["system"] = system_prompt
-
-        async for llm_response in self._query_stream(payloads, func_tool):
-            yield llm_response
+        self._apply_prompt_cache(payloads, system_prompt, dynamic_system_prompt)
+
+        keys = self.api_keys.copy()
+        while True:
+            key = self.key_pool.pick(keys)
+            self.chosen_api_key = key
+            yielded = False
+            try:
+                async with self.key_pool.lease(key) as client:
+                    async for llm_response in self._query_stream(
+                        payloads,
+                        func_tool,
+                        client,
+                    ):
+                        yielded = True
+                        yield llm_response
+                return
+            except Exception as e:
+                if key in keys:
+                    keys.remove(key)
+                # 已经输出部分内容时不再重试
+                if keys and not yielded and is_key_error(e):
+                    logger.warning(
+                        f"检测到 Key 异常({e})，正在尝试更换 API Key 重试... 当前 Key: {key[:12]}...",
+                    )
+                    continue
+                raise
 
     async def assemble_context(self, text: str, image_urls: list[str] | None = None):
         """组装上下文，支持文本和图片"""
@@ -410,3 +561,10 @@ class ProviderAnthropic(Provider):
 
     def set_key(self, key: str):
         self.chosen_api_key = key
+        self.client = self.key_pool.get_client(key)
+
+    def get_key_stats(self) -> list[dict]:
+        return self.key_pool.stats()
+
+    async def terminate(self):
+        await self.key_pool.close()
@@ -329,8 +329,9 @@ class ProviderCoze(Provider):
                     },
                 )
 
-        contexts = self._ensure_message_to_dicts(contexts)
         if not self.auto_save_history and contexts:
+            # 历史中的图片附件引用需解析为 data URL 后再上传
+            contexts = await self._prepare_contexts(contexts)
             # 如果关闭了自动保存历史，传入上下文
             for ctx in contexts:
                 if isinstance(ctx, dict) and "role" in ctx and "content" in ctx:
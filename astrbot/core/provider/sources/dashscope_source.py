@@ -16,6 +16,9 @@ from .openai_source import ProviderOpenAIOfficial
 
 @register_provider_adapter("dashscope", "Dashscope APP 适配器。")
 class ProviderDashscope(ProviderOpenAIOfficial):
+    # text_chat 为自行实现，只读取 system_prompt
+    supports_dynamic_system_prompt = False
+
     def __init__(
         self,
         provider_config: dict,
@@ -204,4 +207,4 @@ class ProviderDashscope(ProviderOpenAIOfficial):
         raise Exception("暂不支持获得 阿里云百炼 的历史消息记录。")
 
     async def terminate(self):
-        pass
+        await super().terminate()
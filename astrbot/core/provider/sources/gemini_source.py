@@ -1,8 +1,6 @@
-import asyncio
 import base64
 import json
 import logging
-import random
 from collections.abc import AsyncGenerator
 
 from google import genai
@@ -13,8 +11,9 @@ import astrbot.core.message.components as Comp
 from astrbot import logger
 from astrbot.api.provider import Provider
 from astrbot.core.message.message_event_result import MessageChain
-from astrbot.core.provider.entities import LLMResponse
+from astrbot.core.provider.entities import LLMResponse, TokenUsage
 from astrbot.core.provider.func_tool_manager import ToolSet
+from astrbot.core.provider.key_pool import KeyPool
 from astrbot.core.utils.io import download_image_by_url
 
 from ..register import register_provider_adapter
@@ -35,6 +34,8 @@ logging.getLogger("google_genai.types").addFilter(SuppressNonTextPartsWarning())
     "Google Gemini Chat Completion 提供商适配器",
 )
 class ProviderGoogleGenAI(Provider):
+    supports_dynamic_system_prompt = True
+
     CATEGORY_MAPPING = {
         "harassment": types.HarmCategory.HARM_CATEGORY_HARASSMENT,
         "hate_speech": types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
@@ -66,20 +67,28 @@ class ProviderGoogleGenAI(Provider):
         if self.api_base and self.api_base.endswith("/"):
             self.api_base = self.api_base[:-1]
 
+        self.key_pool: KeyPool[genai.client.AsyncClient] = KeyPool(
+            self.api_keys,
+            self._create_client,
+            name=provider_config.get("id", "gemini"),
+        )
         self._init_client()
         self.set_model(provider_config["model_config"]["model"])
         self._init_safety_settings()
 
-    def _init_client(self) -> None:
-        """初始化Gemini客户端"""
-        self.client = genai.Client(
-            api_key=self.chosen_api_key,
+    def _create_client(self, api_key: str) -> genai.client.AsyncClient:
+        return genai.Client(
+            api_key=api_key,
             http_options=types.HttpOptions(
                 base_url=self.api_base,
                 timeout=self.timeout * 1000,  # 毫秒
             ),
         ).aio
 
+    def _init_client(self) -> None:
+        """初始化Gemini客户端"""
+        self.client = self.key_pool.get_client(self.chosen_api_key)
+
     def _init_safety_settings(self) -> None:
         """初始化安全设置"""
         user_safety_config = self.provider_config.get("gm_safety_settings", {})
@@ -93,22 +102,24 @@ class ProviderGoogleGenAI(Provider):
             and threshold_str in self.THRESHOLD_MAPPING
         ]
 
-    async def _handle_api_error(self, e: APIError, keys: list[str]) -> bool:
-        """处理API错误，返回是否需要重试"""
+    async def _handle_api_error(self, e: APIError, keys: list[str], key: str) -> bool:
+        """处理API错误，返回是否需要重试。
+
+        Key 异常时将 key 移出本次请求的候选 Key，该 Key 已由 Key 池置于冷却中。
+        """
         if e.message is None:
             e.message = ""
 
         if e.code == 429 or "API key not valid" in e.message:
-            keys.remove(self.chosen_api_key)
+            if key in keys:
+                keys.remove(key)
             if len(keys) > 0:
-                self.set_key(random.choice(keys))
                 logger.info(
-                    f"检测到 Key 异常({e.message})，正在尝试更换 API Key 重试... 当前 Key: {self.chosen_api_key[:12]}...",
+                    f"检测到 Key 异常({e.message})，正在尝试更换 API Key 重试... 当前 Key: {key[:12]}...",
                 )
-                await asyncio.sleep(1)
                 return True
             logger.error(
-                f"检测到 Key 异常({e.message})，且已没有可用的 Key。 当前 Key: {self.chosen_api_key[:12]}...",
+                f"检测到 Key 异常({e.message})，且已没有可用的 Key。 当前 Key: {key[:12]}...",
             )
             raise Exception("达到了 Gemini 速率限制, 请稍后再试...")
         logger.error(
@@ -191,7 +202,7 @@ class ProviderGoogleGenAI(Provider):
 
         if tools and tool_list:
             logger.warning("已启用原生工具，函数工具将被忽略")
-        elif tools and (func_desc := tools.get_func_desc_google_genai_style()):
+        elif tools and (func_desc := tools.google_schema()):
             tool_list = [
                 types.Tool(function_declarations=func_desc["function_declarations"]),
             ]
@@ -324,6 +335,18 @@ class ProviderGoogleGenAI(Provider):
 
         return gemini_contents
 
+    @staticmethod
+    def _parse_usage(result: types.GenerateContentResponse) -> TokenUsage | None:
+        """Gemini 2.5 及以上的模型会自动缓存相同的前缀 (implicit caching)，命中部分记为 cache_read"""
+        usage = result.usage_metadata
+        if usage is None:
+            return None
+        return TokenUsage(
+            input=usage.prompt_token_count or 0,
+            output=usage.candidates_token_count or 0,
+            cache_read=usage.cached_content_token_count or 0,
+        )
+
     def _extract_reasoning_content(self, candidate: types.Candidate) -> str:
         """Extract reasoning content from candidate parts"""
         if not candidate.content or not candidate.content.parts:
@@ -406,8 +429,14 @@ class ProviderGoogleGenAI(Provider):
                 chain.append(Comp.Image.fromBytes(part.inline_data.data))
         return MessageChain(chain=chain)
 
-    async def _query(self, payloads: dict, tools: ToolSet | None) -> LLMResponse:
+    async def _query(
+        self,
+        payloads: dict,
+        tools: ToolSet | None,
+        client: genai.client.AsyncClient | None = None,
+    ) -> LLMResponse:
         """非流式请求 Gemini API"""
+        client = client or self.client
         system_instruction = next(
             (msg["content"] for msg in payloads["messages"] if msg["role"] == "system"),
             None,
@@ -430,7 +459,7 @@ class ProviderGoogleGenAI(Provider):
                     modalities,
                     temperature,
                 )
-                result = await self.client.models.generate_content(
+                result = await client.models.generate_content(
                     model=self.get_model(),
                     contents=conversation,
                     config=config,
@@ -478,6 +507,7 @@ class ProviderGoogleGenAI(Provider):
 
         llm_response = LLMResponse("assistant")
         llm_response.raw_completion = result
+        llm_response.usage = self._parse_usage(result)
         llm_response.result_chain = self._process_content_parts(
             result.candidates[0],
             llm_response,
@@ -488,8 +518,10 @@ class ProviderGoogleGenAI(Provider):
         self,
         payloads: dict,
         tools: ToolSet | None,
+        client: genai.client.AsyncClient | None = None,
     ) -> AsyncGenerator[LLMResponse, None]:
         """流式请求 Gemini API"""
+        client = client or self.client
         system_instruction = next(
             (msg["content"] for msg in payloads["messages"] if msg["role"] == "system"),
             None,
@@ -505,7 +537,7 @@ class ProviderGoogleGenAI(Provider):
                     tools,
                     system_instruction,
                 )
-                result = await self.client.models.generate_content_stream(
+                result = await client.models.generate_content_stream(
                     model=self.get_model(),
                     contents=conversation,
                     config=config,
@@ -530,8 +562,11 @@ class ProviderGoogleGenAI(Provider):
         accumulated_text = ""
         accumulated_reasoning = ""
         final_response = None
+        usage = None
 
         async for chunk in result:
+            if chunk.usage_metadata:
+                usage = self._parse_usage(chunk)
             llm_response = LLMResponse("assistant", is_chunk=True)
 
             if not chunk.candidates:
@@ -583,6 +618,8 @@ class ProviderGoogleGenAI(Provider):
         if not final_response:
             final_response = LLMResponse("assistant", is_chunk=False)
 
+        final_response.usage = usage
+
         # Set the complete accumulated reasoning in the final response
         if accumulated_reasoning:
             final_response.reasoning_content = accumulated_reasoning
@@ -615,9 +652,14 @@ class ProviderGoogleGenAI(Provider):
         new_record = None
         if prompt is not None:
             new_record = await self.assemble_context(prompt, image_urls)
-        context_query = self._ensure_message_to_dicts(contexts)
+        context_query = await self._prepare_contexts(contexts)
         if new_record:
             context_query.append(new_record)
+        system_prompt = self._place_dynamic_system_prompt(
+            system_prompt,
+            kwargs.get("dynamic_system_prompt"),
+            context_query,
+        )
         if system_prompt:
             context_query.insert(0, {"role": "system", "content": system_prompt})
 
@@ -642,10 +684,13 @@ class ProviderGoogleGenAI(Provider):
         keys = self.api_keys.copy()
 
         for _ in range(retry):
+            key = self.key_pool.pick(keys)
+            self.chosen_api_key = key
             try:
-                return await self._query(payloads, func_tool)
+                async with self.key_pool.lease(key) as client:
+                    return await self._query(payloads, func_tool, client)
             except APIError as e:
-                if await self._handle_api_error(e, keys):
+                if await self._handle_api_error(e, keys, key):
                     continue
                 break
 
@@ -668,9 +713,14 @@ class ProviderGoogleGenAI(Provider):
         new_record = None
         if prompt is not None:
             new_record = await self.assemble_context(prompt, image_urls)
-        context_query = self._ensure_message_to_dicts(contexts)
+        context_query = await self._prepare_contexts(contexts)
         if new_record:
             context_query.append(new_record)
+        system_prompt = self._place_dynamic_system_prompt(
+            system_prompt,
+            kwargs.get("dynamic_system_prompt"),
+            context_query,
+        )
         if system_prompt:
             context_query.insert(0, {"role": "system", "content": system_prompt})
 
@@ -695,12 +745,19 @@ class ProviderGoogleGenAI(Provider):
         keys = self.api_keys.copy()
 
         for _ in range(retry):
+            key = self.key_pool.pick(keys)
+            self.chosen_api_key = key
             try:
-                async for response in self._query_stream(payloads, func_tool):
-                    yield response
+                async with self.key_pool.lease(key) as client:
+                    async for response in self._query_stream(
+                        payloads,
+                        func_tool,
+                        client,
+                    ):
+                        yield response
                 break
             except APIError as e:
-                if await self._handle_api_error(e, keys):
+                if await self._handle_api_error(e, keys, key):
                     continue
                 break
 
@@ -727,6 +784,9 @@ class ProviderGoogleGenAI(Provider):
         self.chosen_api_key = key
         self._init_client()
 
+    def get_key_stats(self) -> list[dict]:
+        return self.key_pool.stats()
+
     async def assemble_context(self, text: str, image_urls: list[str] | None = None):
         """组装上下文。"""
         if image_urls:
@@ -764,4 +824,5 @@ class ProviderGoogleGenAI(Provider):
             return "data:image/jpeg;base64," + image_bs64
 
     async def terminate(self):
+        await self.key_pool.close()
         logger.info("Google GenAI 适配器已终止。")
@@ -1,9 +1,7 @@
-import asyncio
 import base64
 import inspect
 import json
 import os
-import random
 import re
 from collections.abc import AsyncGenerator
 
@@ -19,7 +17,8 @@ from astrbot.api.provider import Provider
 from astrbot.core.agent.message import Message
 from astrbot.core.agent.tool import ToolSet
 from astrbot.core.message.message_event_result import MessageChain
-from astrbot.core.provider.entities import LLMResponse, ToolCallsResult
+from astrbot.core.provider.entities import LLMResponse, TokenUsage, ToolCallsResult
+from astrbot.core.provider.key_pool import KeyPool
 from astrbot.core.utils.io import download_image_by_url
 
 from ..register import register_provider_adapter
@@ -30,6 +29,8 @@ from ..register import register_provider_adapter
     "OpenAI API Chat Completion 提供商适配器",
 )
 class ProviderOpenAIOfficial(Provider):
+    supports_dynamic_system_prompt = True
+
     def __init__(self, provider_config, provider_settings) -> None:
         super().__init__(provider_config, provider_settings)
         self.chosen_api_key = None
@@ -46,23 +47,13 @@ class ProviderOpenAIOfficial(Provider):
             for key in self.custom_headers:
                 self.custom_headers[key] = str(self.custom_headers[key])
 
-        if "api_version" in provider_config:
-            # Using Azure OpenAI API
-            self.client = AsyncAzureOpenAI(
-                api_key=self.chosen_api_key,
-                api_version=provider_config.get("api_version", None),
-                default_headers=self.custom_headers,
-                base_url=provider_config.get("api_base", ""),
-                timeout=self.timeout,
-            )
-        else:
-            # Using OpenAI Official API
-            self.client = AsyncOpenAI(
-                api_key=self.chosen_api_key,
-                base_url=provider_config.get("api_base", None),
-                default_headers=self.custom_headers,
-                timeout=self.timeout,
-            )
+        # 每个 Key 使用独立的客户端，避免并发请求之间互相修改 api_key
+        self.key_pool: KeyPool[AsyncOpenAI] = KeyPool(
+            self.api_keys,
+            self._create_client,
+            name=provider_config.get("id", "openai"),
+        )
+        self.client = self.key_pool.get_client(self.chosen_api_key or "")
 
         self.default_params = inspect.signature(
             self.client.chat.completions.create,
@@ -74,6 +65,24 @@ class ProviderOpenAIOfficial(Provider):
 
         self.reasoning_key = "reasoning_content"
 
+    def _create_client(self, api_key: str) -> AsyncOpenAI:
+        if "api_version" in self.provider_config:
+            # Using Azure OpenAI API
+            return AsyncAzureOpenAI(
+                api_key=api_key,
+                api_version=self.provider_config.get("api_version", None),
+                default_headers=self.custom_headers,
+                base_url=self.provider_config.get("api_base", ""),
+                timeout=self.timeout,
+            )
+        # Using OpenAI Official API
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=self.provider_config.get("api_base", None),
+            default_headers=self.custom_headers,
+            timeout=self.timeout,
+        )
+
     def _maybe_inject_xai_search(self, payloads: dict, **kwargs):
         """当开启 xAI 原生搜索时，向请求体注入 Live Search 参数。
 
@@ -107,11 +116,16 @@ class ProviderOpenAIOfficial(Provider):
         except NotFoundError as e:
             raise Exception(f"获取模型列表失败：{e}")
 
-    async def _query(self, payloads: dict, tools: ToolSet | None) -> LLMResponse:
+    async def _query(
+        self,
+        payloads: dict,
+        tools: ToolSet | None,
+        client: AsyncOpenAI | None = None,
+    ) -> LLMResponse:
         if tools:
             model = payloads.get("model", "").lower()
             omit_empty_param_field = "gemini" in model
-            tool_list = tools.get_func_desc_openai_style(
+            tool_list = tools.openai_schema(
                 omit_empty_parameter_field=omit_empty_param_field,
             )
             if tool_list:
@@ -138,7 +152,8 @@ class ProviderOpenAIOfficial(Provider):
         if model == "deepseek-reasoner" and "tools" in payloads:
             del payloads["tools"]
 
-        completion = await self.client.chat.completions.create(
+        client = client or self.client
+        completion = await client.chat.completions.create(
             **payloads,
             stream=False,
             extra_body=extra_body,
@@ -159,12 +174,13 @@ class ProviderOpenAIOfficial(Provider):
         self,
         payloads: dict,
         tools: ToolSet | None,
+        client: AsyncOpenAI | None = None,
     ) -> AsyncGenerator[LLMResponse, None]:
         """流式查询API，逐步返回结果"""
         if tools:
             model = payloads.get("model", "").lower()
             omit_empty_param_field = "gemini" in model
-            tool_list = tools.get_func_desc_openai_style(
+            tool_list = tools.openai_schema(
                 omit_empty_parameter_field=omit_empty_param_field,
             )
             if tool_list:
@@ -186,7 +202,8 @@ class ProviderOpenAIOfficial(Provider):
         for key in to_del:
             del payloads[key]
 
-        stream = await self.client.chat.completions.create(
+        client = client or self.client
+        stream = await client.chat.completions.create(
             **payloads,
             stream=True,
             extra_body=extra_body,
@@ -311,9 +328,27 @@ class ProviderOpenAIOfficial(Provider):
             raise Exception(f"API 返回的 completion 无法解析：{completion}。")
 
         llm_response.raw_completion = completion
+        llm_response.usage = self._parse_usage(completion)
 
         return llm_response
 
+    @staticmethod
+    def _parse_usage(completion: ChatCompletion) -> TokenUsage | None:
+        usage = completion.usage
+        if usage is None:
+            return None
+        details = usage.prompt_tokens_details
+        cached = (details.cached_tokens if details else None) or getattr(
+            usage,
+            "prompt_cache_hit_tokens",  # DeepSeek
+            None,
+        )
+        return TokenUsage(
+            input=usage.prompt_tokens or 0,
+            output=usage.completion_tokens or 0,
+            cache_read=cached if isinstance(cached, int) else 0,
+        )
+
     async def _prepare_chat_payload(
         self,
         prompt: str | None,
@@ -322,17 +357,27 @@ class ProviderOpenAIOfficial(Provider):
         system_prompt: str | None = None,
         tool_calls_result: ToolCallsResult | list[ToolCallsResult] | None = None,
         model: str | None = None,
+        dynamic_system_prompt: str | None = None,
         **kwargs,
     ) -> tuple:
-        """准备聊天所需的有效载荷和上下文"""
+        """准备聊天所需的有效载荷和上下文
+
+        消息按 系统提示词 -> 历史对话 -> 本轮输入 的顺序排列，每轮变化的内容放在稳定的前缀之后，
+        以便命中提供商的自动前缀缓存。
+        """
         if contexts is None:
             contexts = []
         new_record = None
         if prompt is not None:
             new_record = await self.assemble_context(prompt, image_urls)
-        context_query = self._ensure_message_to_dicts(contexts)
+        context_query = await self._prepare_contexts(contexts)
         if new_record:
             context_query.append(new_record)
+        system_prompt = self._place_dynamic_system_prompt(
+            system_prompt,
+            dynamic_system_prompt,
+            context_query,
+        )
         if system_prompt:
             context_query.insert(0, {"role": "system", "content": system_prompt})
 
@@ -374,12 +419,10 @@ class ProviderOpenAIOfficial(Provider):
             logger.warning(
                 f"API 调用过于频繁，尝试使用其他 Key 重试。当前 Key: {chosen_key[:12]}",
             )
-            # 最后一次不等待
-            if retry_cnt < max_retries - 1:
-                await asyncio.sleep(1)
+            # 该 Key 已由 Key 池置于冷却中，换用其他 Key 时无需等待
             available_api_keys.remove(chosen_key)
             if len(available_api_keys) > 0:
-                chosen_key = random.choice(available_api_keys)
+                chosen_key = self.key_pool.pick(available_api_keys)
                 return (
                     False,
                     chosen_key,
@@ -466,14 +509,15 @@ class ProviderOpenAIOfficial(Provider):
         llm_response = None
         max_retries = 10
         available_api_keys = self.api_keys.copy()
-        chosen_key = random.choice(available_api_keys)
+        chosen_key = self.key_pool.pick(available_api_keys)
 
         last_exception = None
         retry_cnt = 0
         for retry_cnt in range(max_retries):
             try:
-                self.client.api_key = chosen_key
-                llm_response = await self._query(payloads, func_tool)
+                self.chosen_api_key = chosen_key
+                async with self.key_pool.lease(chosen_key) as client:
+                    llm_response = await self._query(payloads, func_tool, client)
                 break
             except UnprocessableEntityError as e:
                 logger.warning(f"不可处理的实体错误：{e}，尝试删除图片。")
@@ -535,15 +579,20 @@ class ProviderOpenAIOfficial(Provider):
 
         max_retries = 10
         available_api_keys = self.api_keys.copy()
-        chosen_key = random.choice(available_api_keys)
+        chosen_key = self.key_pool.pick(available_api_keys)
 
         last_exception = None
         retry_cnt = 0
         for retry_cnt in range(max_retries):
             try:
-                self.client.api_key = chosen_key
-                async for response in self._query_stream(payloads, func_tool):
-                    yield response
+                self.chosen_api_key = chosen_key
+                async with self.key_pool.lease(chosen_key) as client:
+                    async for response in self._query_stream(
+                        payloads,
+                        func_tool,
+                        client,
+                    ):
+                        yield response
                 break
             except UnprocessableEntityError as e:
                 logger.warning(f"不可处理的实体错误：{e}，尝试删除图片。")
@@ -599,13 +648,22 @@ class ProviderOpenAIOfficial(Provider):
         return new_contexts
 
     def get_current_key(self) -> str:
-        return self.client.api_key
+        return self.chosen_api_key or ""
 
     def get_keys(self) -> list[str]:
         return self.api_keys
 
     def set_key(self, key):
-        self.client.api_key = key
+        self.chosen_api_key = key
+        self.client = self.key_pool.get_client(key)
+
+    def get_key_stats(self) -> list[dict]:
+        return self.key_pool.stats()
+
+    async def terminate(self):
+        # 子类（如阿里云百炼）可能不创建 OpenAI 客户端
+        if key_pool := getattr(self, "key_pool", None):
+            await key_pool.close()
 
     async def assemble_context(
         self,
@@ -0,0 +1,187 @@
+"""TTS 音频缓存
+
+按 (提供商 ID, 提供商配置, 文本) 的哈希缓存合成结果，常用短句无需重复合成。
+音频文件保存在 data/tts_cache 下，按最近使用时间淘汰，总大小不超过上限。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+from astrbot.core import logger
+from astrbot.core.provider.provider import TTSProvider
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class TTSAudioCache:
+    def __init__(
+        self, cache_dir: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.cache_dir = cache_dir or os.path.join(get_astrbot_data_path(), "tts_cache")
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[str, int]] | None = None
+        """缓存键 -> (文件路径, 文件大小)，按最近使用排序。首次使用时从磁盘加载。"""
+        self._total_bytes = 0
+        self._loading: asyncio.Future | None = None
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries or ()),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    @staticmethod
+    def _key(provider: TTSProvider, text: str) -> str:
+        # 音色、模型等参数都在提供商配置中，整体参与哈希，配置变化后自然不再命中
+        config = json.dumps(
+            provider.provider_config,
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        raw = f"{provider.meta().id}\0{config}\0{text}"
+        return hashlib.sha256(raw.encode("utf-8", "surrogatepass")).hexdigest()
+
+    async def _load(self) -> OrderedDict[str, tuple[str, int]]:
+        if self._entries is not None:
+            return self._entries
+        # 首次使用时的并发调用共同等待同一次扫描
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(
+                asyncio.to_thread(_scan_dir, self.cache_dir),
+            )
+        try:
+            files = await asyncio.shield(self._loading)
+        finally:
+            self._loading = None
+        if self._entries is not None:
+            return self._entries
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        for path, size in files:
+            key = os.path.splitext(os.path.basename(path))[0]
+            self._entries[key] = (path, size)
+            self._total_bytes += size
+        await self._evict()
+        return self._entries
+
+    async def _evict(self):
+        entries = self._entries
+        victims = []
+        while entries and self._total_bytes > self.max_bytes:
+            _, (path, size) = entries.popitem(last=False)
+            self._total_bytes -= size
+            victims.append(path)
+        if victims:
+            await asyncio.to_thread(_remove_files, victims)
+
+    async def _get(self, key: str) -> str | None:
+        entries = await self._load()
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        path, size = entry
+        entries.move_to_end(key)
+        # 重启后按修改时间恢复使用顺序
+        if not await asyncio.to_thread(_touch_file, path):
+            if entries.get(key) == entry:
+                del entries[key]
+                self._total_bytes -= size
+            return None
+        return path
+
+    async def _put(self, key: str, audio_path: str) -> str:
+        entries = await self._load()
+        ext = os.path.splitext(audio_path)[1]
+        path = os.path.join(self.cache_dir, f"{key}{ext}")
+        size = await asyncio.to_thread(_copy_file, audio_path, path)
+        old = entries.pop(key, None)
+        if old is not None:
+            self._total_bytes -= old[1]
+        entries[key] = (path, size)
+        self._total_bytes += size
+        await self._evict()
+        return path if key in entries else audio_path
+
+    async def get_audio(self, provider: TTSProvider, text: str) -> str:
+        """返回缓存的音频路径，未命中时调用提供商合成并写入缓存。"""
+        if self.max_bytes <= 0:
+            return await provider.get_audio(text)
+        key = self._key(provider, text)
+        path = await self._get(key)
+        if path is not None:
+            self.hits += 1
+            return path
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.hits += 1
+            return await asyncio.shield(fut)
+
+        self.misses += 1
+        fut = asyncio.ensure_future(provider.get_audio(text))
+        self._inflight[key] = fut
+        try:
+            audio_path = await asyncio.shield(fut)
+        finally:
+            self._inflight.pop(key, None)
+        if audio_path and os.path.exists(audio_path):
+            try:
+                return await self._put(key, audio_path)
+            except OSError as e:
+                logger.warning(f"写入 TTS 缓存失败: {e}")
+        return audio_path
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self._entries = None
+        self._total_bytes = 0
+
+
+def _scan_dir(cache_dir: str) -> list[tuple[str, int]]:
+    """返回缓存目录中的 (文件路径, 文件大小)，按修改时间从旧到新排列"""
+    os.makedirs(cache_dir, exist_ok=True)
+    files = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file():
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.path, stat.st_size))
+    return [(path, size) for _, path, size in sorted(files)]
+
+
+def _touch_file(path: str) -> bool:
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _copy_file(src: str, dst: str) -> int:
+    shutil.copyfile(src, dst)
+    return os.path.getsize(dst)
+
+
+def _remove_files(paths: list[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+tts_audio_cache = TTSAudioCache()
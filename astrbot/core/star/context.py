@@ -432,8 +432,7 @@ class Context:
 
             if tool.name in tool_name:
                 logger.warning("替换已存在的 LLM 工具: " + tool.name)
-                self.provider_manager.llm_tools.remove_func(tool.name)
-            self.provider_manager.llm_tools.func_list.append(tool)
+            self.provider_manager.llm_tools.add_tool(tool)
 
     def register_web_api(
         self,
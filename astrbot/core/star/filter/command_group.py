@@ -121,7 +121,9 @@ class CommandGroupFilter(HandlerFilter):
         if not self.custom_filter_ok(event, cfg):
             return False
 
-        if self.equals(event.message_str.strip()):
+        # equals 与 startswith 使用同样去除首尾空白后的文本
+        message_str = event.message_str.strip()
+        if self.equals(message_str):
             tree = (
                 self.group_name
                 + "\n"
@@ -131,4 +133,4 @@ class CommandGroupFilter(HandlerFilter):
                 f"参数不足。{self.group_name} 指令组下有如下指令，请参考：\n" + tree,
             )
 
-        return self.startswith(event.message_str)
+        return self.startswith(message_str)
@@ -405,6 +405,12 @@ def register_llm_tool(name: str | None = None, **kwargs):
     yield
     ```
 
+    可选参数：
+        - sequential(bool): 为 False 时该工具可与同一轮的其他工具调用并发执行，默认逐个执行。
+          并发执行的工具应通过返回值或 yield 发送消息，而不是直接调用 event.set_result。
+        - max_concurrency(int): 同一轮中该工具最多同时执行的调用数，0 为不限制。
+        - timeout(float): 单次调用的总超时时间（秒）。
+
     """
     name_ = name
     registering_agent = None
@@ -433,6 +439,7 @@ def register_llm_tool(name: str | None = None, **kwargs):
             doc_desc = docstring.description.strip() if docstring.description else ""
             md = get_handler_or_create(awaitable, EventType.OnCallingFuncToolEvent)
             llm_tools.add_func(llm_tool_name, args, doc_desc, md.handler)
+            tool = llm_tools.get_func(llm_tool_name)
         else:
             assert isinstance(registering_agent, RegisteringAgent)
             # print(f"Registering tool {llm_tool_name} for agent", registering_agent._agent.name)
@@ -443,6 +450,11 @@ def register_llm_tool(name: str | None = None, **kwargs):
             tool = llm_tools.spec_to_func(llm_tool_name, args, desc, awaitable)
             registering_agent._agent.tools.append(tool)
 
+        if tool:
+            tool.sequential = kwargs.get("sequential")
+            tool.max_concurrency = kwargs.get("max_concurrency", 0)
+            tool.timeout = kwargs.get("timeout")
+
         return awaitable
 
     return decorator
@@ -486,7 +498,7 @@ def register_agent(
         )
         handoff_tool = HandoffTool(agent=agent)
         handoff_tool.handler = awaitable
-        llm_tools.func_list.append(handoff_tool)
+        llm_tools.add_tool(handoff_tool)
         return RegisteringAgent(agent)
 
     return decorator
@@ -15,6 +15,15 @@ class StarHandlerRegistry(Generic[T]):
     def __init__(self):
         self.star_handlers_map: dict[str, StarHandlerMetadata] = {}
         self._handlers: list[StarHandlerMetadata] = []
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """注册表版本号，Handler 增删或插件加载后递增，用于使依赖注册表的缓存失效"""
+        return self._version
+
+    def mark_changed(self):
+        self._version += 1
 
     def append(self, handler: StarHandlerMetadata):
         """添加一个 Handler，并保持按优先级有序"""
@@ -24,6 +33,7 @@ class StarHandlerRegistry(Generic[T]):
         self.star_handlers_map[handler.handler_full_name] = handler
         self._handlers.append(handler)
         self._handlers.sort(key=lambda h: -h.extras_configs["priority"])
+        self._version += 1
 
     def _print_handlers(self):
         for handler in self._handlers:
@@ -79,10 +89,12 @@ class StarHandlerRegistry(Generic[T]):
     def clear(self):
         self.star_handlers_map.clear()
         self._handlers.clear()
+        self._version += 1
 
     def remove(self, handler: StarHandlerMetadata):
         self.star_handlers_map.pop(handler.handler_full_name, None)
         self._handlers = [h for h in self._handlers if h != handler]
+        self._version += 1
 
     def __iter__(self):
         return iter(self._handlers)
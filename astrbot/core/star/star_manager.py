@@ -513,6 +513,7 @@ class PluginManager:
                                 )
                             if ft.name in inactivated_llm_tools:
                                 ft.active = False
+                    llm_tools.invalidate_cache()
 
                 else:
                     # v3.4.0 以前的方式注册插件
@@ -602,6 +603,8 @@ class PluginManager:
                         )
 
                 metadata.star_handler_full_names = full_names
+                # 插件元数据已就绪，使依赖注册表的缓存（如分发索引）失效
+                star_handlers_registry.mark_changed()
 
                 # 执行 initialize() 方法
                 if hasattr(metadata.star_cls, "initialize") and metadata.star_cls:
@@ -816,6 +819,7 @@ class PluginManager:
                 to_remove.append(func_tool)
         for func_tool in to_remove:
             llm_tools.func_list.remove(func_tool)
+        llm_tools.invalidate_cache()
 
         if plugin is None:
             return
@@ -871,6 +875,7 @@ class PluginManager:
                     func_tool.active = False
                     if func_tool.name not in inactivated_llm_tools:
                         inactivated_llm_tools.append(func_tool.name)
+            llm_tools.invalidate_cache()
 
             await sp.global_put("inactivated_plugins", inactivated_plugins)
             await sp.global_put("inactivated_llm_tools", inactivated_llm_tools)
@@ -920,6 +925,7 @@ class PluginManager:
             ):
                 inactivated_llm_tools.remove(func_tool.name)
                 func_tool.active = True
+        llm_tools.invalidate_cache()
         await sp.global_put("inactivated_llm_tools", inactivated_llm_tools)
 
         await self.reload(plugin_name)
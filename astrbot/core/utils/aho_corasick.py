@@ -0,0 +1,77 @@
+"""Aho-Corasick 多模式字符串匹配
+
+一次扫描文本即可找出所有模式串中的命中项，耗时与模式串数量无关。
+"""
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[str] = ()):
+        self.patterns: list[str] = []
+        # 节点 i 的转移表、失败指针与输出（以该节点结尾的最短模式串下标，-1 表示无）
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[int] = [-1]
+        self._built = False
+        for pattern in patterns:
+            self.add(pattern)
+        self.build()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def add(self, pattern: str):
+        """添加模式串。添加后需调用 build() 才能生效。空串会被忽略。"""
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(-1)
+            node = nxt
+        if self._out[node] == -1:
+            self._out[node] = len(self.patterns)
+            self.patterns.append(pattern)
+        self._built = False
+
+    def build(self):
+        """按广度优先计算失败指针，并把后缀节点的输出合并到当前节点。"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                if out[child] == -1:
+                    out[child] = out[fail[child]]
+                queue.append(child)
+        self._built = True
+
+    def finditer(self, text: str) -> Iterator[tuple[int, str]]:
+        """依次产出 (结束位置, 模式串)。同一位置结束的多个模式串只产出最长的一个。"""
+        if not self._built:
+            self.build()
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node] != -1:
+                yield i + 1, patterns[out[node]]
+
+    def search(self, text: str) -> str | None:
+        """返回文本中最先出现（结束位置最早）的模式串，未命中时返回 None。"""
+        for _, pattern in self.finditer(text):
+            return pattern
+        return None
@@ -1,4 +1,6 @@
+import asyncio
 import base64
+import hashlib
 import logging
 import os
 import shutil
@@ -7,8 +9,11 @@ import ssl
 import time
 import uuid
 import zipfile
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
 from pathlib import Path
 
+import aiofiles
 import aiohttp
 import certifi
 import psutil
@@ -51,16 +56,8 @@ def port_checker(port: int, host: str = "localhost"):
 
 def save_temp_img(img: Image.Image | str) -> str:
     temp_dir = os.path.join(get_astrbot_data_path(), "temp")
-    # 获得文件创建时间，清除超过 12 小时的
-    try:
-        for f in os.listdir(temp_dir):
-            path = os.path.join(temp_dir, f)
-            if os.path.isfile(path):
-                ctime = os.path.getctime(path)
-                if time.time() - ctime > 3600 * 12:
-                    os.remove(path)
-    except Exception as e:
-        print(f"清除临时文件失败: {e}")
+    # 过期临时文件由 temp_janitor 定期清理
+    temp_janitor.ensure_started()
 
     # 获得时间戳
     timestamp = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
@@ -74,138 +71,460 @@ def save_temp_img(img: Image.Image | str) -> str:
     return p
 
 
+TEMP_MAX_AGE = 3600 * 12
+TEMP_MAX_BYTES = 2 * 1024 * 1024 * 1024
+TEMP_CLEAN_INTERVAL = 600
+
+
+class TempFileJanitor:
+    """定期清理 data/temp 下的临时文件。
+
+    每 `interval` 秒扫描一次 temp 目录的顶层文件（子目录如媒体缓存自行管理），
+    删除超过 `max_age` 的文件；总大小仍超过 `max_bytes` 时从最旧的文件开始删除。
+    """
+
+    def __init__(
+        self,
+        temp_dir: str | None = None,
+        max_age: float = TEMP_MAX_AGE,
+        max_bytes: int = TEMP_MAX_BYTES,
+        interval: float = TEMP_CLEAN_INTERVAL,
+    ):
+        self.temp_dir = temp_dir or os.path.join(get_astrbot_data_path(), "temp")
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def ensure_started(self) -> None:
+        task = self._task
+        if task is not None and not task.done():
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(
+                self._loop(),
+                name="temp_janitor",
+            )
+        except RuntimeError:
+            # 没有运行中的事件循环（如在渲染线程中），留到下一次调用时启动
+            pass
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.clean)
+                if removed:
+                    logger.debug(f"已清理 {removed} 个临时文件")
+            except Exception as e:
+                logger.warning(f"清除临时文件失败: {e}")
+            await asyncio.sleep(self.interval)
+
+    def clean(self) -> int:
+        """执行一次清理，返回删除的文件数。"""
+        now = time.time()
+        files = []
+        total = 0
+        with os.scandir(self.temp_dir) as it:
+            for entry in it:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                files.append((stat.st_mtime, entry.path, stat.st_size))
+                total += stat.st_size
+        files.sort()
+        victims = []
+        for mtime, path, size in files:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            victims.append(path)
+            total -= size
+        _remove_files(victims)
+        return len(victims)
+
+    async def stop(self) -> None:
+        task = self._task
+        self._task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MEDIA_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+MEDIA_CACHE_MAX_AGE = 3600 * 12
+MEDIA_CACHE_EVICT_INTERVAL = 60
+MEDIA_URL_TTL = 300
+"""同一 URL 复用已下载内容的时间（秒），从下载时起算。响应的 Cache-Control 优先"""
+
+
+def _url_cache_ttl(headers) -> float:
+    """根据响应的 Cache-Control 计算 URL 下载结果可复用的时间（秒）"""
+    directives = [
+        d.strip() for d in headers.get("Cache-Control", "").lower().split(",")
+    ]
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    for directive in directives:
+        if directive.startswith("max-age="):
+            try:
+                return min(float(directive[8:]), MEDIA_CACHE_MAX_AGE)
+            except ValueError:
+                break
+    return MEDIA_URL_TTL
+
+
+class MediaCache:
+    """按内容寻址的媒体下载缓存。
+
+    消息组件中的图片、语音、视频 URL 往往会被多次解析：`convert_to_file_path`、`convert_to_base64`、
+    每轮请求的 `assemble_context` 以及长期记忆的图片转述都会重新下载同一个 URL。
+
+    - 所有下载共用一个带连接池的 aiohttp 会话；
+    - 同一 URL 的并发请求只会发起一次下载，下载结果在 Cache-Control 允许的时间内
+      （默认 MEDIA_URL_TTL，从下载时起算）复用，过期后重新下载，随机图片等动态内容不会一直返回旧内容；
+    - 下载内容以流式异步写入，并按内容的 SHA-256 命名，相同内容只保存一份；
+    - 缓存目录 (data/temp/media_cache) 按总大小和最近访问时间淘汰。
+
+    返回的缓存文件可能同时被多处使用，调用方不应修改或删除，可用 `owns` 判断。
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = None,
+        max_bytes: int = MEDIA_CACHE_MAX_BYTES,
+        max_age: float = MEDIA_CACHE_MAX_AGE,
+        connection_limit: int = 64,
+    ):
+        self.cache_dir = cache_dir or os.path.join(
+            get_astrbot_data_path(),
+            "temp",
+            "media_cache",
+        )
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.connection_limit = connection_limit
+
+        self._session: aiohttp.ClientSession | None = None
+        self._session_loop: asyncio.AbstractEventLoop | None = None
+        self._inflight: dict[tuple[str, str], asyncio.Future] = {}
+        self._url_index: dict[tuple[str, str], tuple[str, float]] = {}
+        """(URL, 后缀) -> (缓存文件路径, 过期时间)"""
+        self._entries: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        """缓存文件路径 -> (大小, 最近访问时间)，按访问顺序排列"""
+        self._total_bytes = 0
+        self._scanned = False
+        self._scanning: asyncio.Future | None = None
+        self._last_evict = 0.0
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取共享的 aiohttp 会话。会话与事件循环绑定，循环变化时重新创建。"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            ssl_context = ssl.create_default_context(cafile=certifi.where())
+            self._session = aiohttp.ClientSession(
+                trust_env=True,
+                connector=aiohttp.TCPConnector(
+                    ssl=ssl_context,
+                    limit=self.connection_limit,
+                ),
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def stream_to_file(
+        self,
+        url: str,
+        path: str,
+        method: str = "GET",
+        json: dict | None = None,
+        timeout: float | None = None,
+        on_progress: Callable[[int, int], None] | None = None,
+        on_headers: Callable[[Mapping[str, str]], None] | None = None,
+    ) -> str:
+        """下载 URL 到指定路径，返回内容的 SHA-256。证书验证失败时关闭验证重试一次。
+
+        Args:
+            on_progress: 每写入一块数据后调用，参数为 (已下载字节数, Content-Length)
+            on_headers: 收到成功的响应后以响应头调用
+        """
+        kwargs = {"json": json, "on_progress": on_progress, "on_headers": on_headers}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+        try:
+            return await self._stream_to_file(url, path, method, **kwargs)
+        except (
+            aiohttp.ClientConnectorSSLError,
+            aiohttp.ClientConnectorCertificateError,
+        ):
+            # 关闭SSL验证（仅在证书验证失败时作为fallback）
+            logger.warning(
+                f"SSL certificate verification failed for {url}. "
+                "Disabling SSL verification (CERT_NONE) as a fallback. "
+                "This is insecure and exposes the application to man-in-the-middle attacks. "
+                "Please investigate and resolve certificate issues."
+            )
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+            return await self._stream_to_file(
+                url,
+                path,
+                method,
+                ssl=ssl_context,
+                **kwargs,
+            )
+
+    async def _stream_to_file(
+        self,
+        url: str,
+        path: str,
+        method: str,
+        on_progress: Callable[[int, int], None] | None = None,
+        on_headers: Callable[[Mapping[str, str]], None] | None = None,
+        **kwargs,
+    ) -> str:
+        hasher = hashlib.sha256()
+        session = self.get_session()
+        async with session.request(method, url, **kwargs) as resp:
+            if resp.status >= 400:
+                raise Exception(f"下载文件失败: {resp.status}")
+            if on_headers:
+                on_headers(resp.headers)
+            total_size = int(resp.headers.get("content-length", 0))
+            downloaded_size = 0
+            async with aiofiles.open(path, "wb") as f:
+                async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    hasher.update(chunk)
+                    await f.write(chunk)
+                    downloaded_size += len(chunk)
+                    if on_progress:
+                        on_progress(downloaded_size, total_size)
+        return hasher.hexdigest()
+
+    async def fetch(self, url: str, suffix: str = ".jpg") -> str:
+        """获取 URL 对应的本地缓存文件路径，未缓存时下载。"""
+        key = (url, suffix)
+        entry = self._url_index.get(key)
+        if entry and entry[1] > time.time() and self._touch(entry[0]):
+            return entry[0]
+
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._download(key))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # 单个等待方被取消时不影响其他等待方
+        return await asyncio.shield(fut)
+
+    async def _download(self, key: tuple[str, str]) -> str:
+        url, suffix = key
+        await self._ensure_scanned()
+        tmp_path = os.path.join(self.cache_dir, f".{uuid.uuid4().hex}.part")
+        ttl = MEDIA_URL_TTL
+
+        def on_headers(headers: Mapping[str, str]) -> None:
+            nonlocal ttl
+            ttl = _url_cache_ttl(headers)
+
+        try:
+            digest = await self.stream_to_file(url, tmp_path, on_headers=on_headers)
+            path = self._commit(tmp_path, digest, suffix)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        if ttl > 0:
+            self._url_index[key] = (path, time.time() + ttl)
+        else:
+            self._url_index.pop(key, None)
+        await self._maybe_evict()
+        return path
+
+    async def save_bytes(self, data: bytes, suffix: str = ".jpg") -> str:
+        """将内存中的数据保存到缓存目录，相同内容返回同一路径。"""
+        await self._ensure_scanned()
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.cache_dir, f"{digest}{suffix}")
+        if self._touch(path):
+            return path
+        tmp_path = os.path.join(self.cache_dir, f".{uuid.uuid4().hex}.part")
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                await f.write(data)
+            path = self._commit(tmp_path, digest, suffix)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        await self._maybe_evict()
+        return path
+
+    def _commit(self, tmp_path: str, digest: str, suffix: str) -> str:
+        path = os.path.join(self.cache_dir, f"{digest}{suffix}")
+        if self._touch(path):
+            return path
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        self._entries[path] = (size, time.time())
+        self._total_bytes += size
+        return path
+
+    def _touch(self, path: str) -> bool:
+        """更新缓存项的访问时间。文件已被外部删除时移除该项并返回 False。"""
+        entry = self._entries.get(path)
+        if entry is None:
+            return False
+        if not os.path.exists(path):
+            self._drop(path)
+            return False
+        self._entries[path] = (entry[0], time.time())
+        self._entries.move_to_end(path)
+        return True
+
+    def _drop(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry:
+            self._total_bytes -= entry[0]
+
+    def owns(self, path: str) -> bool:
+        """路径是否为缓存文件。"""
+        cache_dir = os.path.abspath(self.cache_dir)
+        try:
+            return os.path.commonpath([os.path.abspath(path), cache_dir]) == cache_dir
+        except ValueError:
+            return False
+
+    async def _ensure_scanned(self) -> None:
+        if self._scanned:
+            return
+        # 首次使用时的并发调用共同等待同一次扫描，扫描完成（缓存目录已创建）后才标记
+        if self._scanning is None:
+            self._scanning = asyncio.ensure_future(asyncio.to_thread(self._scan))
+        try:
+            await asyncio.shield(self._scanning)
+        except Exception:
+            self._scanning = None
+            raise
+        self._scanned = True
+
+    def _scan(self) -> None:
+        """载入上次运行留下的缓存文件，并清理未完成的下载。"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isfile(path):
+                continue
+            if name.endswith(".part"):
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, path, stat.st_size))
+        for mtime, path, size in sorted(entries):
+            if path not in self._entries:
+                self._entries[path] = (size, mtime)
+                self._total_bytes += size
+
+    async def _maybe_evict(self) -> None:
+        now = time.time()
+        if (
+            self._total_bytes <= self.max_bytes
+            and now - self._last_evict < MEDIA_CACHE_EVICT_INTERVAL
+        ):
+            return
+        self._last_evict = now
+        victims = []
+        for path, (size, accessed) in self._entries.items():
+            if self._total_bytes <= self.max_bytes and now - accessed <= self.max_age:
+                break
+            victims.append(path)
+            self._total_bytes -= size
+        for path in victims:
+            del self._entries[path]
+        self._url_index = {
+            k: v
+            for k, v in self._url_index.items()
+            if v[0] in self._entries and v[1] > now
+        }
+        if victims:
+            await asyncio.to_thread(_remove_files, victims)
+
+
+def _remove_files(paths: list[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"清除文件 {path} 失败: {e}")
+
+
+media_cache = MediaCache()
+temp_janitor = TempFileJanitor()
+
+
 async def download_image_by_url(
     url: str,
     post: bool = False,
     post_data: dict | None = None,
     path: str | None = None,
 ) -> str:
-    """下载图片, 返回 path"""
-    try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where(),
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)  # 使用 certifi 的根证书
-        async with aiohttp.ClientSession(
-            trust_env=True,
-            connector=connector,
-        ) as session:
-            if post:
-                async with session.post(url, json=post_data) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
-            else:
-                async with session.get(url) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
-    except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
-        # 关闭SSL验证（仅在证书验证失败时作为fallback）
-        logger.warning(
-            f"SSL certificate verification failed for {url}. "
-            "Disabling SSL verification (CERT_NONE) as a fallback. "
-            "This is insecure and exposes the application to man-in-the-middle attacks. "
-            "Please investigate and resolve certificate issues."
-        )
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        async with aiohttp.ClientSession() as session:
-            if post:
-                async with session.post(url, json=post_data, ssl=ssl_context) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
-            else:
-                async with session.get(url, ssl=ssl_context) as resp:
-                    if not path:
-                        return save_temp_img(await resp.read())
-                    with open(path, "wb") as f:
-                        f.write(await resp.read())
-                    return path
-    except Exception as e:
-        raise e
+    """下载图片, 返回 path
+
+    未指定 path 的 GET 请求经由媒体缓存，同一 URL 只会下载一次，返回的文件不应被修改。
+    """
+    if not post and not path:
+        return await media_cache.fetch(url)
+    if not path:
+        temp_dir = os.path.join(get_astrbot_data_path(), "temp")
+        path = os.path.join(temp_dir, f"{int(time.time())}_{uuid.uuid4().hex[:8]}.jpg")
+    await media_cache.stream_to_file(
+        url,
+        path,
+        method="POST" if post else "GET",
+        json=post_data if post else None,
+    )
+    return path
 
 
 async def download_file(url: str, path: str, show_progress: bool = False):
     """从指定 url 下载文件到指定路径 path"""
-    try:
-        ssl_context = ssl.create_default_context(
-            cafile=certifi.where(),
-        )  # 使用 certifi 提供的 CA 证书
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(
-            trust_env=True,
-            connector=connector,
-        ) as session:
-            async with session.get(url, timeout=1800) as resp:
-                if resp.status != 200:
-                    raise Exception(f"下载文件失败: {resp.status}")
-                total_size = int(resp.headers.get("content-length", 0))
-                downloaded_size = 0
-                start_time = time.time()
-                if show_progress:
-                    print(f"文件大小: {total_size / 1024:.2f} KB | 文件地址: {url}")
-                with open(path, "wb") as f:
-                    while True:
-                        chunk = await resp.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if show_progress:
-                            elapsed_time = (
-                                time.time() - start_time
-                                if time.time() - start_time > 0
-                                else 1
-                            )
-                            speed = downloaded_size / 1024 / elapsed_time  # KB/s
-                            print(
-                                f"\r下载进度: {downloaded_size / total_size:.2%} 速度: {speed:.2f} KB/s",
-                                end="",
-                            )
-    except (aiohttp.ClientConnectorSSLError, aiohttp.ClientConnectorCertificateError):
-        # 关闭SSL验证（仅在证书验证失败时作为fallback）
-        logger.warning(
-            "SSL 证书验证失败，已关闭 SSL 验证（不安全，仅用于临时下载）。请检查目标服务器的证书配置。"
-        )
-        logger.warning(
-            f"SSL certificate verification failed for {url}. "
-            "Falling back to unverified connection (CERT_NONE). "
-            "This is insecure and exposes the application to man-in-the-middle attacks. "
-            "Please investigate certificate issues with the remote server."
-        )
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, ssl=ssl_context, timeout=120) as resp:
-                total_size = int(resp.headers.get("content-length", 0))
-                downloaded_size = 0
-                start_time = time.time()
-                if show_progress:
-                    print(f"文件大小: {total_size / 1024:.2f} KB | 文件地址: {url}")
-                with open(path, "wb") as f:
-                    while True:
-                        chunk = await resp.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        if show_progress:
-                            elapsed_time = time.time() - start_time
-                            speed = downloaded_size / 1024 / elapsed_time  # KB/s
-                            print(
-                                f"\r下载进度: {downloaded_size / total_size:.2%} 速度: {speed:.2f} KB/s",
-                                end="",
-                            )
+    on_progress = None
+    if show_progress:
+        start_time = time.time()
+        announced = False
+
+        def on_progress(downloaded_size: int, total_size: int):
+            nonlocal announced
+            if not announced:
+                announced = True
+                print(f"文件大小: {total_size / 1024:.2f} KB | 文件地址: {url}")
+            elapsed_time = max(time.time() - start_time, 1e-3)
+            speed = downloaded_size / 1024 / elapsed_time  # KB/s
+            progress = downloaded_size / total_size if total_size else 0
+            print(
+                f"\r下载进度: {progress:.2%} 速度: {speed:.2f} KB/s",
+                end="",
+            )
+
+    await media_cache.stream_to_file(
+        url,
+        path,
+        timeout=1800,
+        on_progress=on_progress,
+    )
     if show_progress:
         print()
 
@@ -1,16 +1,36 @@
+import asyncio
 import os
 import socket
 import sys
 import uuid
+from datetime import datetime
 
 import aiohttp
 
 from astrbot.core import db_helper, logger
 from astrbot.core.config import VERSION
 
+TICKSTATS_URL = "https://tickstats.soulter.top/api/metric/90a6c2a1"
+
 
 class Metric:
+    """指标收集。
+
+    `upload()` 只在内存中累加：平台消息统计按 (小时, platform_id, platform_type) 聚合，
+    每 `stats_flush_interval` 秒用一个事务批量写入数据库；遥测指标按除计数字段外的内容合并，
+    每 `telemetry_flush_interval` 秒通过共享的 HTTP 会话上报一次。关闭时调用 `shutdown()` 写入剩余数据。
+    """
+
     _iid_cache = None
+    _hostname_cache = None
+
+    stats_flush_interval = 10
+    telemetry_flush_interval = 60
+
+    _pending_stats: dict[tuple[datetime, str, str], int] = {}
+    _pending_telemetry: dict[tuple, dict] = {}
+    _flush_task: asyncio.Task | None = None
+    _session: aiohttp.ClientSession | None = None
 
     @staticmethod
     def get_installation_id():
@@ -39,37 +59,130 @@ class Metric:
             Metric._iid_cache = "null"
             return "null"
 
+    @staticmethod
+    def get_hostname():
+        if Metric._hostname_cache is None:
+            try:
+                Metric._hostname_cache = socket.gethostname()
+            except Exception:
+                Metric._hostname_cache = ""
+        return Metric._hostname_cache
+
     @staticmethod
     async def upload(**kwargs):
         """上传相关非敏感的指标以更好地了解 AstrBot 的使用情况。上传的指标不会包含任何有关消息文本、用户信息等敏感信息。
 
+        指标会先在内存中聚合，之后批量写入数据库和上报。
+
         Powered by TickStats.
         """
-        base_url = "https://tickstats.soulter.top/api/metric/90a6c2a1"
-        kwargs["v"] = VERSION
-        kwargs["os"] = sys.platform
-        payload = {"metrics_data": kwargs}
-        try:
-            kwargs["hn"] = socket.gethostname()
-        except Exception:
-            pass
+        if "adapter_name" in kwargs:
+            timestamp = datetime.now().replace(minute=0, second=0, microsecond=0)
+            key = (
+                timestamp,
+                kwargs["adapter_name"],
+                kwargs.get("adapter_type", "unknown"),
+            )
+            Metric._pending_stats[key] = Metric._pending_stats.get(key, 0) + 1
+
+        # 计数字段（*_tick）累加，其余字段相同的指标合并为一条
+        ticks = {k: v for k, v in kwargs.items() if k.endswith("_tick")}
+        attrs = tuple(
+            sorted((k, str(v)) for k, v in kwargs.items() if k not in ticks),
+        )
+        merged = Metric._pending_telemetry.get(attrs)
+        if merged is None:
+            Metric._pending_telemetry[attrs] = dict(kwargs)
+        else:
+            for k, v in ticks.items():
+                merged[k] = merged.get(k, 0) + v
+
+        Metric._ensure_flush_task()
+
+    @staticmethod
+    def _ensure_flush_task():
+        task = Metric._flush_task
+        if task is not None and not task.done():
+            return
         try:
-            kwargs["iid"] = Metric.get_installation_id()
-        except Exception:
+            Metric._flush_task = asyncio.get_running_loop().create_task(
+                Metric._flush_loop(),
+                name="metric_flush",
+            )
+        except RuntimeError:
+            # 没有运行中的事件循环，留到下一次 upload 或 shutdown 时写入
             pass
+
+    @staticmethod
+    async def _flush_loop():
+        elapsed = 0
+        while True:
+            await asyncio.sleep(Metric.stats_flush_interval)
+            elapsed += Metric.stats_flush_interval
+            await Metric.flush_stats()
+            if elapsed >= Metric.telemetry_flush_interval:
+                elapsed = 0
+                await Metric.flush_telemetry()
+
+    @staticmethod
+    async def flush_stats():
+        """将累积的平台消息统计批量写入数据库。"""
+        if not Metric._pending_stats:
+            return
+        pending, Metric._pending_stats = Metric._pending_stats, {}
         try:
-            if "adapter_name" in kwargs:
-                await db_helper.insert_platform_stats(
-                    platform_id=kwargs["adapter_name"],
-                    platform_type=kwargs.get("adapter_type", "unknown"),
-                )
+            await db_helper.insert_platform_stats_batch(
+                [
+                    (ts, pid, ptype, count)
+                    for (ts, pid, ptype), count in pending.items()
+                ],
+            )
         except Exception as e:
             logger.error(f"保存指标到数据库失败: {e}")
 
+    @staticmethod
+    async def flush_telemetry():
+        """上报累积的遥测指标。"""
+        if not Metric._pending_telemetry:
+            return
+        pending, Metric._pending_telemetry = Metric._pending_telemetry, {}
+        if Metric._session is None or Metric._session.closed:
+            Metric._session = aiohttp.ClientSession(trust_env=True)
+
+        hostname = Metric.get_hostname()
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.post(base_url, json=payload, timeout=3) as response:
+            iid = Metric.get_installation_id()
+        except Exception:
+            iid = "null"
+        for metrics_data in pending.values():
+            metrics_data["v"] = VERSION
+            metrics_data["os"] = sys.platform
+            metrics_data["hn"] = hostname
+            metrics_data["iid"] = iid
+            try:
+                async with Metric._session.post(
+                    TICKSTATS_URL,
+                    json={"metrics_data": metrics_data},
+                    timeout=aiohttp.ClientTimeout(total=3),
+                ) as response:
                     if response.status != 200:
                         pass
-        except Exception:
-            pass
+            except Exception:
+                pass
+
+    @staticmethod
+    async def shutdown():
+        """停止定时写入，并写入、上报所有剩余的指标。"""
+        task = Metric._flush_task
+        Metric._flush_task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await Metric.flush_stats()
+        await Metric.flush_telemetry()
+        if Metric._session is not None and not Metric._session.closed:
+            await Metric._session.close()
+        Metric._session = None
@@ -1,6 +1,8 @@
 import asyncio
+import copy
 import os
 import threading
+from collections import OrderedDict
 from typing import Any, TypeVar, overload
 
 from astrbot.core.db import BaseDatabase
@@ -9,10 +11,116 @@ from astrbot.core.db.po import Preference
 from .astrbot_path import get_astrbot_data_path
 
 _VT = TypeVar("_VT")
+_MISSING = object()
+
+DEFAULT_UMO_CACHE_SIZE = 4096
+"""umo 范围下最多缓存的会话数量"""
+
+
+class _PreferenceCache:
+    """偏好设置的进程内写穿缓存。
+
+    以 (scope, scope_id) 为单位缓存该范围下的全部键值，因此一个已缓存范围中查不到的键即表示数据库中不存在。
+    umo 范围的条目数量与会话数量成正比，使用有界 LRU；其余范围数量很少，不做淘汰。
+    umo 范围全部载入后，未命中即表示该会话没有偏好设置；一旦有会话被淘汰，该范围不再视为全部载入，
+    未命中的会话需要重新从数据库读取（事件处理流程会先通过 `SharedPreferences.preload()` 异步载入）。
+    缓存会被主事件循环和同步接口使用的后台事件循环同时访问，所有操作都在锁内完成。
+    """
+
+    def __init__(self, umo_max_size: int = DEFAULT_UMO_CACHE_SIZE):
+        self.umo_max_size = umo_max_size
+        self._lock = threading.RLock()
+        self._scopes: dict[tuple[str, str], dict[str, Any]] = {}
+        self._umo: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._complete_scopes: set[str] = set()
+        """整个 scope 都已载入缓存，未命中的 scope_id 即表示没有任何偏好设置"""
+        self._generations: dict[tuple[str, str], int] = {}
+
+    def lookup(self, scope: str, scope_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            if scope == "umo":
+                entries = self._umo.get(scope_id)
+                if entries is not None:
+                    self._umo.move_to_end(scope_id)
+            else:
+                entries = self._scopes.get((scope, scope_id))
+            if entries is None and scope in self._complete_scopes:
+                return {}
+            return entries
+
+    def generation(self, scope: str, scope_id: str) -> int:
+        with self._lock:
+            return self._generations.get((scope, scope_id), 0)
+
+    def fill(
+        self,
+        scope: str,
+        scope_id: str,
+        entries: dict[str, Any],
+        generation: int | None = None,
+    ) -> None:
+        """写入某个范围的完整内容。若读取期间该范围被修改过 (generation 变化)，则放弃写入。"""
+        with self._lock:
+            if generation is not None and generation != self.generation(
+                scope, scope_id
+            ):
+                return
+            self._store(scope, scope_id, entries)
+
+    def set(self, scope: str, scope_id: str, key: str, value: Any) -> None:
+        with self._lock:
+            self._bump(scope, scope_id)
+            entries = self._peek(scope, scope_id)
+            if entries is not None:
+                entries[key] = value
+            elif scope in self._complete_scopes:
+                self._store(scope, scope_id, {key: value})
+
+    def remove(self, scope: str, scope_id: str, key: str) -> None:
+        with self._lock:
+            self._bump(scope, scope_id)
+            entries = self._peek(scope, scope_id)
+            if entries is not None:
+                entries.pop(key, None)
+
+    def clear(self, scope: str, scope_id: str) -> None:
+        with self._lock:
+            self._bump(scope, scope_id)
+            if self._peek(scope, scope_id) is not None:
+                self._store(scope, scope_id, {})
+
+    def mark_complete(self, scope: str) -> None:
+        with self._lock:
+            self._complete_scopes.add(scope)
+
+    def _peek(self, scope: str, scope_id: str) -> dict[str, Any] | None:
+        if scope == "umo":
+            return self._umo.get(scope_id)
+        return self._scopes.get((scope, scope_id))
+
+    def _store(self, scope: str, scope_id: str, entries: dict[str, Any]) -> None:
+        if scope != "umo":
+            self._scopes[(scope, scope_id)] = entries
+            return
+        self._umo[scope_id] = entries
+        self._umo.move_to_end(scope_id)
+        if len(self._umo) > self.umo_max_size:
+            while len(self._umo) > self.umo_max_size:
+                self._umo.popitem(last=False)
+            self._complete_scopes.discard("umo")
+
+    def _bump(self, scope: str, scope_id: str) -> None:
+        key = (scope, scope_id)
+        self._generations[key] = self._generations.get(key, 0) + 1
 
 
 class SharedPreferences:
-    def __init__(self, db_helper: BaseDatabase, json_storage_path=None):
+    def __init__(
+        self,
+        db_helper: BaseDatabase,
+        json_storage_path=None,
+        umo_cache_size: int = DEFAULT_UMO_CACHE_SIZE,
+    ):
         if json_storage_path is None:
             json_storage_path = os.path.join(
                 get_astrbot_data_path(),
@@ -20,11 +128,61 @@ class SharedPreferences:
             )
         self.path = json_storage_path
         self.db_helper = db_helper
+        self._cache = _PreferenceCache(umo_max_size=umo_cache_size)
 
         self._sync_loop = asyncio.new_event_loop()
         t = threading.Thread(target=self._sync_loop.run_forever, daemon=True)
         t.start()
 
+    async def initialize(self):
+        """预热偏好设置缓存。在数据库初始化之后调用。
+
+        global 与 umo 范围全部载入，此后同步接口 `get()` 的查询无需在事件循环上等待数据库。
+        会话数超出 umo 缓存上限时，umo 范围不再视为全部载入，会话在下次访问时由 `preload()` 异步载入。
+        """
+        for scope in ("global", "umo"):
+            prefs = await self.db_helper.get_preferences(scope)
+            grouped: dict[str, dict[str, Any]] = {}
+            for pref in prefs:
+                grouped.setdefault(pref.scope_id, {})[pref.key] = pref.value.get("val")
+            for scope_id, entries in grouped.items():
+                self._cache.fill(scope, scope_id, entries)
+            if scope != "umo" or len(grouped) <= self._cache.umo_max_size:
+                self._cache.mark_complete(scope)
+
+    async def _load_scope(self, scope: str, scope_id: str) -> dict[str, Any]:
+        entries = self._cache.lookup(scope, scope_id)
+        if entries is not None:
+            return entries
+        generation = self._cache.generation(scope, scope_id)
+        prefs = await self.db_helper.get_preferences(scope, scope_id)
+        entries = {pref.key: pref.value.get("val") for pref in prefs}
+        self._cache.fill(scope, scope_id, entries, generation)
+        return entries
+
+    async def preload(self, scope: str, scope_id: str) -> None:
+        """确保某个范围已在缓存中，之后同一范围的同步 `get()` 不会阻塞事件循环。"""
+        await self._load_scope(scope, scope_id)
+
+    def _get_cached(
+        self,
+        scope: str,
+        scope_id: str,
+        key: str,
+        default: Any = _MISSING,
+    ) -> Any:
+        """仅从缓存中获取偏好设置，不访问数据库。
+
+        若该范围尚未被缓存，返回 `_MISSING` 哨兵对象 (而不是 default)，以便调用方区分“不存在”和“未缓存”。
+        """
+        entries = self._cache.lookup(scope, scope_id)
+        if entries is None:
+            return _MISSING
+        value = entries.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        return copy.deepcopy(value)
+
     async def get_async(
         self,
         scope: str,
@@ -34,12 +192,10 @@ class SharedPreferences:
     ) -> _VT:
         """获取指定范围和键的偏好设置"""
         if scope_id is not None and key is not None:
-            result = await self.db_helper.get_preference(scope, scope_id, key)
-            if result:
-                ret = result.value["val"]
-            else:
-                ret = default
-            return ret
+            entries = await self._load_scope(scope, scope_id)
+            if key not in entries:
+                return default
+            return copy.deepcopy(entries[key])
         raise ValueError(
             "scope_id and key cannot be None when getting a specific preference.",
         )
@@ -121,6 +277,7 @@ class SharedPreferences:
             key,
             {"val": value},
         )
+        self._cache.set(scope, scope_id, key, copy.deepcopy(value))
 
     async def session_put(self, umo: str, key: str, value: Any):
         await self.put_async("umo", umo, key, value)
@@ -131,6 +288,7 @@ class SharedPreferences:
     async def remove_async(self, scope: str, scope_id: str, key: str):
         """删除指定范围和键的偏好设置"""
         await self.db_helper.remove_preference(scope, scope_id, key)
+        self._cache.remove(scope, scope_id, key)
 
     async def session_remove(self, umo: str, key: str):
         await self.remove_async("umo", umo, key)
@@ -142,6 +300,7 @@ class SharedPreferences:
     async def clear_async(self, scope: str, scope_id: str):
         """清空指定范围的所有偏好设置"""
         await self.db_helper.clear_preferences(scope, scope_id)
+        self._cache.clear(scope, scope_id)
 
     # ====
     # DEPRECATED METHODS
@@ -154,7 +313,11 @@ class SharedPreferences:
         scope: str | None = None,
         scope_id: str | None = "",
     ) -> _VT:
-        """获取偏好设置（已弃用）"""
+        """获取偏好设置（已弃用）
+
+        命中缓存时直接返回，不会阻塞事件循环；仅在缓存未命中时才通过后台事件循环读取数据库。
+        启动时会预热缓存，事件处理流程也会先调用 `preload()`，在事件循环上调用时一般不会未命中。
+        """
         if scope_id == "":
             scope_id = "unknown"
         if scope_id is None or key is None:
@@ -162,10 +325,14 @@ class SharedPreferences:
             raise ValueError(
                 "scope_id and key cannot be None when getting a specific preference.",
             )
-        result = asyncio.run_coroutine_threadsafe(
-            self.get_async(scope or "unknown", scope_id or "unknown", key, default),
-            self._sync_loop,
-        ).result()
+        scope = scope or "unknown"
+        scope_id = scope_id or "unknown"
+        result = self._get_cached(scope, scope_id, key, default)
+        if result is _MISSING:
+            result = asyncio.run_coroutine_threadsafe(
+                self.get_async(scope, scope_id, key, default),
+                self._sync_loop,
+            ).result()
 
         return result if result is not None else default
 
@@ -1,3 +1,4 @@
+import asyncio
 import re
 import os
 import aiohttp
@@ -6,6 +7,7 @@ import certifi
 from io import BytesIO
 from typing import List, Tuple
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from astrbot.core.config import VERSION
 
 from . import RenderStrategy
@@ -14,10 +16,29 @@ from astrbot.core.utils.io import save_temp_img
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 
 
+# FreeType 字体对象不是线程安全的，所有本地渲染在同一个线程中依次执行
+_render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="t2i_local")
+
+
 class FontManager:
     """字体管理类，负责加载和缓存字体"""
 
     _font_cache = {}
+    _style_font_cache = {}
+
+    # 粗体、斜体字体列表，找不到时由调用方模拟
+    STYLE_FONTS = {
+        "bold": [
+            "msyhbd.ttc",  # 微软雅黑粗体 (Windows)
+            "Arial-Bold.ttf",  # Arial粗体
+            "DejaVuSans-Bold.ttf",  # Linux粗体
+        ],
+        "italic": [
+            "msyhi.ttc",  # 微软雅黑斜体 (Windows)
+            "Arial-Italic.ttf",  # Arial斜体
+            "DejaVuSans-Oblique.ttf",  # Linux斜体
+        ],
+    }
 
     @classmethod
     def get_font(cls, size: int) -> ImageFont.FreeTypeFont:
@@ -55,16 +76,40 @@ class FontManager:
 
         # 如果所有字体都失败，使用默认字体
         try:
+            # Pillow 10.1 起默认字体支持指定大小
+            default_font = ImageFont.load_default(size)
+        except TypeError:
             default_font = ImageFont.load_default()
-            # PIL默认字体大小固定，这里不缓存
-            return default_font
         except Exception:
             raise RuntimeError("无法加载任何字体")
+        # 同样缓存，避免每次都重新查找上面的字体文件
+        cls._font_cache[size] = default_font
+        return default_font
+
+    @classmethod
+    def get_style_font(cls, style: str, size: int) -> ImageFont.FreeTypeFont | None:
+        """获取粗体/斜体字体，没有对应字体时返回 None。结果（包括未找到）会被缓存。"""
+        key = (style, size)
+        if key in cls._style_font_cache:
+            return cls._style_font_cache[key]
+
+        font = None
+        for font_name in cls.STYLE_FONTS.get(style, []):
+            try:
+                font = ImageFont.truetype(font_name, size)
+                break
+            except Exception:
+                continue
+        cls._style_font_cache[key] = font
+        return font
 
 
 class TextMeasurer:
     """测量文本尺寸的工具类"""
 
+    # 字体 -> {字符: 前进宽度}
+    _advance_cache = {}
+
     @staticmethod
     def get_text_size(text: str, font: ImageFont.FreeTypeFont) -> Tuple[int, int]:
         """获取文本的尺寸"""
@@ -79,35 +124,51 @@ class TextMeasurer:
             # 兼容旧版本
             return font.getsize(text)
 
-    @staticmethod
+    @classmethod
+    def get_advances(cls, font: ImageFont.FreeTypeFont) -> dict:
+        """获取字体的字符宽度表，按需填充"""
+        advances = cls._advance_cache.get(font)
+        if advances is None:
+            advances = cls._advance_cache[font] = {}
+        return advances
+
+    @classmethod
+    def char_width(cls, char: str, font: ImageFont.FreeTypeFont) -> float:
+        advances = cls.get_advances(font)
+        width = advances.get(char)
+        if width is None:
+            if hasattr(font, "getlength"):
+                width = font.getlength(char)
+            else:
+                width = cls.get_text_size(char, font)[0]
+            advances[char] = width
+        return width
+
+    @classmethod
     def split_text_to_fit_width(
-        text: str, font: ImageFont.FreeTypeFont, max_width: int
+        cls, text: str, font: ImageFont.FreeTypeFont, max_width: int
     ) -> List[str]:
-        """将文本拆分为多行，确保每行不超过指定宽度"""
+        """将文本拆分为多行，确保每行不超过指定宽度
+
+        逐字累加字符宽度，一次扫描完成换行，字符宽度按字体缓存。
+        """
         lines = []
         if not text:
             return lines
 
-        remaining_text = text
-        while remaining_text:
-            # 如果文本宽度小于最大宽度，直接添加
-            text_width = TextMeasurer.get_text_size(remaining_text, font)[0]
-            if text_width <= max_width:
-                lines.append(remaining_text)
-                break
-
-            # 尝试逐字计算能放入当前行的最多字符
-            for i in range(len(remaining_text), 0, -1):
-                width = TextMeasurer.get_text_size(remaining_text[:i], font)[0]
-                if width <= max_width:
-                    lines.append(remaining_text[:i])
-                    remaining_text = remaining_text[i:]
-                    break
-            else:
-                # 如果单个字符都放不下，强制放一个字符
-                lines.append(remaining_text[0])
-                remaining_text = remaining_text[1:]
-
+        advances = cls.get_advances(font)
+        line_start = 0
+        line_width = 0.0
+        for i, char in enumerate(text):
+            width = advances.get(char)
+            if width is None:
+                width = cls.char_width(char, font)
+            if line_width + width > max_width and i > line_start:
+                lines.append(text[line_start:i])
+                line_start = i
+                line_width = 0.0
+            line_width += width
+        lines.append(text[line_start:])
         return lines
 
 
@@ -116,6 +177,16 @@ class MarkdownElement(ABC):
 
     def __init__(self, content: str):
         self.content = content
+        self._lines_cache = {}
+
+    def wrap(self, font: ImageFont.FreeTypeFont, max_width: int) -> List[str]:
+        """将内容按宽度换行。结果按 (字体, 宽度) 缓存，计算高度与渲染复用同一次排版"""
+        key = (font, max_width)
+        lines = self._lines_cache.get(key)
+        if lines is None:
+            lines = TextMeasurer.split_text_to_fit_width(self.content, font, max_width)
+            self._lines_cache[key] = lines
+        return lines
 
     @abstractmethod
     def calculate_height(self, image_width: int, font_size: int) -> int:
@@ -144,9 +215,7 @@ class TextElement(MarkdownElement):
             return 10  # 空行高度
 
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 20
-        )
+        lines = self.wrap(font, image_width - 20)
         return len(lines) * (font_size + 8)
 
     def render(
@@ -162,9 +231,7 @@ class TextElement(MarkdownElement):
             return y + 10  # 空行
 
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 20
-        )
+        lines = self.wrap(font, image_width - 20)
 
         for line in lines:
             draw.text((x, y), line, font=font, fill=(0, 0, 0))
@@ -177,10 +244,11 @@ class BoldTextElement(MarkdownElement):
     """粗体文本元素"""
 
     def calculate_height(self, image_width: int, font_size: int) -> int:
-        font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 20
+        # 与 render 使用相同的字体换行
+        font = FontManager.get_style_font("bold", font_size) or FontManager.get_font(
+            font_size
         )
+        lines = self.wrap(font, image_width - 20)
         return len(lines) * (font_size + 8)
 
     def render(
@@ -194,33 +262,17 @@ class BoldTextElement(MarkdownElement):
     ) -> int:
         # 尝试使用粗体字体，如果没有则绘制两次模拟粗体效果
         try:
-            bold_fonts = [
-                "msyhbd.ttc",  # 微软雅黑粗体 (Windows)
-                "Arial-Bold.ttf",  # Arial粗体
-                "DejaVuSans-Bold.ttf",  # Linux粗体
-            ]
-
-            bold_font = None
-            for font_name in bold_fonts:
-                try:
-                    bold_font = ImageFont.truetype(font_name, font_size)
-                    break
-                except Exception:
-                    continue
+            bold_font = FontManager.get_style_font("bold", font_size)
 
             if bold_font:
-                lines = TextMeasurer.split_text_to_fit_width(
-                    self.content, bold_font, image_width - 20
-                )
+                lines = self.wrap(bold_font, image_width - 20)
                 for line in lines:
                     draw.text((x, y), line, font=bold_font, fill=(0, 0, 0))
                     y += font_size + 8
             else:
                 # 如果没有粗体字体，则绘制两次文本轻微偏移以模拟粗体
                 font = FontManager.get_font(font_size)
-                lines = TextMeasurer.split_text_to_fit_width(
-                    self.content, font, image_width - 20
-                )
+                lines = self.wrap(font, image_width - 20)
                 for line in lines:
                     draw.text((x, y), line, font=font, fill=(0, 0, 0))
                     draw.text((x + 1, y), line, font=font, fill=(0, 0, 0))
@@ -228,9 +280,7 @@ class BoldTextElement(MarkdownElement):
         except Exception:
             # 兜底方案：使用普通字体
             font = FontManager.get_font(font_size)
-            lines = TextMeasurer.split_text_to_fit_width(
-                self.content, font, image_width - 20
-            )
+            lines = self.wrap(font, image_width - 20)
             for line in lines:
                 draw.text((x, y), line, font=font, fill=(0, 0, 0))
                 y += font_size + 8
@@ -242,10 +292,11 @@ class ItalicTextElement(MarkdownElement):
     """斜体文本元素"""
 
     def calculate_height(self, image_width: int, font_size: int) -> int:
-        font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 20
-        )
+        # 与 render 使用相同的字体换行
+        font = FontManager.get_style_font(
+            "italic", font_size
+        ) or FontManager.get_font(font_size)
+        lines = self.wrap(font, image_width - 20)
         return len(lines) * (font_size + 8)
 
     def render(
@@ -259,33 +310,17 @@ class ItalicTextElement(MarkdownElement):
     ) -> int:
         # 尝试使用斜体字体，如果没有则使用倾斜变换模拟斜体效果
         try:
-            italic_fonts = [
-                "msyhi.ttc",  # 微软雅黑斜体 (Windows)
-                "Arial-Italic.ttf",  # Arial斜体
-                "DejaVuSans-Oblique.ttf",  # Linux斜体
-            ]
-
-            italic_font = None
-            for font_name in italic_fonts:
-                try:
-                    italic_font = ImageFont.truetype(font_name, font_size)
-                    break
-                except Exception:
-                    continue
+            italic_font = FontManager.get_style_font("italic", font_size)
 
             if italic_font:
-                lines = TextMeasurer.split_text_to_fit_width(
-                    self.content, italic_font, image_width - 20
-                )
+                lines = self.wrap(italic_font, image_width - 20)
                 for line in lines:
                     draw.text((x, y), line, font=italic_font, fill=(0, 0, 0))
                     y += font_size + 8
             else:
                 # 如果没有斜体字体，使用变换
                 font = FontManager.get_font(font_size)
-                lines = TextMeasurer.split_text_to_fit_width(
-                    self.content, font, image_width - 20
-                )
+                lines = self.wrap(font, image_width - 20)
 
                 for line in lines:
                     # 先创建一个临时图像用于倾斜处理
@@ -308,9 +343,7 @@ class ItalicTextElement(MarkdownElement):
         except Exception:
             # 兜底方案：使用普通字体
             font = FontManager.get_font(font_size)
-            lines = TextMeasurer.split_text_to_fit_width(
-                self.content, font, image_width - 20
-            )
+            lines = self.wrap(font, image_width - 20)
             for line in lines:
                 draw.text((x, y), line, font=font, fill=(0, 0, 0))
                 y += font_size + 8
@@ -323,9 +356,7 @@ class UnderlineTextElement(MarkdownElement):
 
     def calculate_height(self, image_width: int, font_size: int) -> int:
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 20
-        )
+        lines = self.wrap(font, image_width - 20)
         return len(lines) * (font_size + 8)
 
     def render(
@@ -338,9 +369,7 @@ class UnderlineTextElement(MarkdownElement):
         font_size: int,
     ) -> int:
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 20
-        )
+        lines = self.wrap(font, image_width - 20)
 
         for line in lines:
             # 绘制文本
@@ -363,9 +392,7 @@ class StrikethroughTextElement(MarkdownElement):
 
     def calculate_height(self, image_width: int, font_size: int) -> int:
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 20
-        )
+        lines = self.wrap(font, image_width - 20)
         return len(lines) * (font_size + 8)
 
     def render(
@@ -378,9 +405,7 @@ class StrikethroughTextElement(MarkdownElement):
         font_size: int,
     ) -> int:
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 20
-        )
+        lines = self.wrap(font, image_width - 20)
 
         for line in lines:
             # 绘制文本
@@ -414,9 +439,7 @@ class HeaderElement(MarkdownElement):
     def calculate_height(self, image_width: int, font_size: int) -> int:
         header_font_size = 42 - (self.level - 1) * 4
         font = FontManager.get_font(header_font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 20
-        )
+        lines = self.wrap(font, image_width - 20)
         return len(lines) * header_font_size + 30  # 包含上下间距和分隔线
 
     def render(
@@ -450,9 +473,7 @@ class QuoteElement(MarkdownElement):
 
     def calculate_height(self, image_width: int, font_size: int) -> int:
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 30
-        )  # 左边留出引用线的空间
+        lines = self.wrap(font, image_width - 30)  # 左边留出引用线的空间
         return len(lines) * (font_size + 6) + 12  # 包含上下间距
 
     def render(
@@ -465,9 +486,7 @@ class QuoteElement(MarkdownElement):
         font_size: int,
     ) -> int:
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 30
-        )
+        lines = self.wrap(font, image_width - 30)
 
         total_height = len(lines) * (font_size + 6)
 
@@ -494,9 +513,7 @@ class ListItemElement(MarkdownElement):
 
     def calculate_height(self, image_width: int, font_size: int) -> int:
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 30
-        )  # 左边留出项目符号的空间
+        lines = self.wrap(font, image_width - 30)  # 左边留出项目符号的空间
         return len(lines) * (font_size + 6) + 16  # 包含上下间距
 
     def render(
@@ -509,9 +526,7 @@ class ListItemElement(MarkdownElement):
         font_size: int,
     ) -> int:
         font = FontManager.get_font(font_size)
-        lines = TextMeasurer.split_text_to_fit_width(
-            self.content, font, image_width - 30
-        )
+        lines = self.wrap(font, image_width - 30)
 
         y += 8  # 上间距
 
@@ -535,17 +550,25 @@ class CodeBlockElement(MarkdownElement):
     def __init__(self, content: List[str]):
         super().__init__("\n".join(content))
 
+    def wrap(self, font: ImageFont.FreeTypeFont, max_width: int) -> List[str]:
+        """代码块逐行换行，保留原有的换行"""
+        key = (font, max_width)
+        lines = self._lines_cache.get(key)
+        if lines is None:
+            lines = []
+            for line in self.content.split("\n"):
+                lines.extend(
+                    TextMeasurer.split_text_to_fit_width(line, font, max_width)
+                )
+            self._lines_cache[key] = lines
+        return lines
+
     def calculate_height(self, image_width: int, font_size: int) -> int:
         if not self.content:
             return 40  # 空代码块的最小高度
 
         font = FontManager.get_font(font_size)
-        lines = self.content.split("\n")
-        wrapped_lines = []
-
-        for line in lines:
-            wrapped = TextMeasurer.split_text_to_fit_width(line, font, image_width - 40)
-            wrapped_lines.extend(wrapped)
+        wrapped_lines = self.wrap(font, image_width - 40)
 
         return len(wrapped_lines) * (font_size + 4) + 40  # 包含内边距和上下间距
 
@@ -559,12 +582,7 @@ class CodeBlockElement(MarkdownElement):
         font_size: int,
     ) -> int:
         font = FontManager.get_font(font_size)
-        lines = self.content.split("\n")
-        wrapped_lines = []
-
-        for line in lines:
-            wrapped = TextMeasurer.split_text_to_fit_width(line, font, image_width - 40)
-            wrapped_lines.extend(wrapped)
+        wrapped_lines = self.wrap(font, image_width - 40)
 
         content_height = len(wrapped_lines) * (font_size + 4)
         total_height = content_height + 30  # 包含内边距
@@ -707,6 +725,7 @@ class MarkdownParser:
     @staticmethod
     async def parse(text: str) -> List[MarkdownElement]:
         elements = []
+        image_elements = []
         lines = text.split("\n")
 
         i = 0
@@ -718,7 +737,7 @@ class MarkdownParser:
             if image_match:
                 image_url = image_match.group(2)
                 element = ImageElement(line, image_url)
-                await element.load_image()
+                image_elements.append(element)
                 elements.append(element)
                 i += 1
                 continue
@@ -837,6 +856,10 @@ class MarkdownParser:
             elements.append(TextElement(line))
             i += 1
 
+        # 并发加载所有图片
+        if image_elements:
+            await asyncio.gather(*(element.load_image() for element in image_elements))
+
         return elements
 
 
@@ -857,6 +880,14 @@ class MarkdownRenderer:
         # 解析Markdown文本
         elements = await MarkdownParser.parse(markdown_text)
 
+        # 排版与绘制是 CPU 密集的同步操作，放到渲染线程中执行
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _render_executor, self.draw_elements, elements
+        )
+
+    def draw_elements(self, elements: List[MarkdownElement]) -> Image.Image:
+        """排版并绘制已解析的元素"""
         # 计算总高度
         total_height = 20  # 初始边距
         for element in elements:
@@ -929,4 +960,5 @@ class LocalRenderStrategy(RenderStrategy):
         image = await renderer.render(text)
 
         # 保存图像并返回路径/URL
-        return save_temp_img(image)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_render_executor, save_temp_img, image)
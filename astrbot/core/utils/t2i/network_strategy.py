@@ -1,22 +1,98 @@
 import asyncio
+import hashlib
+import json
 import logging
+import os
 import random
-import ssl
-
-import aiohttp
-import certifi
+import time
+from collections import OrderedDict
 
 from astrbot.core.config import VERSION
-from astrbot.core.utils.io import download_image_by_url
+from astrbot.core.utils.io import download_image_by_url, media_cache
 from astrbot.core.utils.t2i.template_manager import TemplateManager
 
 from . import RenderStrategy
 
 ASTRBOT_T2I_DEFAULT_ENDPOINT = "https://t2i.soulter.top/text2img"
 
+RENDER_CACHE_SIZE = 256
+RENDER_CACHE_TTL = 3600
+"""渲染结果缓存时间（秒）。远程端点返回的图片 URL 可能会过期，因此不宜过长。"""
+
 logger = logging.getLogger("astrbot")
 
 
+class RenderCache:
+    """按 (模板, 模板数据, 渲染选项) 的哈希缓存渲染结果（图片路径或 URL）。
+
+    重复的 /help 输出、插件菜单等固定内容无需重复请求远程渲染。同一内容的并发渲染只请求一次。
+    """
+
+    def __init__(
+        self, max_size: int = RENDER_CACHE_SIZE, ttl: float = RENDER_CACHE_TTL
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(post_data: dict) -> str:
+        raw = json.dumps(post_data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def get(self, key: str) -> str | None:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        # 本地文件可能已被临时文件清理或发送后删除
+        if expires_at <= time.monotonic() or (
+            not result.startswith("http") and not os.path.exists(result)
+        ):
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return result
+
+    async def get_or_render(self, key: str, render) -> str:
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.hits += 1
+            return await asyncio.shield(fut)
+
+        self.misses += 1
+        fut = asyncio.ensure_future(render())
+        self._inflight[key] = fut
+        try:
+            result = await asyncio.shield(fut)
+        finally:
+            self._inflight.pop(key, None)
+        self._cache[key] = (time.monotonic() + self.ttl, result)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def clear(self):
+        self._cache.clear()
+
+
 class NetworkRenderStrategy(RenderStrategy):
     def __init__(self, base_url: str | None = None) -> None:
         super().__init__()
@@ -27,6 +103,7 @@ class NetworkRenderStrategy(RenderStrategy):
 
         self.endpoints = [self.BASE_RENDER_URL]
         self.template_manager = TemplateManager()
+        self.render_cache = RenderCache()
 
     async def initialize(self):
         if self.BASE_RENDER_URL == ASTRBOT_T2I_DEFAULT_ENDPOINT:
@@ -39,21 +116,21 @@ class NetworkRenderStrategy(RenderStrategy):
     async def get_official_endpoints(self):
         """获取官方的 t2i 端点列表。"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    "https://api.soulter.top/astrbot/t2i-endpoints",
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        all_endpoints: list[dict] = data.get("data", [])
-                        self.endpoints = [
-                            ep.get("url")
-                            for ep in all_endpoints
-                            if ep.get("active") and ep.get("url")
-                        ]
-                        logger.info(
-                            f"Successfully got {len(self.endpoints)} official T2I endpoints.",
-                        )
+            session = media_cache.get_session()
+            async with session.get(
+                "https://api.soulter.top/astrbot/t2i-endpoints",
+            ) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    all_endpoints: list[dict] = data.get("data", [])
+                    self.endpoints = [
+                        ep.get("url")
+                        for ep in all_endpoints
+                        if ep.get("active") and ep.get("url")
+                    ]
+                    logger.info(
+                        f"Successfully got {len(self.endpoints)} official T2I endpoints.",
+                    )
         except Exception as e:
             logger.error(f"Failed to get official endpoints: {e}")
 
@@ -82,24 +159,23 @@ class NetworkRenderStrategy(RenderStrategy):
             "options": default_options,
         }
 
+        return await self.render_cache.get_or_render(
+            RenderCache.key(post_data),
+            lambda: self._render_remote(post_data, return_url),
+        )
+
+    async def _render_remote(self, post_data: dict, return_url: bool) -> str:
         endpoints = self.endpoints.copy() if self.endpoints else [self.BASE_RENDER_URL]
         random.shuffle(endpoints)
         last_exception = None
         for endpoint in endpoints:
             try:
                 if return_url:
-                    ssl_context = ssl.create_default_context(cafile=certifi.where())
-                    connector = aiohttp.TCPConnector(ssl=ssl_context)
-                    async with (
-                        aiohttp.ClientSession(
-                            trust_env=True,
-                            connector=connector,
-                        ) as session,
-                        session.post(
-                            f"{endpoint}/generate",
-                            json=post_data,
-                        ) as resp,
-                    ):
+                    session = media_cache.get_session()
+                    async with session.post(
+                        f"{endpoint}/generate",
+                        json=post_data,
+                    ) as resp:
                         if resp.status == 200:
                             ret = await resp.json()
                             return f"{endpoint}/{ret['data']['id']}"
@@ -8,6 +8,7 @@ from io import BytesIO
 
 from astrbot.core import logger
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+from astrbot.core.utils.io import media_cache
 
 
 async def tencent_silk_to_wav(silk_path: str, output_path: str) -> str:
@@ -130,8 +131,9 @@ async def audio_to_tencent_silk_base64(audio_path: str) -> tuple[str, float]:
 
     if ext != ".wav":
         await convert_to_pcm_wav(audio_path, temp_wav)
-        # 删除原文件
-        os.remove(audio_path)
+        # 删除原文件，媒体缓存中的文件是共享的，保留
+        if not media_cache.owns(audio_path):
+            os.remove(audio_path)
         wav_path = temp_wav
     else:
         wav_path = audio_path
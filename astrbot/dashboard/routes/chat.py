@@ -1,6 +1,7 @@
 import asyncio
 import json
 import os
+import time
 import uuid
 from contextlib import asynccontextmanager
 
@@ -16,6 +17,42 @@ from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 
 from .route import Response, Route, RouteContext
 
+SSE_FLUSH_INTERVAL = 0.02
+"""流式文本增量的最小发送间隔（秒）"""
+SSE_COALESCE_MAX_CHARS = 2048
+
+
+def _is_stream_delta(result: dict | None) -> bool:
+    return bool(
+        result
+        and result.get("type") == "plain"
+        and result.get("streaming")
+        and isinstance(result.get("data"), str),
+    )
+
+
+def _coalesce_deltas(
+    result: dict, back_queue: asyncio.Queue
+) -> tuple[dict, dict | None]:
+    """将队列中已到达的连续流式文本增量合并到 result 中。
+
+    返回 (合并结果, 遇到的第一条不可合并的消息)。
+    """
+    merged = None
+    while len(result["data"]) < SSE_COALESCE_MAX_CHARS:
+        try:
+            item = back_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        if not _is_stream_delta(item) or item.get("chain_type") != result.get(
+            "chain_type",
+        ):
+            return result, item
+        if merged is None:
+            merged = result = dict(result)
+        result["data"] += item["data"]
+    return result, None
+
 
 @asynccontextmanager
 async def track_conversation(convs: dict, conv_id: str):
@@ -139,9 +176,6 @@ class ChatRoute(Route):
         # 追加用户消息
         webchat_conv_id = await self._get_webchat_conv_id_from_conv_id(conversation_id)
 
-        # 获取会话特定的队列
-        back_queue = webchat_queue_mgr.get_or_create_back_queue(webchat_conv_id)
-
         new_his = {"type": "user", "message": message}
         if image_url:
             new_his["image_url"] = image_url
@@ -160,65 +194,80 @@ class ChatRoute(Route):
 
             try:
                 async with track_conversation(self.running_convs, webchat_conv_id):
-                    while True:
-                        try:
-                            result = await asyncio.wait_for(back_queue.get(), timeout=1)
-                        except asyncio.TimeoutError:
-                            continue
-                        except asyncio.CancelledError:
-                            logger.debug(f"[WebChat] 用户 {username} 断开聊天长连接。")
-                            client_disconnected = True
-                        except Exception as e:
-                            logger.error(f"WebChat stream error: {e}")
-
-                        if not result:
-                            continue
-
-                        result_text = result["data"]
-                        type = result.get("type")
-                        streaming = result.get("streaming", False)
-
-                        try:
-                            if not client_disconnected:
-                                yield f"data: {json.dumps(result, ensure_ascii=False)}\n\n"
-                        except Exception as e:
-                            if not client_disconnected:
-                                logger.debug(
-                                    f"[WebChat] 用户 {username} 断开聊天长连接。 {e}",
+                    with webchat_queue_mgr.consume_back_queue(
+                        webchat_conv_id,
+                    ) as back_queue:
+                        pending = None
+                        last_flush = 0.0
+                        while True:
+                            if pending is not None:
+                                result, pending = pending, None
+                            else:
+                                try:
+                                    result = await back_queue.get()
+                                except asyncio.CancelledError:
+                                    logger.debug(
+                                        f"[WebChat] 用户 {username} 断开聊天长连接。",
+                                    )
+                                    client_disconnected = True
+                                    continue
+
+                            if not result:
+                                continue
+
+                            if _is_stream_delta(result) and not client_disconnected:
+                                # 限制发送频率，期间到达的增量合并为一条发送
+                                wait = (
+                                    last_flush + SSE_FLUSH_INTERVAL - time.monotonic()
+                                )
+                                if wait > 0:
+                                    try:
+                                        await asyncio.sleep(wait)
+                                    except asyncio.CancelledError:
+                                        logger.debug(
+                                            f"[WebChat] 用户 {username} 断开聊天长连接。",
+                                        )
+                                        client_disconnected = True
+                                result, pending = _coalesce_deltas(result, back_queue)
+                            last_flush = time.monotonic()
+
+                            result_text = result["data"]
+                            type = result.get("type")
+                            streaming = result.get("streaming", False)
+
+                            try:
+                                if not client_disconnected:
+                                    yield f"data: {json.dumps(result, ensure_ascii=False)}\n\n"
+                            except (Exception, asyncio.CancelledError) as e:
+                                if not client_disconnected:
+                                    logger.debug(
+                                        f"[WebChat] 用户 {username} 断开聊天长连接。 {e}",
+                                    )
+                                client_disconnected = True
+
+                            if type == "end":
+                                break
+                            elif (
+                                (streaming and type == "complete")
+                                or not streaming
+                                or type == "break"
+                            ):
+                                # 追加机器人消息
+                                new_his = {"type": "bot", "message": result_text}
+                                if "reasoning" in result:
+                                    new_his["reasoning"] = result["reasoning"]
+                                await self.platform_history_mgr.insert(
+                                    platform_id="webchat",
+                                    user_id=webchat_conv_id,
+                                    content=new_his,
+                                    sender_id="bot",
+                                    sender_name="bot",
                                 )
-                            client_disconnected = True
-
-                        try:
-                            if not client_disconnected:
-                                await asyncio.sleep(0.05)
-                        except asyncio.CancelledError:
-                            logger.debug(f"[WebChat] 用户 {username} 断开聊天长连接。")
-                            client_disconnected = True
-
-                        if type == "end":
-                            break
-                        elif (
-                            (streaming and type == "complete")
-                            or not streaming
-                            or type == "break"
-                        ):
-                            # 追加机器人消息
-                            new_his = {"type": "bot", "message": result_text}
-                            if "reasoning" in result:
-                                new_his["reasoning"] = result["reasoning"]
-                            await self.platform_history_mgr.insert(
-                                platform_id="webchat",
-                                user_id=webchat_conv_id,
-                                content=new_his,
-                                sender_id="bot",
-                                sender_name="bot",
-                            )
             except BaseException as e:
                 logger.exception(f"WebChat stream unexpected error: {e}", exc_info=True)
 
-        # 将消息放入会话特定的队列
-        chat_queue = webchat_queue_mgr.get_or_create_queue(webchat_conv_id)
-        await chat_queue.put(
+        # 将消息放入 WebChat 的输入队列
+        await webchat_queue_mgr.inbound_queue.put(
             (
                 username,
                 webchat_conv_id,
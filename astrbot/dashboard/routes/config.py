@@ -180,6 +180,7 @@ class ConfigRoute(Route):
             "/config/provider/check_one": ("GET", self.check_one_provider_status),
             "/config/provider/list": ("GET", self.get_provider_config_list),
             "/config/provider/model_list": ("GET", self.get_provider_model_list),
+            "/config/provider/key_stats": ("GET", self.get_provider_key_stats),
             "/config/provider/get_embedding_dim": ("POST", self.get_embedding_dim),
         }
         self.register_routes()
@@ -523,6 +524,8 @@ class ConfigRoute(Route):
                 "This provider type is not tested and is assumed to be available."
             )
 
+        if isinstance(provider, Provider):
+            status_info["key_stats"] = provider.get_key_stats()
         return status_info
 
     def _error_response(
@@ -613,6 +616,23 @@ class ConfigRoute(Route):
             logger.error(traceback.format_exc())
             return Response().error(str(e)).__dict__
 
+    async def get_provider_key_stats(self):
+        """获取指定提供商各个 API Key 的使用统计"""
+        provider_id = request.args.get("provider_id", None)
+        if not provider_id:
+            return Response().error("缺少参数 provider_id").__dict__
+
+        prov_mgr = self.core_lifecycle.provider_manager
+        provider = prov_mgr.inst_map.get(provider_id, None)
+        if not isinstance(provider, Provider):
+            return Response().error(f"未找到 ID 为 {provider_id} 的提供商").__dict__
+
+        ret = {
+            "provider_id": provider_id,
+            "keys": provider.get_key_stats(),
+        }
+        return Response().ok(ret).__dict__
+
     async def get_embedding_dim(self):
         """获取嵌入模型的维度"""
         post_data = await request.json
@@ -6,6 +6,11 @@ from quart import request
 from astrbot.core import logger
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.db import BaseDatabase
+from astrbot.core.provider.image_refs import (
+    ATTACHMENT_URL_PREFIX,
+    externalize_images,
+    resolve_image_refs,
+)
 
 from .route import Response, Route, RouteContext
 
@@ -101,6 +106,13 @@ class ConversationRoute(Route):
             logger.error(error_msg)
             return Response().error(f"获取对话列表失败: {e!s}").__dict__
 
+    @staticmethod
+    async def _resolve_history(history: str) -> str:
+        """将历史中的图片附件引用解析为 data URL，以便前端直接展示"""
+        if not history or ATTACHMENT_URL_PREFIX not in history:
+            return history
+        return json.dumps(await resolve_image_refs(json.loads(history)))
+
     async def get_conv_detail(self):
         """获取指定对话详情（通过POST请求）"""
         try:
@@ -126,7 +138,7 @@ class ConversationRoute(Route):
                         "cid": cid,
                         "title": conversation.title,
                         "persona_id": conversation.persona_id,
-                        "history": conversation.history,
+                        "history": await self._resolve_history(conversation.history),
                         "created_at": conversation.created_at,
                         "updated_at": conversation.updated_at,
                     },
@@ -271,6 +283,8 @@ class ConversationRoute(Route):
                 return Response().error("对话不存在").__dict__
 
             history = json.loads(history) if isinstance(history, str) else history
+            # 前端拿到的是解析后的 data URL，保存时重新转为附件引用
+            history = await externalize_images(history)
 
             await self.conv_mgr.update_conversation(
                 unified_msg_origin=user_id,
@@ -2,6 +2,7 @@
 
 import asyncio
 import os
+import shutil
 import traceback
 import uuid
 
@@ -10,11 +11,18 @@ from quart import request
 
 from astrbot.core import logger
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
+from astrbot.core.knowledge_base.processing import MAX_WORKERS as KB_PROCESS_WORKERS
+from astrbot.core.knowledge_base.upload_tasks import UploadTaskRegistry
 from astrbot.core.provider.provider import EmbeddingProvider, RerankProvider
+from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 
 from ..utils import generate_tsne_visualization
 from .route import Response, Route, RouteContext
 
+UPLOAD_MAX_FILE_SIZE = 100 * 1024 * 1024
+"""单个上传文件的大小上限"""
+UPLOAD_SPOOL_CHUNK_SIZE = 64 * 1024
+
 
 class KnowledgeBaseRoute(Route):
     """知识库管理路由
@@ -33,8 +41,7 @@ class KnowledgeBaseRoute(Route):
         self.kb_db = None
         self.session_config_db = None  # 会话配置数据库
         self.retrieval_manager = None
-        self.upload_progress = {}  # 存储上传进度 {task_id: {status, file_index, file_total, stage, current, total}}
-        self.upload_tasks = {}  # 存储后台上传任务 {task_id: {"status", "result", "error"}}
+        self.upload_tasks = UploadTaskRegistry()  # 上传任务的状态、结果与进度
 
         # 注册路由
         self.routes = {
@@ -69,6 +76,20 @@ class KnowledgeBaseRoute(Route):
     def _get_kb_manager(self):
         return self.core_lifecycle.kb_manager
 
+    @staticmethod
+    async def _spool_upload(file, file_path: str):
+        """将上传的文件分块写入磁盘，超过大小限制时抛出 ValueError"""
+        size = 0
+        async with aiofiles.open(file_path, "wb") as f:
+            while data := file.stream.read(UPLOAD_SPOOL_CHUNK_SIZE):
+                size += len(data)
+                if size > UPLOAD_MAX_FILE_SIZE:
+                    raise ValueError(
+                        f"文件 {file.filename} 超过大小限制 "
+                        f"({UPLOAD_MAX_FILE_SIZE // 1024 // 1024} MB)",
+                    )
+                await f.write(data)
+
     async def _background_upload_task(
         self,
         task_id: str,
@@ -79,73 +100,71 @@ class KnowledgeBaseRoute(Route):
         batch_size: int,
         tasks_limit: int,
         max_retries: int,
+        spool_dir: str,
     ):
         """后台上传任务"""
         try:
             # 初始化任务状态
-            self.upload_tasks[task_id] = {
-                "status": "processing",
-                "result": None,
-                "error": None,
-            }
-            self.upload_progress[task_id] = {
-                "status": "processing",
-                "file_index": 0,
-                "file_total": len(files_to_upload),
-                "stage": "waiting",
-                "current": 0,
-                "total": 100,
-            }
+            await self.upload_tasks.set_status(task_id, "processing")
+            self.upload_tasks.init_progress(task_id, len(files_to_upload))
 
             uploaded_docs = []
             failed_docs = []
-
-            for file_idx, file_info in enumerate(files_to_upload):
-                try:
-                    # 更新整体进度
-                    self.upload_progress[task_id].update(
-                        {
-                            "status": "processing",
-                            "file_index": file_idx,
-                            "file_name": file_info["file_name"],
-                            "stage": "parsing",
-                            "current": 0,
-                            "total": 100,
-                        },
-                    )
-
-                    # 创建进度回调函数
-                    async def progress_callback(stage, current, total):
-                        if task_id in self.upload_progress:
-                            self.upload_progress[task_id].update(
-                                {
-                                    "status": "processing",
-                                    "file_index": file_idx,
-                                    "file_name": file_info["file_name"],
-                                    "stage": stage,
-                                    "current": current,
-                                    "total": total,
-                                },
+            # 多个文件并行处理，并行数与文档解析进程数一致
+            semaphore = asyncio.Semaphore(KB_PROCESS_WORKERS)
+
+            async def upload_one(file_idx: int, file_info: dict):
+                async with semaphore:
+                    try:
+                        # 更新整体进度
+                        self.upload_tasks.update_progress(
+                            task_id,
+                            status="processing",
+                            file_index=file_idx,
+                            file_name=file_info["file_name"],
+                            stage="parsing",
+                            current=0,
+                            total=100,
+                        )
+
+                        # 创建进度回调函数
+                        async def progress_callback(stage, current, total):
+                            self.upload_tasks.update_progress(
+                                task_id,
+                                status="processing",
+                                file_index=file_idx,
+                                file_name=file_info["file_name"],
+                                stage=stage,
+                                current=current,
+                                total=total,
                             )
 
-                    doc = await kb_helper.upload_document(
-                        file_name=file_info["file_name"],
-                        file_content=file_info["file_content"],
-                        file_type=file_info["file_type"],
-                        chunk_size=chunk_size,
-                        chunk_overlap=chunk_overlap,
-                        batch_size=batch_size,
-                        tasks_limit=tasks_limit,
-                        max_retries=max_retries,
-                        progress_callback=progress_callback,
-                    )
-
-                    uploaded_docs.append(doc.model_dump())
-                except Exception as e:
-                    logger.error(f"上传文档 {file_info['file_name']} 失败: {e}")
-                    failed_docs.append(
-                        {"file_name": file_info["file_name"], "error": str(e)},
-                    )
+                        doc = await kb_helper.upload_document(
+                            file_name=file_info["file_name"],
+                            file_content=file_info["file_path"],
+                            file_type=file_info["file_type"],
+                            chunk_size=chunk_size,
+                            chunk_overlap=chunk_overlap,
+                            batch_size=batch_size,
+                            tasks_limit=tasks_limit,
+                            max_retries=max_retries,
+                            progress_callback=progress_callback,
+                            upload_id=f"{task_id}-{file_idx}",
+                        )
+
+                        uploaded_docs.append(doc.model_dump())
+                    except Exception as e:
+                        logger.error(f"上传文档 {file_info['file_name']} 失败: {e}")
+                        failed_docs.append(
+                            {"file_name": file_info["file_name"], "error": str(e)},
+                        )
+
+            await asyncio.gather(
+                *(
+                    upload_one(file_idx, file_info)
+                    for file_idx, file_info in enumerate(files_to_upload)
+                ),
+            )
 
             # 更新任务完成状态
             result = {
@@ -157,23 +176,14 @@ class KnowledgeBaseRoute(Route):
                 "failed_count": len(failed_docs),
             }
 
-            self.upload_tasks[task_id] = {
-                "status": "completed",
-                "result": result,
-                "error": None,
-            }
-            self.upload_progress[task_id]["status"] = "completed"
+            await self.upload_tasks.set_status(task_id, "completed", result=result)
 
         except Exception as e:
             logger.error(f"后台上传任务 {task_id} 失败: {e}")
             logger.error(traceback.format_exc())
-            self.upload_tasks[task_id] = {
-                "status": "failed",
-                "result": None,
-                "error": str(e),
-            }
-            if task_id in self.upload_progress:
-                self.upload_progress[task_id]["status"] = "failed"
+            await self.upload_tasks.set_status(task_id, "failed", error=str(e))
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
 
     async def list_kbs(self):
         """获取知识库列表
@@ -221,6 +231,9 @@ class KnowledgeBaseRoute(Route):
         - top_k_dense: 密集检索数量 (可选, 默认50)
         - top_k_sparse: 稀疏检索数量 (可选, 默认50)
         - top_m_final: 最终返回数量 (可选, 默认5)
+        - index_type: 向量索引类型 flat/ivf_flat/ivf_pq/hnsw (可选, 默认flat)
+        - index_nprobe: IVF 索引检索的聚类数 (可选, 默认16)
+        - index_ef_search: HNSW 索引检索的候选数 (可选, 默认64)
         """
         try:
             kb_manager = self._get_kb_manager()
@@ -238,6 +251,9 @@ class KnowledgeBaseRoute(Route):
             top_k_dense = data.get("top_k_dense")
             top_k_sparse = data.get("top_k_sparse")
             top_m_final = data.get("top_m_final")
+            index_type = data.get("index_type")
+            index_nprobe = data.get("index_nprobe")
+            index_ef_search = data.get("index_ef_search")
 
             # pre-check embedding dim
             if not embedding_provider_id:
@@ -292,6 +308,9 @@ class KnowledgeBaseRoute(Route):
                 top_k_dense=top_k_dense,
                 top_k_sparse=top_k_sparse,
                 top_m_final=top_m_final,
+                index_type=index_type,
+                index_nprobe=index_nprobe,
+                index_ef_search=index_ef_search,
             )
             kb = kb_helper.kb
 
@@ -345,6 +364,9 @@ class KnowledgeBaseRoute(Route):
         - top_k_dense: 密集检索数量 (可选)
         - top_k_sparse: 稀疏检索数量 (可选)
         - top_m_final: 最终返回数量 (可选)
+        - index_type: 向量索引类型 flat/ivf_flat/ivf_pq/hnsw (可选)
+        - index_nprobe: IVF 索引检索的聚类数 (可选)
+        - index_ef_search: HNSW 索引检索的候选数 (可选)
         """
         try:
             kb_manager = self._get_kb_manager()
@@ -364,6 +386,9 @@ class KnowledgeBaseRoute(Route):
             top_k_dense = data.get("top_k_dense")
             top_k_sparse = data.get("top_k_sparse")
             top_m_final = data.get("top_m_final")
+            index_type = data.get("index_type")
+            index_nprobe = data.get("index_nprobe")
+            index_ef_search = data.get("index_ef_search")
 
             # 检查是否至少提供了一个更新字段
             if all(
@@ -379,6 +404,9 @@ class KnowledgeBaseRoute(Route):
                     top_k_dense,
                     top_k_sparse,
                     top_m_final,
+                    index_type,
+                    index_nprobe,
+                    index_ef_search,
                 ]
             ):
                 return Response().error("至少需要提供一个更新字段").__dict__
@@ -395,6 +423,9 @@ class KnowledgeBaseRoute(Route):
                 top_k_dense=top_k_dense,
                 top_k_sparse=top_k_sparse,
                 top_m_final=top_m_final,
+                index_type=index_type,
+                index_nprobe=index_nprobe,
+                index_ef_search=index_ef_search,
             )
 
             if not kb_helper:
@@ -523,7 +554,7 @@ class KnowledgeBaseRoute(Route):
 
         Form Data (multipart/form-data):
         - kb_id: 知识库 ID (必填)
-        - file: 文件对象 (必填，可多个，字段名为 file, file1, file2, ... 或 files[])
+        - file: 文件对象 (必填，可多个，字段名为 file, file1, file2, ... 或 files[])，单个文件不超过 100 MB
 
         JSON Body (application/json):
         - kb_id: 知识库 ID (必填)
@@ -578,18 +609,27 @@ class KnowledgeBaseRoute(Route):
             if len(file_list) > 10:
                 return Response().error("最多只能上传10个文件").__dict__
 
-            # 处理每个文件
-            for file in file_list:
-                file_name = file.filename
+            # 获取知识库
+            kb_helper = await kb_manager.get_kb(kb_id)
+            if not kb_helper:
+                return Response().error("知识库不存在").__dict__
 
-                # 保存到临时文件
-                temp_file_path = f"data/temp/{uuid.uuid4()}_{file_name}"
-                await file.save(temp_file_path)
+            # 生成任务ID
+            task_id = str(uuid.uuid4())
 
-                try:
-                    # 异步读取文件内容
-                    async with aiofiles.open(temp_file_path, "rb") as f:
-                        file_content = await f.read()
+            # 将文件流式写入磁盘暂存，后台任务直接读取暂存文件
+            spool_dir = os.path.join(
+                get_astrbot_data_path(),
+                "temp",
+                "kb_uploads",
+                task_id,
+            )
+            os.makedirs(spool_dir, exist_ok=True)
+            try:
+                for idx, file in enumerate(file_list):
+                    file_name = os.path.basename(file.filename or "")
+                    file_path = os.path.join(spool_dir, f"{idx}_{file_name}")
+                    await self._spool_upload(file, file_path)
 
                     # 提取文件类型
                     file_type = (
@@ -599,29 +639,16 @@ class KnowledgeBaseRoute(Route):
                     files_to_upload.append(
                         {
                             "file_name": file_name,
-                            "file_content": file_content,
+                            "file_path": file_path,
                             "file_type": file_type,
                         },
                     )
-                finally:
-                    # 清理临时文件
-                    if os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
-
-            # 获取知识库
-            kb_helper = await kb_manager.get_kb(kb_id)
-            if not kb_helper:
-                return Response().error("知识库不存在").__dict__
-
-            # 生成任务ID
-            task_id = str(uuid.uuid4())
+            except BaseException:
+                shutil.rmtree(spool_dir, ignore_errors=True)
+                raise
 
             # 初始化任务状态
-            self.upload_tasks[task_id] = {
-                "status": "pending",
-                "result": None,
-                "error": None,
-            }
+            await self.upload_tasks.set_status(task_id, "pending")
 
             # 启动后台任务
             asyncio.create_task(
@@ -634,6 +661,7 @@ class KnowledgeBaseRoute(Route):
                     batch_size=batch_size,
                     tasks_limit=tasks_limit,
                     max_retries=max_retries,
+                    spool_dir=spool_dir,
                 ),
             )
 
@@ -674,10 +702,11 @@ class KnowledgeBaseRoute(Route):
                 return Response().error("缺少参数 task_id").__dict__
 
             # 检查任务是否存在
-            if task_id not in self.upload_tasks:
+            task = await self.upload_tasks.get(task_id)
+            if task is None:
                 return Response().error("找不到该任务").__dict__
 
-            task_info = self.upload_tasks[task_id]
+            task_info, progress = task
             status = task_info["status"]
 
             # 构建返回数据
@@ -687,16 +716,12 @@ class KnowledgeBaseRoute(Route):
             }
 
             # 如果任务正在处理，返回进度信息
-            if status == "processing" and task_id in self.upload_progress:
-                response_data["progress"] = self.upload_progress[task_id]
+            if status == "processing" and progress is not None:
+                response_data["progress"] = progress
 
-            # 如果任务完成，返回结果
+            # 如果任务完成，返回结果 (已结束的任务在过期后自动清理)
             if status == "completed":
                 response_data["result"] = task_info["result"]
-                # 清理已完成的任务
-                # del self.upload_tasks[task_id]
-                # if task_id in self.upload_progress:
-                #     del self.upload_progress[task_id]
 
             # 如果任务失败，返回错误信息
             if status == "failed":
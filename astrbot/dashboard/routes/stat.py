@@ -11,6 +11,7 @@ from astrbot.core.config import VERSION
 from astrbot.core.core_lifecycle import AstrBotCoreLifecycle
 from astrbot.core.db import BaseDatabase
 from astrbot.core.db.migration.helper import check_migration_needed_v4
+from astrbot.core.pipeline.content_safety_check.stage import ContentSafetyCheckStage
 from astrbot.core.utils.io import get_dashboard_version
 
 from .route import Response, Route, RouteContext
@@ -80,6 +81,18 @@ class StatRoute(Route):
     async def get_start_time(self):
         return Response().ok({"start_time": self.core_lifecycle.start_time}).__dict__
 
+    def _get_content_safety_stats(self) -> dict[str, dict]:
+        """各配置文件的内容安全策略耗时、失败次数与审核缓存命中情况"""
+        stats = {}
+        for (
+            conf_id,
+            scheduler,
+        ) in self.core_lifecycle.pipeline_scheduler_mapping.items():
+            for stage in scheduler.stages:
+                if isinstance(stage, ContentSafetyCheckStage):
+                    stats[conf_id] = stage.strategy_selector.stats()
+        return stats
+
     async def get_stat(self):
         offset_sec = request.args.get("offset_sec", 86400)
         offset_sec = int(offset_sec)
@@ -141,6 +154,8 @@ class StatRoute(Route):
                     "cpu_percent": round(cpu_percent, 1),
                     "thread_count": thread_count,
                     "start_time": self.core_lifecycle.start_time,
+                    "event_bus": self.core_lifecycle.event_bus.get_metrics(),
+                    "content_safety": self._get_content_safety_stats(),
                 },
             )
 
@@ -0,0 +1,5 @@
+"""知识库文档解析与分块
+
+这些模块会在文档解析进程池的子进程中导入，因此不能导入 astrbot.core：
+导入 astrbot.core 会加载配置、创建数据库连接并启动后台线程。
+"""
@@ -4,6 +4,7 @@
 """
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
 
 
 class BaseChunker(ABC):
@@ -23,3 +24,11 @@ class BaseChunker(ABC):
             list[str]: 分块后的文本列表
 
         """
+
+    def split_text(self, text: str, **kwargs) -> list[str]:
+        """同步地将文本分块，用于在进程池中执行。未实现时分块在事件循环中执行"""
+        raise NotImplementedError
+
+    def split_stream(self, texts: Iterable[str], **kwargs) -> list[str]:
+        """对以空行连接的多段文本 (如 PDF 的逐页文本) 分块"""
+        return self.split_text("\n\n".join(texts), **kwargs)
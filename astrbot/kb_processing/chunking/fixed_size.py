@@ -35,6 +35,9 @@ class FixedSizeChunker(BaseChunker):
             list[str]: 分块后的文本列表
 
         """
+        return self.split_text(text, **kwargs)
+
+    def split_text(self, text: str, **kwargs) -> list[str]:
         chunk_size = kwargs.get("chunk_size", self.chunk_size)
         chunk_overlap = kwargs.get("chunk_overlap", self.chunk_overlap)
 
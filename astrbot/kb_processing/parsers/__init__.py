@@ -0,0 +1,15 @@
+"""文档解析器模块"""
+
+from .base import BaseParser, DocumentSource, MediaItem, ParseResult, open_source
+from .pdf_parser import PDFParser
+from .text_parser import TextParser
+
+__all__ = [
+    "BaseParser",
+    "DocumentSource",
+    "MediaItem",
+    "PDFParser",
+    "ParseResult",
+    "TextParser",
+    "open_source",
+]
@@ -0,0 +1,86 @@
+"""文档解析器基类和数据结构
+
+定义了文档解析器的抽象接口和相关数据类。
+"""
+
+import asyncio
+import io
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO
+
+DocumentSource = bytes | str | os.PathLike | BinaryIO
+"""文档来源：文件内容、文件路径或二进制流"""
+
+
+@contextmanager
+def open_source(source: DocumentSource) -> Iterator[BinaryIO]:
+    """以二进制流的形式打开文档来源"""
+    if isinstance(source, bytes | bytearray):
+        yield io.BytesIO(source)
+    elif isinstance(source, str | os.PathLike):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        yield source
+
+
+@dataclass
+class MediaItem:
+    """多媒体项
+
+    表示从文档中提取的多媒体资源。
+    """
+
+    media_type: str  # image, video
+    file_name: str
+    content: bytes
+    mime_type: str
+
+
+@dataclass
+class ParseResult:
+    """解析结果
+
+    包含解析后的文本内容和提取的多媒体资源。
+    """
+
+    text: str
+    media: list[MediaItem]
+
+
+class BaseParser(ABC):
+    """文档解析器基类
+
+    所有文档解析器都应该继承此类并实现 parse 方法。
+    """
+
+    @abstractmethod
+    async def parse(self, file_content: DocumentSource, file_name: str) -> ParseResult:
+        """解析文档
+
+        Args:
+            file_content: 文件内容、文件路径或二进制流
+            file_name: 文件名
+
+        Returns:
+            ParseResult: 解析结果
+
+        """
+
+    def parse_stream(
+        self,
+        file_content: DocumentSource,
+        file_name: str,
+    ) -> Iterator["str | MediaItem"]:
+        """同步地逐段 (如逐页) 解析文档，依次产出文本片段和多媒体资源
+
+        用于在进程池中执行，产出的文本片段之间以空行连接即为完整文本。
+        默认在新的事件循环中执行 parse()，一次性产出全文和多媒体资源。
+        """
+        result = asyncio.run(self.parse(file_content, file_name))
+        yield result.text
+        yield from result.media
@@ -0,0 +1,38 @@
+import os
+from collections.abc import Iterator
+
+from markitdown_no_magika import MarkItDown, StreamInfo
+
+from .base import (
+    BaseParser,
+    DocumentSource,
+    ParseResult,
+    open_source,
+)
+
+
+class MarkitdownParser(BaseParser):
+    """解析 docx, xls, xlsx 格式"""
+
+    async def parse(self, file_content: DocumentSource, file_name: str) -> ParseResult:
+        return ParseResult(
+            text=self._convert(file_content, file_name),
+            media=[],
+        )
+
+    def parse_stream(
+        self,
+        file_content: DocumentSource,
+        file_name: str,
+    ) -> Iterator[str]:
+        yield self._convert(file_content, file_name)
+
+    @staticmethod
+    def _convert(source: DocumentSource, file_name: str) -> str:
+        md = MarkItDown(enable_plugins=False)
+        stream_info = StreamInfo(
+            extension=os.path.splitext(file_name)[1].lower(),
+            filename=file_name,
+        )
+        with open_source(source) as f:
+            return md.convert(f, stream_info=stream_info).markdown
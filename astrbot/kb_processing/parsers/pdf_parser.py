@@ -0,0 +1,121 @@
+"""PDF 文件解析器
+
+支持解析 PDF 文件中的文本和图片资源。
+"""
+
+from collections.abc import Iterator
+
+from pypdf import PdfReader
+
+from .base import (
+    BaseParser,
+    DocumentSource,
+    MediaItem,
+    ParseResult,
+    open_source,
+)
+
+
+class PDFParser(BaseParser):
+    """PDF 文档解析器
+
+    提取 PDF 中的文本内容和嵌入的图片资源。
+    """
+
+    async def parse(self, file_content: DocumentSource, file_name: str) -> ParseResult:
+        """解析 PDF 文件
+
+        Args:
+            file_content: 文件内容、文件路径或二进制流
+            file_name: 文件名
+
+        Returns:
+            ParseResult: 包含文本和图片的解析结果
+
+        """
+        text_parts = []
+        media_items = []
+        for item in self.parse_stream(file_content, file_name):
+            if isinstance(item, MediaItem):
+                media_items.append(item)
+            elif item:
+                text_parts.append(item)
+
+        full_text = "\n\n".join(text_parts)
+        return ParseResult(text=full_text, media=media_items)
+
+    def parse_stream(
+        self,
+        file_content: DocumentSource,
+        file_name: str,
+    ) -> Iterator[str | MediaItem]:
+        """逐页产出页面文本和页面中的图片"""
+        with open_source(file_content) as pdf_file:
+            reader = PdfReader(pdf_file)
+
+            image_counter = 0
+            for page_num, page in enumerate(reader.pages):
+                # 提取文本
+                text = page.extract_text()
+                if text:
+                    yield text
+
+                # 提取图片
+                for media_item in self._extract_images(page, page_num, image_counter):
+                    image_counter += 1
+                    yield media_item
+
+    @staticmethod
+    def _extract_images(page, page_num: int, image_counter: int) -> list[MediaItem]:
+        media_items = []
+        try:
+            # 安全检查 Resources
+            if "/Resources" not in page:
+                return media_items
+
+            resources = page["/Resources"]
+            if not resources or "/XObject" not in resources:  # type: ignore
+                return media_items
+
+            xobjects = resources["/XObject"].get_object()  # type: ignore
+            if not xobjects:
+                return media_items
+
+            for obj_name in xobjects:
+                try:
+                    obj = xobjects[obj_name]
+
+                    if obj.get("/Subtype") != "/Image":
+                        continue
+
+                    # 提取图片数据
+                    image_data = obj.get_data()
+
+                    # 确定格式
+                    filter_type = obj.get("/Filter", "")
+                    if filter_type == "/DCTDecode":
+                        ext = "jpg"
+                        mime_type = "image/jpeg"
+                    elif filter_type == "/FlateDecode":
+                        ext = "png"
+                        mime_type = "image/png"
+                    else:
+                        ext = "png"
+                        mime_type = "image/png"
+
+                    image_counter += 1
+                    media_items.append(
+                        MediaItem(
+                            media_type="image",
+                            file_name=f"page_{page_num}_img_{image_counter}.{ext}",
+                            content=image_data,
+                            mime_type=mime_type,
+                        ),
+                    )
+                except Exception:
+                    # 单个图片提取失败不影响整体
+                    continue
+        except Exception:
+            # 页面处理失败不影响其他页面
+            pass
+        return media_items
@@ -3,7 +3,14 @@
 支持解析 TXT 和 Markdown 文件。
 """
 
-from astrbot.core.knowledge_base.parsers.base import BaseParser, ParseResult
+from collections.abc import Iterator
+
+from .base import (
+    BaseParser,
+    DocumentSource,
+    ParseResult,
+    open_source,
+)
 
 
 class TextParser(BaseParser):
@@ -12,13 +19,13 @@ class TextParser(BaseParser):
     支持多种字符编码的自动检测。
     """
 
-    async def parse(self, file_content: bytes, file_name: str) -> ParseResult:
+    async def parse(self, file_content: DocumentSource, file_name: str) -> ParseResult:
         """解析文本文件
 
         尝试使用多种编码解析文件内容。
 
         Args:
-            file_content: 文件内容
+            file_content: 文件内容、文件路径或二进制流
             file_name: 文件名
 
         Returns:
@@ -28,6 +35,20 @@ class TextParser(BaseParser):
             ValueError: 如果无法解码文件
 
         """
+        # 文本文件无多媒体资源
+        return ParseResult(text=self._decode(file_content, file_name), media=[])
+
+    def parse_stream(
+        self,
+        file_content: DocumentSource,
+        file_name: str,
+    ) -> Iterator[str]:
+        yield self._decode(file_content, file_name)
+
+    @staticmethod
+    def _decode(source: DocumentSource, file_name: str) -> str:
+        with open_source(source) as f:
+            file_content = f.read()
         # 尝试多种编码
         for encoding in ["utf-8", "gbk", "gb2312", "gb18030"]:
             try:
@@ -37,6 +58,4 @@ class TextParser(BaseParser):
                 continue
         else:
             raise ValueError(f"无法解码文件: {file_name}")
-
-        # 文本文件无多媒体资源
-        return ParseResult(text=text, media=[])
+        return text
@@ -1,7 +1,7 @@
 from .base import BaseParser
 
 
-async def select_parser(ext: str) -> BaseParser:
+def get_parser(ext: str) -> BaseParser:
     if ext in {".md", ".txt", ".markdown", ".xlsx", ".docx", ".xls"}:
         from .markitdown_parser import MarkitdownParser
 
@@ -11,3 +11,7 @@ async def select_parser(ext: str) -> BaseParser:
 
         return PDFParser()
     raise ValueError(f"暂时不支持的文件格式: {ext}")
+
+
+async def select_parser(ext: str) -> BaseParser:
+    return get_parser(ext)
@@ -0,0 +1,34 @@
+"""文档解析进程池的任务入口，在子进程中执行"""
+
+from .chunking.base import BaseChunker
+from .parsers.base import DocumentSource, MediaItem
+from .parsers.util import get_parser
+
+
+def parse_and_chunk(
+    ext: str,
+    source: DocumentSource,
+    file_name: str,
+    chunker: BaseChunker | None,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> tuple[list[str], list[MediaItem]]:
+    """解析文档并分块。chunker 为空时只解析，返回的列表中仅包含全文"""
+    parser = get_parser(ext)
+    media: list[MediaItem] = []
+
+    def texts():
+        for item in parser.parse_stream(source, file_name):
+            if isinstance(item, MediaItem):
+                media.append(item)
+            elif item:
+                yield item
+
+    if chunker is None:
+        return ["\n\n".join(texts())], media
+    chunks = chunker.split_stream(
+        texts(),
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+    return chunks, media
@@ -0,0 +1,77 @@
+"""关键词内容安全检查基准测试
+
+对比逐个 re.search 的旧实现与 Aho-Corasick + 组合正则的 KeywordsStrategy。
+
+用法: python benchmarks/bench_keywords.py [关键词数量] [消息数量]
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import astrbot.api  # noqa: F401, E402
+from astrbot.core.pipeline.content_safety_check.strategies.keywords import (  # noqa: E402
+    KeywordsStrategy,
+)
+
+CJK = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+
+
+def random_word(rng: random.Random) -> str:
+    if rng.random() < 0.7:
+        return "".join(rng.choices(CJK, k=rng.randint(2, 5)))
+    return "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(4, 10)))
+
+
+def legacy_check(keywords: list[str], content: str) -> tuple[bool, str]:
+    for keyword in keywords:
+        if re.search(keyword, content):
+            return False, "内容安全检查不通过，匹配到敏感词。"
+    return True, ""
+
+
+def bench(name: str, fn, messages: list[str]) -> float:
+    start = time.perf_counter()
+    blocked = sum(not fn(m)[0] for m in messages)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<12} {elapsed * 1000:10.1f} ms  "
+        f"{elapsed / len(messages) * 1e6:10.1f} us/msg  命中 {blocked}",
+    )
+    return elapsed
+
+
+def main():
+    n_keywords = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_messages = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(0)
+
+    keywords = list({random_word(rng) for _ in range(n_keywords)})
+    # 约 1% 的关键词为正则
+    for i in range(0, len(keywords), 100):
+        keywords[i] = f"{keywords[i]}\\d+"
+
+    messages = []
+    for _ in range(n_messages):
+        text = "".join(rng.choices(CJK + list(" ，。abc"), k=rng.randint(20, 400)))
+        if rng.random() < 0.1:
+            pos = rng.randint(0, len(text))
+            text = text[:pos] + rng.choice(keywords).replace("\\d+", "42") + text[pos:]
+        messages.append(text)
+
+    print(f"关键词 {len(keywords)} 个，消息 {len(messages)} 条")
+    start = time.perf_counter()
+    strategy = KeywordsStrategy(keywords)
+    print(f"构建自动机   {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+    legacy = bench("re.search", lambda m: legacy_check(keywords, m), messages)
+    current = bench("automaton", strategy.check, messages)
+    print(f"加速比 {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
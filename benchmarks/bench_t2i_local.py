@@ -0,0 +1,92 @@
+"""本地文本转图片基准测试
+
+对比逐个前缀测量宽度的旧换行算法与按字符宽度累加的新算法，并测量长回答的完整渲染耗时。
+
+用法: python benchmarks/bench_t2i_local.py [重复次数]
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import astrbot.api  # noqa: F401, E402
+from astrbot.core.utils.t2i.local_strategy import (  # noqa: E402
+    FontManager,
+    MarkdownRenderer,
+    TextMeasurer,
+)
+
+PARAGRAPH = (
+    "大语言模型的回答往往包含很长的段落，例如对一个技术问题的详细解释。"
+    "Large language models often produce long paragraphs mixing English words, "
+    "数字 1234567890 和标点符号，在渲染为图片时需要按宽度自动换行。"
+)
+
+LONG_ANSWER = "\n".join(
+    [
+        "# 回答",
+        "",
+        *[PARAGRAPH * 3 for _ in range(6)],
+        "## 要点",
+        *[f"- 第 {i} 点：{PARAGRAPH}" for i in range(8)],
+        "> " + PARAGRAPH * 2,
+        "```python",
+        *[f"print('line {i}', {'x' * 60!r})" for i in range(20)],
+        "```",
+        "这里有 **加粗的内容** 和 *斜体的内容* 以及 `行内代码`。",
+    ]
+)
+
+
+def legacy_split(text, font, max_width):
+    lines = []
+    remaining_text = text
+    while remaining_text:
+        if TextMeasurer.get_text_size(remaining_text, font)[0] <= max_width:
+            lines.append(remaining_text)
+            break
+        for i in range(len(remaining_text), 0, -1):
+            if TextMeasurer.get_text_size(remaining_text[:i], font)[0] <= max_width:
+                lines.append(remaining_text[:i])
+                remaining_text = remaining_text[i:]
+                break
+        else:
+            lines.append(remaining_text[0])
+            remaining_text = remaining_text[1:]
+    return lines
+
+
+def timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    font = FontManager.get_font(26)
+    text = PARAGRAPH * 2
+    print(f"段落长度 {len(text)} 字符")
+
+    # 旧算法很慢，只执行一次
+    legacy = timeit(lambda: legacy_split(text, font, 780), 1)
+    current = timeit(
+        lambda: TextMeasurer.split_text_to_fit_width(text, font, 780), repeat
+    )
+    print(f"换行 旧算法 {legacy:10.2f} ms")
+    print(f"换行 新算法 {current:10.2f} ms  加速比 {legacy / current:.1f}x")
+
+    renderer = MarkdownRenderer(font_size=26, width=800)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        image = await renderer.render(LONG_ANSWER)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"完整渲染 {len(LONG_ANSWER)} 字符 -> {image.size}: {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
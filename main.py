@@ -5,11 +5,14 @@ import os
 import sys
 from pathlib import Path
 
-from astrbot.core import LogBroker, LogManager, db_helper, logger
-from astrbot.core.config.default import VERSION
-from astrbot.core.initial_loader import InitialLoader
-from astrbot.core.utils.astrbot_path import get_astrbot_data_path
-from astrbot.core.utils.io import download_dashboard, get_dashboard_version
+if __name__ != "__mp_main__":
+    # 文档解析进程池以 spawn 方式启动的子进程会以 __mp_main__ 的名字重新导入本文件，
+    # 此时不导入 astrbot.core，避免在每个子进程中初始化核心
+    from astrbot.core import LogBroker, LogManager, db_helper, logger
+    from astrbot.core.config.default import VERSION
+    from astrbot.core.initial_loader import InitialLoader
+    from astrbot.core.utils.astrbot_path import get_astrbot_data_path
+    from astrbot.core.utils.io import download_dashboard, get_dashboard_version
 
 # 将父目录添加到 sys.path
 sys.path.append(Path(__file__).parent.as_posix())
@@ -163,10 +163,11 @@ class LongTermMemory:
             req.prompt += f"\nNow, a new message is coming: `{prompt}`. Please react to it. Only output your response and do not output any other information."
             req.contexts = []  # 清空上下文，当使用了主动回复，所有聊天记录都在一个prompt中。
         else:
-            req.system_prompt += (
+            # 群聊记录每条消息都会变化，放在稳定的系统提示词之后
+            req.dynamic_system_prompt += (
                 "You are now in a chatroom. The chat history is as follows: \n"
             )
-            req.system_prompt += chats_str
+            req.dynamic_system_prompt += chats_str
 
     async def after_req_llm(self, event: AstrMessageEvent):
         if event.unified_msg_origin not in self.session_chats:
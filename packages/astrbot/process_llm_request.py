@@ -48,10 +48,7 @@ class ProcessLLMRequest:
         tmgr = self.ctx.get_llm_tool_manager()
         if (persona and persona.get("tools") is None) or not persona:
             # select all
-            toolset = tmgr.get_full_tool_set()
-            for tool in toolset:
-                if not tool.active:
-                    toolset.remove_tool(tool.name)
+            toolset = tmgr.get_active_tool_set()
         else:
             toolset = ToolSet()
             if persona["tools"]:
@@ -106,7 +103,11 @@ class ProcessLLMRequest:
         )
 
     async def process_llm_request(self, event: AstrMessageEvent, req: ProviderRequest):
-        """在请求 LLM 前注入人格信息、Identifier、时间、回复内容等 System Prompt"""
+        """在请求 LLM 前注入人格信息、Identifier、时间、回复内容等 System Prompt
+
+        人格设定写入 system_prompt；群名称、时间、引用消息等每轮可能变化的内容写入
+        dynamic_system_prompt，以保持系统提示词前缀稳定，命中提示词缓存。
+        """
         cfg: dict = self.ctx.get_config(umo=event.unified_msg_origin)[
             "provider_settings"
         ]
@@ -131,7 +132,7 @@ class ProcessLLMRequest:
         if cfg.get("group_name_display") and event.message_obj.group_id:
             group_name = event.message_obj.group.group_name
             if group_name:
-                req.system_prompt += f"\nGroup name: {group_name}\n"
+                req.dynamic_system_prompt += f"\nGroup name: {group_name}\n"
 
         # time info
         if cfg.get("datetime_system_prompt"):
@@ -147,7 +148,7 @@ class ProcessLLMRequest:
                 current_time = (
                     datetime.datetime.now().astimezone().strftime("%Y-%m-%d %H:%M (%Z)")
                 )
-            req.system_prompt += f"\nCurrent datetime: {current_time}\n"
+            req.dynamic_system_prompt += f"\nCurrent datetime: {current_time}\n"
 
         img_cap_prov_id: str = cfg.get("default_image_caption_provider_id") or ""
         if req.conversation:
@@ -170,7 +171,7 @@ class ProcessLLMRequest:
             if quote.sender_nickname:
                 sender_info = f"(Sent by {quote.sender_nickname})"
             message_str = quote.message_str or "[Empty Text]"
-            req.system_prompt += (
+            req.dynamic_system_prompt += (
                 f"\nUser is quoting a message{sender_info}.\n"
                 f"Here are the information of the quoted message: Text Content: {message_str}.\n"
             )
@@ -193,7 +194,7 @@ class ProcessLLMRequest:
                             image_urls=[await image_seg.convert_to_file_path()],
                         )
                         if llm_resp.completion_text:
-                            req.system_prompt += (
+                            req.dynamic_system_prompt += (
                                 f"Image Caption: {llm_resp.completion_text}\n"
                             )
                     else:
@@ -191,7 +191,7 @@ class Main(star.Star):
             ),
         )
 
-    @llm_tool(name="web_search")
+    @llm_tool(name="web_search", sequential=False)
     async def search_from_search_engine(
         self,
         event: AstrMessageEvent,
@@ -255,7 +255,7 @@ class Main(star.Star):
         self.baidu_initialized = True
         logger.info("Successfully initialized Baidu AI Search MCP server.")
 
-    @llm_tool(name="fetch_url")
+    @llm_tool(name="fetch_url", sequential=False)
     async def fetch_website_content(self, event: AstrMessageEvent, url: str) -> str:
         """Fetch the content of a website with the given web url
 
@@ -266,7 +266,7 @@ class Main(star.Star):
         resp = await self._get_from_url(url)
         return resp
 
-    @llm_tool("web_search_tavily")
+    @llm_tool("web_search_tavily", sequential=False)
     async def search_from_tavily(
         self,
         event: AstrMessageEvent,
@@ -337,7 +337,7 @@ class Main(star.Star):
             ret += "\n\n针对问题，请根据上面的结果分点总结，并且在结尾处附上对应内容的参考链接（如有）。"
         return ret
 
-    @llm_tool("tavily_extract_web_page")
+    @llm_tool("tavily_extract_web_page", sequential=False)
     async def tavily_extract_web_page(
         self,
         event: AstrMessageEvent,
@@ -0,0 +1,236 @@
+"""Tests that the waking check dispatch index selects the same handlers as a linear scan."""
+
+import itertools
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+import astrbot.api  # noqa: F401
+from astrbot.core.pipeline.waking_check.dispatch_index import HandlerDispatchIndex
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.platform.astrbot_message import AstrBotMessage
+from astrbot.core.platform.message_type import MessageType
+from astrbot.core.platform.platform_metadata import PlatformMetadata
+from astrbot.core.star.filter.command import CommandFilter
+from astrbot.core.star.filter.command_group import CommandGroupFilter
+from astrbot.core.star.filter.event_message_type import (
+    EventMessageType,
+    EventMessageTypeFilter,
+)
+from astrbot.core.star.filter.platform_adapter_type import (
+    PlatformAdapterType,
+    PlatformAdapterTypeFilter,
+)
+from astrbot.core.star.filter.regex import RegexFilter
+from astrbot.core.star.star import StarMetadata, star_map
+from astrbot.core.star.star_handler import EventType, StarHandlerMetadata
+
+ACTIVE_MODULE = "tests.dispatch_index_plugin"
+INACTIVE_MODULE = "tests.dispatch_index_inactive_plugin"
+
+
+async def no_args(self, event): ...
+
+
+async def one_arg(self, event, text: str): ...
+
+
+async def two_ints(self, event, a: int, b: int): ...
+
+
+def make_handler(name, filters, handler=no_args, module=ACTIVE_MODULE):
+    md = StarHandlerMetadata(
+        event_type=EventType.AdapterMessageEvent,
+        handler_full_name=f"{module}_{name}",
+        handler_name=name,
+        handler_module_path=module,
+        handler=handler,
+        event_filters=[],
+    )
+    for f in filters:
+        if isinstance(f, CommandFilter):
+            f.init_handler_md(md)
+    md.event_filters = filters
+    return md
+
+
+def build_handlers() -> list[StarHandlerMetadata]:
+    math_group = CommandGroupFilter("math", alias={"计算"})
+    shared_regex = RegexFilter(r"^shared")
+    return [
+        make_handler("help", [CommandFilter("help", alias={"帮助"})]),
+        make_handler("help_long", [CommandFilter("helpme")]),
+        make_handler(
+            "echo",
+            [
+                CommandFilter("echo"),
+                EventMessageTypeFilter(EventMessageType.GROUP_MESSAGE),
+            ],
+            handler=one_arg,
+        ),
+        make_handler(
+            "ping",
+            [CommandFilter("ping"), PlatformAdapterTypeFilter("aiocqhttp")],
+        ),
+        make_handler("math", [math_group]),
+        make_handler(
+            "math_add",
+            [
+                CommandFilter(
+                    "add", parent_command_names=math_group.get_complete_command_names()
+                )
+            ],
+            handler=two_ints,
+        ),
+        make_handler("digits", [RegexFilter(r"\d+$")]),
+        make_handler("backref", [RegexFilter(r"(a)\1")]),
+        make_handler(
+            "weather_qq",
+            [
+                RegexFilter(r".*天气"),
+                PlatformAdapterTypeFilter(PlatformAdapterType.AIOCQHTTP),
+            ],
+        ),
+        make_handler("shared_a", [shared_regex]),
+        make_handler(
+            "shared_b",
+            [shared_regex, EventMessageTypeFilter(EventMessageType.PRIVATE_MESSAGE)],
+        ),
+        make_handler(
+            "regex_and_command",
+            [CommandFilter("hi"), RegexFilter(r"hi there")],
+        ),
+        make_handler(
+            "private_only",
+            [EventMessageTypeFilter(EventMessageType.PRIVATE_MESSAGE)],
+        ),
+        make_handler("telegram_only", [PlatformAdapterTypeFilter("telegram")]),
+        make_handler(
+            "inactive_help",
+            [CommandFilter("help")],
+            module=INACTIVE_MODULE,
+        ),
+    ]
+
+
+MESSAGES = [
+    "help",
+    "帮助",
+    "help me",
+    "helpme",
+    "helpme  now",
+    "helper",
+    "echo hello",
+    "echo",
+    "ping",
+    "ping pong",
+    "math add 1 2",
+    "计算 add 3 4",
+    "math add x y",
+    "math",
+    "mathadd",
+    "12345",
+    "abc 123",
+    "aa",
+    "baab",
+    "今天天气",
+    "天气怎么样",
+    "shared stuff",
+    "hi there",
+    "hi",
+    "hello world",
+    "",
+]
+MESSAGE_TYPES = [MessageType.GROUP_MESSAGE, MessageType.FRIEND_MESSAGE]
+PLATFORMS = ["aiocqhttp", "telegram"]
+
+
+def make_event(message_str, message_type, platform, wake):
+    message_obj = AstrBotMessage()
+    message_obj.type = message_type
+    message_obj.message_str = message_str
+    message_obj.message = []
+    event = AstrMessageEvent(
+        message_str=message_str,
+        message_obj=message_obj,
+        platform_meta=PlatformMetadata(name=platform, description="", id=platform),
+        session_id="session",
+    )
+    event.is_at_or_wake_command = wake
+    return event
+
+
+def outcome(handler: StarHandlerMetadata, event: AstrMessageEvent) -> str:
+    """与 WakingCheckStage 一致地逐个执行过滤器"""
+    for f in handler.event_filters:
+        try:
+            if not f.filter(event, {}):
+                return "rejected"
+        except Exception:
+            return "error"
+    return "passed"
+
+
+def linear_scan(handlers, event) -> list[tuple[str, str]]:
+    ret = []
+    for handler in handlers:
+        plugin = star_map.get(handler.handler_module_path)
+        if not (plugin and plugin.activated):
+            continue
+        result = outcome(handler, event)
+        if result != "rejected":
+            ret.append((handler.handler_name, result))
+    return ret
+
+
+def indexed_scan(index: HandlerDispatchIndex, event) -> list[tuple[str, str]]:
+    ret = []
+    for handler in index.candidates(event):
+        result = outcome(handler, event)
+        if result != "rejected":
+            ret.append((handler.handler_name, result))
+    return ret
+
+
+@pytest.fixture
+def plugins():
+    star_map[ACTIVE_MODULE] = StarMetadata(name="dispatch_test", activated=True)
+    star_map[INACTIVE_MODULE] = StarMetadata(name="dispatch_off", activated=False)
+    yield
+    star_map.pop(ACTIVE_MODULE, None)
+    star_map.pop(INACTIVE_MODULE, None)
+
+
+@pytest.mark.parametrize(
+    ("message_str", "message_type", "platform", "wake"),
+    list(itertools.product(MESSAGES, MESSAGE_TYPES, PLATFORMS, [True, False])),
+)
+def test_index_matches_linear_scan(plugins, message_str, message_type, platform, wake):
+    handlers = build_handlers()
+    index = HandlerDispatchIndex(handlers)
+
+    expected = linear_scan(
+        handlers, make_event(message_str, message_type, platform, wake)
+    )
+    actual = indexed_scan(index, make_event(message_str, message_type, platform, wake))
+
+    assert actual == expected
+
+
+def test_index_skips_unmatched_gated_handlers(plugins):
+    handlers = build_handlers()
+    index = HandlerDispatchIndex(handlers)
+
+    event = make_event("hello world", MessageType.GROUP_MESSAGE, "aiocqhttp", True)
+    names = [h.handler_name for h in index.candidates(event)]
+
+    # 只剩下没有指令/正则过滤器的 Handler
+    assert names == ["private_only", "telegram_only"]
+
+    event = make_event("math add 1 2", MessageType.GROUP_MESSAGE, "aiocqhttp", True)
+    names = [h.handler_name for h in index.candidates(event)]
+    assert names == ["math", "math_add", "private_only", "telegram_only"]
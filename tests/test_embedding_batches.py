@@ -0,0 +1,75 @@
+"""Tests for batched embedding generation when batches finish out of order."""
+
+import asyncio
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+import astrbot.api  # noqa: F401
+from astrbot.core.db.vec_db.faiss_impl.vec_db import FaissVecDB
+from astrbot.core.provider.provider import EmbeddingProvider
+
+TEXT_COUNT = 10
+
+
+class ReversedEmbeddingProvider(EmbeddingProvider):
+    """越靠前的批次越晚完成，每个文本的向量为其序号对应的 one-hot 向量"""
+
+    def __init__(self):
+        super().__init__({}, {})
+        self.completed_batches: list[int] = []
+
+    async def get_embedding(self, text: str) -> list[float]:
+        return self._one_hot(int(text))
+
+    async def get_embeddings(self, text: list[str]) -> list[list[float]]:
+        first = int(text[0])
+        await asyncio.sleep(0.01 * (TEXT_COUNT - first))
+        self.completed_batches.append(first)
+        return [self._one_hot(int(t)) for t in text]
+
+    def get_dim(self) -> int:
+        return TEXT_COUNT
+
+    @staticmethod
+    def _one_hot(idx: int) -> list[float]:
+        vector = [0.0] * TEXT_COUNT
+        vector[idx] = 1.0
+        return vector
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_batch_aligns_out_of_order_batches():
+    provider = ReversedEmbeddingProvider()
+    texts = [str(i) for i in range(TEXT_COUNT)]
+
+    vectors = await provider.get_embeddings_batch(texts, batch_size=2, tasks_limit=5)
+
+    assert provider.completed_batches != sorted(provider.completed_batches)
+    assert vectors == [provider._one_hot(i) for i in range(TEXT_COUNT)]
+
+
+@pytest.mark.asyncio
+async def test_insert_batch_stores_each_vector_with_its_chunk(tmp_path):
+    provider = ReversedEmbeddingProvider()
+    vec_db = FaissVecDB(
+        str(tmp_path / "doc.db"),
+        str(tmp_path / "index.faiss"),
+        provider,
+    )
+    await vec_db.initialize()
+    texts = [str(i) for i in range(TEXT_COUNT)]
+
+    int_ids = await vec_db.insert_batch(texts, batch_size=2, tasks_limit=5)
+
+    assert provider.completed_batches != sorted(provider.completed_batches)
+    assert -1 not in int_ids
+    for i in range(TEXT_COUNT):
+        results = await vec_db.retrieve("", k=1, embedding=provider._one_hot(i))
+        assert results[0].data["text"] == str(i)
+        assert results[0].data["id"] == int_ids[i]
+    await vec_db.close()
@@ -0,0 +1,67 @@
+"""Tests for the keywords content safety strategy."""
+
+import os
+import sys
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import astrbot.api  # noqa: F401
+from astrbot.core.pipeline.content_safety_check.strategies.keywords import (
+    KeywordsStrategy,
+)
+from astrbot.core.utils.aho_corasick import AhoCorasick
+
+
+def test_aho_corasick_finds_overlapping_terms():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert automaton.search("ushers") == "she"
+    assert [end for end, _ in automaton.finditer("ushers")] == [4, 6]
+    assert automaton.search("nothing here") == "he"
+    assert automaton.search("xyz") is None
+    assert AhoCorasick([]).search("anything") is None
+
+
+def test_literal_keywords_use_automaton():
+    strategy = KeywordsStrategy(["敏感词", "badword"])
+    assert strategy.match("这里有敏感词出现") == "敏感词"
+    assert strategy.match("a BadWord here") == "badword"
+    assert strategy.match("clean text") is None
+    ok, info = strategy.check("badword")
+    assert not ok
+    assert "badword" in info
+
+
+def test_regex_keywords():
+    strategy = KeywordsStrategy([r"foo\d+", r"ba[rz]"])
+    assert strategy.match("xx foo42 yy") == r"foo\d+"
+    assert strategy.match("baz") == r"ba[rz]"
+    assert strategy.match("foo bar") == r"ba[rz]"
+    assert strategy.match("fooo") is None
+
+
+def test_regex_keywords_with_same_group_name():
+    strategy = KeywordsStrategy([r"(?P<x>foo)\d", r"(?P<x>bar)\d", r"(a)\1"])
+    assert strategy.match("foo1") == r"(?P<x>foo)\d"
+    assert strategy.match("bar2") == r"(?P<x>bar)\d"
+    assert strategy.match("aa") == r"(a)\1"
+    assert strategy.match("foo bar") is None
+
+
+def test_invalid_regex_falls_back_to_literal():
+    strategy = KeywordsStrategy(["[abc"])
+    assert strategy.match("x[abcx") == "[abc"
+    assert strategy.match("abc") is None
+
+
+def test_normalization():
+    strategy = KeywordsStrategy(["ＡＢＣ", "测试"])
+    assert strategy.match("abc") == "ＡＢＣ"
+    assert strategy.match("测​试") == "测试"
+
+    strategy = KeywordsStrategy(["ＡＢ.*c"])
+    assert strategy.match("ＡＢzzc") == "ＡＢ.*c"
+
+    strategy = KeywordsStrategy(["ＡＢＣ"], normalize=False)
+    assert strategy.match("abc") is None
+    assert strategy.match("ＡＢＣ") == "ＡＢＣ"
@@ -0,0 +1,126 @@
+"""Tests for concurrent tool call execution in the tool loop agent runner."""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+# Add project root to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+import astrbot.api  # noqa: F401
+from astrbot.core.agent.hooks import BaseAgentRunHooks
+from astrbot.core.agent.run_context import ContextWrapper
+from astrbot.core.agent.runners.base import AgentState
+from astrbot.core.agent.runners.tool_loop_agent_runner import ToolLoopAgentRunner
+from astrbot.core.agent.tool import FunctionTool, ToolSet
+from astrbot.core.astr_agent_tool_exec import FunctionToolExecutor
+from astrbot.core.message.message_event_result import MessageEventResult
+from astrbot.core.provider.entities import LLMResponse, ProviderRequest
+
+
+class FakeEvent:
+    """Only the parts of AstrMessageEvent used by local tool execution."""
+
+    def __init__(self):
+        self._result = None
+        self.sent: list[str] = []
+
+    def set_result(self, result):
+        self._result = result
+
+    def get_result(self):
+        return self._result
+
+    async def send(self, message):
+        self.sent.append(message.get_plain_text())
+
+
+def make_handler_tool(
+    name: str,
+    state: dict,
+    delay: float = 0.01,
+    sequential: bool | None = None,
+) -> FunctionTool:
+    async def handler(event):
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        await asyncio.sleep(delay)
+        state["running"] -= 1
+        yield MessageEventResult().message(f"reply from {name}")
+        yield f"result of {name}"
+
+    return FunctionTool(
+        name=name,
+        parameters={"type": "object", "properties": {}},
+        description=name,
+        handler=handler,
+        sequential=sequential,
+    )
+
+
+def make_runner(event: FakeEvent) -> ToolLoopAgentRunner:
+    runner = ToolLoopAgentRunner()
+    runner._state = AgentState.IDLE
+    runner.tool_executor = FunctionToolExecutor
+    runner.agent_hooks = BaseAgentRunHooks()
+    runner.run_context = ContextWrapper(
+        context=SimpleNamespace(event=event),
+        max_concurrent_tool_calls=4,
+    )
+    return runner
+
+
+async def run_tools(runner: ToolLoopAgentRunner, tools: list[FunctionTool]):
+    req = ProviderRequest(func_tool=ToolSet(tools))
+    llm_response = LLMResponse(
+        role="assistant",
+        tools_call_name=[tool.name for tool in tools],
+        tools_call_args=[{} for _ in tools],
+        tools_call_ids=[f"call_{tool.name}" for tool in tools],
+    )
+    blocks = []
+    async for result in runner._handle_function_tools(req, llm_response):
+        if isinstance(result, list):
+            blocks = result
+    return blocks
+
+
+@pytest.mark.asyncio
+async def test_handler_tools_do_not_share_event_result_concurrently():
+    state = {"running": 0, "max_running": 0}
+    tools = [make_handler_tool(name, state) for name in ("tool_a", "tool_b")]
+    event = FakeEvent()
+
+    blocks = await run_tools(make_runner(event), tools)
+
+    assert state["max_running"] == 1
+    assert event.sent == ["reply from tool_a", "reply from tool_b"]
+    assert [block.content for block in blocks] == [
+        "result of tool_a",
+        "result of tool_b",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_opted_in_tools_overlap_and_keep_call_order():
+    state = {"running": 0, "max_running": 0}
+    # tool_a 耗时更长，会晚于 tool_b 完成
+    tools = [
+        make_handler_tool("tool_a", state, delay=0.05, sequential=False),
+        make_handler_tool("tool_b", state, delay=0.01, sequential=False),
+    ]
+    event = FakeEvent()
+
+    blocks = await run_tools(make_runner(event), tools)
+
+    assert state["max_running"] == 2
+    # 每个调用发送自己的消息，不会读到另一个调用的结果
+    assert sorted(event.sent) == ["reply from tool_a", "reply from tool_b"]
+    assert [block.tool_call_id for block in blocks] == ["call_tool_a", "call_tool_b"]
+    assert [block.content for block in blocks] == [
+        "result of tool_a",
+        "result of tool_b",
+    ]